@@ -0,0 +1,278 @@
+"""
+APIサーバー（uvicorn）のプロセス管理
+
+Streamlitアプリの start_api_server() と start-streamlit.py から使う。
+- 待ち受けソケットを親プロセスで作り、N個の uvicorn ワーカーに --fd で共有させる
+  （Windowsではソケットを共有できないため uvicorn --workers の1プロセスで起動する）
+- 固定時間 sleep せず、/health が応答するまでバックオフ付きでポーリングする
+- ワーカーの標準出力・標準エラーはスレッドで読み続け、直近の行をリングバッファに保持する
+  （パイプが詰まって子プロセスが止まることがない）
+- 異常終了したワーカーはバックオフ付きで再起動する（短時間に再起動しすぎた場合は諦める）
+- ワーカーはそれぞれ別のプロセスグループで起動し、終了・再起動時には子プロセス（CPUワーカーなど）もまとめて止める
+- CPU_WORKERS が未指定なら、gunicorn.conf.py と同じく全体でCPU数程度になるようワーカーごとのCPUワーカー数を割り振る
+"""
+
+import atexit
+import collections
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from typing import List, Optional
+
+# ワーカー数・起動待ちの最大秒数・ワーカーごとの再起動回数の上限（RESTART_WINDOW 秒あたり）
+API_WORKERS = int(os.getenv("API_WORKERS", "1"))
+API_STARTUP_TIMEOUT = float(os.getenv("API_STARTUP_TIMEOUT", "30"))
+API_MAX_RESTARTS = int(os.getenv("API_MAX_RESTARTS", "5"))
+RESTART_WINDOW = 60
+
+# 保持するログの行数
+LOG_LINES = 500
+
+# --fd でソケットを子プロセスに渡せるか（Windowsでは不可）
+SHARED_SOCKET_SUPPORTED = os.name == "posix"
+
+# 強制終了に使うシグナル（Windows には SIGKILL がないため SIGTERM = TerminateProcess）
+KILL_SIGNAL = signal.SIGKILL if SHARED_SOCKET_SUPPORTED else signal.SIGTERM
+
+class Worker:
+    """uvicorn のワーカープロセス1つ"""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.process: Optional[subprocess.Popen] = None
+        self.restarts: List[float] = []
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self.process.pid if self.process else None
+
+    def is_running(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def signal_group(self, sig: int):
+        """ワーカーと、その子プロセスにシグナルを送る"""
+        if self.process is None:
+            return
+        try:
+            if SHARED_SOCKET_SUPPORTED:
+                os.killpg(self.process.pid, sig)
+            elif self.is_running():
+                self.process.send_signal(sig)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+class APISupervisor:
+    """APIサーバーのワーカーを起動・監視する
+
+        supervisor = APISupervisor(port=8000, workers=2)
+        supervisor.start()
+        if supervisor.wait_until_ready():
+            ...
+        supervisor.stop()
+    """
+
+    def __init__(
+        self,
+        app: str = "app.main:app",
+        host: str = "0.0.0.0",
+        port: int = 8000,
+        workers: Optional[int] = None,
+        max_restarts: Optional[int] = None,
+        cwd: Optional[str] = None,
+        echo: bool = False
+    ):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.worker_count = max(1, workers or API_WORKERS)
+        self.max_restarts = API_MAX_RESTARTS if max_restarts is None else max_restarts
+        self.cwd = cwd
+        self.echo = echo
+        self.workers: List[Worker] = []
+        self.failed = False
+        self._socket: Optional[socket.socket] = None
+        self._logs = collections.deque(maxlen=LOG_LINES)
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._monitor: Optional[threading.Thread] = None
+        self._atexit_registered = False
+
+    @property
+    def health_url(self) -> str:
+        host = "127.0.0.1" if self.host in ("0.0.0.0", "") else self.host
+        return f"http://{host}:{self.port}/health"
+
+    def start(self):
+        """ワーカーを起動し、監視スレッドを開始する（起動済みなら何もしない）"""
+        with self._lock:
+            if self._monitor is not None and self._monitor.is_alive():
+                return
+            self._stopping.clear()
+            self.failed = False
+
+            if SHARED_SOCKET_SUPPORTED:
+                self._socket = self._bind()
+                self.workers = [Worker(i) for i in range(self.worker_count)]
+            else:
+                # uvicorn 自身にワーカーを管理させる
+                self.workers = [Worker(0)]
+            for worker in self.workers:
+                self._spawn(worker)
+
+            self._monitor = threading.Thread(target=self._watch, name="api-supervisor", daemon=True)
+            self._monitor.start()
+
+            # start() / stop() を繰り返しても終了時の stop は1回だけ登録する
+            if not self._atexit_registered:
+                atexit.register(self.stop)
+                self._atexit_registered = True
+
+    def wait_until_ready(self, timeout: Optional[float] = None, initial_delay: float = 0.05, max_delay: float = 1.0) -> bool:
+        """/health が200を返すまでバックオフ付きでポーリング（すべてのワーカーが起動に失敗したら待たずに False）"""
+        deadline = time.monotonic() + (API_STARTUP_TIMEOUT if timeout is None else timeout)
+        delay = initial_delay
+        while True:
+            if self.is_healthy():
+                return True
+            if self.failed:
+                return False
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, max_delay)
+
+    def is_healthy(self, timeout: float = 1.0) -> bool:
+        try:
+            with urllib.request.urlopen(self.health_url, timeout=timeout) as response:
+                return response.status == 200
+        except (urllib.error.URLError, OSError):
+            return False
+
+    def is_running(self) -> bool:
+        """動いているワーカーが1つ以上あるか"""
+        return any(worker.is_running() for worker in self.workers)
+
+    def status(self) -> List[dict]:
+        """ワーカーごとの状態（PID・動作中か・再起動回数）"""
+        return [
+            {"worker": worker.index, "pid": worker.pid, "running": worker.is_running(), "restarts": len(worker.restarts)}
+            for worker in self.workers
+        ]
+
+    def logs(self, lines: int = 50) -> List[str]:
+        """直近のログ"""
+        return list(self._logs)[-lines:]
+
+    def stop(self, timeout: float = 5):
+        """ワーカーを終了する（SIGTERMで終わらなければ kill）"""
+        self._stopping.set()
+        with self._lock:
+            for worker in self.workers:
+                worker.signal_group(signal.SIGTERM)
+            for worker in self.workers:
+                if worker.process is None:
+                    continue
+                try:
+                    worker.process.wait(timeout=timeout)
+                except subprocess.TimeoutExpired:
+                    worker.process.kill()
+                    worker.process.wait()
+                worker.signal_group(KILL_SIGNAL)
+            if self._socket is not None:
+                self._socket.close()
+                self._socket = None
+
+    def _bind(self) -> socket.socket:
+        """ワーカーで共有する待ち受けソケット"""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(2048)
+        sock.set_inheritable(True)
+        return sock
+
+    def _command(self) -> List[str]:
+        command = [sys.executable, "-m", "uvicorn", self.app]
+        if self._socket is not None:
+            return command + ["--fd", str(self._socket.fileno())]
+        return command + ["--host", self.host, "--port", str(self.port), "--workers", str(self.worker_count)]
+
+    def _env(self) -> dict:
+        """ワーカーの環境変数（CPUExecutor のプロセス数をワーカー間で分ける）"""
+        env = dict(os.environ)
+        if "CPU_WORKERS" not in env:
+            try:
+                cpus = len(os.sched_getaffinity(0))
+            except AttributeError:
+                cpus = os.cpu_count() or 1
+            env["CPU_WORKERS"] = str(max(1, cpus // self.worker_count))
+        return env
+
+    def _spawn(self, worker: Worker):
+        worker.process = subprocess.Popen(
+            self._command(),
+            cwd=self.cwd,
+            env=self._env(),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            stdin=subprocess.DEVNULL,
+            pass_fds=(self._socket.fileno(),) if self._socket is not None else (),
+            start_new_session=SHARED_SOCKET_SUPPORTED,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            bufsize=1
+        )
+        threading.Thread(
+            target=self._drain, args=(worker.index, worker.process), name=f"api-worker-{worker.index}-log", daemon=True
+        ).start()
+
+    def _drain(self, index: int, process: subprocess.Popen):
+        """子プロセスの出力を読み続ける"""
+        for line in process.stdout:
+            line = f"[worker {index}] {line.rstrip()}"
+            self._logs.append(line)
+            if self.echo:
+                print(line, flush=True)
+        process.stdout.close()
+
+    def _watch(self):
+        """異常終了したワーカーを再起動する"""
+        while not self._stopping.wait(0.5):
+            with self._lock:
+                if self._stopping.is_set():
+                    return
+                for worker in self.workers:
+                    if worker.process is None or worker.is_running():
+                        continue
+
+                    now = time.monotonic()
+                    worker.restarts = [t for t in worker.restarts if now - t < RESTART_WINDOW]
+                    if len(worker.restarts) >= self.max_restarts:
+                        continue
+
+                    # 再起動が続く場合は待ち時間を延ばす（0.5秒, 1秒, 2秒...）
+                    backoff = 0.5 * 2 ** len(worker.restarts)
+                    if worker.restarts and now - worker.restarts[-1] < backoff:
+                        continue
+
+                    self._logs.append(
+                        f"[supervisor] worker {worker.index} (pid {worker.pid}) が終了しました (code {worker.process.returncode})。再起動します"
+                    )
+                    # 終了したワーカーの子プロセスが残っていれば止める
+                    worker.signal_group(KILL_SIGNAL)
+                    worker.restarts.append(now)
+                    self._spawn(worker)
+
+                # すべてのワーカーが再起動の上限に達したら諦める
+                self.failed = all(
+                    not worker.is_running() and len(worker.restarts) >= self.max_restarts
+                    for worker in self.workers
+                )
@@ -1,19 +1,86 @@
-import pandas as pd
-from typing import List, Dict, Optional
+from typing import AsyncIterator, List, Dict, Optional, Tuple, TYPE_CHECKING
 from sqlalchemy.orm import Session
 from app.models import Booking, GuestMessage, ResponseTemplate, ResponseLog
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-import numpy as np
 from datetime import datetime, timedelta
 import json
+from app.config import settings
+from app.services.cpu_executor import cpu_executor
+from app.services.language_detection import detect_language, reply_language
+from app.services.llm_backend import get_llm_service
+from app.services.ranking import rank_suggestions
+from app.services.suggestion import Suggestion, SuggestionType
+from app.services.template_engine import template_engine
+
+# pandas / scikit-learn は起動時間に大きく影響するため、使う時点で読み込む
+if TYPE_CHECKING:
+    import pandas as pd
+
+# LLMバックエンドを使わない場合の定型のAI生成候補（言語 -> メッセージタイプ。起動時に1回だけ作る）
+_CANNED_AI_RESPONSES = {
+    'ja': {
+        'luggage': [
+            "承知いたしました。お荷物の預かりサービスをご利用いただけます。フロントデスクまでお越しください。",
+            "お荷物の預かりは可能です。チェックイン前・チェックアウト後も対応いたします。",
+            "お荷物をお預かりいたします。安全に保管いたしますのでご安心ください。"
+        ],
+        'availability': [
+            "現在の空室状況をお調べいたします。ご希望の日程をお教えください。",
+            "予約可能な期間をご案内いたします。お急ぎの場合はお電話にてお問い合わせください。",
+            "空室カレンダーをご確認いたします。ご希望に合うお部屋をご提案いたします。"
+        ],
+        'attractions': [
+            "周辺の観光地をご案内いたします。おすすめスポットをご紹介いたします。",
+            "ホテル周辺の観光情報をお調べいたします。アクセス方法もご案内いたします。",
+            "地元の隠れた名所もご紹介いたします。お気軽にお尋ねください。"
+        ]
+    },
+    'en': {
+        'luggage': [
+            "Certainly. Our luggage storage service is available; please come to the front desk.",
+            "We can keep your luggage before check-in and after check-out.",
+            "We will be glad to look after your luggage. It will be stored safely."
+        ],
+        'availability': [
+            "We will check current availability for you. Could you tell us your preferred dates?",
+            "We can let you know which dates are available. For urgent requests, please call us.",
+            "We will check the availability calendar and suggest a room that suits you."
+        ],
+        'attractions': [
+            "We are happy to introduce sights around the hotel and recommend some favourite spots.",
+            "We will look up sightseeing information near the hotel, including how to get there.",
+            "We can also point you to some hidden local gems. Please feel free to ask."
+        ]
+    }
+}
+
+CANNED_AI_SUGGESTIONS = {
+    language: {
+        message_type: tuple(
+            Suggestion(response, SuggestionType.AI_GENERATED, 0.7, f'AI Generated #{i+1}')
+            for i, response in enumerate(responses)
+        )
+        for message_type, responses in by_type.items()
+    }
+    for language, by_type in _CANNED_AI_RESPONSES.items()
+}
 
 class BookingDataAgent:
     def __init__(self):
-        self.vectorizer = TfidfVectorizer(max_features=1000, stop_words=None)
+        self._vectorizer = None
         self.message_vectors = None
         self.template_vectors = None
         self.templates = []
+        self.template_ids = []
+    
+    @property
+    def vectorizer(self):
+        """TF-IDFベクトライザ（初回アクセス時に生成）"""
+        if self._vectorizer is None:
+            from sklearn.feature_extraction.text import TfidfVectorizer
+            
+            # 日本語は空白で分かち書きされないため文字n-gramでベクトル化する
+            self._vectorizer = TfidfVectorizer(max_features=1000, stop_words=None, analyzer='char_wb', ngram_range=(2, 3))
+        return self._vectorizer
     
     def learn_from_historical_data(self, db: Session, hotel_id: int):
         """過去の対応ログから学習"""
@@ -39,6 +106,7 @@ class BookingDataAgent:
                 templates = []
             
             self.templates = [template.template_content for template in templates]
+            self.template_ids = [template.id for template in templates]
             
             # TF-IDFベクトル化（テンプレートが存在する場合のみ）
             if self.templates:
@@ -64,6 +132,8 @@ class BookingDataAgent:
     
     def analyze_booking_patterns(self, db: Session, hotel_id: int) -> Dict:
         """予約パターンを分析"""
+        import pandas as pd
+        
         bookings = db.query(Booking).filter(Booking.hotel_id == hotel_id).all()
         
         if not bookings:
@@ -94,126 +164,181 @@ class BookingDataAgent:
         
         return analysis
     
-    def generate_response_suggestions(self, message: str, message_type: str, db: Session, hotel_id: int) -> List[Dict]:
+    async def analyze_booking_patterns_async(self, hotel_id: int) -> Dict:
+        """予約パターン分析をCPUExecutorのワーカーで実行"""
+        return await cpu_executor.run('analyze_booking_patterns', hotel_id=hotel_id)
+    
+    async def rank_by_template_similarity(self, message: str, hotel_id: int, suggestions: List[Suggestion]) -> List[Suggestion]:
+        """学習済みTF-IDFモデルとのコサイン類似度でテンプレート候補の信頼度を調整"""
+        try:
+            scores = await cpu_executor.run('rank_templates', hotel_id=hotel_id, message=message)
+        except Exception as e:
+            print(f"テンプレート類似度計算エラー: {str(e)}")
+            return suggestions
+        
+        return self._apply_template_similarity(scores, suggestions)
+    
+    async def rank_by_template_similarity_batch(self, messages: List[str], hotel_id: int, suggestion_lists: List[List[Suggestion]]) -> List[List[Suggestion]]:
+        """複数のメッセージのテンプレート候補を、TF-IDFの変換・類似度計算1回でまとめて調整"""
+        try:
+            batch_scores = await cpu_executor.run('rank_templates_batch', hotel_id=hotel_id, messages=messages)
+        except Exception as e:
+            print(f"テンプレート類似度計算エラー: {str(e)}")
+            return suggestion_lists
+        
+        return [
+            self._apply_template_similarity(scores, suggestions)
+            for scores, suggestions in zip(batch_scores, suggestion_lists)
+        ]
+    
+    def _apply_template_similarity(self, scores: List[Dict], suggestions: List[Suggestion]) -> List[Suggestion]:
+        """類似度（0〜1）をテンプレート候補の信頼度（0.7〜0.9）に反映
+
+        変数を描画した候補は本文がテンプレートと一致しないため、候補の根拠（Template: <ID>）で対応付ける。
+        テンプレートIDを保存していない古いモデルの場合は本文で対応付ける。
+        """
+        similarity = {}
+        for score in scores:
+            key = f"Template: {score['template_id']}" if score.get('template_id') is not None else score['content']
+            similarity[key] = score['similarity']
+        
+        adjusted = []
+        for suggestion in suggestions:
+            value = similarity.get(suggestion.source, similarity.get(suggestion.content)) if suggestion.type is SuggestionType.TEMPLATE else None
+            adjusted.append(suggestion if value is None else suggestion.with_confidence(round(0.7 + 0.2 * value, 3)))
+        return adjusted
+    
+    def generate_response_suggestions(self, message: str, message_type: str, db: Session, hotel_id: int, context=None) -> List[Suggestion]:
         """メッセージに基づいて返信候補を生成"""
         suggestions = []
+        language = detect_language(message)
         
         # 1. テンプレートベースの候補
-        template_suggestions = self._get_template_suggestions(message, message_type, db, hotel_id)
+        template_suggestions = self._get_template_suggestions(message, message_type, db, hotel_id, context, language=language)
         suggestions.extend(template_suggestions)
         
         # 2. AI生成の候補
-        ai_suggestions = self._generate_ai_suggestions(message, message_type, db, hotel_id)
+        ai_suggestions = self._generate_ai_suggestions(message, message_type, db, hotel_id, language)
         suggestions.extend(ai_suggestions)
         
         # 3. 過去の成功例ベースの候補
-        historical_suggestions = self._get_historical_suggestions(message, message_type, db, hotel_id)
+        historical_suggestions = self._get_historical_suggestions(message, message_type, db, hotel_id, language=language)
         suggestions.extend(historical_suggestions)
         
         # 重複を除去し、上位3つを返す
-        unique_suggestions = self._deduplicate_suggestions(suggestions)
+        unique_suggestions = rank_suggestions(suggestions, message)
         return unique_suggestions[:3]
     
-    def _get_template_suggestions(self, message: str, message_type: str, db: Session, hotel_id: int) -> List[Dict]:
-        """テンプレートベースの候補を生成"""
-        templates = db.query(ResponseTemplate).filter(
+    def _get_template_suggestions(self, message: str, message_type: str, db: Session, hotel_id: int, context=None, variables: Optional[Dict] = None, language: Optional[str] = None) -> List[Suggestion]:
+        """テンプレートベースの候補を生成（変数を含むテンプレートは variables で描画）"""
+        language = language or settings.DEFAULT_LANGUAGE
+        if context is not None:
+            # HotelContextの読み込み時に作成済みの、言語ごとの候補を使う
+            return context.get_template_suggestions(message_type, variables, language)
+        
+        query = db.query(ResponseTemplate).filter(
             ResponseTemplate.hotel_id == hotel_id,
             ResponseTemplate.message_type == message_type,
             ResponseTemplate.is_active == True
-        ).all()
+        )
+        templates = query.filter(ResponseTemplate.language == language).all()
+        if not templates and reply_language(language) != language:
+            templates = query.filter(ResponseTemplate.language == reply_language(language)).all()
         
         suggestions = []
         for template in templates:
-            suggestions.append({
-                'content': template.template_content,
-                'type': 'template',
-                'confidence': 0.8,
-                'source': f'Template: {template.id}'
-            })
+            content = template_engine.render(
+                (template.id, template.updated_at), template.template_content, variables or {}
+            )
+            if content:
+                suggestions.append(Suggestion(content, SuggestionType.TEMPLATE, 0.8, f'Template: {template.id}'))
         
         return suggestions
     
-    def _generate_ai_suggestions(self, message: str, message_type: str, db: Session, hotel_id: int) -> List[Dict]:
-        """AI生成の候補を作成"""
-        # 実際の実装ではOpenAI APIを使用
-        # ここでは仮の候補を返す
-        
-        ai_responses = {
-            'luggage': [
-                "承知いたしました。お荷物の預かりサービスをご利用いただけます。フロントデスクまでお越しください。",
-                "お荷物の預かりは可能です。チェックイン前・チェックアウト後も対応いたします。",
-                "お荷物をお預かりいたします。安全に保管いたしますのでご安心ください。"
-            ],
-            'availability': [
-                "現在の空室状況をお調べいたします。ご希望の日程をお教えください。",
-                "予約可能な期間をご案内いたします。お急ぎの場合はお電話にてお問い合わせください。",
-                "空室カレンダーをご確認いたします。ご希望に合うお部屋をご提案いたします。"
-            ],
-            'attractions': [
-                "周辺の観光地をご案内いたします。おすすめスポットをご紹介いたします。",
-                "ホテル周辺の観光情報をお調べいたします。アクセス方法もご案内いたします。",
-                "地元の隠れた名所もご紹介いたします。お気軽にお尋ねください。"
-            ]
-        }
-        
-        suggestions = []
-        responses = ai_responses.get(message_type, [])
+    async def generate_ai_suggestions(self, message: str, message_type: str, db: Session, hotel_id: int, context=None, language: str = 'ja') -> List[Suggestion]:
+        """LLMバックエンドでAI生成の候補を作成（LLMを使わない設定・エラー時は定型の候補）"""
+        llm_service = get_llm_service()
+        if llm_service is not None:
+            try:
+                return await llm_service.suggest(message, message_type, context, language)
+            except Exception as e:
+                print(f"LLM返信候補生成エラー: {str(e)}")
         
-        for i, response in enumerate(responses):
-            suggestions.append({
-                'content': response,
-                'type': 'ai_generated',
-                'confidence': 0.7,
-                'source': f'AI Generated #{i+1}'
-            })
+        return self._generate_ai_suggestions(message, message_type, db, hotel_id, language)
+    
+    async def stream_ai_suggestions(self, message: str, message_type: str, db: Session, hotel_id: int, context=None, language: str = 'ja') -> AsyncIterator[Suggestion]:
+        """AI生成の候補を1件できるたびに返す（LLMのストリーミング。LLMを使わない設定・候補を返す前のエラー時は定型の候補）"""
+        llm_service = get_llm_service()
+        if llm_service is not None:
+            streamed = False
+            try:
+                async for suggestion in llm_service.stream_suggestions(message, message_type, context, language):
+                    streamed = True
+                    yield suggestion
+                return
+            except Exception as e:
+                print(f"LLM返信候補生成エラー: {str(e)}")
+                if streamed:
+                    return
         
-        return suggestions
+        for suggestion in self._generate_ai_suggestions(message, message_type, db, hotel_id, language):
+            yield suggestion
+    
+    def _generate_ai_suggestions(self, message: str, message_type: str, db: Session, hotel_id: int, language: str = 'ja') -> List[Suggestion]:
+        """定型のAI生成候補を作成（LLMバックエンドを使わない場合）"""
+        return list(CANNED_AI_SUGGESTIONS[reply_language(language)].get(message_type, ()))
     
-    def _get_historical_suggestions(self, message: str, message_type: str, db: Session, hotel_id: int) -> List[Dict]:
-        """過去の成功例ベースの候補を生成"""
+    def _get_historical_suggestions(self, message: str, message_type: str, db: Session, hotel_id: int, deadline=None, language: Optional[str] = None) -> List[Suggestion]:
+        """過去の成功例ベースの候補を生成（language を指定するとその言語の返信のみ）"""
+        # リクエストの処理時間の予算を使い切っている場合はDBに問い合わせない
+        if deadline is not None and deadline.expired():
+            return []
+        
         try:
-            # 過去の類似メッセージとそのレスポンスを検索
-            similar_messages = db.query(GuestMessage).join(Booking, GuestMessage.booking_id == Booking.id).filter(
-                Booking.hotel_id == hotel_id,
-                GuestMessage.message_type == message_type
-            ).limit(5).all()
-            
-            suggestions = []
-            for msg in similar_messages:
-                response = db.query(ResponseLog).filter(
-                    ResponseLog.guest_message_id == msg.id,
-                    ResponseLog.is_sent == True
-                ).first()
-                
-                if response:
-                    suggestions.append({
-                        'content': response.response_content,
-                        'type': 'historical',
-                        'confidence': 0.6,
-                        'source': f'Historical: Message #{msg.id}'
-                    })
-            
-            return suggestions
+            return self.historical_suggestions_from_responses(
+                self.get_historical_responses(message_type, db, hotel_id), language
+            )
         except Exception as e:
             # エラーが発生した場合は空のリストを返す
             return []
     
-    def _deduplicate_suggestions(self, suggestions: List[Dict]) -> List[Dict]:
-        """重複する候補を除去"""
-        seen = set()
-        unique_suggestions = []
+    def get_historical_responses(self, message_type: str, db: Session, hotel_id: int) -> List[Tuple[int, str]]:
+        """同じ種類の過去のメッセージへの送信済みの返信 [(メッセージID, 返信内容)]"""
+        # 過去の類似メッセージとそのレスポンスを1回のクエリで検索
+        similar_messages = db.query(GuestMessage.id).join(Booking, GuestMessage.booking_id == Booking.id).filter(
+            Booking.hotel_id == hotel_id,
+            GuestMessage.message_type == message_type
+        ).limit(5).subquery()
         
-        for suggestion in suggestions:
-            content = suggestion['content']
-            if content not in seen:
-                seen.add(content)
-                unique_suggestions.append(suggestion)
+        return db.query(ResponseLog.guest_message_id, ResponseLog.response_content).filter(
+            ResponseLog.guest_message_id.in_(db.query(similar_messages.c.id)),
+            ResponseLog.is_sent == True
+        ).order_by(ResponseLog.guest_message_id, ResponseLog.id).all()
+    
+    def historical_suggestions_from_responses(self, responses: List[Tuple[int, str]], language: Optional[str] = None) -> List[Suggestion]:
+        """過去の返信から候補を作る（メッセージごとに最初の返信のみ）"""
+        suggestions = []
+        seen_messages = set()
+        for message_id, response_content in responses:
+            # メッセージごとに最初の返信だけを使う
+            if message_id in seen_messages:
+                continue
+            seen_messages.add(message_id)
+            
+            # ゲストの言語と違う言語で書かれた返信は使わない
+            if language and detect_language(response_content) not in (language, reply_language(language)):
+                continue
+            
+            suggestions.append(Suggestion(
+                response_content,
+                SuggestionType.HISTORICAL,
+                0.6,
+                f'Historical: Message #{message_id}'
+            ))
         
-        # 信頼度でソート
-        unique_suggestions.sort(key=lambda x: x['confidence'], reverse=True)
-        return unique_suggestions
+        return suggestions
     
-    def _calculate_average_stay(self, df: pd.DataFrame) -> float:
+    def _calculate_average_stay(self, df: 'pd.DataFrame') -> float:
         """平均滞在日数を計算"""
         if df.empty or 'check_in' not in df.columns or 'check_out' not in df.columns:
             return 0
@@ -221,7 +346,7 @@ class BookingDataAgent:
         df['stay_duration'] = (df['check_out'] - df['check_in']).dt.days
         return df['stay_duration'].mean()
     
-    def _identify_peak_seasons(self, df: pd.DataFrame) -> Dict:
+    def _identify_peak_seasons(self, df: 'pd.DataFrame') -> Dict:
         """ピークシーズンを特定"""
         if df.empty or 'check_in' not in df.columns:
             return {}
@@ -235,7 +360,7 @@ class BookingDataAgent:
             'monthly_distribution': {str(k): v for k, v in monthly_counts.to_dict().items()}
         }
     
-    def _analyze_booking_trends(self, df: pd.DataFrame) -> Dict:
+    def _analyze_booking_trends(self, df: 'pd.DataFrame') -> Dict:
         """予約トレンドを分析"""
         if df.empty or 'check_in' not in df.columns:
             return {}
@@ -248,7 +373,7 @@ class BookingDataAgent:
             'growth_rate': self._calculate_growth_rate(monthly_trends)
         }
     
-    def _calculate_growth_rate(self, trends: pd.Series) -> float:
+    def _calculate_growth_rate(self, trends: 'pd.Series') -> float:
         """成長率を計算"""
         if len(trends) < 2:
             return 0
@@ -1,5 +1,3 @@
-import googlemaps
-import requests
 from typing import List, Dict, Optional
 from app.config import settings
 from app.models import Hotel, NearbyAttraction
@@ -10,15 +8,34 @@ class HotelInfoAgent:
     def __init__(self):
         # Google Maps APIキーが設定されている場合のみクライアントを初期化
         if settings.GOOGLE_MAPS_API_KEY and settings.GOOGLE_MAPS_API_KEY != "your_google_maps_api_key_here":
+            import googlemaps
+            
             self.gmaps = googlemaps.Client(key=settings.GOOGLE_MAPS_API_KEY)
         else:
             self.gmaps = None
     
-    def get_nearby_attractions(self, hotel_id: int, db: Session, radius: int = 2000) -> List[Dict]:
+    def _get_hotel(self, hotel_id: int, db: Session, context=None):
+        """ホテル情報を取得（HotelContextがあればDBに問い合わせない）"""
+        if context is not None:
+            return context
+        return db.query(Hotel).filter(Hotel.id == hotel_id).first()
+    
+    def get_nearby_attractions(self, hotel_id: int, db: Session, radius: int = 2000, context=None, deadline=None) -> List[Dict]:
         """ホテル周辺の観光地・施設を取得"""
+        # 同じホテル・半径の結果はHotelContextにキャッシュする
+        if context is not None and radius in context.attractions:
+            return context.attractions[radius]
+        
+        attractions = self._fetch_nearby_attractions(hotel_id, db, radius, context, deadline)
+        if context is not None and attractions:
+            context.attractions[radius] = attractions
+        return attractions
+    
+    def _fetch_nearby_attractions(self, hotel_id: int, db: Session, radius: int, context=None, deadline=None) -> List[Dict]:
+        """Google Places APIで周辺の観光地・施設を検索"""
         try:
             # ホテル情報を取得
-            hotel = db.query(Hotel).filter(Hotel.id == hotel_id).first()
+            hotel = self._get_hotel(hotel_id, db, context)
             if not hotel:
                 return []
             
@@ -26,6 +43,10 @@ class HotelInfoAgent:
             if not self.gmaps or not settings.GOOGLE_MAPS_API_KEY or settings.GOOGLE_MAPS_API_KEY == "your_google_maps_api_key_here":
                 return self._get_mock_attractions(hotel)
             
+            # リクエストの処理時間の予算を使い切っている場合は外部APIを呼ばない
+            if deadline is not None and deadline.expired():
+                return []
+            
             try:
                 # Google Places APIで周辺施設を検索
                 places_result = self.gmaps.places_nearby(
@@ -59,14 +80,24 @@ class HotelInfoAgent:
         except Exception as e:
             # APIエラーが発生した場合はモックデータを返す
             print(f"Google Maps API エラー: {str(e)}")
-            hotel = db.query(Hotel).filter(Hotel.id == hotel_id).first()
+            hotel = self._get_hotel(hotel_id, db, context)
             if hotel:
                 return self._get_mock_attractions(hotel)
             return []
     
-    def get_luggage_storage_info(self, hotel_id: int, db: Session) -> Dict:
+    def get_luggage_storage_info(self, hotel_id: int, db: Session, context=None, deadline=None) -> Dict:
         """荷物預かり情報を取得"""
-        hotel = db.query(Hotel).filter(Hotel.id == hotel_id).first()
+        if context is not None and context.luggage_info is not None:
+            return context.luggage_info
+        
+        luggage_info = self._fetch_luggage_storage_info(hotel_id, db, context, deadline)
+        if context is not None and luggage_info:
+            context.luggage_info = luggage_info
+        return luggage_info
+    
+    def _fetch_luggage_storage_info(self, hotel_id: int, db: Session, context=None, deadline=None) -> Dict:
+        """ホテル周辺のコインロッカー・荷物預かりサービスを検索"""
+        hotel = self._get_hotel(hotel_id, db, context)
         if not hotel:
             return {}
         
@@ -74,6 +105,10 @@ class HotelInfoAgent:
         if not self.gmaps or not settings.GOOGLE_MAPS_API_KEY or settings.GOOGLE_MAPS_API_KEY == "your_google_maps_api_key_here":
             return self._get_mock_luggage_info(hotel)
         
+        # リクエストの処理時間の予算を使い切っている場合は外部APIを呼ばない
+        if deadline is not None and deadline.expired():
+            return {}
+        
         try:
             # ホテル周辺のコインロッカーや荷物預かりサービスを検索
             places_result = self.gmaps.places_nearby(
@@ -106,9 +141,9 @@ class HotelInfoAgent:
             print(f"Google Maps API エラー (荷物預かり): {str(e)}")
             return self._get_mock_luggage_info(hotel)
     
-    def get_booking_availability(self, hotel_id: int, db: Session) -> Dict:
+    def get_booking_availability(self, hotel_id: int, db: Session, context=None) -> Dict:
         """予約可能期間を取得"""
-        hotel = db.query(Hotel).filter(Hotel.id == hotel_id).first()
+        hotel = self._get_hotel(hotel_id, db, context)
         if not hotel:
             return {}
         
@@ -6,6 +6,16 @@ load_dotenv()
 class Settings:
     # OpenAI Configuration
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
+    OPENAI_MODEL: str = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+    OPENAI_BASE_URL: str = os.getenv("OPENAI_BASE_URL", "")
+    
+    # LLM Backend (auto = APIキーがあれば openai, なければ static / openai / stub / static)
+    LLM_BACKEND: str = os.getenv("LLM_BACKEND", "auto").lower()
+    LLM_TIMEOUT: float = float(os.getenv("LLM_TIMEOUT", "10"))
+    LLM_BATCH_MAX_SIZE: int = int(os.getenv("LLM_BATCH_MAX_SIZE", "8"))
+    LLM_BATCH_WAIT_MS: int = int(os.getenv("LLM_BATCH_WAIT_MS", "20"))
+    LLM_CACHE_SIZE: int = int(os.getenv("LLM_CACHE_SIZE", "2048"))
+    LLM_CACHE_TTL: int = int(os.getenv("LLM_CACHE_TTL", "3600"))
     
     # Database Configuration
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./hotel_agent.db")
@@ -24,10 +34,50 @@ class Settings:
     AIRBNB_API_KEY: str = os.getenv("AIRBNB_API_KEY", "")
     AIRBNB_API_URL: str = os.getenv("AIRBNB_API_URL", "https://api.airbnb.com/v2")
     
+    # Analytics Snapshot (Parquet)
+    ANALYTICS_SNAPSHOT_DIR: str = os.getenv("ANALYTICS_SNAPSHOT_DIR", "./analytics_snapshot")
+    ANALYTICS_BATCH_SIZE: int = int(os.getenv("ANALYTICS_BATCH_SIZE", "50000"))
+    
+    # Background Jobs / Model Training
+    MODEL_DIR: str = os.getenv("MODEL_DIR", "./models")
+    # ホテルの分析データ（GET /hotels/{hotel_id}/analytics）のキャッシュ秒数
+    ANALYTICS_CACHE_TTL: int = int(os.getenv("ANALYTICS_CACHE_TTL", "60"))
+    # 実行中のジョブの生存を記録する間隔（秒）。3回分記録がなければワーカーが停止したとみなして失敗にする
+    JOB_HEARTBEAT_INTERVAL: int = int(os.getenv("JOB_HEARTBEAT_INTERVAL", "30"))
+    
+    # メッセージ分類モデルの確率がこれ未満の場合はキーワードで分類
+    CLASSIFIER_MIN_CONFIDENCE: float = float(os.getenv("CLASSIFIER_MIN_CONFIDENCE", "0.5"))
+    
+    # オペレーターのフィードバックによるランキングの学習
+    # （学習率・加点の最大値・他のワーカーの更新を読み直す間隔（秒））
+    FEEDBACK_LEARNING_RATE: float = float(os.getenv("FEEDBACK_LEARNING_RATE", "0.1"))
+    FEEDBACK_WEIGHT: float = float(os.getenv("FEEDBACK_WEIGHT", "0.1"))
+    FEEDBACK_WEIGHTS_TTL: int = int(os.getenv("FEEDBACK_WEIGHTS_TTL", "60"))
+    
+    # Hotel Context (ホテル情報・テンプレートのプロセス内キャッシュ, 秒)
+    HOTEL_CONTEXT_TTL: int = int(os.getenv("HOTEL_CONTEXT_TTL", "300"))
+    
+    # 言語判定できないメッセージ（数字・記号のみなど）に使う言語
+    DEFAULT_LANGUAGE: str = os.getenv("DEFAULT_LANGUAGE", "ja")
+    
+    # 返信候補生成の処理時間の予算（ミリ秒, 0 = 無制限。リクエストの budget_ms で上書き可能）
+    SUGGESTION_BUDGET_MS: int = int(os.getenv("SUGGESTION_BUDGET_MS", "0"))
+    
+    # まとめて返信候補を取得できるメッセージ数の上限（POST /messages/suggestions/batch）
+    SUGGESTION_BATCH_MAX: int = int(os.getenv("SUGGESTION_BATCH_MAX", "50"))
+    
+    # CPU Executor (0 = プロセスを使わずスレッドで実行)
+    CPU_WORKERS: int = int(os.getenv("CPU_WORKERS", str(min(4, os.cpu_count() or 1))))
+    CPU_PRELOAD_MODULES: list = os.getenv(
+        "CPU_PRELOAD_MODULES",
+        "pandas,numpy,sklearn.feature_extraction.text,sklearn.metrics.pairwise"
+    ).split(",")
+    
     # Application Settings
     APP_NAME: str = os.getenv("APP_NAME", "Hotel Response Agent")
     DEBUG: bool = os.getenv("DEBUG", "True").lower() == "true"
     HOST: str = os.getenv("HOST", "0.0.0.0")
     PORT: int = int(os.getenv("PORT", "8000"))
+    PREWARM_ON_STARTUP: bool = os.getenv("PREWARM_ON_STARTUP", "False").lower() == "true"
 
 settings = Settings()
\ No newline at end of file
@@ -1,7 +1,7 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from app.config import settings
-from app.models import Base
+from app.models import Base, create_missing_indexes
 
 # Create database engine
 engine = create_engine(settings.DATABASE_URL)
@@ -12,6 +12,7 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 def create_tables():
     """Create all database tables"""
     Base.metadata.create_all(bind=engine)
+    create_missing_indexes(engine)
 
 def get_db():
     """Dependency to get database session"""
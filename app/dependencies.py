@@ -0,0 +1,53 @@
+import importlib
+from functools import lru_cache
+
+from app.config import settings
+
+# プリウォーム時に読み込む重いモジュール
+HEAVY_MODULES = (
+    'pandas',
+    'numpy',
+    'sklearn.feature_extraction.text',
+    'sklearn.metrics.pairwise',
+)
+
+@lru_cache(maxsize=None)
+def get_message_processor():
+    """MessageProcessorを初回利用時に生成"""
+    from app.services.api_service import MessageProcessor
+
+    return MessageProcessor()
+
+@lru_cache(maxsize=None)
+def get_response_generator():
+    """ResponseGeneratorを初回利用時に生成"""
+    from app.services.response_generator import ResponseGenerator
+
+    return ResponseGenerator()
+
+@lru_cache(maxsize=None)
+def get_booking_data_agent():
+    """BookingDataAgentを初回利用時に生成"""
+    from app.agents.booking_data_agent import BookingDataAgent
+
+    return BookingDataAgent()
+
+def prewarm():
+    """エージェントと重いライブラリを先に読み込んでおく（最初のリクエストの遅延をなくす）"""
+    get_message_processor()
+    get_response_generator()
+    get_booking_data_agent()
+
+    # 学習済みのメッセージ分類モデルがあれば読み込んでおく
+    from app.services.message_classifier import message_classifier
+
+    message_classifier.model()
+
+    for module in HEAVY_MODULES:
+        try:
+            importlib.import_module(module)
+        except ImportError as e:
+            print(f"プリウォームエラー ({module}): {str(e)}")
+
+    if settings.GOOGLE_MAPS_API_KEY:
+        importlib.import_module('googlemaps')
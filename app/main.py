@@ -1,15 +1,27 @@
-from fastapi import FastAPI, Depends, HTTPException, BackgroundTasks
+from fastapi import FastAPI, Depends, HTTPException, BackgroundTasks, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from typing import List, Dict, Optional
-import uvicorn
+import asyncio
+import hashlib
+import json
+import time
 from datetime import datetime, timedelta
 
 from app.database import get_db, create_tables
-from app.models import Hotel, GuestMessage, ResponseLog
-from app.services.api_service import MessageProcessor
-from app.services.response_generator import ResponseGenerator
-from app.agents.booking_data_agent import BookingDataAgent
+from app.models import Hotel, Booking, GuestMessage, ResponseLog
+from app.dependencies import get_message_processor, get_response_generator, get_booking_data_agent, prewarm
+from app.services.cpu_executor import cpu_executor
+from app.services.feedback import feedback_learner
+from app.services.hotel_context import hotel_context_registry
+from app.services.invalidation import invalidation_markers
+from app.services.job_manager import job_manager
+from app.services.language_detection import detect_language
+from app.services.message_classifier import load_classifier_metadata
+from app.services.suggestion import serialize_suggestions
+from app.services.training import load_training_result
 from app.config import settings
 
 # FastAPIアプリケーションの初期化
@@ -28,10 +40,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# 依存関係
-message_processor = MessageProcessor()
-response_generator = ResponseGenerator()
-booking_data_agent = BookingDataAgent()
+# 依存関係（エージェントは app.dependencies で初回利用時に生成する）
+
+# 分析データのキャッシュ（hotel_id -> (有効期限, 作成時刻, レスポンス)）。
+# 学習が完了すると invalidation_markers で全ワーカーのキャッシュを破棄する
+_analytics_cache = {}
+
+# 受信箱の一覧で返すメッセージ本文の文字数（全文は詳細で取得する）
+INBOX_PREVIEW_CHARS = 80
 
 # データベーステーブル作成
 create_tables()
@@ -39,8 +55,20 @@ create_tables()
 @app.on_event("startup")
 async def startup_event():
     """アプリケーション起動時の初期化処理"""
+    # エージェントと重いライブラリを先に読み込む（PREWARM_ON_STARTUP=true の場合）
+    if settings.PREWARM_ON_STARTUP:
+        await asyncio.to_thread(prewarm)
+    
+    # CPUワーカーを起動し、pandas/scikit-learnを読み込ませておく
+    if settings.CPU_WORKERS > 0:
+        await asyncio.to_thread(cpu_executor.warm_up)
     print(f"{settings.APP_NAME} が起動しました")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """アプリケーション終了時の後処理"""
+    cpu_executor.shutdown()
+
 @app.get("/")
 async def root():
     """ルートエンドポイント"""
@@ -50,16 +78,33 @@ async def root():
         "status": "running"
     }
 
+def conditional_json_response(request: Request, payload) -> Response:
+    """ETag付きのJSONレスポンス（If-None-Match が一致すれば本文なしの304を返す）
+
+    内容が変わっていなければクライアントは前回のレスポンスを使い回せる。
+    """
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if etag in candidates or "*" in candidates:
+            return Response(status_code=304, headers=headers)
+    
+    return Response(content=body, media_type="application/json", headers=headers)
+
 @app.get("/health")
 async def health_check():
     """ヘルスチェック"""
     return {"status": "healthy"}
 
 @app.get("/hotels")
-async def get_hotels(db: Session = Depends(get_db)):
-    """ホテル一覧を取得"""
+async def get_hotels(request: Request, db: Session = Depends(get_db)):
+    """ホテル一覧を取得（ETag対応）"""
     hotels = db.query(Hotel).all()
-    return [
+    return conditional_json_response(request, [
         {
             "id": hotel.id,
             "name": hotel.name,
@@ -68,7 +113,7 @@ async def get_hotels(db: Session = Depends(get_db)):
             "country": hotel.country
         }
         for hotel in hotels
-    ]
+    ])
 
 @app.post("/hotels")
 async def create_hotel(
@@ -103,10 +148,11 @@ async def create_hotel(
 @app.get("/messages/{hotel_id}")
 async def get_messages(
     hotel_id: int,
+    request: Request,
     platform: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    """ホテルのメッセージを取得"""
+    """ホテルのメッセージを取得（ETag対応）"""
     try:
         # データベースからメッセージを取得
         # GuestMessage -> Booking -> Hotel の順でJOIN
@@ -121,7 +167,7 @@ async def get_messages(
         bookings = db.query(Booking).filter(Booking.hotel_id == hotel_id).all()
         if not bookings:
             # 予約が存在しない場合は空のリストを返す
-            return []
+            return conditional_json_response(request, [])
         
         # メッセージを取得
         query = db.query(GuestMessage).join(Booking, GuestMessage.booking_id == Booking.id).filter(Booking.hotel_id == hotel_id)
@@ -131,7 +177,7 @@ async def get_messages(
         
         messages = query.all()
         
-        return [
+        return conditional_json_response(request, [
             {
                 "id": msg.id,
                 "booking_id": msg.booking_id,
@@ -142,13 +188,121 @@ async def get_messages(
                 "is_processed": msg.is_processed
             }
             for msg in messages
-        ]
+        ])
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"メッセージ取得エラー: {str(e)}")
 
-from pydantic import BaseModel
+@app.get("/hotels/{hotel_id}/inbox")
+async def get_inbox(
+    hotel_id: int,
+    request: Request,
+    limit: int = Query(50, ge=1, le=200, description="1ページの件数"),
+    before_id: Optional[int] = Query(None, description="前のページの next_cursor（これより前に受信したメッセージを返す）"),
+    platform: Optional[str] = None,
+    message_type: Optional[str] = None,
+    max_age_hours: Optional[int] = Query(None, ge=1, description="受信からの経過時間の上限（時間）"),
+    include_processed: bool = False,
+    db: Session = Depends(get_db)
+):
+    """受信箱を新しい順に1ページ取得（ETag対応）
+    
+    OFFSETではなく前のページの最後のメッセージIDを基準にするため、何ページ目でも1ページ分の行だけを読む。
+    本文は先頭 INBOX_PREVIEW_CHARS 文字だけを返す（全文は /hotels/{hotel_id}/inbox/{message_id}）。
+    """
+    hotel = db.query(Hotel.id).filter(Hotel.id == hotel_id).first()
+    if not hotel:
+        raise HTTPException(status_code=404, detail="ホテルが見つかりません")
+    
+    query = db.query(
+        GuestMessage.id,
+        GuestMessage.platform,
+        GuestMessage.message_type,
+        GuestMessage.timestamp,
+        GuestMessage.is_processed,
+        func.substr(GuestMessage.message_content, 1, INBOX_PREVIEW_CHARS).label("preview"),
+        Booking.guest_name
+    ).join(Booking, GuestMessage.booking_id == Booking.id).filter(Booking.hotel_id == hotel_id)
+    
+    if before_id is not None:
+        query = query.filter(GuestMessage.id < before_id)
+    if not include_processed:
+        query = query.filter(GuestMessage.is_processed == False)
+    if platform:
+        query = query.filter(GuestMessage.platform == platform)
+    if message_type:
+        query = query.filter(GuestMessage.message_type == message_type)
+    if max_age_hours:
+        query = query.filter(GuestMessage.timestamp >= datetime.now() - timedelta(hours=max_age_hours))
+    
+    # 1件多く取得して次のページがあるかを判定する
+    rows = query.order_by(GuestMessage.id.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    
+    return conditional_json_response(request, {
+        "items": [
+            {
+                "id": row.id,
+                "platform": row.platform,
+                "message_type": row.message_type,
+                "timestamp": row.timestamp.isoformat() if row.timestamp else None,
+                "is_processed": row.is_processed,
+                "guest_name": row.guest_name,
+                "preview": row.preview
+            }
+            for row in rows
+        ],
+        "next_cursor": rows[-1].id if has_more else None
+    })
+
+@app.get("/hotels/{hotel_id}/inbox/facets")
+async def get_inbox_facets(hotel_id: int, request: Request, db: Session = Depends(get_db)):
+    """受信箱の絞り込みの選択肢（ホテルのメッセージにあるプラットフォームとメッセージタイプ）"""
+    hotel = db.query(Hotel.id).filter(Hotel.id == hotel_id).first()
+    if not hotel:
+        raise HTTPException(status_code=404, detail="ホテルが見つかりません")
+    
+    base = db.query(GuestMessage).join(Booking, GuestMessage.booking_id == Booking.id).filter(Booking.hotel_id == hotel_id)
+    platforms = base.with_entities(GuestMessage.platform).distinct().all()
+    message_types = base.with_entities(GuestMessage.message_type).distinct().all()
+    
+    return conditional_json_response(request, {
+        "platforms": sorted(platform for platform, in platforms if platform),
+        "message_types": sorted(message_type for message_type, in message_types if message_type)
+    })
+
+@app.get("/hotels/{hotel_id}/inbox/{message_id}")
+async def get_inbox_message(hotel_id: int, message_id: int, request: Request, db: Session = Depends(get_db)):
+    """受信箱のメッセージ1件の詳細（本文の全文と予約情報）"""
+    row = db.query(GuestMessage, Booking).join(Booking, GuestMessage.booking_id == Booking.id).filter(
+        GuestMessage.id == message_id,
+        Booking.hotel_id == hotel_id
+    ).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="メッセージが見つかりません")
+    
+    message, booking = row
+    return conditional_json_response(request, {
+        "id": message.id,
+        "booking_id": message.booking_id,
+        "platform": message.platform,
+        "message_content": message.message_content,
+        "message_type": message.message_type,
+        "timestamp": message.timestamp.isoformat() if message.timestamp else None,
+        "is_processed": message.is_processed,
+        "booking": {
+            "guest_name": booking.guest_name,
+            "booking_reference": booking.booking_reference,
+            "check_in": booking.check_in.isoformat() if booking.check_in else None,
+            "check_out": booking.check_out.isoformat() if booking.check_out else None,
+            "room_type": booking.room_type,
+            "guest_count": booking.guest_count
+        }
+    })
+
+from pydantic import BaseModel, Field
 
 class MessageCreate(BaseModel):
     booking_id: str
@@ -222,7 +376,7 @@ async def fetch_new_messages(
     
     async def save_messages():
         # 全プラットフォームからメッセージを取得
-        messages = await message_processor.fetch_all_messages(str(hotel_id), listing_id)
+        messages = await get_message_processor().fetch_all_messages(str(hotel_id), listing_id)
         
         # データベースに保存（実際の実装では適切なセッション管理が必要）
         # ここでは簡略化
@@ -241,6 +395,7 @@ async def fetch_new_messages(
 async def get_response_suggestions(
     message_id: int,
     hotel_id: int,
+    budget_ms: Optional[int] = Query(None, ge=1, description="処理時間の予算（ミリ秒）。間に合わなかったソースは使わない"),
     db: Session = Depends(get_db)
 ):
     """メッセージに対する返信候補を取得"""
@@ -250,32 +405,159 @@ async def get_response_suggestions(
     if not message:
         raise HTTPException(status_code=404, detail="メッセージが見つかりません")
     
-    # メッセージタイプを分類
-    message_type = message_processor.categorize_message(message.message_content)
+    # メッセージタイプと言語を判定（分類モデルの推論はイベントループを止めないようスレッドで実行）
+    message_content = message.message_content
+    message_type, language = await asyncio.to_thread(get_message_processor().classify_message, message_content)
     
-    # 返信候補を生成
-    suggestions = await response_generator.generate_response_suggestions(
-        message.message_content,
+    # 返信候補を生成（テンプレートのゲスト名・チェックイン日は予約から埋める）
+    result = await get_response_generator().generate_suggestions_with_sources(
+        message_content,
         message_type,
         hotel_id,
-        db
+        db,
+        budget_ms=budget_ms,
+        booking=_get_booking(db, message.booking_id),
+        language=language
     )
     
     return {
         "message_id": message_id,
-        "message_content": message.message_content,
+        "message_content": message_content,
         "message_type": message_type,
-        "suggestions": suggestions
+        "language": language,
+        "suggestions": serialize_suggestions(result['suggestions']),
+        "sources": result['sources']
     }
 
+@app.post("/messages/{message_id}/suggestions/stream")
+async def stream_response_suggestions(
+    message_id: int,
+    hotel_id: int,
+    budget_ms: Optional[int] = Query(None, ge=1, description="処理時間の予算（ミリ秒）。間に合わなかったソースは使わない"),
+    db: Session = Depends(get_db)
+):
+    """返信候補をServer-Sent Eventsで順次返す（ソースが終わった順に候補を送信。AI候補はLLMの生成中に1件ずつ送信）"""
+
+    message = db.query(GuestMessage).filter(GuestMessage.id == message_id).first()
+    if not message:
+        raise HTTPException(status_code=404, detail="メッセージが見つかりません")
+
+    message_type, language = await asyncio.to_thread(get_message_processor().classify_message, message.message_content)
+    booking = _get_booking(db, message.booking_id)
+
+    async def events():
+        yield _sse_event('message', {
+            "message_id": message_id,
+            "message_content": message.message_content,
+            "message_type": message_type,
+            "language": language
+        })
+        try:
+            async for event, data in get_response_generator().stream_suggestions(
+                message.message_content,
+                message_type,
+                hotel_id,
+                db,
+                budget_ms=budget_ms,
+                booking=booking,
+                language=language,
+                stream_ai=True
+            ):
+                # 候補はAPIの境界でだけ辞書に変換する
+                if event == 'suggestion':
+                    data = {**data, 'suggestion': data['suggestion'].to_dict()}
+                elif event == 'done':
+                    data = {**data, 'suggestions': serialize_suggestions(data['suggestions'])}
+                yield _sse_event(event, data)
+        except Exception as e:
+            yield _sse_event('error', {"detail": f"返信候補生成エラー: {str(e)}"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+class BatchSuggestionsRequest(BaseModel):
+    hotel_id: int
+    message_ids: List[int] = Field(min_length=1, max_length=settings.SUGGESTION_BATCH_MAX, description="返信候補を取得するメッセージID（先頭から順に返す）")
+    budget_ms: Optional[int] = Field(None, ge=1, description="処理時間の予算（ミリ秒）。間に合わなかったソースは使わない")
+
+@app.post("/messages/suggestions/batch")
+async def get_batch_response_suggestions(request: BatchSuggestionsRequest, db: Session = Depends(get_db)):
+    """同じホテルの複数のメッセージの返信候補をまとめて取得（受信箱の1ページ分の先読み用）
+    
+    ホテル情報・テンプレート・過去の返信・フィードバックの加点はメッセージ間で共有し、
+    分類とテンプレートの類似度計算は1回の推論で行う。
+    """
+    # メッセージと予約を1回のクエリで取得（他のホテルのメッセージは含めない）
+    rows = db.query(GuestMessage, Booking).join(Booking, GuestMessage.booking_id == Booking.id).filter(
+        GuestMessage.id.in_(request.message_ids),
+        Booking.hotel_id == request.hotel_id
+    ).all()
+    found = {message.id: (message, booking) for message, booking in rows}
+    ordered = [found[message_id] for message_id in dict.fromkeys(request.message_ids) if message_id in found]
+    
+    # メッセージタイプはまとめて分類
+    message_ids = [message.id for message, _ in ordered]
+    contents = [message.message_content for message, _ in ordered]
+    message_types = await asyncio.to_thread(get_message_processor().categorize_messages, contents) if contents else []
+    messages = [
+        {
+            'content': content,
+            'message_type': message_type,
+            'language': detect_language(content),
+            'booking': booking
+        }
+        for content, message_type, (_, booking) in zip(contents, message_types, ordered)
+    ]
+    
+    results = await get_response_generator().generate_batch_suggestions(
+        messages, request.hotel_id, db, budget_ms=request.budget_ms
+    ) if messages else []
+    
+    return {
+        "hotel_id": request.hotel_id,
+        "results": [
+            {
+                "message_id": message_id,
+                "message_content": item['content'],
+                "message_type": item['message_type'],
+                "language": item['language'],
+                "suggestions": serialize_suggestions(result['suggestions']),
+                "sources": result['sources']
+            }
+            for message_id, item, result in zip(message_ids, messages, results)
+        ],
+        "missing_message_ids": sorted(set(request.message_ids) - set(found))
+    }
+
+def _get_booking(db: Session, booking_id: int):
+    """メッセージの予約を取得"""
+    from app.models import Booking
+
+    return db.query(Booking).filter(Booking.id == booking_id).first()
+
+def _record_feedback(bind, *args, **kwargs) -> Dict:
+    """フィードバックを専用のセッションで記録（編集距離の計算でイベントループを止めないようスレッドで実行する）"""
+    with Session(bind=bind) as feedback_db:
+        return feedback_learner.record(feedback_db, *args, **kwargs)
+
+def _sse_event(event: str, data: Dict) -> str:
+    """Server-Sent Eventsの1イベント分の文字列"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
 @app.post("/messages/{message_id}/respond")
 async def send_response(
     message_id: int,
     response_content: str,
     platform: str,
+    suggestion_source: Optional[str] = Query(None, description="選んだ候補の根拠（候補を使わなかった場合は省略）"),
+    suggestion_type: Optional[str] = Query(None, description="選んだ候補の種類"),
+    suggested_content: Optional[str] = Query(None, description="編集前の候補の内容"),
     db: Session = Depends(get_db)
 ):
-    """返信を送信"""
+    """返信を送信（選んだ候補を指定すると、編集距離をフィードバックとしてランキングに反映する）"""
     
     # メッセージを取得
     message = db.query(GuestMessage).filter(GuestMessage.id == message_id).first()
@@ -283,7 +565,7 @@ async def send_response(
         raise HTTPException(status_code=404, detail="メッセージが見つかりません")
     
     # 返信を送信
-    result = await response_generator.send_response(
+    result = await get_response_generator().send_response(
         str(message_id),
         response_content,
         platform,
@@ -294,40 +576,211 @@ async def send_response(
     message.is_processed = True
     db.commit()
     
+    # オペレーターがどの候補をどれだけ編集したかを記録し、ランキングの重みを更新
+    feedback = None
+    booking = _get_booking(db, message.booking_id)
+    if booking:
+        try:
+            feedback = await asyncio.to_thread(
+                _record_feedback,
+                db.get_bind(),
+                booking.hotel_id,
+                message_id,
+                response_content,
+                response_log_id=result.get('response_log_id'),
+                suggestion_source=suggestion_source,
+                suggestion_type=suggestion_type,
+                suggested_content=suggested_content
+            )
+        except Exception as e:
+            print(f"フィードバック記録エラー: {str(e)}")
+    
     return {
         "message_id": message_id,
         "response_content": response_content,
-        "result": result
+        "result": result,
+        "feedback": feedback
+    }
+
+@app.get("/hotels/{hotel_id}/ranking-weights")
+async def get_ranking_weights(hotel_id: int, db: Session = Depends(get_db)):
+    """オペレーターのフィードバックから学習したランキングの重み"""
+    return {"hotel_id": hotel_id, "weights": feedback_learner.weights(hotel_id, db)}
+
+class TemplateRenderRequest(BaseModel):
+    message_ids: List[int]
+
+@app.post("/hotels/{hotel_id}/templates/{template_id}/render")
+async def render_template_for_messages(
+    hotel_id: int,
+    template_id: int,
+    request: TemplateRenderRequest,
+    db: Session = Depends(get_db)
+):
+    """テンプレートを複数のゲスト向けにまとめて描画（一斉返信用）"""
+    from app.models import Booking, ResponseTemplate
+    from app.services.template_engine import template_engine, template_variables
+
+    template = db.query(ResponseTemplate).filter(
+        ResponseTemplate.id == template_id,
+        ResponseTemplate.hotel_id == hotel_id
+    ).first()
+    if not template:
+        raise HTTPException(status_code=404, detail="テンプレートが見つかりません")
+
+    hotel_context = hotel_context_registry.get(hotel_id, db)
+    if not hotel_context:
+        raise HTTPException(status_code=404, detail="ホテルが見つかりません")
+
+    # メッセージと予約を1回のクエリで取得
+    rows = db.query(GuestMessage.id, Booking).join(Booking, GuestMessage.booking_id == Booking.id).filter(
+        GuestMessage.id.in_(request.message_ids),
+        Booking.hotel_id == hotel_id
+    ).all()
+
+    rendered = template_engine.render_many(
+        (template.id, template.updated_at),
+        template.template_content,
+        [template_variables(hotel_context, booking, language=template.language) for _, booking in rows]
+    )
+
+    return {
+        "template_id": template_id,
+        "rendered": [
+            {"message_id": message_id, "content": content}
+            for (message_id, _), content in zip(rows, rendered)
+        ],
+        "missing_message_ids": sorted(set(request.message_ids) - {message_id for message_id, _ in rows})
     }
 
 @app.get("/hotels/{hotel_id}/analytics")
 async def get_hotel_analytics(
     hotel_id: int,
+    response: Response,
     db: Session = Depends(get_db)
 ):
-    """ホテルの分析データを取得"""
+    """ホテルの分析データを取得（読み取り専用。学習は /hotels/{hotel_id}/train で実行）"""
     try:
         # まず、ホテルが存在するかチェック
         hotel = db.query(Hotel).filter(Hotel.id == hotel_id).first()
         if not hotel:
             raise HTTPException(status_code=404, detail="ホテルが見つかりません")
         
+        response.headers["Cache-Control"] = f"private, max-age={settings.ANALYTICS_CACHE_TTL}"
+        
+        cached = _analytics_cache.get(hotel_id)
+        if cached and cached[0] > time.monotonic() and not invalidation_markers.changed_since('analytics', hotel_id, cached[1]):
+            return cached[2]
+        created_at = invalidation_markers.now()
+        
         # 予約パターンを分析
-        booking_analysis = booking_data_agent.analyze_booking_patterns(db, hotel_id)
+        booking_analysis = await get_booking_data_agent().analyze_booking_patterns_async(hotel_id)
         
-        # 過去のデータから学習
-        learning_result = booking_data_agent.learn_from_historical_data(db, hotel_id)
+        # 最後に学習した結果（学習自体はここでは行わない）
+        learning_result = load_training_result(hotel_id)
         
-        return {
+        analytics = {
             "hotel_id": hotel_id,
             "booking_analysis": booking_analysis,
             "learning_result": learning_result
         }
+        _analytics_cache[hotel_id] = (time.monotonic() + settings.ANALYTICS_CACHE_TTL, created_at, analytics)
+        
+        return analytics
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"分析データ取得エラー: {str(e)}")
 
+@app.post("/hotels/{hotel_id}/train", status_code=202)
+async def train_hotel_model_job(
+    hotel_id: int,
+    db: Session = Depends(get_db)
+):
+    """過去データからの学習をバックグラウンドジョブとして開始"""
+    hotel = db.query(Hotel).filter(Hotel.id == hotel_id).first()
+    if not hotel:
+        raise HTTPException(status_code=404, detail="ホテルが見つかりません")
+    
+    return job_manager.submit('train_hotel_model', hotel_id=hotel_id)
+
+@app.post("/classifier/train", status_code=202)
+async def train_message_classifier_job():
+    """ラベル付きメッセージからのメッセージ分類モデルの学習をバックグラウンドジョブとして開始"""
+    return job_manager.submit('train_message_classifier')
+
+@app.get("/classifier")
+async def get_message_classifier():
+    """メッセージ分類モデルの最後の学習結果（件数・カテゴリ・評価用データでの精度）"""
+    metadata = load_classifier_metadata()
+    return {"trained": bool(metadata), **metadata}
+
+class ClassifyRequest(BaseModel):
+    messages: List[str]
+
+@app.post("/messages/classify")
+async def classify_messages(request: ClassifyRequest):
+    """メッセージをまとめて分類（カテゴリと言語）。分類モデルの推論は1回で行う"""
+    processor = get_message_processor()
+    message_types = await asyncio.to_thread(processor.categorize_messages, request.messages)
+    return {
+        "results": [
+            {"message_type": message_type, "language": detect_language(message)}
+            for message, message_type in zip(request.messages, message_types)
+        ]
+    }
+
+@app.get("/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    """バックグラウンドジョブの状態を取得"""
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="ジョブが見つかりません")
+    return job
+
+@app.post("/analytics/snapshot")
+async def create_analytics_snapshot(background_tasks: BackgroundTasks):
+    """チェーン分析用のParquetスナップショットを作成"""
+    from app.services.analytics_snapshot import run_snapshot
+
+    background_tasks.add_task(run_snapshot)
+    return {"message": "スナップショットの作成を開始しました"}
+
+@app.get("/analytics/chain")
+async def get_chain_analytics(hotel_ids: Optional[List[int]] = Query(None)):
+    """スナップショットからチェーン全体の分析データを取得"""
+    from app.services.chain_analytics import ChainAnalytics
+
+    chain_analytics = ChainAnalytics()
+    if not chain_analytics.snapshot_available():
+        raise HTTPException(status_code=404, detail="スナップショットがありません。先に /analytics/snapshot を実行してください")
+
+    # Parquetのスキャンはイベントループを止めないようスレッドで並行して実行する
+    try:
+        booking_analysis, message_analysis, response_analysis = await asyncio.gather(
+            asyncio.to_thread(chain_analytics.analyze_booking_patterns, hotel_ids),
+            asyncio.to_thread(chain_analytics.analyze_messages, hotel_ids),
+            asyncio.to_thread(chain_analytics.analyze_responses, hotel_ids)
+        )
+        return {
+            "booking_analysis": booking_analysis,
+            "message_analysis": message_analysis,
+            "response_analysis": response_analysis
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"チェーン分析エラー: {str(e)}")
+
+@app.get("/llm/usage")
+async def get_llm_usage():
+    """LLMの利用量（トークン数・キャッシュヒット・バッチ数）を取得"""
+    from app.services.llm_backend import get_llm_service, llm_usage
+
+    llm_service = get_llm_service()
+    return {
+        "backend": llm_service.backend.name if llm_service else "static",
+        **llm_usage.snapshot()
+    }
+
 @app.get("/hotels/{hotel_id}/nearby-attractions")
 async def get_nearby_attractions(
     hotel_id: int,
@@ -337,14 +790,12 @@ async def get_nearby_attractions(
     """ホテル周辺の観光地を取得"""
     try:
         # まず、ホテルが存在するかチェック
-        hotel = db.query(Hotel).filter(Hotel.id == hotel_id).first()
-        if not hotel:
+        hotel_context = hotel_context_registry.get(hotel_id, db)
+        if not hotel_context:
             raise HTTPException(status_code=404, detail="ホテルが見つかりません")
         
-        from app.agents.hotel_info_agent import HotelInfoAgent
-        
-        hotel_info_agent = HotelInfoAgent()
-        attractions = hotel_info_agent.get_nearby_attractions(hotel_id, db, radius)
+        hotel_info_agent = get_response_generator().hotel_info_agent
+        attractions = hotel_info_agent.get_nearby_attractions(hotel_id, db, radius, context=hotel_context)
         
         return {
             "hotel_id": hotel_id,
@@ -357,6 +808,8 @@ async def get_nearby_attractions(
         raise HTTPException(status_code=500, detail=f"周辺観光地取得エラー: {str(e)}")
 
 if __name__ == "__main__":
+    import uvicorn
+    
     uvicorn.run(
         "app.main:app",
         host=settings.HOST,
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Float, Boolean
+from sqlalchemy import Column, Integer, String, Text, DateTime, Float, Boolean, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
 from datetime import datetime
@@ -24,7 +24,7 @@ class Booking(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     booking_id = Column(String(100), unique=True)  # 外部システムの予約ID
-    hotel_id = Column(Integer, nullable=False)
+    hotel_id = Column(Integer, nullable=False, index=True)
     guest_name = Column(String(255))
     check_in = Column(DateTime)
     check_out = Column(DateTime)
@@ -40,7 +40,7 @@ class GuestMessage(Base):
     __tablename__ = "guest_messages"
     
     id = Column(Integer, primary_key=True, index=True)
-    booking_id = Column(Integer, nullable=False)
+    booking_id = Column(Integer, nullable=False, index=True)
     platform = Column(String(50))  # booking.com, airbnb, etc.
     message_content = Column(Text, nullable=False)
     message_type = Column(String(50))  # question, complaint, request
@@ -69,6 +69,44 @@ class ResponseLog(Base):
     sent_at = Column(DateTime, default=func.now())
     is_sent = Column(Boolean, default=False)
 
+class SuggestionFeedback(Base):
+    __tablename__ = "suggestion_feedback"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    hotel_id = Column(Integer, nullable=False, index=True)
+    guest_message_id = Column(Integer, nullable=False)
+    response_log_id = Column(Integer)
+    suggestion_source = Column(String(100))  # 選ばれた候補の根拠（Template: 12 など。候補を使わなかった場合は空）
+    suggestion_type = Column(String(50))
+    suggested_content = Column(Text)
+    edit_distance = Column(Integer)  # 候補から送信した返信までの編集距離（文字数）
+    reward = Column(Float)  # 1 - 編集距離 / 長い方の文字数（そのまま送信した場合は1）
+    created_at = Column(DateTime, default=func.now())
+
+class RankingWeight(Base):
+    __tablename__ = "ranking_weights"
+    __table_args__ = (UniqueConstraint("hotel_id", "key"),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    hotel_id = Column(Integer, nullable=False)
+    key = Column(String(100), nullable=False)  # family:template / family:ai / Template: 12 など
+    value = Column(Float, nullable=False)  # 報酬の指数移動平均（0〜1）
+    observations = Column(Integer, default=0)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+class BackgroundJob(Base):
+    __tablename__ = "background_jobs"
+    
+    id = Column(String(32), primary_key=True)  # ジョブID（uuid4 の16進数）
+    type = Column(String(100), nullable=False)  # train_hotel_model / train_message_classifier
+    hotel_id = Column(Integer)
+    status = Column(String(20), nullable=False, default="queued")  # queued, completed, failed
+    result = Column(Text)  # 結果のJSON
+    error = Column(Text)
+    created_at = Column(DateTime, default=func.now(), index=True)
+    heartbeat_at = Column(DateTime)  # 実行中のワーカーが最後に生存を記録した時刻
+    finished_at = Column(DateTime)
+
 class NearbyAttraction(Base):
     __tablename__ = "nearby_attractions"
     
@@ -82,4 +120,14 @@ class NearbyAttraction(Base):
     latitude = Column(Float)
     longitude = Column(Float)
     created_at = Column(DateTime, default=func.now())
-    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
\ No newline at end of file
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+def create_missing_indexes(bind):
+    """既存のテーブルに後から追加したインデックスを作成（CREATE INDEX IF NOT EXISTS 相当）
+
+    create_all は既にあるテーブルのインデックスを作らないため、
+    bookings.hotel_id などモデルに追加したインデックスはここで作成する。
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
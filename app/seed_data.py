@@ -93,6 +93,22 @@ def create_sample_templates(db: Session, hotels):
         "地元の隠れた名所もご紹介いたします。お気軽にお尋ねください。"
     ]
     
+    # 英語のテンプレート
+    english_templates = {
+        "luggage": [
+            "Our luggage storage service is available. Please come to the front desk.",
+            "We can keep your luggage before check-in and after check-out.",
+        ],
+        "availability": [
+            "We will check availability for you. Could you tell us your preferred dates?",
+            "We recommend booking early to secure your room.",
+        ],
+        "attractions": [
+            "We are happy to recommend sights near the hotel.",
+            "We can also tell you how to get to popular spots nearby.",
+        ],
+    }
+    
     for hotel in hotels:
         # 荷物預かりテンプレート
         for template in luggage_templates:
@@ -129,6 +145,19 @@ def create_sample_templates(db: Session, hotels):
             )
             templates.append(response_template)
             db.add(response_template)
+        
+        # 英語のテンプレート（英語のメッセージへの返信に使う）
+        for message_type, template_contents in english_templates.items():
+            for template in template_contents:
+                response_template = ResponseTemplate(
+                    hotel_id=hotel.id,
+                    message_type=message_type,
+                    template_content=template,
+                    language="en",
+                    is_active=True
+                )
+                templates.append(response_template)
+                db.add(response_template)
     
     db.commit()
     return templates
@@ -0,0 +1,176 @@
+import os
+import shutil
+import uuid
+from datetime import datetime
+from typing import Dict, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+
+from app.config import settings
+from app.models import Booking, GuestMessage, ResponseLog
+
+# スナップショットの対象テーブル（パーティションは hotel_id / month の2階層）
+SNAPSHOT_TABLES = ('bookings', 'guest_messages', 'response_logs')
+
+PARTITIONING = ds.partitioning(
+    pa.schema([('hotel_id', pa.int64()), ('month', pa.string())]),
+    flavor='hive'
+)
+
+def _pointer_path(snapshot_dir: str, table: str) -> str:
+    return os.path.join(snapshot_dir, f"{table}.current")
+
+def _read_pointer(snapshot_dir: str, table: str) -> Optional[str]:
+    try:
+        with open(_pointer_path(snapshot_dir, table), encoding='utf-8') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+def current_table_dir(snapshot_dir: str, table: str) -> Optional[str]:
+    """テーブルの現在のスナップショットのディレクトリ（なければ None）
+
+    スナップショットは {table}-{作成日時}-{ID} のディレクトリに書き、{table}.current に
+    現在のディレクトリ名を書いて切り替える（旧形式の {table} ディレクトリもそのまま読める）。
+    """
+    path = os.path.join(snapshot_dir, _read_pointer(snapshot_dir, table) or table)
+    return path if os.path.isdir(path) else None
+
+class AnalyticsSnapshotExporter:
+    """bookings / guest_messages / response_logs をParquetにエクスポートする"""
+
+    def __init__(self, engine: Engine, snapshot_dir: Optional[str] = None, batch_size: Optional[int] = None):
+        self.engine = engine
+        self.snapshot_dir = snapshot_dir or settings.ANALYTICS_SNAPSHOT_DIR
+        self.batch_size = batch_size or settings.ANALYTICS_BATCH_SIZE
+
+    def export_all(self) -> Dict:
+        """全テーブルのスナップショットを作成"""
+        started_at = datetime.now()
+        row_counts = {table: self.export_table(table) for table in SNAPSHOT_TABLES}
+
+        return {
+            'snapshot_dir': os.path.abspath(self.snapshot_dir),
+            'row_counts': row_counts,
+            'started_at': started_at.isoformat(),
+            'finished_at': datetime.now().isoformat()
+        }
+
+    def export_table(self, table: str) -> int:
+        """1テーブルをチャンク単位で読み出し、新しいディレクトリに書いてから切り替える"""
+        statement, time_column = self._build_query(table)
+
+        # 同時に実行されたスナップショットと衝突しないよう、実行ごとに別のディレクトリに書く
+        version = f"{table}-{datetime.now():%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:8]}"
+        tmp_dir = os.path.join(self.snapshot_dir, f"{version}.tmp")
+        os.makedirs(tmp_dir)
+
+        total_rows = 0
+        chunks = pd.read_sql(statement, self.engine, chunksize=self.batch_size)
+        for chunk_index, chunk in enumerate(chunks):
+            if chunk.empty:
+                continue
+
+            chunk = self._with_month_partition(chunk, time_column)
+            ds.write_dataset(
+                pa.Table.from_pandas(chunk, preserve_index=False),
+                tmp_dir,
+                format='parquet',
+                partitioning=PARTITIONING,
+                basename_template=f"chunk-{chunk_index:05d}-{{i}}.parquet",
+                existing_data_behavior='overwrite_or_ignore'
+            )
+            total_rows += len(chunk)
+
+        os.replace(tmp_dir, os.path.join(self.snapshot_dir, version))
+        self._switch(table, version)
+
+        return total_rows
+
+    def _switch(self, table: str, version: str):
+        """{table}.current を書き換えて読み取り側を新しいスナップショットに切り替える
+
+        ファイルの置き換え（os.replace）は原子的なため、読み取り側からスナップショットが
+        見えなくなる瞬間はない。読み取り中の可能性がある直前のスナップショットは残し、
+        それより古いものだけを削除する。
+        """
+        previous = _read_pointer(self.snapshot_dir, table) or table
+        pointer = _pointer_path(self.snapshot_dir, table)
+        tmp_pointer = f"{pointer}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_pointer, 'w', encoding='utf-8') as f:
+            f.write(version)
+        os.replace(tmp_pointer, pointer)
+
+        # 名前は作成日時順に並ぶ（旧形式の {table} は最も古い）。書き込み中（.tmp）のものは対象外
+        oldest_kept = min(version, previous)
+        for name in os.listdir(self.snapshot_dir):
+            if (name == table or name.startswith(f"{table}-")) and not name.endswith('.tmp') and name < oldest_kept:
+                shutil.rmtree(os.path.join(self.snapshot_dir, name), ignore_errors=True)
+
+    def _build_query(self, table: str):
+        """テーブルごとのSELECT文とパーティションに使う日時カラムを返す"""
+        if table == 'bookings':
+            statement = select(
+                Booking.id,
+                Booking.hotel_id,
+                Booking.check_in,
+                Booking.check_out,
+                Booking.room_type,
+                Booking.guest_count,
+                Booking.total_amount,
+                Booking.status
+            ).order_by(Booking.id)
+            return statement, 'check_in'
+
+        if table == 'guest_messages':
+            statement = select(
+                GuestMessage.id,
+                Booking.hotel_id,
+                GuestMessage.platform,
+                GuestMessage.message_type,
+                GuestMessage.timestamp,
+                GuestMessage.is_processed
+            ).join(Booking, GuestMessage.booking_id == Booking.id).order_by(GuestMessage.id)
+            return statement, 'timestamp'
+
+        if table == 'response_logs':
+            statement = select(
+                ResponseLog.id,
+                Booking.hotel_id,
+                ResponseLog.guest_message_id,
+                ResponseLog.response_type,
+                ResponseLog.sent_at,
+                ResponseLog.is_sent
+            ).join(
+                GuestMessage, ResponseLog.guest_message_id == GuestMessage.id
+            ).join(
+                Booking, GuestMessage.booking_id == Booking.id
+            ).order_by(ResponseLog.id)
+            return statement, 'sent_at'
+
+        raise ValueError(f"Unsupported snapshot table: {table}")
+
+    def _with_month_partition(self, chunk: pd.DataFrame, time_column: str) -> pd.DataFrame:
+        """パーティション用の month カラム（YYYY-MM）を付与"""
+        timestamps = pd.to_datetime(chunk[time_column], errors='coerce')
+        chunk[time_column] = timestamps
+        chunk['month'] = timestamps.dt.strftime('%Y-%m').fillna('unknown')
+        chunk['hotel_id'] = chunk['hotel_id'].astype('int64')
+        return chunk
+
+def run_snapshot() -> Dict:
+    """アプリケーションのDB設定でスナップショットを作成"""
+    from app.database import engine
+
+    exporter = AnalyticsSnapshotExporter(engine)
+    return exporter.export_all()
+
+if __name__ == "__main__":
+    result = run_snapshot()
+    print(f"スナップショットを作成しました: {result['snapshot_dir']}")
+    for table, rows in result['row_counts'].items():
+        print(f"  {table}: {rows}件")
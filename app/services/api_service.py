@@ -1,7 +1,8 @@
-import aiohttp
 import asyncio
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from app.config import settings
+from app.services.language_detection import detect_language
+from app.services.message_classifier import message_classifier
 import json
 from datetime import datetime
 
@@ -136,23 +137,41 @@ class MessageProcessor:
         else:
             raise ValueError(f"Unsupported platform: {platform}")
     
-    def categorize_message(self, message: str) -> str:
-        """メッセージをカテゴリに分類"""
-        message_lower = message.lower()
-        
+    # カテゴリごとのキーワード（判定の優先順）
+    TOPIC_KEYWORDS = {
         # 荷物関連
-        luggage_keywords = ['荷物', 'バッグ', 'スーツケース', '預かり', 'luggage', 'bag', 'suitcase']
-        if any(keyword in message_lower for keyword in luggage_keywords):
-            return 'luggage'
-        
+        'luggage': ['荷物', 'バッグ', 'スーツケース', '預かり', 'luggage', 'baggage', 'bag', 'suitcase'],
         # 予約関連
-        booking_keywords = ['予約', '空室', '空き', 'availability', 'booking', 'reservation']
-        if any(keyword in message_lower for keyword in booking_keywords):
-            return 'availability'
-        
+        'availability': ['予約', '空室', '空き', 'availability', 'available', 'vacancy', 'booking', 'reservation'],
         # 観光地関連
-        attraction_keywords = ['観光', '観光地', 'おすすめ', '観光スポット', 'attraction', 'sightseeing', 'recommend']
-        if any(keyword in message_lower for keyword in attraction_keywords):
-            return 'attractions'
-        
-        return 'general'
\ No newline at end of file
+        'attractions': ['観光', '観光地', 'おすすめ', '観光スポット', 'attraction', 'sightseeing', 'recommend', 'things to do']
+    }
+    
+    def detect_topics(self, message: str) -> List[str]:
+        """メッセージに含まれる話題をすべて検出（複数の質問を含むメッセージ用）"""
+        message_lower = message.lower()
+        return [
+            topic for topic, keywords in self.TOPIC_KEYWORDS.items()
+            if any(keyword in message_lower for keyword in keywords)
+        ]
+    
+    def categorize_message(self, message: str) -> str:
+        """メッセージをカテゴリに分類（学習済みの分類モデルがあれば使い、なければキーワードで分類）"""
+        return self.categorize_messages([message])[0]
+    
+    def categorize_messages(self, messages: List[str]) -> List[str]:
+        """複数のメッセージをまとめて分類（分類モデルの推論は1回で行う）"""
+        predictions = message_classifier.predict_batch(messages)
+        return [
+            prediction or self.categorize_by_keywords(message)
+            for message, prediction in zip(messages, predictions)
+        ]
+    
+    def categorize_by_keywords(self, message: str) -> str:
+        """キーワードでカテゴリに分類"""
+        topics = self.detect_topics(message)
+        return topics[0] if topics else 'general'
+    
+    def classify_message(self, message: str) -> Tuple[str, str]:
+        """メッセージのカテゴリと言語を判定"""
+        return self.categorize_message(message), detect_language(message)
@@ -0,0 +1,199 @@
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from app.config import settings
+from app.services.analytics_snapshot import PARTITIONING, current_table_dir
+
+# duration型の単位ごとの1日あたりの値
+_UNITS_PER_DAY = {
+    's': 86400,
+    'ms': 86400 * 10**3,
+    'us': 86400 * 10**6,
+    'ns': 86400 * 10**9
+}
+
+class ChainAnalytics:
+    """Parquetスナップショットを列単位でスキャンしてチェーン全体を分析する
+
+    BookingDataAgent.analyze_booking_patterns と同じ指標をホテル毎に返す。
+    レコードバッチ単位で集計値だけを保持するため、メモリ使用量は
+    行数ではなくホテル数×月数に比例する。
+    """
+
+    def __init__(self, snapshot_dir: Optional[str] = None, batch_size: Optional[int] = None):
+        self.snapshot_dir = snapshot_dir or settings.ANALYTICS_SNAPSHOT_DIR
+        self.batch_size = batch_size or settings.ANALYTICS_BATCH_SIZE
+
+    def snapshot_available(self, table: str = 'bookings') -> bool:
+        """スナップショットが存在するか"""
+        return current_table_dir(self.snapshot_dir, table) is not None
+
+    def analyze_booking_patterns(self, hotel_ids: Optional[List[int]] = None) -> Dict:
+        """ホテル毎とチェーン全体の予約パターンを分析"""
+        totals = defaultdict(lambda: {'count': 0, 'stay_sum': 0.0, 'stay_n': 0, 'guest_sum': 0.0, 'guest_n': 0})
+        room_types = defaultdict(Counter)
+        months = defaultdict(Counter)
+        year_months = defaultdict(Counter)
+
+        columns = ['hotel_id', 'month', 'check_in', 'check_out', 'guest_count', 'room_type']
+        for table in self._scan('bookings', columns, hotel_ids):
+            stay_days = self._stay_days(table['check_in'], table['check_out'])
+            summary = pa.table({
+                'hotel_id': table['hotel_id'],
+                'stay': stay_days,
+                'guest_count': table['guest_count'].cast(pa.float64())
+            }).group_by('hotel_id').aggregate([
+                ('hotel_id', 'count'),
+                ('stay', 'sum'),
+                ('stay', 'count'),
+                ('guest_count', 'sum'),
+                ('guest_count', 'count')
+            ])
+            for row in summary.to_pylist():
+                acc = totals[row['hotel_id']]
+                acc['count'] += row['hotel_id_count']
+                acc['stay_sum'] += row['stay_sum'] or 0
+                acc['stay_n'] += row['stay_count']
+                acc['guest_sum'] += row['guest_count_sum'] or 0
+                acc['guest_n'] += row['guest_count_count']
+
+            self._count_into(room_types, table['hotel_id'], table['room_type'])
+            self._count_into(months, table['hotel_id'], pc.month(table['check_in']))
+            self._count_into(year_months, table['hotel_id'], table['month'], skip={'unknown'})
+
+        hotels = {
+            hotel_id: self._booking_summary(acc, room_types[hotel_id], months[hotel_id], year_months[hotel_id])
+            for hotel_id, acc in sorted(totals.items())
+        }
+
+        chain_acc = {key: sum(acc[key] for acc in totals.values()) for key in ('count', 'stay_sum', 'stay_n', 'guest_sum', 'guest_n')}
+        chain = self._booking_summary(
+            chain_acc,
+            sum(room_types.values(), Counter()),
+            sum(months.values(), Counter()),
+            sum(year_months.values(), Counter())
+        ) if totals else {}
+
+        return {
+            'hotel_count': len(hotels),
+            'chain': chain,
+            'hotels': hotels
+        }
+
+    def analyze_messages(self, hotel_ids: Optional[List[int]] = None) -> Dict:
+        """ホテル毎のメッセージ件数（種類・プラットフォーム・処理状況）を集計"""
+        counts = Counter()
+        processed = Counter()
+        by_type = defaultdict(Counter)
+        by_platform = defaultdict(Counter)
+
+        columns = ['hotel_id', 'message_type', 'platform', 'is_processed']
+        for table in self._scan('guest_messages', columns, hotel_ids):
+            self._count_into(by_type, table['hotel_id'], table['message_type'])
+            self._count_into(by_platform, table['hotel_id'], table['platform'])
+            done = table.filter(pc.fill_null(table['is_processed'], False))
+            for hotel_id, n in self._value_counts(done['hotel_id']).items():
+                processed[hotel_id] += n
+            for hotel_id, n in self._value_counts(table['hotel_id']).items():
+                counts[hotel_id] += n
+
+        return {
+            hotel_id: {
+                'total_messages': total,
+                'processed_messages': processed[hotel_id],
+                'message_types': dict(by_type[hotel_id].most_common()),
+                'platforms': dict(by_platform[hotel_id].most_common())
+            }
+            for hotel_id, total in sorted(counts.items())
+        }
+
+    def analyze_responses(self, hotel_ids: Optional[List[int]] = None) -> Dict:
+        """ホテル毎の返信ログ件数を集計"""
+        counts = Counter()
+        sent = Counter()
+        by_type = defaultdict(Counter)
+
+        columns = ['hotel_id', 'response_type', 'is_sent']
+        for table in self._scan('response_logs', columns, hotel_ids):
+            self._count_into(by_type, table['hotel_id'], table['response_type'])
+            delivered = table.filter(pc.fill_null(table['is_sent'], False))
+            for hotel_id, n in self._value_counts(delivered['hotel_id']).items():
+                sent[hotel_id] += n
+            for hotel_id, n in self._value_counts(table['hotel_id']).items():
+                counts[hotel_id] += n
+
+        return {
+            hotel_id: {
+                'total_responses': total,
+                'sent_responses': sent[hotel_id],
+                'response_types': dict(by_type[hotel_id].most_common())
+            }
+            for hotel_id, total in sorted(counts.items())
+        }
+
+    def _scan(self, table: str, columns: List[str], hotel_ids: Optional[List[int]]) -> Iterator[pa.Table]:
+        """必要な列だけをバッチ単位で読み出す（hotel_id はパーティションで絞り込み）"""
+        path = current_table_dir(self.snapshot_dir, table)
+        if path is None:
+            return
+
+        dataset = ds.dataset(path, format='parquet', partitioning=PARTITIONING)
+        filter_expression = ds.field('hotel_id').isin(list(hotel_ids)) if hotel_ids else None
+
+        for batch in dataset.to_batches(columns=columns, filter=filter_expression, batch_size=self.batch_size):
+            if batch.num_rows:
+                yield pa.Table.from_batches([batch])
+
+    def _stay_days(self, check_in: pa.ChunkedArray, check_out: pa.ChunkedArray) -> pa.ChunkedArray:
+        """滞在日数（pandasの timedelta.days と同じく切り捨て）"""
+        duration = pc.subtract(check_out, check_in)
+        per_day = _UNITS_PER_DAY[duration.type.unit]
+        return pc.floor(pc.divide(duration.cast(pa.int64()).cast(pa.float64()), per_day))
+
+    def _value_counts(self, values: Iterable) -> Dict:
+        """配列の値ごとの件数（nullは除外）"""
+        result = {}
+        for item in pc.value_counts(values).to_pylist():
+            if item['values'] is not None:
+                result[item['values']] = item['counts']
+        return result
+
+    def _count_into(self, target: Dict, hotel_ids: pa.ChunkedArray, values, skip: Optional[set] = None):
+        """(hotel_id, 値) の組み合わせ件数を加算"""
+        grouped = pa.table({'hotel_id': hotel_ids, 'value': values}).group_by(['hotel_id', 'value']).aggregate([
+            ('hotel_id', 'count')
+        ])
+        for row in grouped.to_pylist():
+            if row['value'] is None or (skip and row['value'] in skip):
+                continue
+            target[row['hotel_id']][row['value']] += row['hotel_id_count']
+
+    def _booking_summary(self, acc: Dict, room_types: Counter, months: Counter, year_months: Counter) -> Dict:
+        """集計値を analyze_booking_patterns と同じ形式に整形"""
+        monthly_trends = {key: year_months[key] for key in sorted(year_months)}
+        trend_values = list(monthly_trends.values())
+
+        return {
+            'total_bookings': acc['count'],
+            'average_stay_duration': acc['stay_sum'] / acc['stay_n'] if acc['stay_n'] else 0,
+            'peak_seasons': {
+                'peak_months': [month for month, _ in months.most_common(3)],
+                'monthly_distribution': {str(month): n for month, n in months.most_common()}
+            },
+            'popular_room_types': dict(room_types.most_common()),
+            'average_guest_count': acc['guest_sum'] / acc['guest_n'] if acc['guest_n'] else 0,
+            'booking_trends': {
+                'monthly_trends': monthly_trends,
+                'growth_rate': _growth_rate(trend_values)
+            }
+        }
+
+def _growth_rate(values: List[int]) -> float:
+    """最初の月と最後の月の件数から成長率を計算"""
+    if len(values) < 2 or values[0] == 0:
+        return 0
+    return ((values[-1] - values[0]) / values[0]) * 100
@@ -0,0 +1,94 @@
+import asyncio
+import importlib
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from app.config import settings
+
+# タスク名 -> 関数。ワーカーには名前と小さなペイロードだけを渡す
+TASKS: Dict[str, Callable] = {}
+
+# タスク定義モジュール（ワーカー側でも import して登録する）
+TASK_MODULES = ('app.services.cpu_tasks',)
+
+def cpu_task(name: str):
+    """CPU負荷の高い処理をタスクとして登録するデコレータ"""
+    def decorator(fn: Callable) -> Callable:
+        TASKS[name] = fn
+        return fn
+    return decorator
+
+def _load_task_modules():
+    for module in TASK_MODULES:
+        importlib.import_module(module)
+
+def _init_worker(preload_modules):
+    """ワーカープロセスの初期化"""
+    from app.database import engine
+
+    # 親プロセスから引き継いだDB接続は使わない
+    engine.dispose(close=False)
+
+    # 重いライブラリを先に読み込んでおき、最初のタスクの待ち時間をなくす
+    for module in preload_modules:
+        try:
+            importlib.import_module(module)
+        except ImportError as e:
+            print(f"プリロードエラー ({module}): {str(e)}")
+
+    _load_task_modules()
+
+def _dispatch(task_name: str, payload: Dict):
+    """ワーカー側でタスクを実行"""
+    if task_name not in TASKS:
+        _load_task_modules()
+    return TASKS[task_name](**payload)
+
+def _noop():
+    return None
+
+class CPUExecutor:
+    """CPU負荷の高い処理をプロセスプールに逃がすための実行器
+
+    workers=0 の場合はプロセスを起動せず、スレッド1本で実行する（開発・テスト用）。
+    """
+
+    def __init__(self, workers: Optional[int] = None, preload_modules: Optional[list] = None):
+        self.workers = settings.CPU_WORKERS if workers is None else workers
+        self.preload_modules = preload_modules if preload_modules is not None else settings.CPU_PRELOAD_MODULES
+        self._executor: Optional[Executor] = None
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if self.workers > 0:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    initializer=_init_worker,
+                    initargs=(tuple(self.preload_modules),)
+                )
+            else:
+                _load_task_modules()
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='cpu-task')
+        return self._executor
+
+    def submit(self, task_name: str, **payload) -> Future:
+        """タスクを投入して concurrent.futures.Future を返す"""
+        return self.executor.submit(_dispatch, task_name, payload)
+
+    async def run(self, task_name: str, **payload):
+        """タスクを実行して結果を待つ（イベントループはブロックしない）"""
+        return await asyncio.wrap_future(self.submit(task_name, **payload))
+
+    def warm_up(self):
+        """全ワーカーを起動しておく"""
+        futures = [self.executor.submit(_noop) for _ in range(max(self.workers, 1))]
+        for future in futures:
+            future.result()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+cpu_executor = CPUExecutor()
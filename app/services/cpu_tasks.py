@@ -0,0 +1,85 @@
+import os
+from typing import Dict, List
+
+from app.services.cpu_executor import cpu_task
+
+# ワーカープロセス内の学習済みモデルキャッシュ（hotel_id -> (更新時刻, モデル)）
+_model_cache: Dict = {}
+
+@cpu_task('analyze_booking_patterns')
+def analyze_booking_patterns(hotel_id: int) -> Dict:
+    """予約パターン分析（pandas）"""
+    from app.agents.booking_data_agent import BookingDataAgent
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return BookingDataAgent().analyze_booking_patterns(db, hotel_id)
+    finally:
+        db.close()
+
+@cpu_task('train_hotel_model')
+def train_hotel_model(hotel_id: int) -> Dict:
+    """TF-IDFモデルの学習"""
+    from app.services.training import train_hotel_model as train
+
+    return train(hotel_id)
+
+@cpu_task('train_message_classifier')
+def train_message_classifier() -> Dict:
+    """ラベル付きメッセージからメッセージ分類モデルを学習"""
+    from app.services.message_classifier import train_message_classifier as train
+
+    return train()
+
+@cpu_task('rank_templates')
+def rank_templates(hotel_id: int, message: str) -> List[Dict]:
+    """学習済みTF-IDFモデルでテンプレートとメッセージのコサイン類似度を計算"""
+    from sklearn.metrics.pairwise import cosine_similarity
+
+    model = _get_model(hotel_id)
+    if not model or model.get('template_vectors') is None:
+        return []
+
+    message_vector = model['vectorizer'].transform([message])
+    scores = cosine_similarity(message_vector, model['template_vectors'])[0]
+
+    return _template_scores(model, scores)
+
+@cpu_task('rank_templates_batch')
+def rank_templates_batch(hotel_id: int, messages: List[str]) -> List[List[Dict]]:
+    """複数のメッセージとテンプレートのコサイン類似度を1回の行列計算で求める"""
+    from sklearn.metrics.pairwise import cosine_similarity
+
+    model = _get_model(hotel_id)
+    if not model or model.get('template_vectors') is None:
+        return [[] for _ in messages]
+
+    scores = cosine_similarity(model['vectorizer'].transform(messages), model['template_vectors'])
+
+    return [_template_scores(model, row) for row in scores]
+
+def _template_scores(model: Dict, scores) -> List[Dict]:
+    """テンプレートごとの類似度（テンプレートIDのない古いモデルは template_id が None）"""
+    template_ids = model.get('template_ids') or [None] * len(model['templates'])
+    return [
+        {'template_id': template_id, 'content': content, 'similarity': float(score)}
+        for template_id, content, score in zip(template_ids, model['templates'], scores)
+    ]
+
+def _get_model(hotel_id: int):
+    """モデルファイルが更新されていれば読み直す"""
+    from app.services.training import load_hotel_model, model_path
+
+    try:
+        mtime = os.path.getmtime(model_path(hotel_id))
+    except OSError:
+        return None
+
+    cached = _model_cache.get(hotel_id)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    model = load_hotel_model(hotel_id)
+    _model_cache[hotel_id] = (mtime, model)
+    return model
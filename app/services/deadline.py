@@ -0,0 +1,33 @@
+import time
+from typing import Optional
+
+class Deadline:
+    """リクエスト単位の処理時間の予算（budget_ms）
+
+    ResponseGenerator からエージェントまで渡し、残り時間が無くなった処理は
+    外部APIやDBへの問い合わせを行わずに打ち切る。budget_ms が None/0 の場合は無制限。
+    """
+
+    __slots__ = ('budget_ms', 'started_at', 'expires_at')
+
+    def __init__(self, budget_ms: Optional[float] = None):
+        self.budget_ms = budget_ms or None
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + budget_ms / 1000 if budget_ms else None
+
+    def remaining(self) -> Optional[float]:
+        """残り時間（秒）。無制限の場合は None"""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    def clamp(self, timeout: float) -> float:
+        """ソースごとのタイムアウトを残り時間で切り詰める"""
+        remaining = self.remaining()
+        return timeout if remaining is None else min(timeout, remaining)
+
+    def elapsed_ms(self) -> float:
+        return (time.monotonic() - self.started_at) * 1000
@@ -0,0 +1,178 @@
+import threading
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import RankingWeight, SuggestionFeedback
+from app.services.ranking import type_family
+
+# 中立の重み（フィードバックがないソース・テンプレートはランキングに影響しない）
+NEUTRAL_VALUE = 0.5
+
+# 編集距離を正確に計算する最大文字数（計算量は文字数の2乗のため、長い返信でも数十ミリ秒に収める）
+MAX_EDIT_LENGTH = 500
+
+def edit_distance(a: str, b: str) -> int:
+    """文字単位のレーベンシュタイン距離
+
+    オペレーターの編集は一部だけのことが多いため、共通の先頭・末尾を除いてから計算する。
+    残った部分が MAX_EDIT_LENGTH 文字を超える場合は、先頭 MAX_EDIT_LENGTH 文字の距離に
+    それ以降を全て書き換えたとみなした文字数を加える（実際の距離以上の値になり、編集を見逃さない）。
+    """
+    start = 0
+    while start < len(a) and start < len(b) and a[start] == b[start]:
+        start += 1
+    end_a, end_b = len(a), len(b)
+    while end_a > start and end_b > start and a[end_a - 1] == b[end_b - 1]:
+        end_a -= 1
+        end_b -= 1
+    a, b = a[start:end_a], b[start:end_b]
+
+    overflow = max(len(a), len(b)) - MAX_EDIT_LENGTH
+    if overflow > 0:
+        return _levenshtein(a[:MAX_EDIT_LENGTH], b[:MAX_EDIT_LENGTH]) + overflow
+    return _levenshtein(a, b)
+
+def _levenshtein(a: str, b: str) -> int:
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+class FeedbackLearner:
+    """オペレーターが選んだ候補から、ホテルごとのランキングの重みをオンラインで更新する
+
+    候補をそのまま送信した場合の報酬を1、全面的に書き直した場合を0として、
+    ソースの種類（template / ai / history / rules）とテンプレートごとの重みを報酬の指数移動平均で更新する。
+    重みは ranking_weights に1行ずつ保存し、rank_suggestions には (重み - 0.5) x 2 x FEEDBACK_WEIGHT の加点として渡す。
+    """
+
+    def __init__(self, learning_rate: Optional[float] = None, weight: Optional[float] = None, ttl: Optional[int] = None):
+        self.learning_rate = settings.FEEDBACK_LEARNING_RATE if learning_rate is None else learning_rate
+        self.weight = settings.FEEDBACK_WEIGHT if weight is None else weight
+        self.ttl = settings.FEEDBACK_WEIGHTS_TTL if ttl is None else ttl
+        self._priors: Dict[int, tuple] = {}
+        self._lock = threading.Lock()
+
+    def priors(self, hotel_id: int, db: Session) -> Dict[str, float]:
+        """ランキングの加点（ソースの種類・テンプレートの根拠 -> 加点）
+
+        他のワーカーでの更新も反映するため、TTLを過ぎたらDBから読み直す。
+        """
+        cached = self._priors.get(hotel_id)
+        if cached is not None and (self.ttl <= 0 or time.monotonic() - cached[0] < self.ttl):
+            return cached[1]
+
+        try:
+            rows = db.query(RankingWeight.key, RankingWeight.value).filter(RankingWeight.hotel_id == hotel_id).all()
+        except Exception as e:
+            print(f"ランキングの重み取得エラー: {str(e)}")
+            rows = []
+
+        priors = {key: self.weight * (value - NEUTRAL_VALUE) * 2 for key, value in rows}
+        with self._lock:
+            self._priors[hotel_id] = (time.monotonic(), priors)
+        return priors
+
+    def record(
+        self,
+        db: Session,
+        hotel_id: int,
+        guest_message_id: int,
+        response_content: str,
+        response_log_id: Optional[int] = None,
+        suggestion_source: Optional[str] = None,
+        suggestion_type: Optional[str] = None,
+        suggested_content: Optional[str] = None
+    ) -> Dict:
+        """送信した返信のフィードバックを記録し、選ばれた候補のソース・テンプレートの重みを更新"""
+        distance = None
+        reward = None
+        keys = []
+        if suggestion_source and suggested_content is not None:
+            distance = edit_distance(suggested_content, response_content)
+            reward = max(0.0, 1.0 - distance / max(len(suggested_content), len(response_content), 1))
+
+            family = type_family(suggestion_type, suggestion_source)
+            keys.append(family)
+            if family == 'template':
+                keys.append(suggestion_source)
+
+        feedback = SuggestionFeedback(
+            hotel_id=hotel_id,
+            guest_message_id=guest_message_id,
+            response_log_id=response_log_id,
+            suggestion_source=suggestion_source,
+            suggestion_type=suggestion_type,
+            suggested_content=suggested_content,
+            edit_distance=distance,
+            reward=reward
+        )
+        db.add(feedback)
+        for key in keys:
+            self._update(db, hotel_id, key, reward)
+        db.commit()
+
+        if keys:
+            self.invalidate(hotel_id)
+
+        return {
+            'feedback_id': feedback.id,
+            'edit_distance': distance,
+            'reward': round(reward, 4) if reward is not None else None,
+            'updated_weights': keys
+        }
+
+    def _update(self, db: Session, hotel_id: int, key: str, reward: float):
+        """重みを1件更新（他のワーカーと同時に更新しても失われないよう、DB上で計算する）"""
+        def update() -> int:
+            return db.query(RankingWeight).filter(
+                RankingWeight.hotel_id == hotel_id,
+                RankingWeight.key == key
+            ).update({
+                RankingWeight.value: RankingWeight.value + self.learning_rate * (reward - RankingWeight.value),
+                RankingWeight.observations: RankingWeight.observations + 1
+            }, synchronize_session=False)
+
+        if update():
+            return
+
+        try:
+            with db.begin_nested():
+                db.add(RankingWeight(
+                    hotel_id=hotel_id,
+                    key=key,
+                    value=NEUTRAL_VALUE + self.learning_rate * (reward - NEUTRAL_VALUE),
+                    observations=1
+                ))
+        except IntegrityError:
+            # 別のワーカーが先に作成した場合はその行を更新する
+            update()
+
+    def weights(self, hotel_id: int, db: Session) -> List[Dict]:
+        """ホテルの重みの一覧"""
+        rows = db.query(RankingWeight).filter(RankingWeight.hotel_id == hotel_id).order_by(RankingWeight.key).all()
+        return [
+            {
+                'key': row.key,
+                'value': round(row.value, 4),
+                'prior': round(self.weight * (row.value - NEUTRAL_VALUE) * 2, 4),
+                'observations': row.observations,
+                'updated_at': row.updated_at.isoformat() if row.updated_at else None
+            }
+            for row in rows
+        ]
+
+    def invalidate(self, hotel_id: int):
+        with self._lock:
+            self._priors.pop(hotel_id, None)
+
+feedback_learner = FeedbackLearner()
@@ -0,0 +1,177 @@
+import itertools
+import sys
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import Hotel, ResponseTemplate
+from app.services.invalidation import MARKER_CHECK_INTERVAL, invalidation_markers
+from app.services.language_detection import reply_language
+from app.services.suggestion import Suggestion, SuggestionType
+from app.services.template_engine import template_engine, template_variables
+
+class HotelContext:
+    """1ホテル分の静的データをまとめたインメモリのコンテキスト
+
+    Hotel 行と同じ属性名（id, name, city, latitude ...）を持つため、
+    エージェントや返信生成では Hotel の代わりにそのまま渡せる。
+    """
+
+    __slots__ = (
+        'id', 'name', 'address', 'latitude', 'longitude', 'city', 'country', 'updated_at',
+        'template_suggestions_by_language', 'canned_suggestions',
+        'template_context_sources', 'attractions', 'luggage_info', 'version', 'loaded_at', 'loaded_timestamp',
+        'marker_checked_at'
+    )
+
+    def __init__(self, hotel: Hotel, templates: List[ResponseTemplate], version: int):
+        self.id = hotel.id
+        self.name = hotel.name
+        self.address = hotel.address
+        self.latitude = hotel.latitude
+        self.longitude = hotel.longitude
+        self.city = hotel.city
+        self.country = hotel.country
+        self.updated_at = hotel.updated_at
+
+        template_suggestions = defaultdict(lambda: defaultdict(list))
+        template_context_sources = set()
+        for template in templates:
+            language = template.language or settings.DEFAULT_LANGUAGE
+            suggestion = Suggestion(
+                template.template_content,
+                SuggestionType.TEMPLATE,
+                0.8,
+                sys.intern(f'Template: {template.id}')
+            )
+
+            # 変数を含むテンプレートはここでコンパイルしておき、メッセージごとに描画する
+            render_key = None
+            if not template_engine.is_static(template.template_content):
+                render_key = (template.id, template.updated_at)
+                template_engine.compile(render_key, template.template_content)
+                template_context_sources |= template_engine.context_sources(template.template_content)
+            template_suggestions[language][template.message_type].append((suggestion, render_key))
+
+        # 言語ごとのテンプレート候補（language -> message_type -> 候補）
+        self.template_suggestions_by_language = {
+            language: {message_type: tuple(suggestions) for message_type, suggestions in by_type.items()}
+            for language, by_type in template_suggestions.items()
+        }
+
+        # テンプレートの変数（最寄り駅・観光地）に使うコンテキスト情報（luggage_info / attractions）
+        self.template_context_sources = frozenset(template_context_sources)
+
+        # ホテル名を埋め込んだ定型の候補（ResponseGenerator が言語ごとに初回利用時に作る）
+        self.canned_suggestions: Dict[str, Dict] = {}
+
+        # 外部APIの結果は初回利用時に格納する（radius -> 観光地リスト）
+        self.attractions: Dict[int, List[Dict]] = {}
+        self.luggage_info: Optional[Dict] = None
+
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.loaded_timestamp = invalidation_markers.now()
+        # 他のワーカーからの破棄の目印を最後に確認した時刻（time.monotonic()）
+        self.marker_checked_at = self.loaded_at
+
+    def template_language(self, language: str) -> str:
+        """テンプレートに使う言語（その言語のテンプレートがなければ定型の返信と同じ言語）"""
+        return language if language in self.template_suggestions_by_language else reply_language(language)
+
+    def get_template_suggestions(self, message_type: str, variables: Optional[Dict] = None, language: Optional[str] = None) -> List[Suggestion]:
+        """メッセージタイプ・言語に対応するテンプレートの候補（変数を含むテンプレートは variables で描画）"""
+        template_language = self.template_language(language or settings.DEFAULT_LANGUAGE)
+        by_type = self.template_suggestions_by_language.get(template_language, {})
+        suggestions = []
+        for suggestion, render_key in by_type.get(message_type, ()):
+            if render_key is None:
+                suggestions.append(suggestion)
+                continue
+
+            content = template_engine.render(render_key, suggestion.content, variables or template_variables(self, language=template_language))
+            if content:
+                suggestions.append(Suggestion(content, suggestion.type, suggestion.confidence, suggestion.source))
+        return suggestions
+
+class HotelContextRegistry:
+    """HotelContext のプロセス内レジストリ
+
+    Hotel / ResponseTemplate の変更はセッションのコミット時に検知して破棄し、
+    同じホストの他のワーカーには invalidation_markers で伝える。
+    別ホストのワーカーやセッションを経由しない変更（SQLの直接実行など）は TTL で再読み込みする。
+    目印の確認（stat）はリクエストごとではなく、ホテルごとに check_interval 秒に1回だけ行う。
+    """
+
+    def __init__(self, ttl: Optional[int] = None, check_interval: float = MARKER_CHECK_INTERVAL):
+        self.ttl = settings.HOTEL_CONTEXT_TTL if ttl is None else ttl
+        self.check_interval = check_interval
+        self._contexts: Dict[int, HotelContext] = {}
+        self._versions = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def get(self, hotel_id: int, db: Session) -> Optional[HotelContext]:
+        """コンテキストを取得（なければDBから読み込む）"""
+        context = self._contexts.get(hotel_id)
+        now = time.monotonic()
+        if context is not None and (self.ttl <= 0 or now - context.loaded_at < self.ttl):
+            if now - context.marker_checked_at < self.check_interval:
+                return context
+            if not invalidation_markers.changed_since('hotel_context', hotel_id, context.loaded_timestamp):
+                context.marker_checked_at = now
+                return context
+
+        hotel = db.query(Hotel).filter(Hotel.id == hotel_id).first()
+        if not hotel:
+            return None
+
+        templates = db.query(ResponseTemplate).filter(
+            ResponseTemplate.hotel_id == hotel_id,
+            ResponseTemplate.is_active == True
+        ).all()
+
+        with self._lock:
+            context = HotelContext(hotel, templates, next(self._versions))
+            self._contexts[hotel_id] = context
+        return context
+
+    def invalidate(self, hotel_id: int):
+        """ホテルのコンテキストを破棄（他のワーカーのコンテキストも次の利用時に読み込み直させる）"""
+        with self._lock:
+            self._contexts.pop(hotel_id, None)
+        invalidation_markers.touch('hotel_context', hotel_id)
+
+    def clear(self):
+        with self._lock:
+            self._contexts.clear()
+
+hotel_context_registry = HotelContextRegistry()
+
+# -----------------------------------------------------------------------------
+# 変更検知: flush時に対象ホテルを記録し、commit後に破棄する
+# -----------------------------------------------------------------------------
+
+_PENDING_KEY = 'hotel_context_invalidations'
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changed_hotels(session, flush_context):
+    pending = session.info.setdefault(_PENDING_KEY, set())
+    for instance in itertools.chain(session.new, session.dirty, session.deleted):
+        if isinstance(instance, Hotel) and instance.id is not None:
+            pending.add(instance.id)
+        elif isinstance(instance, ResponseTemplate) and instance.hotel_id is not None:
+            pending.add(instance.hotel_id)
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_changed_hotels(session):
+    for hotel_id in session.info.pop(_PENDING_KEY, ()):
+        hotel_context_registry.invalidate(hotel_id)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_pending_invalidations(session):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,52 @@
+import os
+import time
+from typing import Optional
+
+from app.config import settings
+
+# 頻繁に使うキャッシュが目印を確認する間隔（秒）。他のワーカーでの破棄はこの時間だけ遅れて反映される
+MARKER_CHECK_INTERVAL = 1.0
+
+class InvalidationMarkers:
+    """ワーカー間で共有するキャッシュ破棄の目印（MODEL_DIR/invalidation 以下のファイルの更新時刻）
+
+    gunicorn の各ワーカーはプロセス内にキャッシュ（HotelContext・分析データ）を持つため、
+    あるワーカーで検知した変更を目印のファイルの更新時刻で他のワーカーに伝える。
+    各ワーカーはキャッシュを使う前に、キャッシュを作った時刻と目印の更新時刻を比べる（stat 1回。
+    リクエストごとに使うキャッシュは MARKER_CHECK_INTERVAL 秒に1回だけ確認する）。
+    同じ MODEL_DIR を共有するワーカー間でのみ有効。別ホストのワーカーには各キャッシュのTTLで反映される。
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or os.path.join(settings.MODEL_DIR, 'invalidation')
+
+    def _path(self, namespace: str, key) -> str:
+        return os.path.join(self.directory, f"{namespace}_{key}")
+
+    def touch(self, namespace: str, key):
+        """目印の更新時刻を現在時刻にする（他のワーカーのキャッシュを破棄させる）"""
+        path = self._path(namespace, key)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(path, 'a'):
+                pass
+            # 更新時刻を指定しないとカーネルのタイマー刻み（数ミリ秒）単位に丸められ、
+            # 直前に time.time() で記録したキャッシュの作成時刻より前になることがある
+            now = self.now()
+            os.utime(path, (now, now))
+        except OSError as e:
+            print(f"キャッシュ破棄の目印の更新エラー: {str(e)}")
+
+    def changed_since(self, namespace: str, key, timestamp: float) -> bool:
+        """timestamp（time.time()）以降に目印が更新されたか"""
+        try:
+            return os.stat(self._path(namespace, key)).st_mtime >= timestamp
+        except OSError:
+            return False
+
+    @staticmethod
+    def now() -> float:
+        """キャッシュを作った時刻として記録する値（ファイルの更新時刻と比べるため壁時計）"""
+        return time.time()
+
+invalidation_markers = InvalidationMarkers()
@@ -0,0 +1,195 @@
+import json
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import BackgroundJob
+from app.services.cpu_executor import CPUExecutor, cpu_executor
+
+# 保持するジョブ履歴の上限（古いものから破棄）
+MAX_JOB_HISTORY = 1000
+
+# 生存の記録がこの回数分途切れたジョブは、実行していたワーカーが停止したとみなす
+STALE_HEARTBEATS = 3
+
+STALE_JOB_ERROR = 'ジョブを実行していたワーカーが停止しました'
+
+class JobManager:
+    """学習などの重い処理を CPUExecutor で実行し、状態を管理する
+
+    ジョブの状態は background_jobs テーブルに保存するため、投入したワーカー以外
+    （gunicorn の他のワーカー）からも取得できる。実行中の状態（queued / running）は
+    投入したワーカーだけが把握しているため、他のワーカーからは完了するまで queued と見える。
+    投入したワーカーは完了までジョブの heartbeat_at を定期的に更新し、更新が途切れたジョブ
+    （ワーカーが異常終了した）は、状態の取得・次のジョブの投入時に失敗にする。
+    """
+
+    def __init__(
+        self,
+        executor: Optional[CPUExecutor] = None,
+        session_factory: Optional[Callable[[], Session]] = None,
+        heartbeat_interval: Optional[float] = None
+    ):
+        self.executor = executor or cpu_executor
+        self._session_factory = session_factory
+        self.heartbeat_interval = settings.JOB_HEARTBEAT_INTERVAL if heartbeat_interval is None else heartbeat_interval
+        # このワーカーで実行中のジョブ（ジョブID -> Future）
+        self._futures = {}
+        self._heartbeat: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _session(self) -> Session:
+        if self._session_factory is None:
+            from app.database import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory()
+
+    @property
+    def stale_after(self) -> timedelta:
+        return timedelta(seconds=self.heartbeat_interval * STALE_HEARTBEATS)
+
+    def submit(self, task_name: str, hotel_id: Optional[int] = None, **payload) -> Dict:
+        """ジョブを投入してジョブ情報を返す"""
+        job_id = uuid.uuid4().hex
+        now = datetime.now()
+        with self._session() as db:
+            db.add(BackgroundJob(id=job_id, type=task_name, hotel_id=hotel_id, status='queued', created_at=now, heartbeat_at=now))
+            self._prune(db)
+            self._fail_stale(db)
+            db.commit()
+
+        if hotel_id is not None:
+            payload['hotel_id'] = hotel_id
+        future = self.executor.submit(task_name, **payload)
+        self._futures[job_id] = future
+        future.add_done_callback(lambda f, job_id=job_id: self._on_done(job_id, f))
+        self._start_heartbeat()
+
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """ジョブの状態を取得"""
+        with self._session() as db:
+            job = db.get(BackgroundJob, job_id)
+            if job is None:
+                return None
+            if job.status == 'queued' and job_id not in self._futures and self._is_stale(job):
+                self._fail_stale(db, job_id)
+                db.commit()
+                db.refresh(job)
+            info = self._to_dict(job)
+
+        # 完了前のジョブは、このワーカーで実行中であれば Future から状態を返す
+        future = self._futures.get(job_id)
+        if info['status'] == 'queued' and future is not None:
+            if future.done():
+                status, result, error = self._outcome(future)
+                info.update(status=status, result=result, error=error)
+            elif future.running():
+                info['status'] = 'running'
+        return info
+
+    @staticmethod
+    def _outcome(future):
+        """完了した Future の (状態, 結果, エラー)"""
+        if future.cancelled():
+            return 'failed', None, 'ジョブがキャンセルされました'
+        if future.exception() is not None:
+            return 'failed', None, str(future.exception())
+        return 'completed', future.result(), None
+
+    @staticmethod
+    def _to_dict(job: BackgroundJob) -> Dict:
+        return {
+            'job_id': job.id,
+            'type': job.type,
+            'hotel_id': job.hotel_id,
+            'status': job.status,
+            'created_at': job.created_at.isoformat() if job.created_at else None,
+            'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+            'result': json.loads(job.result) if job.result else None,
+            'error': job.error
+        }
+
+    @staticmethod
+    def _prune(db: Session):
+        """保持する件数を超えた古いジョブを削除"""
+        cutoff = db.query(BackgroundJob.created_at).order_by(BackgroundJob.created_at.desc()).offset(MAX_JOB_HISTORY).limit(1).scalar()
+        if cutoff is not None:
+            db.query(BackgroundJob).filter(BackgroundJob.created_at <= cutoff).delete(synchronize_session=False)
+
+    def _is_stale(self, job: BackgroundJob) -> bool:
+        last_seen = job.heartbeat_at or job.created_at
+        return last_seen is not None and last_seen < datetime.now() - self.stale_after
+
+    def _fail_stale(self, db: Session, job_id: Optional[str] = None):
+        """生存の記録が途切れた未完了のジョブを失敗にする（job_id を指定するとそのジョブだけ）"""
+        query = db.query(BackgroundJob).filter(
+            BackgroundJob.status == 'queued',
+            func.coalesce(BackgroundJob.heartbeat_at, BackgroundJob.created_at) < datetime.now() - self.stale_after
+        )
+        if job_id is not None:
+            query = query.filter(BackgroundJob.id == job_id)
+        elif self._futures:
+            query = query.filter(BackgroundJob.id.notin_(list(self._futures)))
+        query.update({
+            'status': 'failed',
+            'error': STALE_JOB_ERROR,
+            'finished_at': datetime.now()
+        }, synchronize_session=False)
+
+    def _start_heartbeat(self):
+        with self._lock:
+            if self._heartbeat is None or not self._heartbeat.is_alive():
+                self._heartbeat = threading.Thread(target=self._beat, name="job-heartbeat", daemon=True)
+                self._heartbeat.start()
+
+    def _beat(self):
+        """このワーカーで実行中のジョブの生存を記録する（実行中のジョブがなくなったら終了）"""
+        while True:
+            with self._lock:
+                if all(future.done() for future in list(self._futures.values())):
+                    self._heartbeat = None
+                    return
+            time.sleep(self.heartbeat_interval)
+            self.touch_running()
+
+    def touch_running(self):
+        """このワーカーで実行中のジョブの heartbeat_at を現在時刻にする"""
+        job_ids = [job_id for job_id, future in list(self._futures.items()) if not future.done()]
+        if not job_ids:
+            return
+        try:
+            with self._session() as db:
+                db.query(BackgroundJob).filter(
+                    BackgroundJob.id.in_(job_ids),
+                    BackgroundJob.status == 'queued'
+                ).update({'heartbeat_at': datetime.now()}, synchronize_session=False)
+                db.commit()
+        except Exception as e:
+            print(f"ジョブの生存の記録エラー: {str(e)}")
+
+    def _on_done(self, job_id: str, future):
+        """ジョブの結果を保存（executor のスレッドで呼ばれる）"""
+        status, result, error = self._outcome(future)
+        try:
+            with self._session() as db:
+                db.query(BackgroundJob).filter(BackgroundJob.id == job_id).update({
+                    'status': status,
+                    'result': json.dumps(result, ensure_ascii=False, default=str) if result is not None else None,
+                    'error': error,
+                    'finished_at': datetime.now()
+                }, synchronize_session=False)
+                db.commit()
+            self._futures.pop(job_id, None)
+        except Exception as e:
+            # 保存できなかった場合もこのワーカーでは Future から状態を返せるよう残しておく
+            print(f"ジョブの状態の保存エラー: {str(e)}")
+
+job_manager = JobManager()
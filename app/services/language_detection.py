@@ -0,0 +1,135 @@
+import math
+import re
+from collections import Counter
+from typing import Dict, Optional
+
+from app.config import settings
+
+# テンプレート・定型の返信を用意している言語（それ以外の言語は英語の返信を使う）
+REPLY_LANGUAGES = ('ja', 'en')
+
+# 判定に使う先頭の文字数（長いメッセージでも判定時間を一定にする）
+MAX_CHARS = 256
+
+# ラテン文字の言語を判定する文字3-gramモデルの学習用サンプル（ゲストメッセージでよく使われる表現）
+_SAMPLES = {
+    'en': (
+        "Hello, can I store my luggage here before check in? We will arrive early in the morning. "
+        "Is there a room available for two nights next week? What time is check out? "
+        "Could you recommend some good restaurants or places to visit nearby? "
+        "Thank you very much for your help. Please let me know if that is possible. "
+        "How do I get to the hotel from the station? Do you have free wifi and breakfast? "
+        "I would like to change my reservation and book another night for my family. "
+        "Where can we leave our bags after checking out? Are there any sights within walking distance?"
+    ),
+    'fr': (
+        "Bonjour, est-ce que je peux laisser mes bagages avant l'arrivée? Nous arriverons tôt le matin. "
+        "Avez-vous une chambre disponible pour deux nuits la semaine prochaine? À quelle heure est le départ? "
+        "Pourriez-vous nous recommander des restaurants ou des endroits à visiter près de l'hôtel? "
+        "Merci beaucoup pour votre aide. Je voudrais modifier ma réservation pour ma famille. "
+        "Comment aller à l'hôtel depuis la gare? Est-ce que le petit déjeuner est compris?"
+    ),
+    'es': (
+        "Hola, ¿puedo dejar mi equipaje antes del check in? Llegaremos temprano por la mañana. "
+        "¿Tienen una habitación disponible para dos noches la próxima semana? ¿A qué hora es la salida? "
+        "¿Podrían recomendarnos algunos restaurantes o lugares para visitar cerca del hotel? "
+        "Muchas gracias por su ayuda. Quisiera cambiar mi reserva para mi familia. "
+        "¿Cómo llego al hotel desde la estación? ¿El desayuno está incluido en el precio?"
+    ),
+    'de': (
+        "Hallo, kann ich mein Gepäck vor dem Einchecken hier lassen? Wir kommen früh am Morgen an. "
+        "Haben Sie ein Zimmer für zwei Nächte in der nächsten Woche frei? Wann ist der Check-out? "
+        "Können Sie uns gute Restaurants oder Sehenswürdigkeiten in der Nähe empfehlen? "
+        "Vielen Dank für Ihre Hilfe. Ich möchte meine Reservierung für meine Familie ändern. "
+        "Wie komme ich vom Bahnhof zum Hotel? Ist das Frühstück im Preis inbegriffen?"
+    ),
+}
+
+# 英語以外と判定するのに必要な3-gram数と、英語に対する1-gramあたりの対数尤度の差
+# （短い・固有名詞が多いメッセージは英語として扱う）
+MIN_TRIGRAMS = 4
+ENGLISH_MARGIN = 0.3
+
+# 中国語で頻出し、日本語では使わない字体の漢字（簡体字・繁体字・中国語の助詞など）。
+# 時・間・問・個・過・給・対・説など日本語でも普通に使う漢字は含めない（「質問」「時間」を日本語と判定するため）
+_CHINESE_CHARS = frozenset(
+    "们这吗么您请问说还没对过时间够从给让谢个预订呢吧啊你她"
+    "們這嗎麼說沒對從讓夠點"
+)
+
+_WORD_PATTERN = re.compile(r"[^\W\d_]+")
+
+def _trigrams(text: str):
+    """単語ごとに前後を '_' で埋めた文字3-gram"""
+    for word in _WORD_PATTERN.findall(text.lower()):
+        padded = f"_{word}_"
+        for i in range(len(padded) - 2):
+            yield padded[i:i + 3]
+
+class _TrigramModel:
+    """ラテン文字の言語を判定する文字3-gramのナイーブベイズモデル"""
+
+    def __init__(self, samples: Dict[str, str]):
+        self.log_probs = {}
+        self.unseen = {}
+        for language, text in samples.items():
+            counts = Counter(_trigrams(text))
+            # 加算スムージング（未知の3-gramにも小さい確率を与える）
+            total = sum(counts.values()) + len(counts) + 1
+            self.log_probs[language] = {gram: math.log((count + 1) / total) for gram, count in counts.items()}
+            self.unseen[language] = math.log(1 / total)
+
+    def predict(self, text: str) -> Optional[str]:
+        grams = list(_trigrams(text))
+        if not grams:
+            return None
+        if len(grams) < MIN_TRIGRAMS:
+            return 'en'
+
+        scores = {}
+        for language, log_probs in self.log_probs.items():
+            unseen = self.unseen[language]
+            scores[language] = sum(log_probs.get(gram, unseen) for gram in grams)
+        best = max(scores, key=scores.get)
+        if scores[best] - scores['en'] < ENGLISH_MARGIN * len(grams):
+            return 'en'
+        return best
+
+_latin_model = _TrigramModel(_SAMPLES)
+
+def detect_language(text: str, default: Optional[str] = None) -> str:
+    """メッセージの言語を判定（ja / en / zh / ko / fr / es / de）
+
+    文字種（かな・ハングル・漢字・ラテン文字）で大まかに判定し、ラテン文字の文章は
+    文字3-gramモデルで言語を絞り込む。ネットワークを使わず、1件あたり0.2ミリ秒以下で判定できる。
+    判定できない場合（数字・記号のみなど）は default（省略時は DEFAULT_LANGUAGE）を返す。
+    """
+    text = (text or '')[:MAX_CHARS]
+    kana = hangul = han = latin = chinese = 0
+    for char in text:
+        code = ord(char)
+        if 0x3040 <= code <= 0x30FF or 0xFF66 <= code <= 0xFF9F:
+            kana += 1
+        elif 0xAC00 <= code <= 0xD7A3 or 0x1100 <= code <= 0x11FF or 0x3130 <= code <= 0x318F:
+            hangul += 1
+        elif 0x4E00 <= code <= 0x9FFF or 0x3400 <= code <= 0x4DBF:
+            han += 1
+            if char in _CHINESE_CHARS:
+                chinese += 1
+        elif char.isalpha() and code < 0x0250:
+            latin += 1
+
+    # かなが含まれていれば日本語（漢字やローマ字が多い文章でも助詞・語尾にかなが入る）
+    if kana:
+        return 'ja'
+    if hangul and hangul >= han:
+        return 'ko'
+    if han and han >= latin:
+        return 'zh' if chinese else 'ja'
+    if latin:
+        return _latin_model.predict(text) or 'en'
+    return default or settings.DEFAULT_LANGUAGE
+
+def reply_language(language: str) -> str:
+    """テンプレート・定型の返信に使う言語（用意していない言語は英語）"""
+    return language if language in REPLY_LANGUAGES else 'en'
@@ -0,0 +1,512 @@
+import asyncio
+import hashlib
+import json
+import re
+import time
+import unicodedata
+from abc import ABC, abstractmethod
+from collections import OrderedDict, defaultdict
+from typing import AsyncIterator, Dict, List, Optional
+
+from app.config import settings
+from app.services.suggestion import Suggestion, SuggestionType
+
+# LLMへの指示。ストリーミング中でも1行ずつ候補を取り出せるよう「番号|返信」の行形式で出力させる
+SYSTEM_PROMPT = (
+    "あなたはホテルのフロントスタッフです。requests の各ゲストメッセージに対して、"
+    "丁寧で簡潔な返信候補を最大3件ずつ、指定された言語(language)で作成してください。"
+    "出力は1行に1件、'<index>|<返信>' の形式のみとし、それ以外の文章は出力しないでください。"
+)
+
+LANGUAGE_NAMES = {'ja': '日本語', 'en': 'English', 'zh': '中文', 'ko': '한국어', 'fr': 'Français', 'es': 'Español', 'de': 'Deutsch'}
+
+class LLMRequest:
+    """1件のゲストメッセージに対する返信候補生成リクエスト"""
+
+    __slots__ = ('message', 'message_type', 'language', 'hotel', 'hotel_id', 'context_version')
+
+    def __init__(self, message: str, message_type: str, hotel_context=None, language: str = 'ja'):
+        self.message = message
+        self.message_type = message_type
+        self.language = language
+        self.hotel_id = getattr(hotel_context, 'id', None)
+        self.context_version = getattr(hotel_context, 'version', None)
+        self.hotel = _hotel_summary(hotel_context)
+
+    def to_payload(self, index: int = 0) -> Dict:
+        return {
+            'index': index,
+            'message': self.message,
+            'message_type': self.message_type,
+            'language': LANGUAGE_NAMES.get(self.language, self.language),
+            'hotel': self.hotel
+        }
+
+class LLMCompletion:
+    """LLMの応答（返信候補とトークン数）"""
+
+    __slots__ = ('replies', 'prompt_tokens', 'completion_tokens', 'model', 'cached')
+
+    def __init__(self, replies: List[str], prompt_tokens: int = 0, completion_tokens: int = 0, model: str = '', cached: bool = False):
+        self.replies = replies
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.model = model
+        self.cached = cached
+
+def _hotel_summary(hotel_context) -> Dict:
+    """プロンプトに含めるホテル情報"""
+    if hotel_context is None:
+        return {}
+
+    summary = {
+        'name': hotel_context.name,
+        'city': hotel_context.city,
+        'address': hotel_context.address
+    }
+    attractions = getattr(hotel_context, 'attractions', {}).get(2000)
+    if attractions:
+        summary['nearby_attractions'] = [attraction['name'] for attraction in attractions[:3]]
+    return summary
+
+def build_messages(requests: List[LLMRequest]) -> List[Dict]:
+    """Chat Completions API に渡すメッセージを作る（複数リクエストを1回の呼び出しにまとめる）"""
+    payload = {'requests': [request.to_payload(index) for index, request in enumerate(requests)]}
+    return [
+        {'role': 'system', 'content': SYSTEM_PROMPT},
+        {'role': 'user', 'content': json.dumps(payload, ensure_ascii=False)}
+    ]
+
+def parse_reply_line(line: str):
+    """'<index>|<返信>' 形式の1行を (index, 返信) に変換。形式外の行は index 0 とみなす"""
+    line = line.strip()
+    if not line:
+        return None
+    index, separator, reply = line.partition('|')
+    if separator and index.strip().isdigit():
+        return int(index.strip()), reply.strip()
+    return 0, line
+
+def parse_replies(text: str, count: int) -> List[List[str]]:
+    """LLMの出力をリクエストごとの返信候補リストに分ける"""
+    replies = [[] for _ in range(count)]
+    for line in text.splitlines():
+        parsed = parse_reply_line(line)
+        if parsed and parsed[0] < count and parsed[1]:
+            replies[parsed[0]].append(parsed[1])
+    return replies
+
+def estimate_tokens(text: str) -> int:
+    """トークン数の概算（APIがusageを返さない場合に使用）"""
+    return max(1, len(text) // 2)
+
+# =============================================================================
+# バックエンド
+# =============================================================================
+
+class LLMBackend(ABC):
+    """LLMバックエンドのインターフェース"""
+
+    name = 'base'
+
+    @abstractmethod
+    async def complete_batch(self, requests: List[LLMRequest]) -> List[LLMCompletion]:
+        """複数リクエストの返信候補をまとめて生成"""
+
+    async def stream(self, request: LLMRequest, completion: LLMCompletion) -> AsyncIterator[str]:
+        """返信候補を生成しながら出力テキストを少しずつ返す
+
+        トークン数は completion に書き込む（集計は呼び出し側の LLMService で行う）。
+        """
+        result = (await self.complete_batch([request]))[0]
+        completion.prompt_tokens = result.prompt_tokens
+        completion.completion_tokens = result.completion_tokens
+        completion.model = result.model
+        yield '\n'.join(f"0|{reply}" for reply in result.replies)
+
+class StubBackend(LLMBackend):
+    """ネットワークを使わない決定的なバックエンド（テスト・開発用）"""
+
+    name = 'stub'
+    model = 'stub-1'
+
+    async def complete_batch(self, requests: List[LLMRequest]) -> List[LLMCompletion]:
+        completions = []
+        for request in requests:
+            replies = stub_replies(request.to_payload())
+            prompt_text = json.dumps(request.to_payload(), ensure_ascii=False)
+            completions.append(LLMCompletion(
+                replies,
+                prompt_tokens=estimate_tokens(SYSTEM_PROMPT + prompt_text),
+                completion_tokens=estimate_tokens(''.join(replies)),
+                model=self.model
+            ))
+        return completions
+
+    async def stream(self, request: LLMRequest, completion: LLMCompletion) -> AsyncIterator[str]:
+        replies = stub_replies(request.to_payload())
+        completion.prompt_tokens = estimate_tokens(SYSTEM_PROMPT + json.dumps(request.to_payload(), ensure_ascii=False))
+        completion.completion_tokens = estimate_tokens(''.join(replies))
+        completion.model = self.model
+        for reply in replies:
+            yield f"0|{reply}\n"
+
+class OpenAIBackend(LLMBackend):
+    """OpenAI Chat Completions API（OPENAI_BASE_URL でスタブサーバーにも向けられる）"""
+
+    name = 'openai'
+
+    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None, base_url: Optional[str] = None):
+        from openai import AsyncOpenAI
+
+        self.model = model or settings.OPENAI_MODEL
+        self.client = AsyncOpenAI(
+            api_key=api_key or settings.OPENAI_API_KEY or 'stub',
+            base_url=base_url or settings.OPENAI_BASE_URL or None,
+            timeout=settings.LLM_TIMEOUT
+        )
+
+    async def complete_batch(self, requests: List[LLMRequest]) -> List[LLMCompletion]:
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=build_messages(requests),
+            temperature=0.3
+        )
+        text = response.choices[0].message.content or ''
+        replies = parse_replies(text, len(requests))
+
+        # トークン数は1回の呼び出し分をリクエスト数で按分する
+        usage = response.usage
+        prompt_tokens = usage.prompt_tokens if usage else estimate_tokens(json.dumps(build_messages(requests), ensure_ascii=False))
+        completion_tokens = usage.completion_tokens if usage else estimate_tokens(text)
+        share = len(requests)
+
+        return [
+            LLMCompletion(
+                request_replies,
+                prompt_tokens=prompt_tokens // share,
+                completion_tokens=completion_tokens // share,
+                model=response.model or self.model
+            )
+            for request_replies in replies
+        ]
+
+    async def stream(self, request: LLMRequest, completion: LLMCompletion) -> AsyncIterator[str]:
+        messages = build_messages([request])
+        stream = await self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=0.3,
+            stream=True,
+            stream_options={'include_usage': True}
+        )
+        completion.model = self.model
+        text = ''
+        async for chunk in stream:
+            if chunk.usage:
+                completion.prompt_tokens = chunk.usage.prompt_tokens
+                completion.completion_tokens = chunk.usage.completion_tokens
+            if chunk.model:
+                completion.model = chunk.model
+            if chunk.choices and chunk.choices[0].delta.content:
+                text += chunk.choices[0].delta.content
+                yield chunk.choices[0].delta.content
+
+        # usage を返さないAPI（互換サーバー）の場合は概算する
+        if not completion.prompt_tokens:
+            completion.prompt_tokens = estimate_tokens(json.dumps(messages, ensure_ascii=False))
+            completion.completion_tokens = estimate_tokens(text)
+
+# =============================================================================
+# スタブの応答（StubBackend とスタブサーバーで共有）
+# =============================================================================
+
+_STUB_REPLIES = {
+    'ja': {
+        'luggage': [
+            "{hotel}では、チェックイン前・チェックアウト後もお荷物をお預かりいたします。フロントまでお越しください。",
+            "お荷物のお預かりは無料で承っております。貴重品はお手元でお持ちください。"
+        ],
+        'availability': [
+            "{hotel}の空室状況をお調べいたします。ご希望の日程と人数をお知らせください。",
+            "ご希望の日程をお知らせいただければ、空室状況をすぐにご案内いたします。"
+        ],
+        'attractions': [
+            "{hotel}周辺では{attractions}が人気です。アクセス方法もご案内いたします。",
+            "周辺のおすすめスポットをフロントでご案内いたします。お気軽にお声がけください。"
+        ],
+        'general': [
+            "お問い合わせありがとうございます。{hotel}のスタッフが確認してご連絡いたします。",
+            "ご質問を承りました。詳細を確認のうえ、改めてご案内いたします。"
+        ]
+    },
+    'en': {
+        'luggage': [
+            "You are welcome to leave your luggage with us at {hotel} before check-in and after check-out.",
+            "We are happy to store your bags free of charge. Please keep valuables with you."
+        ],
+        'availability': [
+            "We will check availability at {hotel}. Could you tell us your preferred dates and number of guests?",
+            "Please let us know your dates and we will confirm availability right away."
+        ],
+        'attractions': [
+            "Popular spots near {hotel} include {attractions}. We are happy to explain how to get there.",
+            "Our front desk can recommend places to visit nearby. Please feel free to ask."
+        ],
+        'general': [
+            "Thank you for your message. The {hotel} team will check and get back to you shortly.",
+            "We have received your question and will reply with details soon."
+        ]
+    }
+}
+
+def stub_replies(payload: Dict) -> List[str]:
+    """リクエスト内容から決定的に返信候補を作る"""
+    language = 'ja' if payload.get('language') in ('ja', '日本語') else 'en'
+    replies = _STUB_REPLIES[language]
+    templates = replies.get(payload.get('message_type'), replies['general'])
+
+    hotel = payload.get('hotel') or {}
+    attractions = hotel.get('nearby_attractions') or []
+    values = {
+        'hotel': hotel.get('name') or ('our hotel' if language == 'en' else '当ホテル'),
+        'attractions': ', '.join(attractions) if attractions else ('local sights' if language == 'en' else '観光スポット')
+    }
+    return [template.format(**values) for template in templates]
+
+# =============================================================================
+# マイクロバッチ・キャッシュ・トークン集計
+# =============================================================================
+
+class MicroBatcher:
+    """同時に届いたリクエストを短い待ち時間でまとめ、1回のLLM呼び出しにする"""
+
+    def __init__(self, backend: LLMBackend, max_batch_size: Optional[int] = None, max_wait_ms: Optional[int] = None):
+        self.backend = backend
+        self.max_batch_size = max_batch_size or settings.LLM_BATCH_MAX_SIZE
+        self.max_wait = (settings.LLM_BATCH_WAIT_MS if max_wait_ms is None else max_wait_ms) / 1000
+        self._pending = []
+        self._flush_handle = None
+
+    async def submit(self, request: LLMRequest) -> LLMCompletion:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((request, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        batch, self._pending = self._pending, []
+        if batch:
+            asyncio.ensure_future(self._run_batch(batch))
+
+    async def _run_batch(self, batch):
+        requests = [request for request, _ in batch]
+        try:
+            completions = await self.backend.complete_batch(requests)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        llm_usage.record_batch(len(batch))
+        for index, (_, future) in enumerate(batch):
+            if future.done():
+                continue
+            if index < len(completions):
+                future.set_result(completions[index])
+            else:
+                # バックエンドが返した結果がリクエストより少ない場合も、待っている呼び出し側をタイムアウトまで待たせない
+                future.set_exception(RuntimeError(f"LLMの結果が不足しています（{len(completions)}/{len(batch)}件）"))
+
+class SuggestionCache:
+    """正規化したメッセージとホテルコンテキストをキーにしたLRUキャッシュ
+
+    表記ゆれ（全角/半角・大文字小文字・空白・記号）を吸収するため、
+    同じ意味の問い合わせは同じキーになる。泊数や日付で返信が変わるため数字はキーに残す。
+    """
+
+    def __init__(self, max_size: Optional[int] = None, ttl: Optional[int] = None):
+        self.max_size = max_size or settings.LLM_CACHE_SIZE
+        self.ttl = settings.LLM_CACHE_TTL if ttl is None else ttl
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def normalize(message: str) -> str:
+        text = unicodedata.normalize('NFKC', message).lower()
+        return re.sub(r'[\s\W_]+', '', text)
+
+    def key(self, request: LLMRequest) -> str:
+        raw = '|'.join([
+            str(request.hotel_id),
+            str(request.context_version),
+            request.language,
+            request.message_type,
+            self.normalize(request.message)
+        ])
+        return hashlib.blake2b(raw.encode('utf-8'), digest_size=16).hexdigest()
+
+    def get(self, request: LLMRequest) -> Optional[List[str]]:
+        key = self.key(request)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def set(self, request: LLMRequest, replies: List[str]):
+        key = self.key(request)
+        self._entries[key] = (time.monotonic() + self.ttl, replies)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+class TokenUsage:
+    """LLMの利用量（トークン数・呼び出し回数・キャッシュヒット・レイテンシ）の集計"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.totals = defaultdict(float)
+        self.by_hotel = defaultdict(lambda: defaultdict(float))
+
+    def record(self, hotel_id, prompt_tokens: int, completion_tokens: int, latency_ms: float = 0):
+        for target in (self.totals, self.by_hotel[hotel_id]):
+            target['requests'] += 1
+            target['prompt_tokens'] += prompt_tokens
+            target['completion_tokens'] += completion_tokens
+            target['latency_ms_total'] += latency_ms
+
+    def record_cache_hit(self, hotel_id):
+        self.totals['cache_hits'] += 1
+        self.by_hotel[hotel_id]['cache_hits'] += 1
+
+    def record_batch(self, size: int):
+        self.totals['batches'] += 1
+        self.totals['batched_requests'] += size
+
+    def snapshot(self) -> Dict:
+        return {
+            'totals': dict(self.totals),
+            'by_hotel': {str(hotel_id): dict(values) for hotel_id, values in self.by_hotel.items()}
+        }
+
+llm_usage = TokenUsage()
+
+# =============================================================================
+# サービス
+# =============================================================================
+
+class LLMService:
+    """キャッシュ・マイクロバッチ・トークン集計をまとめたLLM返信候補サービス"""
+
+    def __init__(self, backend: LLMBackend):
+        self.backend = backend
+        self.batcher = MicroBatcher(backend)
+        self.cache = SuggestionCache()
+        self._sources = tuple(f'AI Generated #{index + 1} ({backend.name})' for index in range(3))
+
+    async def suggest(self, message: str, message_type: str, hotel_context=None, language: str = 'ja') -> List[Suggestion]:
+        """返信候補を生成（キャッシュがあればLLMを呼ばない）"""
+        request = LLMRequest(message, message_type, hotel_context, language)
+
+        replies = self.cache.get(request)
+        if replies is not None:
+            llm_usage.record_cache_hit(request.hotel_id)
+        else:
+            started_at = time.monotonic()
+            completion = await self.batcher.submit(request)
+            llm_usage.record(
+                request.hotel_id,
+                completion.prompt_tokens,
+                completion.completion_tokens,
+                (time.monotonic() - started_at) * 1000
+            )
+            replies = completion.replies
+            if replies:
+                self.cache.set(request, replies)
+
+        return [self._to_suggestion(reply, index) for index, reply in enumerate(replies[:3])]
+
+    async def stream_suggestions(self, message: str, message_type: str, hotel_context=None, language: str = 'ja') -> AsyncIterator[Suggestion]:
+        """返信候補を1件できるたびに返す（ストリーミング）"""
+        request = LLMRequest(message, message_type, hotel_context, language)
+
+        cached = self.cache.get(request)
+        if cached is not None:
+            llm_usage.record_cache_hit(request.hotel_id)
+            for index, reply in enumerate(cached[:3]):
+                yield self._to_suggestion(reply, index)
+            return
+
+        replies = []
+        buffer = ''
+        completion = LLMCompletion(replies)
+        started_at = time.monotonic()
+        try:
+            async for delta in self.backend.stream(request, completion):
+                buffer += delta
+                *lines, buffer = buffer.split('\n')
+                for line in lines:
+                    parsed = parse_reply_line(line)
+                    if parsed and parsed[1] and len(replies) < 3:
+                        replies.append(parsed[1])
+                        yield self._to_suggestion(parsed[1], len(replies) - 1)
+
+            parsed = parse_reply_line(buffer)
+            if parsed and parsed[1] and len(replies) < 3:
+                replies.append(parsed[1])
+                yield self._to_suggestion(parsed[1], len(replies) - 1)
+        finally:
+            # suggest() と同じくサービス側で集計する（途中で打ち切られた場合もその時点までを記録）
+            llm_usage.record(
+                request.hotel_id,
+                completion.prompt_tokens,
+                completion.completion_tokens,
+                (time.monotonic() - started_at) * 1000
+            )
+
+        if replies:
+            self.cache.set(request, replies)
+
+    def _to_suggestion(self, reply: str, index: int) -> Suggestion:
+        return Suggestion(reply, SuggestionType.AI_GENERATED, 0.75, self._sources[index])
+
+_llm_service = None
+
+# env.example のままのAPIキー（未設定とみなす）
+PLACEHOLDER_API_KEY_PREFIXES = ('sk-your-', 'your_', 'your-')
+
+def has_openai_api_key() -> bool:
+    """OpenAIのAPIキーが設定されているか（空・env.example のプレースホルダーは未設定）"""
+    api_key = settings.OPENAI_API_KEY.strip()
+    return bool(api_key) and not api_key.lower().startswith(PLACEHOLDER_API_KEY_PREFIXES)
+
+def get_llm_service() -> Optional[LLMService]:
+    """設定に応じたLLMサービスを返す（LLMを使わない設定の場合は None）"""
+    global _llm_service
+
+    backend_name = settings.LLM_BACKEND
+    if backend_name == 'auto':
+        backend_name = 'openai' if has_openai_api_key() else 'static'
+    if backend_name == 'static':
+        return None
+
+    if _llm_service is None:
+        backend = OpenAIBackend() if backend_name == 'openai' else StubBackend()
+        _llm_service = LLMService(backend)
+    return _llm_service
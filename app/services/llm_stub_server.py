@@ -0,0 +1,107 @@
+"""
+OpenAI Chat Completions API 互換のローカルスタブサーバー
+
+ネットワークやAPIキーなしで OpenAIBackend（バッチ・ストリーミング）を動かすためのサーバー。
+返信内容は StubBackend と同じく入力から決定的に作られる。
+
+使用方法:
+    python -m app.services.llm_stub_server --port 8100
+    OPENAI_BASE_URL=http://localhost:8100/v1 LLM_BACKEND=openai python -m app.main
+"""
+
+import argparse
+import json
+import time
+from typing import Dict, List
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+from app.services.llm_backend import estimate_tokens, stub_replies
+
+app = FastAPI(title="LLM Stub Server")
+
+def _reply_lines(messages: List[Dict]) -> List[str]:
+    """ユーザーメッセージ内の requests ごとに '<index>|<返信>' の行を作る"""
+    user_content = next((message['content'] for message in reversed(messages) if message.get('role') == 'user'), '')
+    try:
+        requests = json.loads(user_content).get('requests', [])
+    except (ValueError, AttributeError):
+        requests = [{'index': 0, 'message': user_content}]
+
+    lines = []
+    for request in requests:
+        for reply in stub_replies(request):
+            lines.append(f"{request.get('index', 0)}|{reply}")
+    return lines
+
+def _usage(messages: List[Dict], text: str) -> Dict:
+    prompt_tokens = estimate_tokens(''.join(str(message.get('content', '')) for message in messages))
+    completion_tokens = estimate_tokens(text)
+    return {
+        'prompt_tokens': prompt_tokens,
+        'completion_tokens': completion_tokens,
+        'total_tokens': prompt_tokens + completion_tokens
+    }
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    messages = body.get('messages', [])
+    model = body.get('model', 'stub-1')
+    lines = _reply_lines(messages)
+    text = '\n'.join(lines)
+    completion_id = f"chatcmpl-stub-{int(time.time() * 1000)}"
+    created = int(time.time())
+
+    if not body.get('stream'):
+        return {
+            'id': completion_id,
+            'object': 'chat.completion',
+            'created': created,
+            'model': model,
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': text},
+                'finish_reason': 'stop'
+            }],
+            'usage': _usage(messages, text)
+        }
+
+    include_usage = (body.get('stream_options') or {}).get('include_usage', False)
+
+    def chunk(delta: Dict, finish_reason=None, usage=None) -> str:
+        payload = {
+            'id': completion_id,
+            'object': 'chat.completion.chunk',
+            'created': created,
+            'model': model,
+            'choices': [] if usage else [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}],
+            'usage': usage
+        }
+        return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+    def events():
+        yield chunk({'role': 'assistant', 'content': ''})
+        for line in lines:
+            yield chunk({'content': line + '\n'})
+        yield chunk({}, finish_reason='stop')
+        if include_usage:
+            yield chunk({}, usage=_usage(messages, text))
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+@app.get("/health")
+async def health():
+    return {"status": "healthy"}
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="OpenAI互換のLLMスタブサーバー")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    args = parser.parse_args()
+
+    uvicorn.run(app, host=args.host, port=args.port)
@@ -0,0 +1,232 @@
+import json
+import os
+import random
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.config import settings
+
+# 文字n-gramをハッシュする次元数（語彙を持たないため、モデルファイルには重みだけを保存する）
+N_FEATURES = 2 ** 18
+NGRAM_RANGE = (1, 3)
+
+# 学習に必要な最小件数と、精度の評価に使う割合
+MIN_TRAINING_SAMPLES = 20
+HOLDOUT_RATIO = 0.2
+
+def classifier_path() -> str:
+    return os.path.join(settings.MODEL_DIR, "message_classifier.npz")
+
+def _metadata_path() -> str:
+    return os.path.join(settings.MODEL_DIR, "message_classifier.json")
+
+def build_vectorizer():
+    """文字n-gramのHashingVectorizer（学習・推論で同じ設定を使う）"""
+    import numpy as np
+    from sklearn.feature_extraction.text import HashingVectorizer
+
+    # 日本語は空白で分かち書きされないため文字n-gramを使う
+    # （重み行列と同じ float32 にして、推論のたびに重み行列が変換されないようにする）
+    return HashingVectorizer(
+        analyzer='char_wb',
+        ngram_range=NGRAM_RANGE,
+        n_features=N_FEATURES,
+        alternate_sign=False,
+        lowercase=True,
+        dtype=np.float32
+    )
+
+class LinearModel:
+    """学習済みの線形分類器（重みは使われている特徴量の列だけを保持する）"""
+
+    def __init__(self, classes: Sequence[str], columns, weights, intercept):
+        import numpy as np
+
+        self.classes = list(classes)
+        self.columns = np.asarray(columns, dtype=np.int32)
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.intercept = np.asarray(intercept, dtype=np.float32)
+
+        # 推論用: 全特徴量 x クラスの重み行列（使われていない特徴量は0）
+        self._coef = np.zeros((N_FEATURES, len(self.classes)), dtype=np.float32)
+        self._coef[self.columns] = self.weights.T
+        self._vectorizer = build_vectorizer()
+
+    @classmethod
+    def fit(cls, texts: Sequence[str], labels: Sequence[str], random_state: int = 0) -> 'LinearModel':
+        """ラベル付きメッセージから学習（SGDによるロジスティック回帰）"""
+        import numpy as np
+        from sklearn.linear_model import SGDClassifier
+
+        classifier = SGDClassifier(loss='log_loss', alpha=1e-5, max_iter=30, tol=1e-4, random_state=random_state)
+        classifier.fit(build_vectorizer().transform(texts), labels)
+
+        coef = classifier.coef_
+        if coef.shape[0] == 1:
+            # 2クラスの場合は1行しかないため、クラスごとの行にする
+            coef = np.vstack([-coef[0], coef[0]])
+            intercept = np.array([-classifier.intercept_[0], classifier.intercept_[0]])
+        else:
+            intercept = classifier.intercept_
+
+        columns = np.flatnonzero(np.any(coef != 0, axis=0))
+        return cls(classifier.classes_, columns, coef[:, columns], intercept)
+
+    def predict_proba(self, texts: Sequence[str]):
+        """メッセージごとのクラス確率（n_messages x n_classes）"""
+        import numpy as np
+
+        scores = self._vectorizer.transform(texts) @ self._coef + self.intercept
+        # 1対他のロジスティック回帰の確率を正規化する（scikit-learn と同じ方法）
+        probabilities = 1.0 / (1.0 + np.exp(-scores))
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+        return probabilities
+
+    def predict(self, texts: Sequence[str]) -> List[Tuple[str, float]]:
+        """メッセージごとの (カテゴリ, 確率)"""
+        probabilities = self.predict_proba(texts)
+        best = probabilities.argmax(axis=1)
+        return [(self.classes[index], float(probabilities[row, index])) for row, index in enumerate(best)]
+
+    def save(self, path: str):
+        """圧縮したnpzファイルに保存（書き込み途中のファイルを読まれないように一時ファイル経由で置き換える）"""
+        import numpy as np
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez_compressed(
+                f,
+                classes=np.array(self.classes),
+                columns=self.columns,
+                weights=self.weights,
+                intercept=self.intercept
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'LinearModel':
+        import numpy as np
+
+        with np.load(path) as data:
+            return cls(data['classes'].tolist(), data['columns'], data['weights'], data['intercept'])
+
+class MessageClassifier:
+    """保存済みの分類モデルを初回利用時に読み込み、メッセージをまとめて分類する
+
+    モデルファイルが更新されていれば（別プロセスでの再学習など）読み直す。
+    モデルがない・確率が CLASSIFIER_MIN_CONFIDENCE 未満の場合は None を返す（呼び出し側でキーワード分類）。
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self._path = path
+        self._model: Optional[LinearModel] = None
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    @property
+    def path(self) -> str:
+        return self._path or classifier_path()
+
+    def model(self) -> Optional[LinearModel]:
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return None
+
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    try:
+                        self._model = LinearModel.load(self.path)
+                    except Exception as e:
+                        print(f"分類モデル読み込みエラー: {str(e)}")
+                        self._model = None
+                    self._mtime = mtime
+        return self._model
+
+    def predict_batch(self, messages: Sequence[str], min_confidence: Optional[float] = None) -> List[Optional[str]]:
+        """メッセージをまとめて分類（分類できないメッセージは None）"""
+        model = self.model()
+        if model is None or not messages:
+            return [None] * len(messages)
+
+        threshold = settings.CLASSIFIER_MIN_CONFIDENCE if min_confidence is None else min_confidence
+        return [
+            label if probability >= threshold else None
+            for label, probability in model.predict(messages)
+        ]
+
+message_classifier = MessageClassifier()
+
+def train_message_classifier() -> Dict:
+    """ラベル付きの guest_messages から分類モデルを学習して保存（ワーカープロセスで実行）
+
+    一部を評価用に取り分けて精度（キーワード分類との比較）を計測した後、全件で学習し直す。
+    """
+    from app.database import SessionLocal
+    from app.models import GuestMessage
+    from app.services.api_service import MessageProcessor
+
+    db = SessionLocal()
+    try:
+        rows = db.query(GuestMessage.message_content, GuestMessage.message_type).filter(
+            GuestMessage.message_type.isnot(None),
+            GuestMessage.message_type != ''
+        ).all()
+    finally:
+        db.close()
+
+    texts = [content for content, _ in rows]
+    labels = [message_type for _, message_type in rows]
+    classes = sorted(set(labels))
+    if len(texts) < MIN_TRAINING_SAMPLES or len(classes) < 2:
+        raise ValueError(
+            f"学習データが不足しています（{len(texts)}件, {len(classes)}カテゴリ。"
+            f"{MIN_TRAINING_SAMPLES}件以上・2カテゴリ以上が必要です）"
+        )
+
+    # 評価用データで精度を計測
+    indices = list(range(len(texts)))
+    random.Random(0).shuffle(indices)
+    holdout = indices[:max(1, int(len(indices) * HOLDOUT_RATIO))]
+    train = indices[len(holdout):]
+    evaluation = {}
+    if len({labels[i] for i in train}) >= 2:
+        model = LinearModel.fit([texts[i] for i in train], [labels[i] for i in train])
+        predictions = model.predict([texts[i] for i in holdout])
+        keyword_processor = MessageProcessor()
+        evaluation = {
+            'holdout_samples': len(holdout),
+            'accuracy': _accuracy([label for label, _ in predictions], [labels[i] for i in holdout]),
+            'keyword_accuracy': _accuracy(
+                [keyword_processor.categorize_by_keywords(texts[i]) for i in holdout], [labels[i] for i in holdout]
+            )
+        }
+
+    model = LinearModel.fit(texts, labels)
+    model.save(classifier_path())
+
+    result = {
+        'trained_at': datetime.now().isoformat(),
+        'samples': len(texts),
+        'classes': classes,
+        'features_used': int(len(model.columns)),
+        'model_bytes': os.path.getsize(classifier_path()),
+        **evaluation
+    }
+    with open(_metadata_path(), 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False)
+    return result
+
+def load_classifier_metadata() -> Dict:
+    """最後の学習結果（メタデータのみ）を取得"""
+    try:
+        with open(_metadata_path(), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _accuracy(predictions: Sequence[str], labels: Sequence[str]) -> float:
+    return round(sum(p == l for p, l in zip(predictions, labels)) / len(labels), 4) if labels else 0.0
@@ -0,0 +1,181 @@
+import hashlib
+import random
+import re
+import unicodedata
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.services.suggestion import Suggestion, SuggestionType
+
+# 文字n-gram（シングル）の長さ
+SHINGLE_SIZE = 3
+
+# MinHash のハッシュ数と LSH のバンド数（16バンド x 2行 → Jaccard 0.4以上の組はほぼ確実に同じバケットに入る）
+NUM_PERM = 32
+BANDS = 16
+
+# シングルの重複度（短い方の何割が長い方に含まれるか）がこの値以上の候補は
+# 言い換え・言い足し（ほぼ重複）とみなして1件にまとめる
+DUPLICATE_THRESHOLD = 0.8
+
+# スコア = 信頼度 + 関連度 x RELEVANCE_WEIGHT + 他ソースの同意 x CONSENSUS_BONUS（+ フィードバックから学習した加点）
+RELEVANCE_WEIGHT = 0.15
+CONSENSUS_BONUS = 0.02
+
+# 上位候補に同じ種類のソースが続く場合の減点
+DIVERSITY_PENALTY = 0.05
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20240601)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+_ROWS = NUM_PERM // BANDS
+
+def normalize(text: str) -> str:
+    """全角/半角・大文字小文字・空白・記号の違いを吸収"""
+    return re.sub(r'[\s\W_]+', '', unicodedata.normalize('NFKC', text).lower())
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> Set[str]:
+    """正規化したテキストの文字n-gram集合"""
+    text = normalize(text)
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+def minhash(shingle_set: Set[str]) -> List[int]:
+    """シングル集合の MinHash シグネチャ"""
+    hashes = [
+        int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+        for shingle in shingle_set
+    ]
+    if not hashes:
+        return [0] * NUM_PERM
+    return [min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+def overlap(a: Set[str], b: Set[str]) -> float:
+    """重複係数 |A∩B| / min(|A|, |B|)（短い候補を言い足しただけの候補も1に近くなる）"""
+    if not a or not b:
+        return 1.0 if a == b else 0.0
+    return len(a & b) / min(len(a), len(b))
+
+_SOURCE_FAMILIES = {
+    SuggestionType.TEMPLATE: 'template',
+    SuggestionType.AI_GENERATED: 'ai',
+    SuggestionType.HISTORICAL: 'history'
+}
+
+def source_family(suggestion: Suggestion) -> str:
+    """候補のソースの種類（テンプレート・AI・過去の返信・ルール）"""
+    return _SOURCE_FAMILIES.get(suggestion.type, 'rules')
+
+def type_family(suggestion_type: Optional[str], source: Optional[str] = None) -> str:
+    """候補の種類（APIで受け取った文字列）からソースの種類を求める"""
+    try:
+        return _SOURCE_FAMILIES.get(SuggestionType(suggestion_type), 'rules')
+    except ValueError:
+        return 'template' if source and source.startswith('Template:') else 'rules'
+
+def relevance(message_bigrams: Set[str], content: str) -> float:
+    """ゲストのメッセージの文字bigramが候補にどれだけ含まれるか（0〜1）"""
+    if not message_bigrams:
+        return 0.0
+    return len(message_bigrams & _content_bigrams(content)) / len(message_bigrams)
+
+@lru_cache(maxsize=4096)
+def _content_bigrams(content: str) -> frozenset:
+    return frozenset(shingles(content, 2))
+
+@lru_cache(maxsize=4096)
+def fingerprint(content: str) -> Tuple[frozenset, Tuple]:
+    """候補のシングル集合と LSH バンド（定型の候補は毎回同じ内容のためキャッシュする）"""
+    shingle_set = frozenset(shingles(content))
+    signature = minhash(shingle_set)
+    bands = tuple((band, tuple(signature[band * _ROWS:(band + 1) * _ROWS])) for band in range(BANDS))
+    return shingle_set, bands
+
+def prior(suggestion: Suggestion, priors: Optional[Dict[str, float]]) -> float:
+    """フィードバックから学習した加点（ソースの種類 + テンプレートの根拠）"""
+    if not priors:
+        return 0.0
+    return priors.get(source_family(suggestion), 0.0) + priors.get(suggestion.source, 0.0)
+
+def collapse_near_duplicates(
+    suggestions: List[Suggestion],
+    threshold: float = DUPLICATE_THRESHOLD,
+    priors: Optional[Dict[str, float]] = None
+) -> List[Dict]:
+    """ほぼ同じ内容の候補を1件にまとめる（信頼度 + 学習した加点の高い方を残す）
+
+    MinHash の LSH バンドで比較相手を絞り込むため、候補数に対して線形時間で動く。
+    戻り値の各要素は {'suggestion', 'families'}（まとめた候補のソースの種類）。
+    """
+    clusters = []
+    cluster_shingles = []
+    buckets = defaultdict(list)
+
+    for suggestion in suggestions:
+        shingle_set, bands = fingerprint(suggestion.content)
+
+        # 同じバンドを持つクラスタだけを重複係数で確認する
+        match = None
+        candidates = {index for key in bands for index in buckets.get(key, ())}
+        for index in sorted(candidates):
+            if overlap(shingle_set, cluster_shingles[index]) >= threshold:
+                match = index
+                break
+
+        if match is None:
+            clusters.append({'suggestion': suggestion, 'families': {source_family(suggestion)}})
+            cluster_shingles.append(shingle_set)
+            for key in bands:
+                buckets[key].append(len(clusters) - 1)
+            continue
+
+        cluster = clusters[match]
+        cluster['families'].add(source_family(suggestion))
+        current = cluster['suggestion']
+        if suggestion.confidence + prior(suggestion, priors) > current.confidence + prior(current, priors):
+            cluster['suggestion'] = suggestion
+
+    return clusters
+
+def rank_suggestions(
+    suggestions: List[Suggestion],
+    message: Optional[str] = None,
+    top_k: int = 3,
+    priors: Optional[Dict[str, float]] = None
+) -> List[Suggestion]:
+    """候補の重複（言い換え）を除去し、信頼度・メッセージとの関連度・ソースの多様性でランク付け
+
+    上位 top_k 件は同じ種類のソースが偏らないように選び、残りはスコア順に並べる。
+    priors はオペレーターのフィードバックから学習した加点（ソースの種類・テンプレートの根拠 -> 加点）。
+    """
+    message_bigrams = shingles(message, 2) if message else set()
+
+    scored = []
+    for cluster in collapse_near_duplicates(suggestions, priors=priors):
+        suggestion = cluster['suggestion']
+        score = (
+            suggestion.confidence
+            + RELEVANCE_WEIGHT * relevance(message_bigrams, suggestion.content)
+            + CONSENSUS_BONUS * (len(cluster['families']) - 1)
+            + prior(suggestion, priors)
+        )
+        scored.append((score, source_family(suggestion), suggestion))
+
+    # スコア順（同点は元の順序）に並べてから、上位を多様性を考慮して選ぶ
+    scored.sort(key=lambda item: item[0], reverse=True)
+
+    ranked = []
+    family_counts = defaultdict(int)
+    while scored and len(ranked) < top_k:
+        best = max(
+            range(len(scored)),
+            key=lambda i: (scored[i][0] - DIVERSITY_PENALTY * family_counts[scored[i][1]], -i)
+        )
+        _, family, suggestion = scored.pop(best)
+        family_counts[family] += 1
+        ranked.append(suggestion)
+
+    ranked.extend(suggestion for _, _, suggestion in scored)
+    return ranked
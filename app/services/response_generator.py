@@ -1,9 +1,18 @@
-from typing import List, Dict, Optional
+import asyncio
+from typing import AsyncIterator, List, Dict, Optional, Set, Tuple
 from app.agents.hotel_info_agent import HotelInfoAgent
 from app.agents.booking_data_agent import BookingDataAgent
 from app.services.api_service import MessageProcessor
+from app.services.hotel_context import hotel_context_registry
+from app.services.language_detection import detect_language, reply_language
+from app.services.deadline import Deadline
+from app.services.feedback import feedback_learner
+from app.services.ranking import rank_suggestions
+from app.services.suggestion import Suggestion, SuggestionSource, SuggestionType
+from app.services.template_engine import ATTRACTIONS_RADIUS, template_engine, template_variables
+from app.config import settings
 from sqlalchemy.orm import Session
-from app.models import Hotel, GuestMessage, ResponseLog
+from app.models import GuestMessage, ResponseLog
 import json
 
 class ResponseGenerator:
@@ -12,207 +21,657 @@ class ResponseGenerator:
         self.booking_data_agent = BookingDataAgent()
         self.message_processor = MessageProcessor()
     
+    # メッセージの話題 -> 取得するコンテキスト情報
+    CONTEXT_SOURCES = {
+        'luggage': 'luggage_info',
+        'availability': 'availability_info',
+        'attractions': 'attractions'
+    }
+    
+    # ソースごとのタイムアウト（秒）。リクエストの予算（budget_ms）の残り時間でさらに切り詰める
+    SOURCE_TIMEOUTS = {
+        'luggage_info': 2.0,
+        'availability_info': 1.0,
+        'attractions': 2.0,
+        'template_ranking': 0.3,
+        'history': 1.0,
+        'ai': 5.0
+    }
+    
+    # 話題ごとの定型の候補（言語 -> 話題 -> (内容, 種類, 信頼度, 根拠)）。テンプレートエンジンでホテルごとに1回だけ描画する
+    # （ホテル単位で共有するため hotel 以外の変数は使わない）
+    CANNED_RESPONSES = {
+        'ja': {
+            'luggage': (
+                ("{{ hotel.name }}では、お荷物の預かりサービスをご利用いただけます。フロントデスクまでお越しください。チェックイン前・チェックアウト後も対応いたします。",
+                 SuggestionType.INFORMATIVE, 0.9, SuggestionSource.HOTEL_SERVICE_INFO),
+                ("お荷物をお預かりいたします。安全に保管いたしますのでご安心ください。預かり時間は24時間対応しております。",
+                 SuggestionType.REASSURING, 0.8, SuggestionSource.STANDARD_RESPONSE),
+                ("承知いたしました。お荷物の預かりは可能です。お部屋の準備ができ次第、お荷物をお部屋までお運びいたします。",
+                 SuggestionType.SERVICE_ORIENTED, 0.7, SuggestionSource.PERSONALIZED_SERVICE),
+            ),
+            'availability': (
+                ("{{ hotel.name }}の空室状況をお調べいたします。ご希望の日程をお教えください。お急ぎの場合はお電話にてお問い合わせください。",
+                 SuggestionType.INQUIRY, 0.9, SuggestionSource.STANDARD_RESPONSE),
+                ("現在の空室状況をご案内いたします。ご希望の期間をお教えいただければ、最適なお部屋をご提案いたします。",
+                 SuggestionType.SERVICE_ORIENTED, 0.8, SuggestionSource.PERSONALIZED_SERVICE),
+                ("空室カレンダーをご確認いたします。お早めのご予約をお勧めいたします。",
+                 SuggestionType.ENCOURAGING, 0.7, SuggestionSource.BOOKING_ENCOURAGEMENT),
+            ),
+            'attractions': (
+                ("{{ hotel.name }}周辺の観光地をご案内いたします。おすすめスポットをご紹介いたしますので、お気軽にお尋ねください。",
+                 SuggestionType.GENERAL, 0.8, SuggestionSource.STANDARD_RESPONSE),
+                ("ホテル周辺の観光情報をお調べいたします。アクセス方法や営業時間もご案内いたします。",
+                 SuggestionType.INFORMATIVE, 0.7, SuggestionSource.INFORMATION_SERVICE),
+                ("地元の隠れた名所もご紹介いたします。フロントデスクで観光マップをお渡しいたします。",
+                 SuggestionType.LOCAL_EXPERT, 0.6, SuggestionSource.LOCAL_KNOWLEDGE),
+            ),
+            'general': (
+                ("{{ hotel.name }}のスタッフがお手伝いいたします。ご質問がございましたら、お気軽にお声かけください。",
+                 SuggestionType.WELCOMING, 0.7, SuggestionSource.GENERAL_RESPONSE),
+                ("ご質問を承りました。詳細をお調べいたしますので、少々お待ちください。",
+                 SuggestionType.ACKNOWLEDGING, 0.6, SuggestionSource.ACKNOWLEDGMENT),
+                ("お客様のご要望にお応えできるよう、最善を尽くします。フロントデスクまでお越しください。",
+                 SuggestionType.SERVICE_ORIENTED, 0.5, SuggestionSource.SERVICE_COMMITMENT),
+            ),
+        },
+        'en': {
+            'luggage': (
+                ("{{ hotel.name }} offers luggage storage. Please drop by the front desk; we can keep your bags before check-in and after check-out.",
+                 SuggestionType.INFORMATIVE, 0.9, SuggestionSource.HOTEL_SERVICE_INFO),
+                ("We will be happy to keep your luggage. It will be stored safely, and storage is available 24 hours a day.",
+                 SuggestionType.REASSURING, 0.8, SuggestionSource.STANDARD_RESPONSE),
+                ("Certainly, we can store your luggage. We will bring it to your room as soon as it is ready.",
+                 SuggestionType.SERVICE_ORIENTED, 0.7, SuggestionSource.PERSONALIZED_SERVICE),
+            ),
+            'availability': (
+                ("We will check availability at {{ hotel.name }}. Could you let us know your preferred dates? For urgent requests, please give us a call.",
+                 SuggestionType.INQUIRY, 0.9, SuggestionSource.STANDARD_RESPONSE),
+                ("We would be glad to check current availability. If you tell us your dates, we will suggest the best room for your stay.",
+                 SuggestionType.SERVICE_ORIENTED, 0.8, SuggestionSource.PERSONALIZED_SERVICE),
+                ("We will check our availability calendar for you. We recommend booking early to secure your room.",
+                 SuggestionType.ENCOURAGING, 0.7, SuggestionSource.BOOKING_ENCOURAGEMENT),
+            ),
+            'attractions': (
+                ("We are happy to recommend places to visit around {{ hotel.name }}. Please feel free to ask us anytime.",
+                 SuggestionType.GENERAL, 0.8, SuggestionSource.STANDARD_RESPONSE),
+                ("We will look up sightseeing information near the hotel, including directions and opening hours.",
+                 SuggestionType.INFORMATIVE, 0.7, SuggestionSource.INFORMATION_SERVICE),
+                ("We can also introduce some hidden local gems. A sightseeing map is available at the front desk.",
+                 SuggestionType.LOCAL_EXPERT, 0.6, SuggestionSource.LOCAL_KNOWLEDGE),
+            ),
+            'general': (
+                ("The staff at {{ hotel.name }} are here to help. Please let us know if you have any questions.",
+                 SuggestionType.WELCOMING, 0.7, SuggestionSource.GENERAL_RESPONSE),
+                ("Thank you for your question. We will look into the details and get back to you shortly.",
+                 SuggestionType.ACKNOWLEDGING, 0.6, SuggestionSource.ACKNOWLEDGMENT),
+                ("We will do our best to accommodate your request. Please feel free to stop by the front desk.",
+                 SuggestionType.SERVICE_ORIENTED, 0.5, SuggestionSource.SERVICE_COMMITMENT),
+            ),
+        },
+    }
+    
+    # コンテキスト情報（周辺のコインロッカー・空室状況・観光地）を埋め込む候補
+    CONTEXT_RESPONSES = {
+        'ja': {
+            'luggage': "ホテルでの預かりに加えて、最寄りのコインロッカーもご利用いただけます。{name}が徒歩圏内にございます。",
+            'availability': "現在、{period}のご予約を受け付けております。{window}のご予約をお勧めいたします。",
+            'attractions': "おすすめの観光地をご紹介いたします。{names}などが徒歩圏内にございます。詳細なアクセス方法をお教えいたします。"
+        },
+        'en': {
+            'luggage': "In addition to storage at the hotel, coin lockers are also available nearby. {name} is within walking distance.",
+            'availability': "Availability for the next 90 days: {period}. We recommend booking {window}.",
+            'attractions': "Here are some recommended spots: {names} are within walking distance. We are happy to explain how to get there."
+        }
+    }
+    
     async def generate_response_suggestions(
         self, 
         message: str, 
         message_type: str, 
         hotel_id: int, 
-        db: Session
-    ) -> List[Dict]:
+        db: Session,
+        budget_ms: Optional[float] = None,
+        booking=None,
+        language: Optional[str] = None
+    ) -> List[Suggestion]:
         """メッセージに基づいて返信候補を生成"""
+        result = await self.generate_suggestions_with_sources(message, message_type, hotel_id, db, budget_ms, booking, language)
+        return result['suggestions']
+    
+    async def generate_suggestions_with_sources(
+        self,
+        message: str,
+        message_type: str,
+        hotel_id: int,
+        db: Session,
+        budget_ms: Optional[float] = None,
+        booking=None,
+        language: Optional[str] = None
+    ) -> Dict:
+        """返信候補と、候補の生成に使われた/間に合わなかったソースを返す"""
+        result = {}
+        async for event, data in self.stream_suggestions(message, message_type, hotel_id, db, budget_ms, booking, language):
+            if event == 'done':
+                result = data
+        return result
+    
+    async def stream_suggestions(
+        self,
+        message: str,
+        message_type: str,
+        hotel_id: int,
+        db: Session,
+        budget_ms: Optional[float] = None,
+        booking=None,
+        language: Optional[str] = None,
+        stream_ai: bool = False
+    ) -> AsyncIterator[Tuple[str, Dict]]:
+        """返信候補をソースが終わった順に返す
+        
+        ('suggestion', {'source': ソース名, 'suggestion': 候補}) を新しい候補ごとに返し、
+        最後に ('done', {'suggestions': 上位3件, 'sources': レポート}) を返す。
+        booking を渡すとテンプレートの予約関連の変数（ゲスト名・チェックイン日など）を埋める。
+        language（省略時はメッセージから判定）の言語のテンプレート・定型の返信を使う。
+        stream_ai=True の場合はAI候補をマイクロバッチにまとめず、LLMのストリーミングで1件できるたびに返す。
+        """
+        deadline = Deadline(budget_ms or settings.SUGGESTION_BUDGET_MS)
+        language = language or detect_language(message)
         
-        # ホテル情報を取得
-        hotel = db.query(Hotel).filter(Hotel.id == hotel_id).first()
+        # ホテル情報・テンプレートを取得（プロセス内のHotelContextを再利用）
+        hotel = hotel_context_registry.get(hotel_id, db)
         if not hotel:
-            return []
+            yield 'done', {'suggestions': [], 'sources': self._source_report([], [], deadline)}
+            return
         
-        # メッセージタイプに応じて適切な情報を取得
-        context_info = await self._get_context_info(message_type, hotel_id, db)
+        # 複数の話題を含むメッセージ（「荷物と観光地は？」など）はすべての話題を対象にする
+        topics = self._detect_topics(message, message_type)
         
-        # 返信候補を生成
-        suggestions = []
+        # テンプレートはメモリ上にあるため予算に関係なく必ず使う
+        # （変数の最寄り駅・観光地がまだ取得されていない場合は、コンテキスト情報が届いてから描画する）
+        pending_context = self._pending_template_context(hotel)
+        template_topics = topics or [message_type]
+        template_language = hotel.template_language(language)
+        template_suggestions = []
+        if not pending_context:
+            variables = template_variables(hotel, booking, language=template_language)
+            template_suggestions = self._template_suggestions(message, template_topics, hotel_id, db, hotel, variables, language)
         
-        if message_type == 'luggage':
-            suggestions = self._generate_luggage_responses(message, context_info, hotel)
-        elif message_type == 'availability':
-            suggestions = self._generate_availability_responses(message, context_info, hotel)
-        elif message_type == 'attractions':
-            suggestions = self._generate_attraction_responses(message, context_info, hotel)
-        else:
-            suggestions = self._generate_general_responses(message, context_info, hotel)
+        # 送信済みの候補（同じ内容は二度送らない）
+        emitted = set()
+        
+        def new_suggestions(source: str, suggestions: List[Suggestion]):
+            for suggestion in suggestions:
+                if suggestion.content not in emitted:
+                    emitted.add(suggestion.content)
+                    yield 'suggestion', {'source': source, 'suggestion': suggestion}
+        
+        # ルールベースとテンプレートの候補はコンテキスト情報を待たずにすぐ返す
+        context_info = {}
+        for event in new_suggestions('rules', self._topic_suggestions(topics, message, context_info, hotel, language)):
+            yield event
+        for event in new_suggestions('templates', template_suggestions):
+            yield event
+        
+        # コンテキスト情報・テンプレートの並べ替え・過去の返信・AI候補を並行して取得
+        results = {}
+        dropped = []
+        sources = self._build_sources(
+            message, message_type, topics, hotel_id, db, hotel, template_suggestions, deadline, language, stream_ai, pending_context
+        )
+        async for name, outcome in self._iter_sources(sources, deadline, dropped):
+            results[name] = outcome
+            if name in self.CONTEXT_SOURCES.values():
+                # コンテキスト情報が届いたらルールベースの候補を作り直す
+                context_info[name] = outcome
+                for event in new_suggestions('rules', self._topic_suggestions(topics, message, context_info, hotel, language)):
+                    yield event
+            else:
+                for event in new_suggestions(name, outcome):
+                    yield event
+            
+            # テンプレートの変数に使うコンテキスト情報が揃ったらテンプレートを描画する
+            if pending_context and pending_context <= set(results) | set(dropped):
+                pending_context = set()
+                variables = template_variables(hotel, booking, context_info, language=template_language)
+                template_suggestions = self._template_suggestions(message, template_topics, hotel_id, db, hotel, variables, language)
+                for event in new_suggestions('templates', template_suggestions):
+                    yield event
+        
+        if pending_context:
+            # 最後のコンテキスト情報が間に合わなかった場合
+            variables = template_variables(hotel, booking, context_info, language=template_language)
+            template_suggestions = self._template_suggestions(message, template_topics, hotel_id, db, hotel, variables, language)
+            for event in new_suggestions('templates', template_suggestions):
+                yield event
+        if template_suggestions and 'template_ranking' not in sources:
+            # コンテキスト情報を待って描画したテンプレートは、ここで過去のデータとの類似度を反映する
+            ranked = await self._rank_templates(message, hotel_id, template_suggestions, deadline, dropped)
+            if ranked is not None:
+                results['template_ranking'] = ranked
+        
+        # 話題ごとのルールベースの候補（コンテキスト情報が間に合わなくても必ず使う）
+        suggestions = self._topic_suggestions(topics, message, context_info, hotel, language)
         
         # 過去のデータから学習した候補も追加
-        historical_suggestions = self.booking_data_agent.generate_response_suggestions(
-            message, message_type, db, hotel_id
+        suggestions.extend(results.get('template_ranking', template_suggestions))
+        for source in ('ai', 'history'):
+            suggestions.extend(results.get(source, []))
+        
+        # 候補を統合し、言い換えを含む重複を除去してランク付け（オペレーターのフィードバックで学習した加点を使う）
+        unique_suggestions = rank_suggestions(suggestions, message, priors=feedback_learner.priors(hotel_id, db))
+        
+        contributed = ['rules'] + (['templates'] if template_suggestions else [])
+        contributed += [name for name in sources if results.get(name)]
+        if 'template_ranking' not in sources and results.get('template_ranking'):
+            contributed.append('template_ranking')
+        
+        yield 'done', {
+            'suggestions': unique_suggestions[:3],
+            'sources': self._source_report(contributed, dropped, deadline)
+        }
+    
+    async def generate_batch_suggestions(
+        self,
+        messages: List[Dict],
+        hotel_id: int,
+        db: Session,
+        budget_ms: Optional[float] = None
+    ) -> List[Dict]:
+        """同じホテルの複数のメッセージの返信候補をまとめて生成
+        
+        messages は {'content', 'message_type', 'language', 'booking'} のリスト。
+        ホテル情報・コンテキスト情報・過去の返信・フィードバックの加点はバッチ全体で1回だけ取得し、
+        テンプレートの類似度はまとめて計算する。AI候補だけはメッセージごとに並行して生成する。
+        messages と同じ順に {'suggestions': 上位3件, 'sources': レポート} を返す。
+        """
+        deadline = Deadline(budget_ms or settings.SUGGESTION_BUDGET_MS)
+        
+        hotel = hotel_context_registry.get(hotel_id, db)
+        if not hotel:
+            return [{'suggestions': [], 'sources': self._source_report([], [], deadline)} for _ in messages]
+        
+        topics = [self._detect_topics(message['content'], message['message_type']) for message in messages]
+        
+        # テンプレートの変数（最寄り駅・観光地）に使うコンテキスト情報がまだ取得されていない場合は、取得してから描画する
+        pending_context = self._pending_template_context(hotel)
+        
+        def render_templates(context_info: Optional[Dict] = None) -> List[List[Suggestion]]:
+            return [
+                self._template_suggestions(
+                    message['content'], message_topics or [message['message_type']], hotel_id, db, hotel,
+                    template_variables(hotel, message['booking'], context_info, language=hotel.template_language(message['language'])),
+                    message['language']
+                )
+                for message, message_topics in zip(messages, topics)
+            ]
+        
+        template_suggestions = [[] for _ in messages] if pending_context else render_templates()
+        
+        # メッセージ間で共有するソース（同じコンテキスト情報・同じ種類の過去の返信は1回だけ取得）
+        sources = {}
+        shared_context = {self.CONTEXT_SOURCES[topic] for message_topics in topics for topic in message_topics} | pending_context
+        for key in sorted(shared_context):
+            sources[key] = asyncio.to_thread(self._fetch_context, key, hotel_id, db, hotel, deadline)
+        if any(template_suggestions):
+            sources['template_ranking'] = self.booking_data_agent.rank_by_template_similarity_batch(
+                [message['content'] for message in messages], hotel_id, template_suggestions
+            )
+        sources['history'] = asyncio.to_thread(
+            self._batch_historical_responses, {message['message_type'] for message in messages}, hotel_id, db, deadline
         )
         
-        # 候補を統合し、重複を除去
-        all_suggestions = suggestions + historical_suggestions
-        unique_suggestions = self._deduplicate_and_rank(all_suggestions)
+        # AI候補はメッセージごとにタイムアウトを持たせて並行して生成（1件が遅れても他のメッセージの候補は使う）
+        ai_task = asyncio.ensure_future(self._batch_ai_suggestions(messages, hotel_id, db, hotel, deadline))
+        results = {}
+        dropped = []
+        try:
+            async for name, outcome in self._iter_sources(sources, deadline, dropped):
+                results[name] = outcome
+            ai_suggestions = await ai_task
+        finally:
+            ai_task.cancel()
+        
+        priors = feedback_learner.priors(hotel_id, db)
+        context_info = {key: results[key] for key in self.CONTEXT_SOURCES.values() if key in results}
+        if pending_context:
+            # コンテキスト情報を待って描画したテンプレートは、ここで過去のデータとの類似度を反映する
+            template_suggestions = render_templates(context_info)
+            if any(template_suggestions):
+                ranked = await self._rank_templates_batch(messages, hotel_id, template_suggestions, deadline, dropped)
+                if ranked is not None:
+                    results['template_ranking'] = ranked
+        ranked_templates = results.get('template_ranking', template_suggestions)
+        historical_responses = results.get('history', {})
         
-        return unique_suggestions[:3]
+        batch = []
+        for i, message in enumerate(messages):
+            content, language = message['content'], message['language']
+            suggestions = self._topic_suggestions(topics[i], content, context_info, hotel, language)
+            suggestions.extend(ranked_templates[i])
+            suggestions.extend(ai_suggestions[i] or [])
+            historical = self.booking_data_agent.historical_suggestions_from_responses(
+                historical_responses.get(message['message_type'], []), language
+            )
+            suggestions.extend(historical)
+            
+            # このメッセージで使ったソースだけをレポートする
+            context_keys = [self.CONTEXT_SOURCES[topic] for topic in topics[i]]
+            contributed = ['rules'] + (['templates'] if template_suggestions[i] else [])
+            contributed += [key for key in context_keys if context_info.get(key)]
+            if template_suggestions[i] and 'template_ranking' in results:
+                contributed.append('template_ranking')
+            if ai_suggestions[i]:
+                contributed.append('ai')
+            if historical:
+                contributed.append('history')
+            message_dropped = [
+                name for name in dropped
+                if name in context_keys or name == 'history' or (name == 'template_ranking' and template_suggestions[i])
+            ]
+            if ai_suggestions[i] is None:
+                message_dropped.append('ai')
+            
+            batch.append({
+                'suggestions': rank_suggestions(suggestions, content, priors=priors)[:3],
+                'sources': self._source_report(contributed, message_dropped, deadline)
+            })
+        
+        return batch
     
-    async def _get_context_info(self, message_type: str, hotel_id: int, db: Session) -> Dict:
-        """メッセージタイプに応じたコンテキスト情報を取得"""
-        context = {}
+    async def _batch_ai_suggestions(self, messages: List[Dict], hotel_id: int, db: Session, hotel, deadline: Deadline) -> List[Optional[List[Suggestion]]]:
+        """メッセージごとのAI候補を並行して生成（間に合わなかった・エラーになったメッセージは None）"""
+        async def generate(message: Dict):
+            try:
+                return await asyncio.wait_for(
+                    self.booking_data_agent.generate_ai_suggestions(
+                        message['content'], message['message_type'], db, hotel_id, context=hotel, language=message['language']
+                    ),
+                    deadline.clamp(self.SOURCE_TIMEOUTS['ai'])
+                )
+            except asyncio.TimeoutError:
+                return None
+            except Exception as e:
+                print(f"返信候補ソースでエラーが発生しました (ai): {str(e)}")
+                return None
         
-        if message_type == 'luggage':
-            context['luggage_info'] = self.hotel_info_agent.get_luggage_storage_info(hotel_id, db)
-        elif message_type == 'availability':
-            context['availability_info'] = self.hotel_info_agent.get_booking_availability(hotel_id, db)
-        elif message_type == 'attractions':
-            context['attractions'] = self.hotel_info_agent.get_nearby_attractions(hotel_id, db)
+        return await asyncio.gather(*(generate(message) for message in messages))
+    
+    def _batch_historical_responses(self, message_types: set, hotel_id: int, db: Session, deadline: Deadline) -> Dict[str, List[Tuple[int, str]]]:
+        """メッセージの種類ごとの過去の返信（スレッドで実行するため専用のセッションを使う）"""
+        responses = {}
+        with Session(bind=db.get_bind()) as thread_db:
+            for message_type in message_types:
+                if deadline.expired():
+                    break
+                try:
+                    responses[message_type] = self.booking_data_agent.get_historical_responses(message_type, thread_db, hotel_id)
+                except Exception as e:
+                    print(f"過去の返信取得エラー: {str(e)}")
+        return responses
+    
+    def _topic_suggestions(self, topics: List[str], message: str, context_info: Dict, hotel, language: str = 'ja') -> List[Suggestion]:
+        """話題ごとのルールベースの候補"""
+        suggestions = []
+        for topic in topics or ['general']:
+            suggestions.extend(self._generate_topic_responses(topic, message, context_info, hotel, reply_language(language)))
+        return suggestions
+    
+    def _source_report(self, contributed: List[str], dropped: List[str], deadline: Deadline) -> Dict:
+        """どのソースが候補に使われたかのレポート"""
+        return {
+            'contributed': contributed,
+            'dropped': dropped,
+            'budget_ms': deadline.budget_ms,
+            'elapsed_ms': round(deadline.elapsed_ms(), 1)
+        }
+    
+    def _detect_topics(self, message: str, message_type: str) -> List[str]:
+        """分類結果とメッセージ中のキーワードから話題の一覧を作る"""
+        topics = [message_type] if message_type in self.CONTEXT_SOURCES else []
+        for topic in self.message_processor.detect_topics(message):
+            if topic not in topics:
+                topics.append(topic)
+        return topics
+    
+    def _build_sources(
+        self,
+        message: str,
+        message_type: str,
+        topics: List[str],
+        hotel_id: int,
+        db: Session,
+        hotel,
+        template_suggestions: List[Suggestion],
+        deadline: Deadline,
+        language: str = 'ja',
+        stream_ai: bool = False,
+        template_context: Optional[Set[str]] = None
+    ) -> Dict:
+        """並行して実行する候補ソースのコルーチン（stream_ai=True の場合のAI候補は非同期イテレータ）を作る
+        
+        template_context はテンプレートの変数に使うため、話題に関係なく取得するコンテキスト情報。
+        """
+        sources = {}
+        
+        # 外部API（Google Maps）を使う可能性があるためスレッドで実行
+        keys = [self.CONTEXT_SOURCES[topic] for topic in topics]
+        keys += sorted(set(template_context or ()) - set(keys))
+        for key in keys:
+            sources[key] = asyncio.to_thread(self._fetch_context, key, hotel_id, db, hotel, deadline)
+        
+        if template_suggestions:
+            sources['template_ranking'] = self.booking_data_agent.rank_by_template_similarity(
+                message, hotel_id, template_suggestions
+            )
+        if stream_ai:
+            sources['ai'] = self.booking_data_agent.stream_ai_suggestions(message, message_type, db, hotel_id, context=hotel, language=language)
+        else:
+            sources['ai'] = self.booking_data_agent.generate_ai_suggestions(message, message_type, db, hotel_id, context=hotel, language=language)
+        sources['history'] = asyncio.to_thread(self._historical_suggestions, message, message_type, hotel_id, db, deadline, language)
+        
+        return sources
+    
+    async def _iter_sources(self, sources: Dict, deadline: Deadline, dropped: List[str]) -> AsyncIterator[Tuple[str, object]]:
+        """各ソースをタイムアウト付きで並行実行し、終わった順に (ソース名, 結果) を返す
+        
+        非同期イテレータのソース（ストリーミングのAI候補）は候補が1件届くたびに (ソース名, [候補]) を返し、
+        終わった時点（タイムアウト時はそれまでに届いた分）で (ソース名, 全候補) を返す。
+        間に合わなかった・エラーになったソースは dropped に追加する。
+        """
+        queue = asyncio.Queue()
+        
+        async def consume(name: str, partials: List):
+            async for item in sources[name]:
+                partials.append(item)
+                queue.put_nowait((name, [item], False))
+            return partials
+        
+        async def run(name: str):
+            partials = []
+            source = consume(name, partials) if hasattr(sources[name], '__aiter__') else sources[name]
+            try:
+                outcome = await asyncio.wait_for(source, deadline.clamp(self.SOURCE_TIMEOUTS[name]))
+            except asyncio.TimeoutError:
+                outcome = partials or None
+            except Exception as e:
+                print(f"返信候補ソースでエラーが発生しました ({name}): {str(e)}")
+                outcome = partials or None
+            queue.put_nowait((name, outcome, True))
+        
+        tasks = [asyncio.ensure_future(run(name)) for name in sources]
+        try:
+            remaining = len(tasks)
+            while remaining:
+                name, outcome, finished = await queue.get()
+                if finished:
+                    remaining -= 1
+                    if outcome is None:
+                        dropped.append(name)
+                        continue
+                yield name, outcome
+        finally:
+            # ストリーミングの途中で切断された場合は残りのソースを止める
+            for task in tasks:
+                task.cancel()
+    
+    def _pending_template_context(self, hotel) -> Set[str]:
+        """テンプレートの変数に使うコンテキスト情報のうち、HotelContext にまだ取得されていないもの"""
+        pending = set()
+        for key in getattr(hotel, 'template_context_sources', ()):
+            cached = hotel.luggage_info if key == 'luggage_info' else hotel.attractions.get(ATTRACTIONS_RADIUS)
+            if cached is None:
+                pending.add(key)
+        return pending
+    
+    async def _rank_templates_batch(self, messages: List[Dict], hotel_id: int, template_suggestions: List[List[Suggestion]], deadline: Deadline, dropped: List[str]) -> Optional[List[List[Suggestion]]]:
+        """メッセージごとのテンプレート候補に類似度をまとめて反映（間に合わなかった・エラーの場合は None）"""
+        return await self._rank_with_timeout(
+            self.booking_data_agent.rank_by_template_similarity_batch(
+                [message['content'] for message in messages], hotel_id, template_suggestions
+            ),
+            deadline,
+            dropped
+        )
+    
+    async def _rank_templates(self, message: str, hotel_id: int, template_suggestions: List[Suggestion], deadline: Deadline, dropped: List[str]) -> Optional[List[Suggestion]]:
+        """テンプレート候補に過去のデータとの類似度を反映（間に合わなかった・エラーの場合は None）"""
+        return await self._rank_with_timeout(
+            self.booking_data_agent.rank_by_template_similarity(message, hotel_id, template_suggestions),
+            deadline,
+            dropped
+        )
+    
+    async def _rank_with_timeout(self, ranking, deadline: Deadline, dropped: List[str]):
+        """template_ranking をソースと同じタイムアウトで待つ（間に合わなかった場合は dropped に追加して None）"""
+        try:
+            return await asyncio.wait_for(ranking, deadline.clamp(self.SOURCE_TIMEOUTS['template_ranking']))
+        except asyncio.TimeoutError:
+            pass
+        except Exception as e:
+            print(f"返信候補ソースでエラーが発生しました (template_ranking): {str(e)}")
+        dropped.append('template_ranking')
+        return None
+    
+    def _fetch_context(self, key: str, hotel_id: int, db: Session, hotel, deadline: Deadline) -> Dict:
+        """コンテキスト情報を1件取得（スレッドで実行するため専用のセッションを使う）
         
-        return context
+        通常は HotelContext を使うためDBには問い合わせない（セッションは使わなければ接続を取得しない）。
+        """
+        with Session(bind=db.get_bind()) as thread_db:
+            if key == 'luggage_info':
+                return self.hotel_info_agent.get_luggage_storage_info(hotel_id, thread_db, context=hotel, deadline=deadline)
+            if key == 'availability_info':
+                return self.hotel_info_agent.get_booking_availability(hotel_id, thread_db, context=hotel)
+            return self.hotel_info_agent.get_nearby_attractions(hotel_id, thread_db, context=hotel, deadline=deadline)
+    
+    def _template_suggestions(self, message: str, topics: List[str], hotel_id: int, db: Session, hotel, variables: Optional[Dict] = None, language: str = 'ja') -> List[Suggestion]:
+        """テンプレート候補（HotelContextから取得するためDBには問い合わせない）"""
+        suggestions = []
+        for topic in topics:
+            suggestions.extend(
+                self.booking_data_agent._get_template_suggestions(message, topic, db, hotel_id, hotel, variables, language)
+            )
+        return suggestions
+    
+    def _historical_suggestions(self, message: str, message_type: str, hotel_id: int, db: Session, deadline: Deadline, language: Optional[str] = None) -> List[Suggestion]:
+        """過去の返信からの候補（スレッドで実行するため専用のセッションを使う）"""
+        with Session(bind=db.get_bind()) as thread_db:
+            return self.booking_data_agent._get_historical_suggestions(message, message_type, thread_db, hotel_id, deadline, language)
+    
+    def _generate_topic_responses(self, topic: str, message: str, context_info: Dict, hotel, language: str = 'ja') -> List[Suggestion]:
+        """話題に応じたルールベースの候補を生成"""
+        if topic == 'luggage':
+            return self._generate_luggage_responses(message, context_info, hotel, language)
+        elif topic == 'availability':
+            return self._generate_availability_responses(message, context_info, hotel, language)
+        elif topic == 'attractions':
+            return self._generate_attraction_responses(message, context_info, hotel, language)
+        return self._generate_general_responses(message, context_info, hotel, language)
     
-    def _generate_luggage_responses(self, message: str, context_info: Dict, hotel) -> List[Dict]:
+    def _canned_suggestions(self, hotel, language: str = 'ja') -> Dict[str, Tuple[Suggestion, ...]]:
+        """ホテル名を埋め込んだ定型の候補（HotelContextごとに言語ごとに1回だけ作る）"""
+        cache = getattr(hotel, 'canned_suggestions', None)
+        canned = cache.get(language) if cache is not None else None
+        if canned is None:
+            variables = template_variables(hotel, language=language)
+            canned = {
+                topic: tuple(
+                    Suggestion(
+                        template_engine.render(('canned', language, topic, index), content, variables),
+                        suggestion_type,
+                        confidence,
+                        source
+                    )
+                    for index, (content, suggestion_type, confidence, source) in enumerate(responses)
+                )
+                for topic, responses in self.CANNED_RESPONSES[language].items()
+            }
+            if cache is not None:
+                cache[language] = canned
+        return canned
+    
+    def _generate_luggage_responses(self, message: str, context_info: Dict, hotel, language: str = 'ja') -> List[Suggestion]:
         """荷物預かりに関する返信候補を生成"""
         luggage_info = context_info.get('luggage_info', {})
         
-        suggestions = [
-            {
-                'content': f"{hotel.name}では、お荷物の預かりサービスをご利用いただけます。フロントデスクまでお越しください。チェックイン前・チェックアウト後も対応いたします。",
-                'type': 'informative',
-                'confidence': 0.9,
-                'source': 'Hotel Service Info'
-            },
-            {
-                'content': "お荷物をお預かりいたします。安全に保管いたしますのでご安心ください。預かり時間は24時間対応しております。",
-                'type': 'reassuring',
-                'confidence': 0.8,
-                'source': 'Standard Response'
-            },
-            {
-                'content': "承知いたしました。お荷物の預かりは可能です。お部屋の準備ができ次第、お荷物をお部屋までお運びいたします。",
-                'type': 'service_oriented',
-                'confidence': 0.7,
-                'source': 'Personalized Service'
-            }
-        ]
+        suggestions = list(self._canned_suggestions(hotel, language)['luggage'])
         
         # 周辺のコインロッカー情報がある場合は追加
         if luggage_info.get('storage_options'):
-            suggestions.append({
-                'content': f"ホテルでの預かりに加えて、最寄りのコインロッカーもご利用いただけます。{luggage_info['storage_options'][0]['name']}が徒歩圏内にございます。",
-                'type': 'comprehensive',
-                'confidence': 0.6,
-                'source': 'Nearby Options'
-            })
+            suggestions.append(Suggestion(
+                self.CONTEXT_RESPONSES[language]['luggage'].format(name=luggage_info['storage_options'][0]['name']),
+                SuggestionType.COMPREHENSIVE,
+                0.6,
+                SuggestionSource.NEARBY_OPTIONS
+            ))
         
         return suggestions
     
-    def _generate_availability_responses(self, message: str, context_info: Dict, hotel) -> List[Dict]:
+    def _generate_availability_responses(self, message: str, context_info: Dict, hotel, language: str = 'ja') -> List[Suggestion]:
         """予約可能期間に関する返信候補を生成"""
         availability_info = context_info.get('availability_info', {})
         
-        suggestions = [
-            {
-                'content': f"{hotel.name}の空室状況をお調べいたします。ご希望の日程をお教えください。お急ぎの場合はお電話にてお問い合わせください。",
-                'type': 'inquiry',
-                'confidence': 0.9,
-                'source': 'Standard Response'
-            },
-            {
-                'content': "現在の空室状況をご案内いたします。ご希望の期間をお教えいただければ、最適なお部屋をご提案いたします。",
-                'type': 'service_oriented',
-                'confidence': 0.8,
-                'source': 'Personalized Service'
-            },
-            {
-                'content': "空室カレンダーをご確認いたします。お早めのご予約をお勧めいたします。",
-                'type': 'encouraging',
-                'confidence': 0.7,
-                'source': 'Booking Encouragement'
-            }
-        ]
+        suggestions = list(self._canned_suggestions(hotel, language)['availability'])
         
         # 利用可能な情報がある場合は追加
         if availability_info.get('availability'):
-            suggestions.append({
-                'content': f"現在、{availability_info['availability'].get('next_90_days', '通常期間')}のご予約を受け付けております。{availability_info.get('recommended_booking_window', '30日前')}のご予約をお勧めいたします。",
-                'type': 'detailed',
-                'confidence': 0.8,
-                'source': 'Availability Data'
-            })
+            default_period, default_window = ('通常期間', '30日前') if language == 'ja' else ('open', '30 days in advance')
+            suggestions.append(Suggestion(
+                self.CONTEXT_RESPONSES[language]['availability'].format(
+                    period=availability_info['availability'].get('next_90_days', default_period),
+                    window=availability_info.get('recommended_booking_window', default_window)
+                ),
+                SuggestionType.DETAILED,
+                0.8,
+                SuggestionSource.AVAILABILITY_DATA
+            ))
         
         return suggestions
     
-    def _generate_attraction_responses(self, message: str, context_info: Dict, hotel) -> List[Dict]:
+    def _generate_attraction_responses(self, message: str, context_info: Dict, hotel, language: str = 'ja') -> List[Suggestion]:
         """観光地に関する返信候補を生成"""
         attractions = context_info.get('attractions', [])
         
-        suggestions = [
-            {
-                'content': f"{hotel.name}周辺の観光地をご案内いたします。おすすめスポットをご紹介いたしますので、お気軽にお尋ねください。",
-                'type': 'general',
-                'confidence': 0.8,
-                'source': 'Standard Response'
-            },
-            {
-                'content': "ホテル周辺の観光情報をお調べいたします。アクセス方法や営業時間もご案内いたします。",
-                'type': 'informative',
-                'confidence': 0.7,
-                'source': 'Information Service'
-            },
-            {
-                'content': "地元の隠れた名所もご紹介いたします。フロントデスクで観光マップをお渡しいたします。",
-                'type': 'local_expert',
-                'confidence': 0.6,
-                'source': 'Local Knowledge'
-            }
-        ]
+        suggestions = list(self._canned_suggestions(hotel, language)['attractions'])
         
         # 具体的な観光地がある場合は追加
         if attractions:
             top_attractions = attractions[:3]
             attraction_names = [attr['name'] for attr in top_attractions]
             
-            suggestions.append({
-                'content': f"おすすめの観光地をご紹介いたします。{', '.join(attraction_names)}などが徒歩圏内にございます。詳細なアクセス方法をお教えいたします。",
-                'type': 'specific',
-                'confidence': 0.9,
-                'source': 'Nearby Attractions'
-            })
+            suggestions.append(Suggestion(
+                self.CONTEXT_RESPONSES[language]['attractions'].format(names=', '.join(attraction_names)),
+                SuggestionType.SPECIFIC,
+                0.9,
+                SuggestionSource.NEARBY_ATTRACTIONS
+            ))
         
         return suggestions
     
-    def _generate_general_responses(self, message: str, context_info: Dict, hotel) -> List[Dict]:
+    def _generate_general_responses(self, message: str, context_info: Dict, hotel, language: str = 'ja') -> List[Suggestion]:
         """一般的な返信候補を生成"""
-        return [
-            {
-                'content': f"{hotel.name}のスタッフがお手伝いいたします。ご質問がございましたら、お気軽にお声かけください。",
-                'type': 'welcoming',
-                'confidence': 0.7,
-                'source': 'General Response'
-            },
-            {
-                'content': "ご質問を承りました。詳細をお調べいたしますので、少々お待ちください。",
-                'type': 'acknowledging',
-                'confidence': 0.6,
-                'source': 'Acknowledgment'
-            },
-            {
-                'content': "お客様のご要望にお応えできるよう、最善を尽くします。フロントデスクまでお越しください。",
-                'type': 'service_oriented',
-                'confidence': 0.5,
-                'source': 'Service Commitment'
-            }
-        ]
-    
-    def _deduplicate_and_rank(self, suggestions: List[Dict]) -> List[Dict]:
-        """候補の重複を除去し、信頼度でランク付け"""
-        seen = set()
-        unique_suggestions = []
-        
-        for suggestion in suggestions:
-            content = suggestion['content']
-            if content not in seen:
-                seen.add(content)
-                unique_suggestions.append(suggestion)
-        
-        # 信頼度でソート
-        unique_suggestions.sort(key=lambda x: x['confidence'], reverse=True)
-        return unique_suggestions
+        return list(self._canned_suggestions(hotel, language)['general'])
     
     async def send_response(
         self, 
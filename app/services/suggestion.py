@@ -0,0 +1,63 @@
+from dataclasses import dataclass, replace
+from enum import Enum
+from typing import Dict, Iterable, List, Union
+
+class SuggestionType(str, Enum):
+    """返信候補の種類"""
+    TEMPLATE = 'template'
+    AI_GENERATED = 'ai_generated'
+    HISTORICAL = 'historical'
+    INFORMATIVE = 'informative'
+    REASSURING = 'reassuring'
+    SERVICE_ORIENTED = 'service_oriented'
+    COMPREHENSIVE = 'comprehensive'
+    INQUIRY = 'inquiry'
+    ENCOURAGING = 'encouraging'
+    DETAILED = 'detailed'
+    GENERAL = 'general'
+    LOCAL_EXPERT = 'local_expert'
+    SPECIFIC = 'specific'
+    WELCOMING = 'welcoming'
+    ACKNOWLEDGING = 'acknowledging'
+
+class SuggestionSource(str, Enum):
+    """ルールベースの候補の根拠（テンプレート・AI・過去の返信は ID 付きの文字列を使う）"""
+    HOTEL_SERVICE_INFO = 'Hotel Service Info'
+    STANDARD_RESPONSE = 'Standard Response'
+    PERSONALIZED_SERVICE = 'Personalized Service'
+    NEARBY_OPTIONS = 'Nearby Options'
+    BOOKING_ENCOURAGEMENT = 'Booking Encouragement'
+    AVAILABILITY_DATA = 'Availability Data'
+    INFORMATION_SERVICE = 'Information Service'
+    LOCAL_KNOWLEDGE = 'Local Knowledge'
+    NEARBY_ATTRACTIONS = 'Nearby Attractions'
+    GENERAL_RESPONSE = 'General Response'
+    ACKNOWLEDGMENT = 'Acknowledgment'
+    SERVICE_COMMITMENT = 'Service Commitment'
+
+@dataclass(frozen=True, slots=True)
+class Suggestion:
+    """返信候補
+
+    変更不可のため、ホテルごとに作った定型の候補をリクエスト間で共有できる。
+    信頼度を変える場合は with_confidence で新しい候補を作る。
+    """
+    content: str
+    type: SuggestionType
+    confidence: float
+    source: Union[SuggestionSource, str]
+
+    def with_confidence(self, confidence: float) -> 'Suggestion':
+        return replace(self, confidence=confidence)
+
+    def to_dict(self) -> Dict:
+        """APIレスポンス用の辞書（content / type / confidence / source）"""
+        return {
+            'content': self.content,
+            'type': self.type.value,
+            'confidence': self.confidence,
+            'source': self.source.value if isinstance(self.source, SuggestionSource) else self.source
+        }
+
+def serialize_suggestions(suggestions: Iterable[Suggestion]) -> List[Dict]:
+    return [suggestion.to_dict() for suggestion in suggestions]
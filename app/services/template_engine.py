@@ -0,0 +1,172 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, List, Optional, Set
+
+# 日付の表記（テンプレートの言語 -> 書式）。用意していない言語は ISO 8601（2025-01-05）
+_MONTH_NAMES = ('January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September', 'October', 'November', 'December')
+DATE_FORMATS = {
+    'ja': lambda value: f"{value.year}年{value.month}月{value.day}日",
+    'zh': lambda value: f"{value.year}年{value.month}月{value.day}日",
+    'ko': lambda value: f"{value.year}년 {value.month}월 {value.day}일",
+    'en': lambda value: f"{_MONTH_NAMES[value.month - 1]} {value.day}, {value.year}",
+    'fr': lambda value: f"{value.day:02d}/{value.month:02d}/{value.year}",
+    'es': lambda value: f"{value.day:02d}/{value.month:02d}/{value.year}",
+    'de': lambda value: f"{value.day:02d}.{value.month:02d}.{value.year}"
+}
+
+# 周辺情報の変数 -> 値を取り出すコンテキスト情報（ResponseGenerator の CONTEXT_SOURCES の値）
+CONTEXT_VARIABLES = {
+    'nearest_station': 'luggage_info',
+    'top_attractions': 'attractions'
+}
+
+# top_attractions に使う観光地の検索半径（m。HotelInfoAgent.get_nearby_attractions の既定値）
+ATTRACTIONS_RADIUS = 2000
+
+class TemplateEngine:
+    """返信テンプレートの描画エンジン（Jinja2 サンドボックス）
+
+    テンプレートは (template_id, updated_at) などのキーごとに1回だけコンパイルしてキャッシュする。
+    変数を含まないテンプレートはコンパイルせずにそのまま返す。
+
+    使用できる変数: guest_name, check_in, check_out, nearest_station, top_attractions, hotel
+    例: "{{ guest_name|default('お客様', true) }}様、{{ hotel.name }}へようこそ。"
+    """
+
+    def __init__(self, cache_size: int = 1024):
+        self.cache_size = cache_size
+        self._environment = None
+        self._compiled = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def environment(self):
+        """Jinja2 の環境（初回利用時に生成）"""
+        if self._environment is None:
+            from jinja2 import ChainableUndefined
+            from jinja2.sandbox import SandboxedEnvironment
+
+            # 返信はプレーンテキストのためHTMLエスケープしない。未定義の変数は空文字になる
+            self._environment = SandboxedEnvironment(autoescape=False, undefined=ChainableUndefined)
+        return self._environment
+
+    @staticmethod
+    def is_static(source: str) -> bool:
+        """変数・制御構文を含まないテンプレートか"""
+        return '{{' not in source and '{%' not in source
+
+    def context_sources(self, source: str) -> Set[str]:
+        """テンプレートが周辺情報の変数で使うコンテキスト情報（luggage_info / attractions）"""
+        if self.is_static(source):
+            return set()
+
+        from jinja2 import meta
+
+        try:
+            names = meta.find_undeclared_variables(self.environment.parse(source))
+        except Exception:
+            # 構文エラーのテンプレートは描画されない
+            return set()
+        return {CONTEXT_VARIABLES[name] for name in names if name in CONTEXT_VARIABLES}
+
+    def compile(self, key: Hashable, source: str):
+        """テンプレートをコンパイル（キャッシュ済みならそれを返す）。構文エラーの場合は None"""
+        compiled = self._compiled.get(key)
+        if compiled is not None:
+            return compiled or None
+
+        try:
+            compiled = self.environment.from_string(source)
+        except Exception as e:
+            # 構文エラーも記録しておき、同じテンプレートを何度もコンパイルしない
+            print(f"テンプレートのコンパイルエラー ({key}): {str(e)}")
+            compiled = False
+
+        with self._lock:
+            self._compiled[key] = compiled
+            while len(self._compiled) > self.cache_size:
+                self._compiled.popitem(last=False)
+        return compiled or None
+
+    def render(self, key: Hashable, source: str, variables: Dict) -> Optional[str]:
+        """テンプレートを描画。描画できない場合は None"""
+        if self.is_static(source):
+            return source
+
+        compiled = self.compile(key, source)
+        if compiled is None:
+            return None
+
+        try:
+            return compiled.render(variables).strip()
+        except Exception as e:
+            print(f"テンプレートの描画エラー ({key}): {str(e)}")
+            return None
+
+    def render_many(self, key: Hashable, source: str, variable_sets: Iterable[Dict]) -> List[Optional[str]]:
+        """同じテンプレートを複数のゲスト向けにまとめて描画"""
+        if self.is_static(source):
+            return [source for _ in variable_sets]
+
+        compiled = self.compile(key, source)
+        if compiled is None:
+            return [None for _ in variable_sets]
+
+        rendered = []
+        for variables in variable_sets:
+            try:
+                rendered.append(compiled.render(variables).strip())
+            except Exception as e:
+                print(f"テンプレートの描画エラー ({key}): {str(e)}")
+                rendered.append(None)
+        return rendered
+
+    def clear(self):
+        with self._lock:
+            self._compiled.clear()
+
+template_engine = TemplateEngine()
+
+def template_variables(hotel, booking=None, context_info: Optional[Dict] = None, language: Optional[str] = None) -> Dict:
+    """テンプレートに渡す変数を作る
+
+    hotel は HotelContext（または Hotel）、booking は Booking（なければ予約関連の変数は空）。
+    周辺情報は context_info（取得済みのコンテキスト情報）か HotelContext のキャッシュを使う。
+    チェックイン日などの日付は language（テンプレートの言語。省略時は日本語）の表記にする。
+    """
+    context_info = context_info or {}
+
+    attractions = context_info.get('attractions')
+    if attractions is None:
+        attractions = (getattr(hotel, 'attractions', None) or {}).get(ATTRACTIONS_RADIUS, [])
+
+    luggage_info = context_info.get('luggage_info') or getattr(hotel, 'luggage_info', None) or {}
+
+    return {
+        'hotel': {
+            'name': hotel.name,
+            'address': hotel.address,
+            'city': hotel.city,
+            'country': hotel.country
+        },
+        'guest_name': getattr(booking, 'guest_name', None) or '',
+        'check_in': _format_date(getattr(booking, 'check_in', None), language),
+        'check_out': _format_date(getattr(booking, 'check_out', None), language),
+        'nearest_station': _nearest_station(luggage_info),
+        'top_attractions': [attraction['name'] for attraction in attractions[:3]]
+    }
+
+def _format_date(value, language: Optional[str] = None) -> str:
+    if not value:
+        return ''
+    formatter = DATE_FORMATS.get(language or 'ja')
+    return formatter(value) if formatter else value.strftime('%Y-%m-%d')
+
+def _nearest_station(luggage_info: Dict) -> str:
+    """荷物預かり情報（駅のコインロッカーなど）から最寄り駅名を推定"""
+    options = sorted(luggage_info.get('storage_options', []), key=lambda option: option.get('distance_km', float('inf')))
+    for option in options:
+        for text in (option.get('address', ''), option.get('name', '')):
+            if '駅' in text:
+                return text[:text.index('駅') + 1]
+    return ''
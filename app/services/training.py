@@ -0,0 +1,67 @@
+import json
+import os
+import pickle
+from datetime import datetime
+from typing import Dict, Optional
+
+from app.config import settings
+from app.services.invalidation import invalidation_markers
+
+def model_path(hotel_id: int) -> str:
+    return os.path.join(settings.MODEL_DIR, f"hotel_{hotel_id}.pkl")
+
+def _metadata_path(hotel_id: int) -> str:
+    return os.path.join(settings.MODEL_DIR, f"hotel_{hotel_id}.json")
+
+def train_hotel_model(hotel_id: int) -> Dict:
+    """ホテルの過去データからTF-IDFモデルを学習して保存（ワーカープロセスで実行）"""
+    from app.agents.booking_data_agent import BookingDataAgent
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        agent = BookingDataAgent()
+        learning_result = agent.learn_from_historical_data(db, hotel_id)
+    finally:
+        db.close()
+
+    learning_result['trained_at'] = datetime.now().isoformat()
+
+    os.makedirs(settings.MODEL_DIR, exist_ok=True)
+    model = {
+        'vectorizer': agent.vectorizer if agent.template_vectors is not None else None,
+        'template_vectors': agent.template_vectors,
+        'templates': agent.templates,
+        'template_ids': agent.template_ids,
+        'learning_result': learning_result
+    }
+
+    # 書き込み途中のファイルを読まれないように一時ファイル経由で置き換える
+    tmp_path = f"{model_path(hotel_id)}.tmp"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(model, f)
+    os.replace(tmp_path, model_path(hotel_id))
+
+    with open(_metadata_path(hotel_id), 'w', encoding='utf-8') as f:
+        json.dump(learning_result, f, ensure_ascii=False)
+
+    # 全ワーカーの分析データのキャッシュ（学習結果を含む）を破棄する
+    invalidation_markers.touch('analytics', hotel_id)
+
+    return learning_result
+
+def load_training_result(hotel_id: int) -> Dict:
+    """最後の学習結果（メタデータのみ）を取得"""
+    try:
+        with open(_metadata_path(hotel_id), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def load_hotel_model(hotel_id: int) -> Optional[Dict]:
+    """保存済みの学習モデルを読み込む"""
+    try:
+        with open(model_path(hotel_id), 'rb') as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
@@ -0,0 +1,97 @@
+"""
+エージェント・メッセージ分類・返信候補生成のマイクロベンチマーク
+
+    python -m pytest benchmarks/bench_agents.py
+"""
+
+import pytest
+
+from generate_dataset import MESSAGE_TYPES, MESSAGES
+
+# 日本語・英語の問い合わせ（本文, 種類）
+GUEST_MESSAGES = [
+    (text, message_type)
+    for language in ("ja", "en")
+    for message_type, texts in zip(MESSAGE_TYPES, MESSAGES[language])
+    for text in texts
+]
+
+# 返信候補の生成に使う問い合わせ（複数の話題を含むものを含む）
+SUGGESTION_MESSAGES = {
+    "ja_luggage": ("チェックイン前に荷物を預かってもらえますか？", "luggage"),
+    "en_availability": ("Do you have a room available next weekend?", "availability"),
+    "ja_multi_topic": ("チェックアウト後に荷物を預けて、近くのおすすめの観光地を回りたいです。", "luggage"),
+    "ja_general": ("領収書を発行していただけますか？", "general")
+}
+
+@pytest.fixture(scope="session")
+def trained_classifier(app_dataset):
+    """データセットのラベル付きメッセージで学習した分類モデル"""
+    from app.services.message_classifier import train_message_classifier
+
+    return train_message_classifier()
+
+@pytest.fixture(params=["keywords", "model"])
+def message_processor(request, monkeypatch):
+    """キーワード分類（分類モデルなし）/ 学習済みの分類モデル"""
+    from app.services.api_service import MessageProcessor
+    from app.services.message_classifier import message_classifier
+
+    if request.param == "model":
+        request.getfixturevalue("trained_classifier")
+    else:
+        monkeypatch.setattr(message_classifier, "_path", "/nonexistent/message_classifier.npz")
+    return MessageProcessor()
+
+def test_categorize_message(benchmark, message_processor):
+    """1件ずつの分類（GUEST_MESSAGES 全件）"""
+    def run():
+        return [message_processor.categorize_message(text) for text, _ in GUEST_MESSAGES]
+
+    assert len(benchmark(run)) == len(GUEST_MESSAGES)
+
+def test_categorize_messages_batch(benchmark, message_processor):
+    """まとめて分類（GUEST_MESSAGES 全件を1回で）"""
+    texts = [text for text, _ in GUEST_MESSAGES]
+    assert len(benchmark(message_processor.categorize_messages, texts)) == len(texts)
+
+@pytest.mark.parametrize("case", list(SUGGESTION_MESSAGES))
+def test_generate_response_suggestions(benchmark, session_factory, run_async, case):
+    """返信候補の生成（ホテルのコンテキストはキャッシュ済みの状態。セッションはリクエストごとに作る）"""
+    from app.dependencies import get_response_generator
+
+    generator = get_response_generator()
+    message, message_type = SUGGESTION_MESSAGES[case]
+
+    def run():
+        db = session_factory()
+        try:
+            return run_async(generator.generate_response_suggestions(message, message_type, 1, db))
+        finally:
+            db.close()
+
+    assert benchmark(run)
+
+def test_calculate_distance(benchmark):
+    """2点間の距離（Haversine）"""
+    from app.agents.hotel_info_agent import HotelInfoAgent
+
+    agent = HotelInfoAgent()
+    assert benchmark(agent._calculate_distance, 35.6812, 139.7671, 35.7101, 139.8107) > 0
+
+@pytest.mark.parametrize("size", [100, 1_000, 10_000, 100_000])
+def test_analyze_booking_patterns(benchmark, booking_sessions, size):
+    """予約パターン分析（予約件数ごと）"""
+    from app.agents.booking_data_agent import BookingDataAgent
+
+    agent = BookingDataAgent()
+    factory = booking_sessions(size)
+
+    def run():
+        db = factory()
+        try:
+            return agent.analyze_booking_patterns(db, 1)
+        finally:
+            db.close()
+
+    assert benchmark(run)["total_bookings"] == size
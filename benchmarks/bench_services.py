@@ -0,0 +1,71 @@
+"""
+候補のランキング・TF-IDF のマイクロベンチマーク
+
+    python -m pytest benchmarks/bench_services.py
+"""
+
+import random
+
+import pytest
+
+from generate_dataset import MESSAGE_TYPES, MESSAGES, REPLIES
+
+REPLY_TEXTS = [text for language in ("ja", "en") for replies in REPLIES[language] for text in replies]
+MESSAGE_TEXTS = [text for language in ("ja", "en") for texts in MESSAGES[language] for text in texts]
+
+# 言い換え（ほぼ重複）を作るための語尾
+VARIANT_SUFFIXES = ["", "何卒よろしくお願いいたします。", " Please let us know if you need anything else.", "ご不明な点はお気軽にお尋ねください。"]
+
+def make_suggestions(count: int, seed: int = 0):
+    """テンプレート・AI・過去の返信の候補（一部は言い換えでほぼ重複する）"""
+    from app.services.suggestion import Suggestion, SuggestionType
+
+    rng = random.Random(seed)
+    sources = [
+        (SuggestionType.TEMPLATE, "Template: {}"),
+        (SuggestionType.AI_GENERATED, "AI Generated #{}"),
+        (SuggestionType.HISTORICAL, "Historical Response #{}")
+    ]
+    suggestions = []
+    for i in range(count):
+        suggestion_type, source = rng.choice(sources)
+        content = rng.choice(REPLY_TEXTS) + rng.choice(VARIANT_SUFFIXES)
+        suggestions.append(Suggestion(content, suggestion_type, round(rng.uniform(0.6, 0.9), 3), source.format(i + 1)))
+    return suggestions
+
+def make_corpus(count: int, seed: int = 0):
+    """TF-IDF の学習用テキスト（返信を組み合わせて count 件）"""
+    rng = random.Random(seed)
+    return [rng.choice(REPLY_TEXTS) + rng.choice(REPLY_TEXTS) for _ in range(count)]
+
+@pytest.mark.parametrize("count", [10, 50, 200])
+def test_rank_suggestions(benchmark, count):
+    """候補の重複除去とランキング（旧 _deduplicate_and_rank）"""
+    from app.services.ranking import rank_suggestions
+
+    suggestions = make_suggestions(count)
+    priors = {"template": 0.05, "ai": 0.02, "Template: 3": 0.08}
+    ranked = benchmark(rank_suggestions, suggestions, "チェックイン前に荷物を預かってもらえますか？", 3, priors)
+    assert 0 < len(ranked) <= count
+
+@pytest.mark.parametrize("count", [30, 1_000, 10_000])
+def test_tfidf_fit(benchmark, count):
+    """TF-IDF の学習（30件 = 1ホテル分のテンプレート程度）"""
+    from app.agents.booking_data_agent import BookingDataAgent
+
+    corpus = make_corpus(count)
+
+    def run():
+        return BookingDataAgent().vectorizer.fit_transform(corpus)
+
+    assert benchmark(run).shape[0] == count
+
+@pytest.mark.parametrize("batch", [1, 100])
+def test_tfidf_transform(benchmark, batch):
+    """学習済みの TF-IDF でのメッセージの変換（1件 / まとめて）"""
+    from app.agents.booking_data_agent import BookingDataAgent
+
+    vectorizer = BookingDataAgent().vectorizer
+    vectorizer.fit(make_corpus(len(MESSAGE_TYPES) * 4))
+    messages = [MESSAGE_TEXTS[i % len(MESSAGE_TEXTS)] for i in range(batch)]
+    assert benchmark(vectorizer.transform, messages).shape[0] == batch
@@ -0,0 +1,97 @@
+"""
+マイクロベンチマーク（pytest-benchmark）の共通フィクスチャ
+
+app の設定は import 時に環境変数から読まれるため、app を import する前に
+一時ディレクトリのSQLiteデータベース・モデルの保存先を設定する（開発用のデータベースには書き込まない）。
+データは generate_dataset.py と同じ生成器で作る。
+"""
+
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+from datetime import date
+from pathlib import Path
+from typing import Callable, Dict
+
+import pytest
+
+BENCH_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = BENCH_DIR.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(BENCH_DIR))
+
+TMP_DIR = tempfile.mkdtemp(prefix="hotel_micro_bench_")
+os.environ["DATABASE_URL"] = f"sqlite:///{TMP_DIR}/bench.db"
+os.environ["MODEL_DIR"] = os.path.join(TMP_DIR, "models")
+# プロセス間の受け渡しではなく処理そのものを計測する
+os.environ["CPU_WORKERS"] = "0"
+# 外部APIを呼ばない
+os.environ["LLM_BACKEND"] = "static"
+os.environ["GOOGLE_MAPS_API_KEY"] = ""
+
+from generate_dataset import BulkWriter, DatasetGenerator
+
+# 返信候補の生成・分類モデルの学習に使うデータセット
+APP_DATASET = {"hotels": 5, "bookings": 5_000, "messages": 20_000, "response_logs": 8_000}
+
+def create_dataset(database_url: str, counts: Dict[str, int], with_templates: bool = True, seed: int = 0):
+    """データセットを作成し、そのデータベースのエンジンを返す"""
+    from sqlalchemy import create_engine
+
+    from app.models import Base
+
+    engine = create_engine(database_url)
+    Base.metadata.create_all(bind=engine)
+    with BulkWriter(engine) as writer:
+        DatasetGenerator(writer, seed, date(2024, 1, 1), 730, date(2025, 7, 1), english_ratio=0.35).run(counts, with_templates)
+    return engine
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(TMP_DIR, ignore_errors=True)
+
+@pytest.fixture(scope="session")
+def app_dataset() -> Dict[str, int]:
+    """app.database のデータベース（一時ファイル）にデータセットを作る"""
+    from app.config import settings
+
+    create_dataset(settings.DATABASE_URL, APP_DATASET).dispose()
+    return APP_DATASET
+
+@pytest.fixture(scope="session")
+def session_factory(app_dataset) -> Callable:
+    """リクエストごとのセッション（API と同じく毎回作り直す）"""
+    from app.database import SessionLocal
+
+    return SessionLocal
+
+@pytest.fixture(scope="session")
+def booking_sessions() -> Callable:
+    """予約件数 -> その件数の予約を持つホテル1件だけのデータベースのセッションファクトリ"""
+    from sqlalchemy.orm import sessionmaker
+
+    factories = {}
+    engines = []
+
+    def get(size: int):
+        if size not in factories:
+            engine = create_dataset(
+                f"sqlite:///{TMP_DIR}/bookings_{size}.db",
+                {"hotels": 1, "bookings": size, "messages": 0, "response_logs": 0},
+                with_templates=False
+            )
+            engines.append(engine)
+            factories[size] = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        return factories[size]
+
+    yield get
+    for engine in engines:
+        engine.dispose()
+
+@pytest.fixture(scope="session")
+def run_async() -> Callable:
+    """コルーチンを同じイベントループで実行する（ループの作成を計測に含めない）"""
+    loop = asyncio.new_event_loop()
+    yield loop.run_until_complete
+    loop.close()
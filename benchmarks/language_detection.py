@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+言語判定のベンチマーク（1メッセージあたりの判定時間と正解率）
+
+日本語・英語・その他の言語のゲストメッセージを繰り返し判定し、
+1件あたりの平均・最大判定時間（マイクロ秒）を計測します。
+平均判定時間が閾値を超えた場合、または判定を誤った場合は終了コード1を返します。
+
+使用方法:
+    python benchmarks/language_detection.py
+    python benchmarks/language_detection.py --iterations 20000 --max-us 200
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.services.language_detection import detect_language
+
+MESSAGES = [
+    ("チェックイン前に荷物を預けることはできますか？", "ja"),
+    ("来月の空室状況を教えてください", "ja"),
+    ("近くのおすすめの観光地はありますか？", "ja"),
+    ("予約確認", "ja"),
+    ("Can I store my luggage here?", "en"),
+    ("Is there a room available for three nights from March 3rd?", "en"),
+    ("Hello! We are a family of four arriving from Singapore on Friday. Could you recommend things to do near the hotel?", "en"),
+    ("Wifi password please", "en"),
+    ("Bonjour, puis-je laisser mes bagages avant l'arrivée?", "fr"),
+    ("¿Puedo dejar mi equipaje antes del check in?", "es"),
+    ("Kann ich mein Gepäck vor dem Einchecken hier lassen?", "de"),
+    ("可以寄存行李吗？", "zh"),
+    ("짐을 맡길 수 있나요?", "ko"),
+]
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="言語判定のベンチマーク")
+    parser.add_argument("--iterations", type=int, default=5000, help="メッセージごとの判定回数")
+    parser.add_argument("--max-us", type=float, default=float(os.getenv("LANGUAGE_DETECTION_MAX_US", "500")), help="平均判定時間の上限（マイクロ秒）")
+    args = parser.parse_args()
+
+    failed = False
+    timings = []
+    for message, expected in MESSAGES:
+        detected = detect_language(message)
+        started_at = time.perf_counter()
+        for _ in range(args.iterations):
+            detect_language(message)
+        us = (time.perf_counter() - started_at) / args.iterations * 1_000_000
+        timings.append(us)
+
+        mark = "OK" if detected == expected else "NG"
+        print(f"  [{mark}] {detected:<3} {us:>7.1f} us  {message[:40]}")
+        if detected != expected:
+            failed = True
+
+    average = sum(timings) / len(timings)
+    print(f"\n平均判定時間: {average:.1f} us / 最大: {max(timings):.1f} us")
+
+    if average > args.max_us:
+        print(f"[ERROR] 平均判定時間が閾値を超えています: {average:.1f} > {args.max_us:.1f} us")
+        failed = True
+    if not failed:
+        print("\n[OK] 言語判定は許容範囲内です")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
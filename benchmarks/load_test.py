@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+APIの負荷テスト（test_data.py / test_sample.py のシナリオを重み付きのユーザーフローとして並行実行）
+
+フロー（重みは --weights で変更可能）:
+    guest_message   ゲストの問い合わせを作成（POST /messages, test_data.SAMPLE_SCENARIOS）
+    suggestions     既存のメッセージの返信候補を取得
+    operator_reply  未処理のメッセージ一覧 → 返信候補 → 候補を選んで返信
+    analytics       分析データを取得
+    attractions     周辺観光地を取得
+    onboarding      ホテルを作成してホテル一覧を取得（test_sample.TEST_HOTEL）
+
+フローは --rps の一定間隔で開始します（前のリクエストの応答を待たないため、
+サーバーが遅くなってもリクエストの到着ペースは変わりません）。
+エンドポイントごとの p50/p95/p99・エラー率・スループットを表示し、--output でJSONに保存します。
+--baseline を指定すると、p95 とエラー率がベースラインから悪化した場合に終了コード1を返します。
+
+使用方法:
+    python benchmarks/load_test.py --start-server --rps 20 --duration 60
+    python benchmarks/load_test.py --base-url http://localhost:8000 --rps 50 --output report.json
+    python benchmarks/load_test.py --start-server --weights suggestions=10,operator_reply=1
+    python benchmarks/load_test.py --start-server --baseline benchmarks/load_baseline.json --tolerance 0.3
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from test_data import SAMPLE_HOTELS, SAMPLE_SCENARIOS
+from test_sample import TEST_HOTEL, TEST_RESPONSE
+
+DEFAULT_WEIGHTS = {
+    "guest_message": 3,
+    "suggestions": 6,
+    "operator_reply": 2,
+    "analytics": 1,
+    "attractions": 2,
+    "onboarding": 0.2
+}
+
+GUEST_NAMES = ["田中太郎", "佐藤花子", "山田次郎", "John Smith", "Emma Brown", "李明"]
+
+def percentile(sorted_values: List[float], p: float) -> Optional[float]:
+    """最近傍法のパーセンタイル"""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, int(round(p / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+class Recorder:
+    """エンドポイントごとのレイテンシ・ステータスを記録"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.statuses: Dict[str, Dict[str, int]] = {}
+
+    def record(self, endpoint: str, seconds: float, status: str, ok: bool):
+        self.latencies.setdefault(endpoint, [])
+        self.errors.setdefault(endpoint, 0)
+        statuses = self.statuses.setdefault(endpoint, {})
+        statuses[status] = statuses.get(status, 0) + 1
+        if ok:
+            self.latencies[endpoint].append(seconds)
+        else:
+            self.errors[endpoint] += 1
+
+    def report(self, duration: float) -> Dict:
+        endpoints = {}
+        for endpoint in sorted(self.statuses):
+            latencies = sorted(self.latencies[endpoint])
+            count = len(latencies) + self.errors[endpoint]
+            endpoints[endpoint] = {
+                "requests": count,
+                "errors": self.errors[endpoint],
+                "error_rate": round(self.errors[endpoint] / count, 4),
+                "throughput_rps": round(count / duration, 2),
+                "p50_ms": _ms(percentile(latencies, 50)),
+                "p95_ms": _ms(percentile(latencies, 95)),
+                "p99_ms": _ms(percentile(latencies, 99)),
+                "max_ms": _ms(latencies[-1] if latencies else None),
+                "status_codes": self.statuses[endpoint]
+            }
+        return endpoints
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 2) if seconds is not None else None
+
+class LoadTest:
+    """重み付きのユーザーフローを一定のペースで開始する"""
+
+    def __init__(self, base_url: str, weights: Dict[str, float], seed: int = 0, timeout: float = 30):
+        self.base_url = base_url.rstrip("/")
+        self.weights = {name: weight for name, weight in weights.items() if weight > 0}
+        self.rng = random.Random(seed)
+        self.timeout = timeout
+        self.recorder = Recorder()
+        self.flows: Dict[str, Dict[str, int]] = {name: {"started": 0, "completed": 0, "failed": 0} for name in self.weights}
+        self.hotel_ids: List[int] = []
+        self.message_ids: Dict[int, List[int]] = {}
+        self.session = None
+
+    async def request(self, method: str, endpoint: str, path: str, **kwargs):
+        """1リクエストを送り、endpoint（パスのテンプレート）ごとに記録する。失敗時は None"""
+        import aiohttp
+
+        started_at = time.perf_counter()
+        try:
+            async with self.session.request(method, f"{self.base_url}{path}", **kwargs) as response:
+                body = await response.read()
+                ok = response.status < 400
+                self.recorder.record(f"{method} {endpoint}", time.perf_counter() - started_at, str(response.status), ok)
+                return json.loads(body) if ok and body else None
+        except asyncio.TimeoutError:
+            self.recorder.record(f"{method} {endpoint}", time.perf_counter() - started_at, "timeout", False)
+        except aiohttp.ClientError as e:
+            self.recorder.record(f"{method} {endpoint}", time.perf_counter() - started_at, type(e).__name__, False)
+        return None
+
+    async def bootstrap(self):
+        """既存のホテル・メッセージを読み込む（ホテルがなければ test_data のサンプルホテルを作る）"""
+        hotels = await self.request("GET", "/hotels", "/hotels") or []
+        if not hotels:
+            for hotel in SAMPLE_HOTELS:
+                await self.request("POST", "/hotels", "/hotels", params=hotel)
+            hotels = await self.request("GET", "/hotels", "/hotels") or []
+        self.hotel_ids = [hotel["id"] for hotel in hotels]
+
+        for hotel_id in self.hotel_ids:
+            messages = await self.request("GET", "/messages/{hotel_id}", f"/messages/{hotel_id}") or []
+            self.message_ids[hotel_id] = [message["id"] for message in messages]
+        if not self.hotel_ids:
+            raise RuntimeError("ホテルを取得・作成できませんでした")
+
+    # ---- フロー ----------------------------------------------------------
+
+    async def flow_guest_message(self) -> bool:
+        hotel_id = self.rng.choice(self.hotel_ids)
+        scenario = self.rng.choice(SAMPLE_SCENARIOS)
+        message = await self.request("POST", "/messages", "/messages", params={"hotel_id": hotel_id}, json={
+            "booking_id": f"load_{hotel_id}_{self.rng.randrange(10 ** 9)}",
+            "platform": scenario["platform"],
+            "message_content": scenario["message"],
+            "message_type": scenario["message_type"],
+            "guest_name": self.rng.choice(GUEST_NAMES),
+            "timestamp": datetime.now().isoformat()
+        })
+        if message is None:
+            return False
+        self.message_ids.setdefault(hotel_id, []).append(message["id"])
+        return True
+
+    async def flow_suggestions(self) -> bool:
+        hotel_id, message_id = self._pick_message()
+        if message_id is None:
+            return await self.flow_guest_message()
+        data = await self.request(
+            "POST", "/messages/{message_id}/suggestions", f"/messages/{message_id}/suggestions", params={"hotel_id": hotel_id}
+        )
+        return data is not None
+
+    async def flow_operator_reply(self) -> bool:
+        hotel_id = self.rng.choice(self.hotel_ids)
+        messages = await self.request("GET", "/messages/{hotel_id}", f"/messages/{hotel_id}")
+        if messages is None:
+            return False
+        unprocessed = [message for message in messages if not message.get("is_processed")]
+        if not unprocessed:
+            return True
+        message = self.rng.choice(unprocessed)
+
+        data = await self.request(
+            "POST", "/messages/{message_id}/suggestions", f"/messages/{message['id']}/suggestions", params={"hotel_id": hotel_id}
+        )
+        if data is None:
+            return False
+
+        # 1件目の候補を選んだことにして返信する（候補がなければ test_sample の定型文）
+        params = {"response_content": TEST_RESPONSE, "platform": message["platform"]}
+        if data.get("suggestions"):
+            suggestion = data["suggestions"][0]
+            params.update({
+                "response_content": suggestion["content"],
+                "suggestion_source": suggestion["source"],
+                "suggestion_type": suggestion["type"],
+                "suggested_content": suggestion["content"]
+            })
+        result = await self.request("POST", "/messages/{message_id}/respond", f"/messages/{message['id']}/respond", params=params)
+        return result is not None
+
+    async def flow_analytics(self) -> bool:
+        hotel_id = self.rng.choice(self.hotel_ids)
+        return await self.request("GET", "/hotels/{hotel_id}/analytics", f"/hotels/{hotel_id}/analytics") is not None
+
+    async def flow_attractions(self) -> bool:
+        hotel_id = self.rng.choice(self.hotel_ids)
+        data = await self.request(
+            "GET", "/hotels/{hotel_id}/nearby-attractions", f"/hotels/{hotel_id}/nearby-attractions", params={"radius": 2000}
+        )
+        return data is not None
+
+    async def flow_onboarding(self) -> bool:
+        hotel = await self.request("POST", "/hotels", "/hotels", params={**TEST_HOTEL, "name": f"{TEST_HOTEL['name']} {self.rng.randrange(10 ** 6)}"})
+        if hotel is None:
+            return False
+        self.hotel_ids.append(hotel["id"])
+        return await self.request("GET", "/hotels", "/hotels") is not None
+
+    def _pick_message(self):
+        hotel_ids = [hotel_id for hotel_id in self.hotel_ids if self.message_ids.get(hotel_id)]
+        if not hotel_ids:
+            return self.rng.choice(self.hotel_ids), None
+        hotel_id = self.rng.choice(hotel_ids)
+        return hotel_id, self.rng.choice(self.message_ids[hotel_id])
+
+    # ---- 実行 ------------------------------------------------------------
+
+    async def run_flow(self, name: str):
+        self.flows[name]["started"] += 1
+        try:
+            ok = await getattr(self, f"flow_{name}")()
+        except Exception as e:
+            print(f"[ERROR] フローでエラーが発生しました ({name}): {str(e)}")
+            ok = False
+        self.flows[name]["completed" if ok else "failed"] += 1
+
+    async def run(self, rps: float, duration: float, max_in_flight: int) -> Dict:
+        import aiohttp
+
+        connector = aiohttp.TCPConnector(limit=max_in_flight)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as self.session:
+            await self.bootstrap()
+            self.recorder = Recorder()
+
+            names = list(self.weights)
+            weights = [self.weights[name] for name in names]
+            in_flight = set()
+            skipped = 0
+            interval = 1 / rps
+            started_at = time.perf_counter()
+            next_at = started_at
+            while next_at < started_at + duration:
+                await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+                next_at += interval
+
+                # クライアント側の上限を超える場合はフローを開始しない（結果の skipped_flows で分かる）
+                if len(in_flight) >= max_in_flight:
+                    skipped += 1
+                    continue
+                task = asyncio.ensure_future(self.run_flow(self.rng.choices(names, weights)[0]))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+
+            if in_flight:
+                await asyncio.wait(in_flight)
+            elapsed = time.perf_counter() - started_at
+
+        endpoints = self.recorder.report(elapsed)
+        total_requests = sum(endpoint["requests"] for endpoint in endpoints.values())
+        total_errors = sum(endpoint["errors"] for endpoint in endpoints.values())
+        return {
+            "config": {"base_url": self.base_url, "rps": rps, "duration": duration, "weights": self.weights, "max_in_flight": max_in_flight},
+            "elapsed_seconds": round(elapsed, 2),
+            "totals": {
+                "requests": total_requests,
+                "errors": total_errors,
+                "error_rate": round(total_errors / total_requests, 4) if total_requests else 0.0,
+                "throughput_rps": round(total_requests / elapsed, 2),
+                "skipped_flows": skipped
+            },
+            "flows": self.flows,
+            "endpoints": endpoints
+        }
+
+def parse_weights(value: Optional[str]) -> Dict[str, float]:
+    weights = dict(DEFAULT_WEIGHTS)
+    if not value:
+        return weights
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in DEFAULT_WEIGHTS:
+            raise argparse.ArgumentTypeError(f"不明なフローです: {name}（{', '.join(DEFAULT_WEIGHTS)}）")
+        weights[name] = float(weight)
+    return weights
+
+def compare_with_baseline(report: Dict, baseline: Dict, tolerance: float, max_error_rate_increase: float) -> List[str]:
+    """ベースラインからの悪化（p95 が tolerance 以上悪化・エラー率が増加）"""
+    regressions = []
+    for endpoint, current in report["endpoints"].items():
+        previous = baseline.get("endpoints", {}).get(endpoint)
+        if not previous:
+            continue
+        if previous.get("p95_ms") and current.get("p95_ms") and current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{endpoint}: p95 {previous['p95_ms']:.1f}ms -> {current['p95_ms']:.1f}ms")
+        if current["error_rate"] > previous["error_rate"] + max_error_rate_increase:
+            regressions.append(f"{endpoint}: エラー率 {previous['error_rate']:.2%} -> {current['error_rate']:.2%}")
+    return regressions
+
+def print_report(report: Dict):
+    totals = report["totals"]
+    print(f"\n{report['elapsed_seconds']:.1f}秒 / {totals['requests']}リクエスト / {totals['throughput_rps']} req/s / エラー率 {totals['error_rate']:.2%}"
+          + (f" / 開始できなかったフロー {totals['skipped_flows']}" if totals["skipped_flows"] else "") + "\n")
+    print(f"  {'endpoint':<46} {'req':>6} {'req/s':>7} {'err%':>6} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for endpoint, stats in report["endpoints"].items():
+        cells = [f"{stats[key]:.1f}" if stats[key] is not None else "-" for key in ("p50_ms", "p95_ms", "p99_ms")]
+        print(f"  {endpoint:<46} {stats['requests']:>6} {stats['throughput_rps']:>7.1f} {stats['error_rate']:>6.1%} {cells[0]:>8} {cells[1]:>8} {cells[2]:>8}")
+    print("\n  flow: " + ", ".join(f"{name} {counts['completed']}/{counts['started']}" for name, counts in report["flows"].items()))
+
+def start_local_server(tmp_dir: str, port: int, workers: int, messages: int):
+    """一時的なSQLiteデータベースにサンプルデータを作り、APIを起動する"""
+    from api_supervisor import APISupervisor
+    from worker_scaling import prepare_database
+
+    database_url = f"sqlite:///{tmp_dir}/load_test.db"
+    prepare_database(database_url, messages)
+    os.environ["MODEL_DIR"] = f"{tmp_dir}/models"
+
+    supervisor = APISupervisor(host="127.0.0.1", port=port, workers=workers, cwd=str(PROJECT_ROOT))
+    supervisor.start()
+    if not supervisor.wait_until_ready(60):
+        print("\n".join(supervisor.logs()))
+        supervisor.stop()
+        raise RuntimeError("APIサーバーが起動しませんでした")
+    return supervisor
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="APIの負荷テスト")
+    parser.add_argument("--base-url", default=os.getenv("API_BASE_URL", "http://localhost:8000"), help="APIのURL（--start-server の場合は無視）")
+    parser.add_argument("--start-server", action="store_true", help="一時的なデータベースでAPIを起動してから計測する")
+    parser.add_argument("--port", type=int, default=8095, help="--start-server で起動するAPIのポート")
+    parser.add_argument("--workers", type=int, default=1, help="--start-server で起動するワーカー数")
+    parser.add_argument("--messages", type=int, default=300, help="--start-server で作成するゲストメッセージ数")
+    parser.add_argument("--rps", type=float, default=10, help="1秒あたりに開始するフロー数")
+    parser.add_argument("--duration", type=float, default=30, help="計測時間（秒）")
+    parser.add_argument("--max-in-flight", type=int, default=200, help="同時に実行するフローの上限")
+    parser.add_argument("--weights", type=parse_weights, default=parse_weights(None), help="フローの重み（例: suggestions=10,analytics=0）")
+    parser.add_argument("--seed", type=int, default=0, help="フロー選択の乱数シード")
+    parser.add_argument("--output", type=Path, default=None, help="JSONレポートの保存先")
+    parser.add_argument("--baseline", type=Path, default=None, help="比較するベースラインのJSONレポート")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="p95 の許容悪化率")
+    parser.add_argument("--max-error-rate-increase", type=float, default=0.01, help="エラー率の許容増加幅")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        supervisor = None
+        base_url = args.base_url
+        if args.start_server:
+            supervisor = start_local_server(tmp_dir, args.port, args.workers, args.messages)
+            base_url = f"http://127.0.0.1:{args.port}"
+        try:
+            print(f"{base_url} に {args.rps} flows/s で {args.duration:.0f}秒間負荷をかけます")
+            report = asyncio.run(LoadTest(base_url, args.weights, seed=args.seed).run(args.rps, args.duration, args.max_in_flight))
+        finally:
+            if supervisor is not None:
+                supervisor.stop()
+
+    print_report(report)
+
+    if args.output:
+        args.output.write_text(json.dumps(report, ensure_ascii=False, indent=2))
+        print(f"\nレポートを保存しました: {args.output}")
+
+    if args.baseline:
+        regressions = compare_with_baseline(report, json.loads(args.baseline.read_text()), args.tolerance, args.max_error_rate_increase)
+        if regressions:
+            print("\n[ERROR] ベースラインから悪化しました:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            return 1
+        print("\n[OK] ベースラインの許容範囲内です")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+マイクロベンチマーク（benchmarks/bench_*.py）の実行とベースラインとの比較
+
+pytest-benchmark でエージェント・サービスの処理（メッセージ分類・返信候補生成・ランキング・
+距離計算・予約パターン分析・TF-IDF）を計測し、ベンチマークごとの統計値（既定は中央値）を
+ベースラインと比較します。許容率を超えて遅くなったベンチマークがあれば終了コード1を返します。
+ベースラインは計測したマシンに依存するため、同じマシン（CI のランナー）で保存・比較してください。
+
+必要なパッケージ: pip install -r requirements-benchmark.txt
+
+使用方法:
+    python benchmarks/micro_benchmarks.py
+    python benchmarks/micro_benchmarks.py --save-baseline
+    python benchmarks/micro_benchmarks.py --baseline benchmarks/micro_baseline.json --tolerance 0.2
+    python benchmarks/micro_benchmarks.py --tolerance-for "test_analyze_booking_patterns*=0.4" --stat min
+    python benchmarks/micro_benchmarks.py -k rank_suggestions -- --benchmark-min-rounds 20
+
+pytest を直接実行することもできます（pytest-benchmark の保存・比較機能を使う場合）:
+    python -m pytest benchmarks --benchmark-autosave
+    python -m pytest benchmarks --benchmark-compare --benchmark-compare-fail=median:20%
+"""
+
+import argparse
+import fnmatch
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+BENCH_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = BENCH_DIR.parent
+DEFAULT_BASELINE = BENCH_DIR / "micro_baseline.json"
+
+STATS = ("min", "median", "mean")
+
+def run_benchmarks(keyword: str, pytest_args: List[str]) -> Tuple[int, Dict]:
+    """pytest-benchmark を実行し、(終了コード, JSON結果) を返す"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        json_path = os.path.join(tmp_dir, "benchmark.json")
+        command = [sys.executable, "-m", "pytest", str(BENCH_DIR), "--benchmark-json", json_path]
+        if keyword:
+            command += ["-k", keyword]
+        result = subprocess.run(command + pytest_args, cwd=str(PROJECT_ROOT))
+        if not os.path.exists(json_path):
+            return result.returncode or 1, {}
+        with open(json_path, encoding="utf-8") as f:
+            return result.returncode, json.load(f)
+
+def summarize(report: Dict) -> Dict[str, Dict[str, float]]:
+    """ベンチマーク名 -> 統計値（秒）"""
+    return {
+        benchmark["fullname"]: {stat: benchmark["stats"][stat] for stat in STATS + ("stddev", "rounds")}
+        for benchmark in report.get("benchmarks", [])
+    }
+
+def tolerance_for(name: str, default: float, overrides: List[Tuple[str, float]]) -> float:
+    """名前（nodeid の :: より後ろ）が一致する最後の上書きを使う"""
+    tolerance = default
+    short_name = name.split("::")[-1]
+    for pattern, value in overrides:
+        if fnmatch.fnmatch(short_name, pattern) or fnmatch.fnmatch(name, pattern):
+            tolerance = value
+    return tolerance
+
+def parse_override(value: str) -> Tuple[str, float]:
+    pattern, _, tolerance = value.rpartition("=")
+    if not pattern:
+        raise argparse.ArgumentTypeError(f"PATTERN=許容率 の形式で指定してください: {value}")
+    return pattern, float(tolerance)
+
+def format_time(seconds: float) -> str:
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.1f}us"
+    if seconds < 1:
+        return f"{seconds * 1e3:.2f}ms"
+    return f"{seconds:.2f}s"
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="マイクロベンチマークの実行とベースラインとの比較")
+    parser.add_argument("-k", dest="keyword", default="", help="実行するベンチマークの絞り込み（pytest -k）")
+    parser.add_argument("--stat", choices=STATS, default="median", help="比較に使う統計値")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="許容する悪化率（0.2 = 20%%）")
+    parser.add_argument(
+        "--tolerance-for", type=parse_override, action="append", default=[], metavar="PATTERN=TOLERANCE",
+        help="ベンチマークごとの許容率（例: 'test_calculate_distance*=0.5'。複数指定可）"
+    )
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="ベースラインのJSONファイル")
+    parser.add_argument("--save-baseline", action="store_true", help="今回の結果をベースラインとして保存")
+    parser.add_argument("pytest_args", nargs="*", help="pytest に渡す追加の引数（-- の後に指定）")
+    args = parser.parse_args()
+
+    returncode, report = run_benchmarks(args.keyword, args.pytest_args)
+    if returncode != 0:
+        print(f"[ERROR] ベンチマークの実行に失敗しました（終了コード {returncode}）")
+        return 1
+
+    current = summarize(report)
+    if not current:
+        print("[ERROR] 実行されたベンチマークがありません")
+        return 1
+
+    if args.save_baseline:
+        baseline = {
+            "machine_info": {key: report.get("machine_info", {}).get(key) for key in ("node", "processor", "python_version", "cpu")},
+            "benchmarks": current
+        }
+        # -k で一部だけ実行した場合は既存のベースラインに上書きでマージする
+        if args.keyword and args.baseline.exists():
+            previous = json.loads(args.baseline.read_text())
+            baseline["benchmarks"] = {**previous.get("benchmarks", {}), **current}
+        args.baseline.write_text(json.dumps(baseline, ensure_ascii=False, indent=2))
+        print(f"\n[OK] ベースラインを保存しました: {args.baseline}（{len(current)}件）")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"\n[OK] 計測が完了しました（ベースライン {args.baseline} がないため比較しません）")
+        return 0
+
+    baseline = json.loads(args.baseline.read_text()).get("benchmarks", {})
+    print(f"\nベースライン: {args.baseline}（{args.stat}, 許容率 {args.tolerance:.0%}）\n")
+    print(f"  {'benchmark':<64} {'baseline':>10} {'current':>10} {'change':>8}")
+
+    regressions = []
+    for name, stats in sorted(current.items()):
+        if name not in baseline:
+            print(f"  {name.split('::', 1)[-1]:<64} {'-':>10} {format_time(stats[args.stat]):>10} {'new':>8}")
+            continue
+        previous = baseline[name][args.stat]
+        change = stats[args.stat] / previous - 1 if previous else 0.0
+        tolerance = tolerance_for(name, args.tolerance, args.tolerance_for)
+        marker = " !" if change > tolerance else ""
+        print(f"  {name.split('::', 1)[-1]:<64} {format_time(previous):>10} {format_time(stats[args.stat]):>10} {change:>+8.1%}{marker}")
+        if change > tolerance:
+            regressions.append(f"{name}: {format_time(previous)} -> {format_time(stats[args.stat])} ({change:+.1%} > {tolerance:.0%})")
+
+    if regressions:
+        print("\n[ERROR] ベースラインから悪化しました:")
+        for regression in regressions:
+            print(f"  - {regression}")
+        return 1
+
+    print("\n[OK] ベースラインの許容範囲内です")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+APIの起動時間（import時間）ベンチマーク
+
+`python -X importtime -c "import app.main"` を複数回実行し、app.main の
+累積import時間の中央値を計測します。閾値やベースラインを超えた場合、
+または起動時に読み込むべきでない重いモジュールが読み込まれた場合は
+終了コード1を返します。
+
+使用方法:
+    python benchmarks/startup_importtime.py
+    python benchmarks/startup_importtime.py --max-ms 800
+    python benchmarks/startup_importtime.py --save-baseline
+    python benchmarks/startup_importtime.py --baseline benchmarks/startup_baseline.json --tolerance 0.2
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "startup_baseline.json"
+
+# 起動時に読み込まれてはいけないモジュール（初回利用時に遅延読み込みする）
+FORBIDDEN_AT_STARTUP = ("pandas", "numpy", "sklearn", "scipy", "googlemaps", "pyarrow", "aiohttp")
+
+def run_importtime(target: str) -> Tuple[float, Dict[str, int]]:
+    """1回分の -X importtime を実行し、(対象の累積ms, モジュール別累積us) を返す"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        env = dict(os.environ)
+        env["PYTHONPATH"] = str(PROJECT_ROOT)
+        env["DATABASE_URL"] = f"sqlite:///{tmp_dir}/startup_bench.db"
+
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+            cwd=tmp_dir,
+            env=env,
+            capture_output=True,
+            text=True
+        )
+
+    if result.returncode != 0:
+        raise RuntimeError(f"import {target} に失敗しました:\n{result.stderr[-2000:]}")
+
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        try:
+            cumulative_us = int(parts[1].strip())
+        except ValueError:
+            continue  # ヘッダー行
+        modules[parts[2].strip()] = cumulative_us
+
+    if target not in modules:
+        raise RuntimeError(f"{target} のimport時間が出力に見つかりません")
+
+    return modules[target] / 1000, modules
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="APIの起動時間ベンチマーク")
+    parser.add_argument("--target", default="app.main", help="計測するモジュール")
+    parser.add_argument("--runs", type=int, default=5, help="計測回数（中央値を採用）")
+    parser.add_argument("--max-ms", type=float, default=float(os.getenv("STARTUP_MAX_MS", "1500")), help="許容する最大import時間(ms)")
+    parser.add_argument("--baseline", type=Path, default=None, help="比較するベースラインJSON")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="ベースラインからの許容悪化率")
+    parser.add_argument("--save-baseline", action="store_true", help="計測結果をベースラインとして保存")
+    parser.add_argument("--top", type=int, default=10, help="表示する遅いモジュールの数")
+    args = parser.parse_args()
+
+    timings: List[float] = []
+    modules: Dict[str, int] = {}
+    for _ in range(args.runs):
+        elapsed_ms, modules = run_importtime(args.target)
+        timings.append(elapsed_ms)
+
+    median_ms = statistics.median(timings)
+    print(f"{args.target} import時間: 中央値 {median_ms:.1f}ms (min {min(timings):.1f}ms / max {max(timings):.1f}ms, {args.runs}回)")
+
+    print(f"\n累積import時間の上位{args.top}モジュール:")
+    top_level = {name: us for name, us in modules.items() if name != args.target and "." not in name}
+    for name, us in sorted(top_level.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {us / 1000:8.1f}ms  {name}")
+
+    failed = False
+
+    heavy = sorted(name for name in modules if name in FORBIDDEN_AT_STARTUP)
+    if heavy:
+        print(f"\n[ERROR] 起動時に重いモジュールが読み込まれています: {', '.join(heavy)}")
+        failed = True
+
+    if median_ms > args.max_ms:
+        print(f"\n[ERROR] import時間が閾値を超えています: {median_ms:.1f}ms > {args.max_ms:.1f}ms")
+        failed = True
+
+    baseline_path = args.baseline or (DEFAULT_BASELINE if DEFAULT_BASELINE.exists() and not args.save_baseline else None)
+    if baseline_path:
+        baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+        limit_ms = baseline["median_ms"] * (1 + args.tolerance)
+        print(f"\nベースライン: {baseline['median_ms']:.1f}ms (許容上限 {limit_ms:.1f}ms)")
+        if median_ms > limit_ms:
+            print(f"[ERROR] ベースラインから {((median_ms / baseline['median_ms']) - 1) * 100:.0f}% 悪化しています")
+            failed = True
+
+    if args.save_baseline:
+        DEFAULT_BASELINE.write_text(
+            json.dumps({"target": args.target, "median_ms": round(median_ms, 1), "python": sys.version.split()[0]}, indent=2),
+            encoding="utf-8"
+        )
+        print(f"\nベースラインを保存しました: {DEFAULT_BASELINE}")
+
+    if not failed:
+        print("\n[OK] 起動時間は許容範囲内です")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+返信候補生成のメモリ割り当てベンチマーク（tracemalloc）
+
+一時的なSQLiteにホテルとテンプレートを作成し、テンプレート・ルールベース・
+定型AI候補の生成からランク付けまでを繰り返して、1リクエストあたりの
+保持メモリ（候補を保持し続けた場合）とピークメモリを計測します。
+ベースラインから悪化した場合は終了コード1を返します。
+
+使用方法:
+    python benchmarks/suggestion_allocations.py
+    python benchmarks/suggestion_allocations.py --requests 5000
+    python benchmarks/suggestion_allocations.py --save-baseline
+    python benchmarks/suggestion_allocations.py --baseline benchmarks/suggestion_allocations_baseline.json --tolerance 0.2
+"""
+
+import argparse
+import gc
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "suggestion_allocations_baseline.json"
+
+MESSAGES = [
+    ("チェックイン前に荷物を預けることはできますか？", "luggage"),
+    ("来月の空室状況を教えてください", "availability"),
+    ("近くのおすすめの観光地はありますか？", "attractions"),
+    ("Wi-Fiのパスワードを教えてください", "general"),
+    ("荷物を預けて観光地を回りたいです", "luggage"),
+]
+
+TEMPLATES = [
+    ("luggage", "お荷物の預かりサービスをご利用いただけます。フロントデスクまでお越しください。"),
+    ("luggage", "チェックイン前・チェックアウト後もお荷物をお預かりいたします。"),
+    ("availability", "空室状況をお調べいたします。ご希望の日程をお教えください。"),
+    ("availability", "お早めのご予約をお勧めいたします。"),
+    ("attractions", "周辺の観光地をご案内いたします。おすすめスポットをご紹介いたします。"),
+    ("attractions", "地元の隠れた名所もご紹介いたします。お気軽にお尋ねください。"),
+]
+
+def setup_database(tmp_dir: str):
+    """ベンチマーク用のホテルとテンプレートを作成し、(ResponseGenerator, HotelContext) を返す"""
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmp_dir}/suggestion_bench.db"
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+    from app.database import SessionLocal, create_tables
+    from app.models import Hotel, ResponseTemplate
+    from app.services.hotel_context import hotel_context_registry
+    from app.services.response_generator import ResponseGenerator
+
+    create_tables()
+    db = SessionLocal()
+    hotel = Hotel(name="ベンチマークホテル", address="東京都台東区", latitude=35.71, longitude=139.79, city="東京", country="日本")
+    db.add(hotel)
+    db.commit()
+    for message_type, content in TEMPLATES:
+        db.add(ResponseTemplate(hotel_id=hotel.id, message_type=message_type, template_content=content))
+    db.commit()
+
+    context = hotel_context_registry.get(hotel.id, db)
+    db.close()
+    return ResponseGenerator(), context
+
+def build_candidates(generator, hotel, message: str, message_type: str):
+    """1リクエスト分の候補生成（外部API・DBを使わない部分）"""
+    from app.services.ranking import rank_suggestions
+
+    topics = generator._detect_topics(message, message_type)
+    suggestions = generator._topic_suggestions(topics, message, {}, hotel)
+    suggestions.extend(generator._template_suggestions(message, topics or [message_type], hotel.id, None, hotel))
+    suggestions.extend(generator.booking_data_agent._generate_ai_suggestions(message, message_type, None, hotel.id))
+    return rank_suggestions(suggestions, message)[:3]
+
+def measure(generator, hotel, requests: int) -> dict:
+    # 初回呼び出しで作られるキャッシュは計測に含めない
+    for message, message_type in MESSAGES:
+        build_candidates(generator, hotel, message, message_type)
+
+    tracemalloc.start()
+
+    # 保持メモリ: 全リクエストの上位候補を保持した場合の増分
+    gc.collect()
+    before = tracemalloc.take_snapshot()
+    started_at = time.perf_counter()
+    results = [build_candidates(generator, hotel, *MESSAGES[i % len(MESSAGES)]) for i in range(requests)]
+    elapsed = time.perf_counter() - started_at
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    diff = after.compare_to(before, "filename")
+    retained_bytes = sum(stat.size_diff for stat in diff)
+    retained_blocks = sum(stat.count_diff for stat in diff)
+    del results
+
+    # ピークメモリ: 1リクエストの処理中に一時的に確保されるメモリ
+    peaks = []
+    for i in range(min(requests, 500)):
+        gc.collect()
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        build_candidates(generator, hotel, *MESSAGES[i % len(MESSAGES)])
+        peaks.append(tracemalloc.get_traced_memory()[1] - current)
+
+    tracemalloc.stop()
+
+    return {
+        "requests": requests,
+        "retained_bytes_per_request": round(retained_bytes / requests, 1),
+        "retained_blocks_per_request": round(retained_blocks / requests, 2),
+        "peak_bytes_per_request": statistics.median(peaks),
+        "us_per_request": round(elapsed / requests * 1_000_000, 1),
+    }
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="返信候補生成のメモリ割り当てベンチマーク")
+    parser.add_argument("--requests", type=int, default=2000, help="リクエスト数")
+    parser.add_argument("--baseline", type=Path, default=None, help="比較するベースラインJSON")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="ベースラインからの許容悪化率")
+    parser.add_argument("--save-baseline", action="store_true", help="計測結果をベースラインとして保存")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        generator, hotel = setup_database(tmp_dir)
+        result = measure(generator, hotel, args.requests)
+
+    print(f"リクエスト数: {result['requests']}")
+    print(f"保持メモリ: {result['retained_bytes_per_request']:.0f} bytes / {result['retained_blocks_per_request']:.1f} blocks (1リクエストあたり)")
+    print(f"ピークメモリ: {result['peak_bytes_per_request']:.0f} bytes (1リクエストあたり, 中央値)")
+    print(f"処理時間: {result['us_per_request']:.1f} us (1リクエストあたり, tracemalloc有効時)")
+
+    failed = False
+    baseline_path = args.baseline or (DEFAULT_BASELINE if DEFAULT_BASELINE.exists() and not args.save_baseline else None)
+    if baseline_path:
+        baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+        for key in ("retained_bytes_per_request", "peak_bytes_per_request"):
+            limit = baseline[key] * (1 + args.tolerance)
+            print(f"\nベースライン {key}: {baseline[key]:.0f} (許容上限 {limit:.0f})")
+            if result[key] > limit:
+                print(f"[ERROR] {key} がベースラインから {((result[key] / baseline[key]) - 1) * 100:.0f}% 悪化しています")
+                failed = True
+
+    if args.save_baseline:
+        DEFAULT_BASELINE.write_text(json.dumps(result, indent=2), encoding="utf-8")
+        print(f"\nベースラインを保存しました: {DEFAULT_BASELINE}")
+
+    if not failed:
+        print("\n[OK] メモリ割り当ては許容範囲内です")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
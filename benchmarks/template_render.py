@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+返信テンプレート描画のベンチマーク（renders/sec）
+
+次の4通りで1秒あたりの描画回数を計測します。
+  - static:    変数を含まないテンプレート（コンパイルしない）
+  - uncached:  毎回 Jinja2 でコンパイルしてから描画（キャッシュなしの比較用）
+  - cached:    (template_id, updated_at) でキャッシュしたテンプレートを描画
+  - bulk:      render_many で複数ゲスト分をまとめて描画
+
+使用方法:
+    python benchmarks/template_render.py
+    python benchmarks/template_render.py --renders 50000 --min-rps 20000
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.services.template_engine import TemplateEngine, template_variables
+
+STATIC_TEMPLATE = "お荷物の預かりサービスをご利用いただけます。フロントデスクまでお越しください。"
+VARIABLE_TEMPLATE = (
+    "{{ guest_name|default('お客様', true) }}様、{{ check_in }}のご到着をお待ちしております。"
+    "{{ hotel.name }}は{{ nearest_station }}から徒歩圏内です。"
+    "{% if top_attractions %}周辺では{{ top_attractions|join('、') }}が人気です。{% endif %}"
+)
+
+def build_variable_sets(count: int):
+    hotel = SimpleNamespace(
+        name="ベンチマークホテル", address="東京都台東区", city="東京", country="日本",
+        attractions={2000: [{'name': '浅草寺'}, {'name': '東京スカイツリー'}, {'name': '上野公園'}]},
+        luggage_info={'storage_options': [{'name': '上野駅コインロッカー', 'address': 'JR上野駅内', 'distance_km': 0.6}]}
+    )
+    check_in = datetime(2024, 4, 1)
+    return [
+        template_variables(hotel, SimpleNamespace(
+            guest_name=f"ゲスト{i}",
+            check_in=check_in + timedelta(days=i % 30),
+            check_out=check_in + timedelta(days=i % 30 + 2)
+        ))
+        for i in range(count)
+    ]
+
+def rate(count: int, func) -> float:
+    started_at = time.perf_counter()
+    func()
+    return count / (time.perf_counter() - started_at)
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="返信テンプレート描画のベンチマーク")
+    parser.add_argument("--renders", type=int, default=20000, help="描画回数")
+    parser.add_argument("--min-rps", type=float, default=float(os.getenv("TEMPLATE_MIN_RPS", "0")), help="cached の最低 renders/sec")
+    args = parser.parse_args()
+
+    engine = TemplateEngine()
+    variable_sets = build_variable_sets(args.renders)
+    key = (1, datetime(2024, 1, 1))
+    uncached_count = max(1, args.renders // 20)
+
+    # 初回コンパイルは計測に含めない
+    print(f"描画例: {engine.render(key, VARIABLE_TEMPLATE, variable_sets[0])}\n")
+
+    results = {
+        "static": rate(args.renders, lambda: [engine.render(key, STATIC_TEMPLATE, v) for v in variable_sets]),
+        "uncached": rate(uncached_count, lambda: [
+            engine.environment.from_string(VARIABLE_TEMPLATE).render(v) for v in variable_sets[:uncached_count]
+        ]),
+        "cached": rate(args.renders, lambda: [engine.render(key, VARIABLE_TEMPLATE, v) for v in variable_sets]),
+        "bulk": rate(args.renders, lambda: engine.render_many(key, VARIABLE_TEMPLATE, variable_sets)),
+    }
+
+    for name, renders_per_sec in results.items():
+        print(f"  {name:<9} {renders_per_sec:>12,.0f} renders/sec")
+    print(f"\nキャッシュによる高速化: {results['cached'] / results['uncached']:.0f}倍")
+
+    if args.min_rps and results["cached"] < args.min_rps:
+        print(f"\n[ERROR] cached の描画速度が閾値を下回っています: {results['cached']:,.0f} < {args.min_rps:,.0f}")
+        return 1
+
+    print("\n[OK] 描画速度は許容範囲内です")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
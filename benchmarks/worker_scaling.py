@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+gunicorn のワーカー数によるスループットのスケーリング計測
+
+一時的なSQLiteデータベースにサンプルデータを作り、gunicorn.conf.py で APIを
+ワーカー数を変えて起動します。各ワーカー数で POST /messages/{id}/suggestions に
+一定時間負荷をかけ、1秒あたりのリクエスト数・レイテンシ・1ワーカーに対する倍率
+（効率 = 倍率 / ワーカー数）を表示します。
+
+負荷をかけるクライアントも同じマシンのCPUを使うため、CPU数より多いワーカー数では
+スケーリングは頭打ちになります。
+
+使用方法:
+    python benchmarks/worker_scaling.py
+    python benchmarks/worker_scaling.py --workers 1,2,4,8 --duration 20 --concurrency 64
+    python benchmarks/worker_scaling.py --min-efficiency 0.7
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Dict, List
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+GUEST_MESSAGES = [
+    ("荷物を預けることはできますか？", "luggage"),
+    ("来月の空室はありますか？", "availability"),
+    ("近くのおすすめの観光地を教えてください", "attractions"),
+    ("チェックイン前に荷物を預けて、周辺の観光地も知りたいです", "luggage"),
+    ("Can I leave my bags after check out?", "luggage"),
+    ("Do you have a room available next weekend?", "availability"),
+    ("Wi-Fiのパスワードを教えてください", "general"),
+]
+
+def available_cpus() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def prepare_database(database_url: str, count: int) -> Dict[int, List[int]]:
+    """サンプルのホテル・予約・テンプレートと、count 件のゲストメッセージを作る（hotel_id -> メッセージID）"""
+    os.environ["DATABASE_URL"] = database_url
+    from app.database import SessionLocal, create_tables
+    from app.models import GuestMessage
+    from app.seed_data import create_sample_bookings, create_sample_hotels, create_sample_templates
+
+    create_tables()
+    db = SessionLocal()
+    try:
+        hotels = create_sample_hotels(db)
+        bookings = create_sample_bookings(db, hotels)
+        create_sample_templates(db, hotels)
+
+        rng = random.Random(0)
+        messages = []
+        for _ in range(count):
+            booking = rng.choice(bookings)
+            content, message_type = rng.choice(GUEST_MESSAGES)
+            messages.append(GuestMessage(booking_id=booking.id, platform="airbnb", message_content=content, message_type=message_type))
+        db.add_all(messages)
+        db.commit()
+
+        booking_hotels = {booking.id: booking.hotel_id for booking in bookings}
+        targets: Dict[int, List[int]] = {}
+        for message in messages:
+            targets.setdefault(booking_hotels[message.booking_id], []).append(message.id)
+        return targets
+    finally:
+        db.close()
+
+def start_server(workers: int, port: int, env: Dict[str, str], log_path: Path) -> subprocess.Popen:
+    env = {**env, "GUNICORN_WORKERS": str(workers), "PORT": str(port), "HOST": "127.0.0.1", "GUNICORN_ACCESS_LOG": ""}
+    with open(log_path, "a") as log:
+        return subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "-c", str(PROJECT_ROOT / "gunicorn.conf.py"), "app.main:app"],
+            cwd=str(PROJECT_ROOT),
+            env=env,
+            stdout=log,
+            stderr=subprocess.STDOUT
+        )
+
+def wait_until_ready(port: int, process: subprocess.Popen, timeout: float = 60) -> bool:
+    """/health が応答するまでバックオフ付きで待つ"""
+    deadline = time.monotonic() + timeout
+    delay = 0.05
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            return False
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as response:
+                if response.status == 200:
+                    return True
+        except (urllib.error.URLError, OSError):
+            pass
+        time.sleep(delay)
+        delay = min(delay * 2, 1.0)
+    return False
+
+def stop_server(process: subprocess.Popen):
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+def run_client(port: int, targets: Dict[int, List[int]], concurrency: int, warmup: float, duration: float, seed: int) -> Dict:
+    """1クライアントプロセス分の負荷（計測期間中に完了したリクエストのみ集計する）"""
+    import aiohttp
+
+    async def main():
+        rng = random.Random(seed)
+        pairs = [(hotel_id, message_id) for hotel_id, ids in targets.items() for message_id in ids]
+        latencies: List[float] = []
+        errors = 0
+        started_at = time.monotonic()
+        measure_from = started_at + warmup
+        stop_at = measure_from + duration
+
+        async def user(session: aiohttp.ClientSession):
+            nonlocal errors
+            while True:
+                sent_at = time.monotonic()
+                if sent_at >= stop_at:
+                    return
+                hotel_id, message_id = rng.choice(pairs)
+                try:
+                    async with session.post(
+                        f"http://127.0.0.1:{port}/messages/{message_id}/suggestions",
+                        params={"hotel_id": hotel_id}
+                    ) as response:
+                        await response.read()
+                        ok = response.status == 200
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    ok = False
+                if sent_at >= measure_from:
+                    if ok:
+                        latencies.append(time.monotonic() - sent_at)
+                    else:
+                        errors += 1
+
+        connector = aiohttp.TCPConnector(limit=concurrency)
+        timeout = aiohttp.ClientTimeout(total=30)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            await asyncio.gather(*(user(session) for _ in range(concurrency)))
+        return {"latencies": latencies, "errors": errors}
+
+    return asyncio.run(main())
+
+def measure(port: int, targets: Dict[int, List[int]], clients: int, concurrency: int, warmup: float, duration: float) -> Dict:
+    """複数のクライアントプロセスで負荷をかける（クライアント側がボトルネックにならないように）"""
+    per_client = max(1, concurrency // clients)
+    with multiprocessing.Pool(clients) as pool:
+        results = pool.starmap(
+            run_client,
+            [(port, targets, per_client, warmup, duration, seed) for seed in range(clients)]
+        )
+
+    latencies = sorted(latency for result in results for latency in result["latencies"])
+    errors = sum(result["errors"] for result in results)
+    if not latencies:
+        return {"rps": 0.0, "p50_ms": None, "p95_ms": None, "errors": errors}
+    return {
+        "rps": len(latencies) / duration,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "errors": errors
+    }
+
+def main() -> int:
+    cpus = available_cpus()
+    default_workers = sorted({min(2 ** i, cpus) for i in range(cpus.bit_length() + 1)})
+
+    parser = argparse.ArgumentParser(description="gunicorn のワーカー数によるスループットのスケーリング計測")
+    parser.add_argument("--workers", default=",".join(map(str, default_workers)), help="計測するワーカー数（カンマ区切り）")
+    parser.add_argument("--duration", type=float, default=10, help="ワーカー数ごとの計測時間（秒）")
+    parser.add_argument("--warmup", type=float, default=2, help="計測前のウォームアップ（秒）")
+    parser.add_argument("--concurrency", type=int, default=32, help="同時接続数（全クライアントの合計）")
+    parser.add_argument("--clients", type=int, default=max(1, min(4, cpus // 2)), help="負荷をかけるクライアントプロセス数")
+    parser.add_argument("--messages", type=int, default=500, help="作成するゲストメッセージ数")
+    parser.add_argument("--port", type=int, default=8090, help="APIのポート")
+    parser.add_argument("--min-efficiency", type=float, default=0.0, help="最大ワーカー数での最低効率（倍率 / ワーカー数）")
+    args = parser.parse_args()
+
+    worker_counts = sorted({int(n) for n in args.workers.split(",") if n.strip()})
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        database_url = f"sqlite:///{tmp_dir}/worker_scaling.db"
+        targets = prepare_database(database_url, args.messages)
+        log_path = Path(tmp_dir) / "gunicorn.log"
+
+        # CPUExecutor のプロセスはワーカー間で取り合わないよう使わない（スレッドで実行）
+        env = {
+            **os.environ,
+            "DATABASE_URL": database_url,
+            "CPU_WORKERS": "0",
+            "MODEL_DIR": f"{tmp_dir}/models",
+            "PYTHONPATH": str(PROJECT_ROOT)
+        }
+
+        print(f"CPU: {cpus} / クライアント: {args.clients}プロセス・同時接続 {args.concurrency} / 計測 {args.duration:.0f}秒\n")
+        print(f"  {'workers':>7} {'req/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'errors':>7} {'倍率':>6} {'効率':>6}")
+
+        results = {}
+        for workers in worker_counts:
+            server = start_server(workers, args.port, env, log_path)
+            try:
+                if not wait_until_ready(args.port, server):
+                    print(f"[ERROR] ワーカー {workers} でAPIが起動しませんでした:\n{log_path.read_text()[-2000:]}")
+                    return 1
+                result = measure(args.port, targets, args.clients, args.concurrency, args.warmup, args.duration)
+            finally:
+                stop_server(server)
+
+            results[workers] = result
+            base = results[worker_counts[0]]["rps"] / worker_counts[0]
+            speedup = result["rps"] / base if base else 0.0
+            result["efficiency"] = speedup / workers
+            p50 = f"{result['p50_ms']:.1f}" if result["p50_ms"] is not None else "-"
+            p95 = f"{result['p95_ms']:.1f}" if result["p95_ms"] is not None else "-"
+            print(f"  {workers:>7} {result['rps']:>10,.1f} {p50:>9} {p95:>9} {result['errors']:>7} {speedup:>5.2f}x {result['efficiency']:>6.0%}")
+
+    if max(worker_counts) > cpus:
+        print(f"\n[WARN] CPU数（{cpus}）より多いワーカー数はスケーリングしません")
+
+    efficiency = results[max(worker_counts)]["efficiency"]
+    if efficiency < args.min_efficiency:
+        print(f"\n[ERROR] 最大ワーカー数での効率が閾値を下回っています: {efficiency:.0%} < {args.min_efficiency:.0%}")
+        return 1
+
+    print("\n[OK] 計測が完了しました")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+"""
+本番用の起動設定（gunicorn + uvicorn ワーカー）
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+- preload_app: アプリ・エージェント・pandas/scikit-learn・分類モデルをマスターで1回だけ読み込み、
+  fork 後はコピーオンライトで共有する（ワーカーごとに読み込み直さない）
+- ワーカー数は GUNICORN_WORKERS（0 = 使えるCPU数から自動で決める）
+- fork 後のワーカーでは、マスターから引き継いだDB接続を使わないようにする
+"""
+
+import gc
+import os
+
+def available_cpus() -> int:
+    """このプロセスが使えるCPU数（CPUアフィニティとcgroupのCPU制限を考慮）"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    # コンテナのCPU制限（cgroup v2: "quota period", 制限なしは "max"）
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, int(int(quota) // int(period))))
+    except (OSError, ValueError):
+        pass
+
+    return max(1, cpus)
+
+def autotune_workers(cpus: int) -> int:
+    """非同期ワーカーは1つでCPU1コアを使い切れるため、CPU数と同じにする"""
+    return cpus
+
+CPUS = available_cpus()
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("GUNICORN_WORKERS", "0")) or autotune_workers(CPUS)
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+
+# タイムアウト・Keep-Alive（秒）
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+# メモリの断片化を避けるため、一定数のリクエストを処理したワーカーを入れ替える（0 = 入れ替えない）
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = max_requests // 10
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-") or None
+errorlog = "-"
+
+# ワーカーごとのCPUExecutorのプロセス数（未指定なら全体でCPU数程度になるよう割り振る）
+# app.config の読み込み（preload）より前に設定する必要がある
+if "CPU_WORKERS" not in os.environ:
+    os.environ["CPU_WORKERS"] = str(max(1, CPUS // workers))
+
+def when_ready(server):
+    """fork 前にマスターで重いライブラリとエージェントを読み込む"""
+    from app.dependencies import prewarm
+
+    prewarm()
+
+    # 読み込んだオブジェクトをGCの対象から外し、ワーカーでページがコピーされないようにする
+    gc.freeze()
+    server.log.info(f"ワーカー {workers} / CPU {CPUS} / CPUワーカー {os.environ['CPU_WORKERS']}（ワーカーごと）")
+
+def post_fork(server, worker):
+    """ワーカーごとの初期化"""
+    from app.database import engine
+
+    # マスターでテーブル作成に使った接続はワーカー間で共有しない
+    engine.dispose(close=False)
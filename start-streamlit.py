@@ -11,6 +11,8 @@ import signal
 import threading
 from pathlib import Path
 
+from api_supervisor import API_STARTUP_TIMEOUT, APISupervisor
+
 def run_command(command, cwd=None):
     """コマンドを実行"""
     try:
@@ -40,6 +42,9 @@ def check_requirements():
     required_files = [
         "requirements-streamlit.txt",
         "streamlit_app.py",
+        "streamlit_api_client.py",
+        "api_supervisor.py",
+        "streamlit_standalone.py",
         "app/main.py",
         "app/config.py",
         "app/database.py",
@@ -79,7 +84,7 @@ def initialize_database():
     print("🗄️ データベースを初期化中...")
     
     # データベーステーブルを作成
-    success, stdout, stderr = run_command("python -c \"from app.database import engine, Base; from app.models import *; Base.metadata.create_all(bind=engine); print('データベース初期化完了')\"")
+    success, stdout, stderr = run_command("python -c \"from app.database import create_tables; create_tables(); print('データベース初期化完了')\"")
     
     if not success:
         print("❌ データベースの初期化に失敗しました")
@@ -104,42 +109,35 @@ def create_sample_data():
     return True
 
 def start_fastapi():
-    """FastAPIサーバーを起動"""
+    """FastAPIサーバーを起動（API_WORKERS 個のワーカー。落ちたワーカーは再起動される）"""
     print("🌐 FastAPIサーバーを起動中...")
     
-    # FastAPIサーバーをバックグラウンドで起動
-    process = subprocess.Popen(
-        ["python", "-m", "uvicorn", "app.main:app", "--host", "0.0.0.0", "--port", "8000", "--reload"],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True
-    )
-    
-    # 少し待機してサーバーが起動するのを待つ
-    time.sleep(3)
-    
-    # サーバーが起動しているかチェック
-    success, stdout, stderr = run_command("curl -s http://localhost:8000/health")
+    # ワーカーのログはこのターミナルに表示する
+    supervisor = APISupervisor(host="0.0.0.0", port=8000, echo=True)
+    started_at = time.monotonic()
+    try:
+        supervisor.start()
+    except OSError as e:
+        print(f"❌ FastAPIサーバーの起動に失敗しました: {e}")
+        return None
     
-    if not success:
+    # /health が応答するまで待つ
+    if not supervisor.wait_until_ready(API_STARTUP_TIMEOUT):
         print("❌ FastAPIサーバーの起動に失敗しました")
-        process.terminate()
+        supervisor.stop()
         return None
     
-    print("✅ FastAPIサーバーが起動しました")
-    return process
+    print(f"✅ FastAPIサーバーが起動しました（ワーカー {supervisor.worker_count}・{time.monotonic() - started_at:.1f}秒）")
+    return supervisor
 
 def start_streamlit():
     """Streamlitアプリを起動"""
     print("🎨 Streamlitアプリを起動中...")
     print("ブラウザで http://localhost:8501 にアクセスしてください")
     
-    # Streamlitアプリを起動
+    # Streamlitアプリを起動（出力はこのターミナルにそのまま表示する）
     process = subprocess.Popen(
-        ["streamlit", "run", "streamlit_app.py", "--server.port", "8501", "--server.address", "0.0.0.0"],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True
+        ["streamlit", "run", "streamlit_app.py", "--server.port", "8501", "--server.address", "0.0.0.0"]
     )
     
     return process
@@ -148,7 +146,9 @@ def cleanup_processes(processes):
     """プロセスをクリーンアップ"""
     print("🧹 クリーンアップ中...")
     for process in processes:
-        if process and process.poll() is None:
+        if isinstance(process, APISupervisor):
+            process.stop()
+        elif process and process.poll() is None:
             process.terminate()
             try:
                 process.wait(timeout=5)
@@ -201,8 +201,8 @@ def main():
     try:
         # プロセスが終了するまで待機
         while True:
-            if fastapi_process.poll() is not None:
-                print("❌ FastAPIサーバーが終了しました")
+            if fastapi_process.failed:
+                print("❌ FastAPIサーバーが終了しました（再起動の上限に達しました）")
                 break
             if streamlit_process.poll() is not None:
                 print("❌ Streamlitアプリが終了しました")
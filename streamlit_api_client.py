@@ -0,0 +1,434 @@
+"""
+Streamlitアプリ共通のAPIクライアント
+
+streamlit_app.py / streamlit_app_fixed.py / streamlit_app_integrated.py から使う。
+- requests.Session を st.cache_resource で保持し、Keep-Aliveで接続を使い回す
+- 接続エラー・502/503/504 はバックオフ付きで再試行する（POSTは接続できなかった場合のみ）
+- /health の結果は HEALTH_CHECK_TTL 秒キャッシュする（再実行のたびにAPIを呼ばない）
+- ホテル一覧・メッセージ一覧・受信箱は API_CACHE_TTL 秒キャッシュし、期限切れ後は ETag で再検証する
+- アプリから起動するAPIサーバーは api_supervisor.APISupervisor を st.cache_resource で1つだけ保持する
+"""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from urllib.parse import urlencode, urlparse
+
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from api_supervisor import APISupervisor
+
+# ローカル開発時は localhost:8000、Docker環境では api:8000 を使用
+API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000")
+
+# GETレスポンスをキャッシュする秒数（再実行のたびにAPIを呼ばない。期限切れ後は ETag で再検証する）
+API_CACHE_TTL = int(os.getenv("API_CACHE_TTL", "30"))
+
+# キャッシュするGETレスポンスの件数（パス・パラメータごとに1件。古いものから破棄）
+API_CACHE_SIZE = int(os.getenv("API_CACHE_SIZE", "256"))
+
+# ヘルスチェックの結果をキャッシュする秒数
+HEALTH_CHECK_TTL = int(os.getenv("HEALTH_CHECK_TTL", "10"))
+
+# 再試行回数と待ち時間（0.3秒, 0.6秒, 1.2秒...）
+API_MAX_RETRIES = int(os.getenv("API_MAX_RETRIES", "3"))
+API_RETRY_BACKOFF = float(os.getenv("API_RETRY_BACKOFF", "0.3"))
+
+# 保持する接続数（Streamlitのセッション数に合わせる）
+API_POOL_SIZE = int(os.getenv("API_POOL_SIZE", "10"))
+
+class APIResponseError(Exception):
+    """APIが200/304以外を返した場合の例外（例外はキャッシュされない）"""
+
+    def __init__(self, response: requests.Response):
+        super().__init__(f"HTTP {response.status_code}")
+        self.response = response
+
+# =============================================================================
+# HTTPセッション
+# =============================================================================
+
+@st.cache_resource
+def get_session() -> requests.Session:
+    """プロセス全体で共有する requests.Session"""
+    retry = Retry(
+        total=API_MAX_RETRIES,
+        backoff_factor=API_RETRY_BACKOFF,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset({"GET", "HEAD", "OPTIONS"}),
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=API_POOL_SIZE, max_retries=retry)
+
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def api_get(path: str, **kwargs) -> requests.Response:
+    return get_session().get(f"{API_BASE_URL}{path}", **kwargs)
+
+def api_post(path: str, **kwargs) -> requests.Response:
+    return get_session().post(f"{API_BASE_URL}{path}", **kwargs)
+
+@st.cache_data(ttl=HEALTH_CHECK_TTL, show_spinner=False)
+def check_api_connection() -> bool:
+    """API接続をチェック（結果は HEALTH_CHECK_TTL 秒キャッシュ）"""
+    try:
+        response = api_get("/health", timeout=5)
+        return response.status_code == 200
+    except requests.exceptions.RequestException:
+        return False
+
+@st.cache_resource
+def get_api_supervisor() -> APISupervisor:
+    """アプリから起動するAPIサーバー（再実行・セッションをまたいで1つだけ）"""
+    return APISupervisor(port=urlparse(API_BASE_URL).port or 8000)
+
+def wait_for_api(timeout: float = 5) -> bool:
+    """キャッシュを使わずにヘルスチェック（APIサーバー起動直後の確認用）"""
+    try:
+        healthy = api_get("/health", timeout=timeout).status_code == 200
+    except requests.exceptions.RequestException:
+        healthy = False
+
+    if healthy:
+        check_api_connection.clear()
+    return healthy
+
+# =============================================================================
+# キャッシュ
+# =============================================================================
+
+class ETagStore:
+    """パス -> (ETag, レスポンス本文) のLRU（最大 max_size 件。セッションのスレッド間で共有する）"""
+
+    def __init__(self, max_size: int = API_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path: str) -> Optional[tuple]:
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None:
+                self._entries.move_to_end(path)
+            return entry
+
+    def set(self, path: str, etag: str, data):
+        with self._lock:
+            self._entries[path] = (etag, data)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+@st.cache_resource
+def _etag_store() -> ETagStore:
+    """スクリプトの再実行をまたいで保持する ETag と本文"""
+    return ETagStore()
+
+@st.cache_data(ttl=API_CACHE_TTL, max_entries=API_CACHE_SIZE, show_spinner=False)
+def cached_get_json(path: str):
+    """GETレスポンスをTTLの間キャッシュ
+
+    期限切れ後は If-None-Match を付けて取得し、変更がなければ（304）前回の本文を使う。
+    """
+    store = _etag_store()
+    cached = store.get(path)
+    headers = {"If-None-Match": cached[0]} if cached else {}
+
+    response = api_get(path, headers=headers, timeout=10)
+    if response.status_code == 304 and cached:
+        return cached[1]
+    if response.status_code != 200:
+        raise APIResponseError(response)
+
+    data = response.json()
+    etag = response.headers.get("ETag")
+    if etag:
+        store.set(path, etag, data)
+    return data
+
+def invalidate_api_cache():
+    """データを変更した後に呼び、次の再実行でAPIから取り直す"""
+    cached_get_json.clear()
+
+# =============================================================================
+# エラーハンドリング
+# =============================================================================
+
+def parse_error_response(response: requests.Response) -> str:
+    """APIエラーレスポンスからエラーメッセージを抽出"""
+    try:
+        error_data = response.json()
+
+        # HTTPValidationErrorの場合
+        if 'detail' in error_data:
+            detail = error_data['detail']
+            if isinstance(detail, list) and len(detail) > 0:
+                error_items = []
+                for item in detail:
+                    if isinstance(item, dict) and 'msg' in item:
+                        error_items.append(item['msg'])
+                        # エラーの場所も含める
+                        if 'loc' in item and item['loc']:
+                            location = ' -> '.join(map(str, item['loc']))
+                            error_items[-1] += f" (場所: {location})"
+                return '\n'.join(error_items)
+            elif isinstance(detail, str):
+                return detail
+
+        # ValidationErrorの場合
+        if 'msg' in error_data:
+            msg = error_data['msg']
+            if 'loc' in error_data and error_data['loc']:
+                location = ' -> '.join(map(str, error_data['loc']))
+                return f"{msg} (場所: {location})"
+            return msg
+
+        # その他のエラー
+        if 'message' in error_data:
+            return error_data['message']
+        if 'error' in error_data:
+            return error_data['error']
+
+        # JSONパースは成功したが、予期しない構造
+        return f"予期しないエラーレスポンス形式: {json.dumps(error_data, ensure_ascii=False, indent=2)}"
+
+    except json.JSONDecodeError:
+        # JSONパースに失敗した場合
+        return f"エラーレスポンスの解析に失敗しました。レスポンス: {response.text[:500]}"
+    except Exception as e:
+        return f"エラーメッセージの抽出中にエラーが発生しました: {str(e)}"
+
+def display_error_with_details(response: requests.Response, operation: str):
+    """詳細なエラー情報を表示"""
+    error_message = parse_error_response(response)
+
+    st.error(f"{operation}に失敗しました")
+    st.error(f"HTTPステータス: {response.status_code}")
+    st.error(f"エラーメッセージ: {error_message}")
+
+    with st.expander(f"詳細なエラー情報 ({operation})"):
+        st.code(f"ステータスコード: {response.status_code}")
+        st.code(f"レスポンスヘッダー: {dict(response.headers)}")
+        st.code(f"レスポンス本文: {response.text}")
+
+# =============================================================================
+# API呼び出し
+# =============================================================================
+
+def fetch_hotels() -> List[Dict]:
+    """ホテル一覧を取得"""
+    try:
+        return cached_get_json("/hotels")
+    except APIResponseError as e:
+        display_error_with_details(e.response, "ホテル一覧の取得")
+        return []
+    except requests.exceptions.Timeout:
+        st.error("API接続タイムアウト - サーバーが起動していない可能性があります")
+        return []
+    except requests.exceptions.ConnectionError:
+        st.error("API接続エラー - サーバーに接続できません")
+        st.error(f"接続先URL: {API_BASE_URL}")
+        return []
+    except Exception as e:
+        st.error(f"API接続エラー: {str(e)}")
+        return []
+
+def fetch_messages(hotel_id: int) -> List[Dict]:
+    """メッセージ一覧を取得"""
+    try:
+        return cached_get_json(f"/messages/{hotel_id}")
+    except APIResponseError as e:
+        display_error_with_details(e.response, "メッセージの取得")
+        return []
+    except requests.exceptions.Timeout:
+        st.error("API接続タイムアウト")
+        return []
+    except requests.exceptions.ConnectionError:
+        st.error("API接続エラー")
+        return []
+    except Exception as e:
+        st.error(f"API接続エラー: {str(e)}")
+        return []
+
+def fetch_inbox_page(
+    hotel_id: int,
+    limit: int = 50,
+    before_id: Optional[int] = None,
+    platform: Optional[str] = None,
+    message_type: Optional[str] = None,
+    max_age_hours: Optional[int] = None
+) -> Dict:
+    """受信箱の1ページを取得（{'items': [...], 'next_cursor': 次のページの before_id}）"""
+    params = {
+        "limit": limit,
+        "before_id": before_id,
+        "platform": platform,
+        "message_type": message_type,
+        "max_age_hours": max_age_hours
+    }
+    query = urlencode({key: value for key, value in params.items() if value is not None})
+    try:
+        return cached_get_json(f"/hotels/{hotel_id}/inbox?{query}")
+    except APIResponseError as e:
+        display_error_with_details(e.response, "受信箱の取得")
+        return {}
+    except requests.exceptions.Timeout:
+        st.error("API接続タイムアウト")
+        return {}
+    except requests.exceptions.ConnectionError:
+        st.error("API接続エラー")
+        return {}
+    except Exception as e:
+        st.error(f"API接続エラー: {str(e)}")
+        return {}
+
+def fetch_inbox_facets(hotel_id: int) -> Dict:
+    """受信箱の絞り込みの選択肢（プラットフォーム・メッセージタイプ）"""
+    try:
+        return cached_get_json(f"/hotels/{hotel_id}/inbox/facets")
+    except Exception:
+        return {}
+
+def fetch_inbox_message(hotel_id: int, message_id: int) -> Dict:
+    """受信箱のメッセージ1件の詳細を取得"""
+    try:
+        return cached_get_json(f"/hotels/{hotel_id}/inbox/{message_id}")
+    except APIResponseError as e:
+        display_error_with_details(e.response, "メッセージの取得")
+        return {}
+    except requests.exceptions.RequestException:
+        st.error("API接続エラー")
+        return {}
+
+def fetch_response_suggestions(message_id: int, hotel_id: int) -> Dict:
+    """返信候補を取得"""
+    try:
+        response = api_post(f"/messages/{message_id}/suggestions", params={"hotel_id": hotel_id}, timeout=30)
+        if response.status_code == 200:
+            return response.json()
+        else:
+            display_error_with_details(response, "返信候補の取得")
+            return {}
+    except requests.exceptions.Timeout:
+        st.error("返信候補生成タイムアウト - 処理に時間がかかっています")
+        return {}
+    except requests.exceptions.ConnectionError:
+        st.error("API接続エラー")
+        return {}
+    except Exception as e:
+        st.error(f"API接続エラー: {str(e)}")
+        return {}
+
+def fetch_batch_suggestions(hotel_id: int, message_ids: List[int]) -> Dict:
+    """複数のメッセージの返信候補をまとめて取得"""
+    try:
+        response = api_post(
+            "/messages/suggestions/batch",
+            json={"hotel_id": hotel_id, "message_ids": message_ids},
+            timeout=60
+        )
+        if response.status_code == 200:
+            return response.json()
+        else:
+            display_error_with_details(response, "返信候補の一括取得")
+            return {}
+    except requests.exceptions.Timeout:
+        st.error("返信候補生成タイムアウト - 処理に時間がかかっています")
+        return {}
+    except requests.exceptions.ConnectionError:
+        st.error("API接続エラー")
+        return {}
+    except Exception as e:
+        st.error(f"API接続エラー: {str(e)}")
+        return {}
+
+def iter_sse_events(response: requests.Response):
+    """Server-Sent Eventsのレスポンスを (イベント名, データ) に分解"""
+    event = "message"
+    data_lines = []
+    for line in response.iter_lines(decode_unicode=True):
+        if line is None:
+            continue
+        if line == "":
+            if data_lines:
+                yield event, json.loads("\n".join(data_lines))
+            event = "message"
+            data_lines = []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data_lines.append(line[len("data:"):].strip())
+
+def stream_response_suggestions(message_id: int, hotel_id: int, placeholder) -> Dict:
+    """返信候補をストリーミングで取得し、届いた順に placeholder に表示する"""
+    received = []
+    try:
+        with api_post(f"/messages/{message_id}/suggestions/stream",
+                      params={"hotel_id": hotel_id}, stream=True, timeout=30) as response:
+            if response.status_code != 200:
+                display_error_with_details(response, "返信候補の取得")
+                return {}
+
+            for event, data in iter_sse_events(response):
+                if event == "suggestion":
+                    received.append(data['suggestion'])
+                    with placeholder.container():
+                        st.caption(f"返信候補を受信中... ({len(received)}件)")
+                        for suggestion in received:
+                            st.write(f"- {suggestion['content']}  \n  *{suggestion['source']} / 信頼度: {suggestion['confidence']:.2f}*")
+                elif event == "done":
+                    placeholder.empty()
+                    return data
+                elif event == "error":
+                    st.error(data.get('detail', '返信候補生成エラー'))
+                    break
+    except requests.exceptions.Timeout:
+        st.error("返信候補生成タイムアウト - 処理に時間がかかっています")
+    except requests.exceptions.ConnectionError:
+        st.error("API接続エラー")
+    except Exception as e:
+        st.error(f"API接続エラー: {str(e)}")
+
+    # 最終結果を受け取れなかった場合は届いた候補を使う
+    placeholder.empty()
+    received.sort(key=lambda suggestion: suggestion['confidence'], reverse=True)
+    return {'suggestions': received[:3]} if received else {}
+
+def send_response(message_id: int, response_content: str, platform: str, suggestion: Optional[Dict] = None) -> Dict:
+    """返信を送信（suggestion は選んだ候補。編集前の内容と根拠をフィードバックとして送る）"""
+    params = {
+        "response_content": response_content,
+        "platform": platform
+    }
+    if suggestion:
+        params.update({
+            "suggestion_source": suggestion['source'],
+            "suggestion_type": suggestion['type'],
+            "suggested_content": suggestion['content']
+        })
+
+    try:
+        response = api_post(f"/messages/{message_id}/respond", params=params, timeout=15)
+        if response.status_code == 200:
+            invalidate_api_cache()
+            return response.json()
+        else:
+            display_error_with_details(response, "返信の送信")
+            return {}
+    except requests.exceptions.Timeout:
+        st.error("返信送信タイムアウト")
+        return {}
+    except requests.exceptions.ConnectionError:
+        st.error("API接続エラー")
+        return {}
+    except Exception as e:
+        st.error(f"API接続エラー: {str(e)}")
+        return {}
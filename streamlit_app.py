@@ -1,8 +1,20 @@
 import streamlit as st
 import requests
-import json
+import os
 from datetime import datetime
-from typing import List, Dict, Optional
+
+from streamlit_api_client import (
+    API_BASE_URL,
+    api_get,
+    api_post,
+    check_api_connection,
+    display_error_with_details,
+    fetch_hotels,
+    fetch_messages,
+    fetch_response_suggestions,
+    invalidate_api_cache,
+    send_response
+)
 
 # ページ設定
 st.set_page_config(
@@ -11,11 +23,6 @@ st.set_page_config(
     layout="wide"
 )
 
-# APIベースURL
-import os
-# ローカル開発時は localhost:8000、Docker環境では api:8000 を使用
-API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000")
-
 # デバッグ情報を表示
 if st.sidebar.checkbox("デバッグ情報を表示"):
     st.sidebar.write(f"API_BASE_URL: {API_BASE_URL}")
@@ -29,174 +36,13 @@ if 'messages' not in st.session_state:
 if 'suggestions' not in st.session_state:
     st.session_state.suggestions = []
 
-def parse_error_response(response: requests.Response) -> str:
-    """APIエラーレスポンスからエラーメッセージを抽出"""
-    try:
-        error_data = response.json()
-        
-        # HTTPValidationErrorの場合
-        if 'detail' in error_data:
-            detail = error_data['detail']
-            if isinstance(detail, list) and len(detail) > 0:
-                error_items = []
-                for item in detail:
-                    if isinstance(item, dict) and 'msg' in item:
-                        error_items.append(item['msg'])
-                        # エラーの場所も含める
-                        if 'loc' in item and item['loc']:
-                            location = ' -> '.join(map(str, item['loc']))
-                            error_items[-1] += f" (場所: {location})"
-                return '\n'.join(error_items)
-            elif isinstance(detail, str):
-                return detail
-        
-        # ValidationErrorの場合
-        if 'msg' in error_data:
-            msg = error_data['msg']
-            if 'loc' in error_data and error_data['loc']:
-                location = ' -> '.join(map(str, error_data['loc']))
-                return f"{msg} (場所: {location})"
-            return msg
-        
-        # その他のエラー
-        if 'message' in error_data:
-            return error_data['message']
-        if 'error' in error_data:
-            return error_data['error']
-        
-        # JSONパースは成功したが、予期しない構造
-        return f"予期しないエラーレスポンス形式: {json.dumps(error_data, ensure_ascii=False, indent=2)}"
-        
-    except json.JSONDecodeError:
-        # JSONパースに失敗した場合
-        return f"エラーレスポンスの解析に失敗しました。レスポンス: {response.text[:500]}"
-    except Exception as e:
-        return f"エラーメッセージの抽出中にエラーが発生しました: {str(e)}"
-
-def display_error_with_details(response: requests.Response, operation: str):
-    """詳細なエラー情報を表示"""
-    error_message = parse_error_response(response)
-    
-    st.error(f"{operation}に失敗しました")
-    st.error(f"HTTPステータス: {response.status_code}")
-    st.error(f"エラーメッセージ: {error_message}")
-    
-    # デバッグ情報を表示（デバッグモードが有効な場合）
-    if st.sidebar.checkbox("デバッグ情報を表示"):
-        with st.expander(f"詳細なエラー情報 ({operation})"):
-            st.code(f"ステータスコード: {response.status_code}")
-            st.code(f"レスポンスヘッダー: {dict(response.headers)}")
-            st.code(f"レスポンス本文: {response.text}")
-
-def test_api_connection() -> bool:
-    """API接続をテスト"""
-    try:
-        response = requests.get(f"{API_BASE_URL}/health", timeout=5)
-        if response.status_code == 200:
-            return True
-        else:
-            display_error_with_details(response, "API接続テスト")
-            return False
-    except requests.exceptions.Timeout:
-        st.error("API接続タイムアウト - サーバーが起動していない可能性があります")
-        return False
-    except requests.exceptions.ConnectionError:
-        st.error("API接続エラー - サーバーに接続できません")
-        st.error(f"接続先URL: {API_BASE_URL}")
-        return False
-    except Exception as e:
-        st.error(f"API接続エラー: {str(e)}")
-        return False
-
-def fetch_hotels() -> List[Dict]:
-    """ホテル一覧を取得"""
-    try:
-        response = requests.get(f"{API_BASE_URL}/hotels", timeout=10)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            display_error_with_details(response, "ホテル一覧の取得")
-            return []
-    except requests.exceptions.Timeout:
-        st.error("API接続タイムアウト - サーバーが起動していない可能性があります")
-        return []
-    except requests.exceptions.ConnectionError:
-        st.error("API接続エラー - サーバーに接続できません")
-        st.error(f"接続先URL: {API_BASE_URL}")
-        return []
-    except Exception as e:
-        st.error(f"API接続エラー: {str(e)}")
-        return []
-
-def fetch_messages(hotel_id: int) -> List[Dict]:
-    """メッセージ一覧を取得"""
-    try:
-        response = requests.get(f"{API_BASE_URL}/messages/{hotel_id}", timeout=10)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            display_error_with_details(response, "メッセージの取得")
-            return []
-    except requests.exceptions.Timeout:
-        st.error("API接続タイムアウト")
-        return []
-    except requests.exceptions.ConnectionError:
-        st.error("API接続エラー")
-        return []
-    except Exception as e:
-        st.error(f"API接続エラー: {str(e)}")
-        return []
-
-def fetch_response_suggestions(message_id: int, hotel_id: int) -> Dict:
-    """返信候補を取得"""
-    try:
-        response = requests.post(f"{API_BASE_URL}/messages/{message_id}/suggestions", 
-                               params={"hotel_id": hotel_id}, timeout=30)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            display_error_with_details(response, "返信候補の取得")
-            return {}
-    except requests.exceptions.Timeout:
-        st.error("返信候補生成タイムアウト - 処理に時間がかかっています")
-        return {}
-    except requests.exceptions.ConnectionError:
-        st.error("API接続エラー")
-        return {}
-    except Exception as e:
-        st.error(f"API接続エラー: {str(e)}")
-        return {}
-
-def send_response(message_id: int, response_content: str, platform: str) -> Dict:
-    """返信を送信"""
-    try:
-        response = requests.post(f"{API_BASE_URL}/messages/{message_id}/respond",
-                               params={
-                                   "response_content": response_content,
-                                   "platform": platform
-                               }, timeout=15)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            display_error_with_details(response, "返信の送信")
-            return {}
-    except requests.exceptions.Timeout:
-        st.error("返信送信タイムアウト")
-        return {}
-    except requests.exceptions.ConnectionError:
-        st.error("API接続エラー")
-        return {}
-    except Exception as e:
-        st.error(f"API接続エラー: {str(e)}")
-        return {}
-
 def main():
     st.title("🏨 ホテル返信システム")
     st.markdown("---")
     
     # API接続テスト
-    if not test_api_connection():
-        st.error("APIサーバーに接続できません。以下を確認してください：")
+    if not check_api_connection():
+        st.error(f"APIサーバーに接続できません（接続先URL: {API_BASE_URL}）。以下を確認してください：")
         st.write("1. Dockerサービスが起動しているか確認")
         st.write("2. APIサーバーが正常に動作しているか確認")
         st.write("3. ネットワーク設定を確認")
@@ -232,8 +78,9 @@ def main():
                 if st.button("新しいメッセージを取得", type="primary"):
                     with st.spinner("メッセージを取得中..."):
                         try:
-                            result = requests.post(f"{API_BASE_URL}/messages/fetch/{hotel['id']}", timeout=30)
+                            result = api_post(f"/messages/fetch/{hotel['id']}", timeout=30)
                             if result.status_code == 200:
+                                invalidate_api_cache()
                                 st.success("メッセージを取得しました")
                                 st.rerun()
                             else:
@@ -340,7 +187,7 @@ def main():
             if st.button("分析データを更新"):
                 with st.spinner("分析データを取得中..."):
                     try:
-                        response = requests.get(f"{API_BASE_URL}/hotels/{hotel['id']}/analytics", timeout=15)
+                        response = api_get(f"/hotels/{hotel['id']}/analytics", timeout=15)
                         if response.status_code == 200:
                             analytics = response.json()
                             
@@ -383,7 +230,7 @@ def main():
                 if st.button("観光地情報を取得"):
                     with st.spinner("観光地情報を取得中..."):
                         try:
-                            response = requests.get(f"{API_BASE_URL}/hotels/{hotel['id']}/nearby-attractions", timeout=15)
+                            response = api_get(f"/hotels/{hotel['id']}/nearby-attractions", timeout=15)
                             if response.status_code == 200:
                                 attractions_data = response.json()
                                 attractions = attractions_data.get('attractions', [])
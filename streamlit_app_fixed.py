@@ -1,15 +1,20 @@
 import streamlit as st
 import requests
-import json
 import os
-import sys
-import subprocess
 import threading
-import time
-import sqlite3
-from datetime import datetime, timedelta
 from typing import List, Dict, Optional
-import random
+
+import streamlit_api_client as api_client
+from streamlit_api_client import (
+    API_BASE_URL,
+    api_get,
+    check_api_connection,
+    display_error_with_details,
+    get_api_supervisor,
+    invalidate_api_cache,
+    wait_for_api
+)
+from streamlit_standalone import get_repository
 
 # ページ設定
 st.set_page_config(
@@ -18,9 +23,6 @@ st.set_page_config(
     layout="wide"
 )
 
-# APIベースURL
-API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000")
-
 # セッション状態の初期化
 if 'selected_hotel' not in st.session_state:
     st.session_state.selected_hotel = None
@@ -28,6 +30,10 @@ if 'messages' not in st.session_state:
     st.session_state.messages = []
 if 'suggestions' not in st.session_state:
     st.session_state.suggestions = []
+if 'prefetched_suggestions' not in st.session_state:
+    st.session_state.prefetched_suggestions = {}
+if 'inbox_table_version' not in st.session_state:
+    st.session_state.inbox_table_version = 0
 if 'api_server_started' not in st.session_state:
     st.session_state.api_server_started = False
 if 'database_initialized' not in st.session_state:
@@ -40,74 +46,9 @@ if 'standalone_mode' not in st.session_state:
 # =============================================================================
 
 def init_database():
-    """データベースを初期化"""
+    """データベースを初期化（app/models.py のテーブルを作成）"""
     try:
-        # SQLiteデータベースを作成
-        conn = sqlite3.connect('hotel_agent.db')
-        cursor = conn.cursor()
-        
-        # テーブルを作成
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS hotels (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                address TEXT NOT NULL,
-                latitude REAL,
-                longitude REAL,
-                city TEXT NOT NULL,
-                country TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS bookings (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                booking_id TEXT UNIQUE,
-                hotel_id INTEGER NOT NULL,
-                guest_name TEXT,
-                check_in TIMESTAMP,
-                check_out TIMESTAMP,
-                room_type TEXT,
-                guest_count INTEGER,
-                booking_reference TEXT UNIQUE,
-                total_amount REAL,
-                status TEXT DEFAULT 'confirmed',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (hotel_id) REFERENCES hotels (id)
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS guest_messages (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                booking_id INTEGER,
-                platform TEXT NOT NULL,
-                message_content TEXT NOT NULL,
-                message_type TEXT,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                is_processed BOOLEAN DEFAULT FALSE,
-                FOREIGN KEY (booking_id) REFERENCES bookings (id)
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS response_templates (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                hotel_id INTEGER NOT NULL,
-                message_type TEXT NOT NULL,
-                template_content TEXT NOT NULL,
-                language TEXT DEFAULT 'ja',
-                is_active BOOLEAN DEFAULT TRUE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (hotel_id) REFERENCES hotels (id)
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
-        
+        get_repository().create_tables()
         st.session_state.database_initialized = True
         return True
     except Exception as e:
@@ -117,93 +58,7 @@ def init_database():
 def create_sample_data():
     """サンプルデータを作成"""
     try:
-        conn = sqlite3.connect('hotel_agent.db')
-        cursor = conn.cursor()
-        
-        # ホテルデータを作成
-        hotels_data = [
-            ("東京グランドホテル", "東京都千代田区丸の内1-1-1", 35.6762, 139.6503, "東京", "日本"),
-            ("大阪ビジネスホテル", "大阪府大阪市北区梅田1-1-1", 34.6937, 135.5023, "大阪", "日本"),
-            ("京都伝統旅館", "京都府京都市下京区四条通烏丸西入ル", 35.0116, 135.7681, "京都", "日本")
-        ]
-        
-        hotel_ids = []
-        for hotel_data in hotels_data:
-            cursor.execute('''
-                INSERT OR IGNORE INTO hotels (name, address, latitude, longitude, city, country)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', hotel_data)
-            hotel_id = cursor.lastrowid
-            if hotel_id == 0:  # 既に存在する場合
-                cursor.execute('SELECT id FROM hotels WHERE name = ?', (hotel_data[0],))
-                hotel_id = cursor.fetchone()[0]
-            hotel_ids.append(hotel_id)
-        
-        # 予約データを作成
-        for hotel_id in hotel_ids:
-            for i in range(5):
-                check_in = datetime.now() + timedelta(days=random.randint(-30, 30))
-                check_out = check_in + timedelta(days=random.randint(1, 7))
-                
-                cursor.execute('''
-                    INSERT OR IGNORE INTO bookings 
-                    (hotel_id, guest_name, check_in, check_out, room_type, guest_count, booking_reference, total_amount, status)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    hotel_id,
-                    f"ゲスト{i+1}",
-                    check_in.isoformat(),
-                    check_out.isoformat(),
-                    random.choice(["シングル", "ダブル", "ツイン", "スイート"]),
-                    random.randint(1, 4),
-                    f"REF{hotel_id:03d}{i+1:03d}",
-                    random.randint(8000, 15000),
-                    random.choice(["confirmed", "cancelled", "completed"])
-                ))
-        
-        # サンプルメッセージを作成
-        sample_messages = [
-            ("チェックイン前に荷物を預かってもらえますか？午前10時に到着予定です。", "luggage"),
-            ("来月の15日から3泊4日で予約できますか？", "availability"),
-            ("ホテル周辺でおすすめの観光地はありますか？", "attractions"),
-            ("Wi-Fiのパスワードを教えてください。", "general"),
-            ("朝食は何時からですか？", "general")
-        ]
-        
-        for hotel_id in hotel_ids:
-            for message_content, message_type in sample_messages:
-                # 予約IDを取得
-                cursor.execute('SELECT id FROM bookings WHERE hotel_id = ? LIMIT 1', (hotel_id,))
-                booking_result = cursor.fetchone()
-                if booking_result:
-                    booking_id = booking_result[0]
-                    
-                    cursor.execute('''
-                        INSERT OR IGNORE INTO guest_messages 
-                        (booking_id, platform, message_content, message_type, is_processed)
-                        VALUES (?, ?, ?, ?, ?)
-                    ''', (booking_id, "booking.com", message_content, message_type, False))
-        
-        # テンプレートデータを作成
-        templates_data = [
-            ("luggage", "お荷物の預かりサービスをご利用いただけます。フロントデスクまでお越しください。"),
-            ("luggage", "チェックイン前・チェックアウト後もお荷物をお預かりいたします。"),
-            ("availability", "空室状況をお調べいたします。ご希望の日程をお教えください。"),
-            ("availability", "ご予約可能な期間をご案内いたします。お急ぎの場合はお電話にてお問い合わせください。"),
-            ("attractions", "周辺の観光地をご案内いたします。おすすめスポットをご紹介いたします。"),
-            ("attractions", "ホテル周辺の観光情報をお調べいたします。アクセス方法もご案内いたします。")
-        ]
-        
-        for hotel_id in hotel_ids:
-            for template_type, template_content in templates_data:
-                cursor.execute('''
-                    INSERT OR IGNORE INTO response_templates 
-                    (hotel_id, message_type, template_content, language, is_active)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (hotel_id, template_type, template_content, "ja", True))
-        
-        conn.commit()
-        conn.close()
+        get_repository().create_sample_data()
         return True
     except Exception as e:
         st.error(f"サンプルデータ作成エラー: {str(e)}")
@@ -216,81 +71,22 @@ def create_sample_data():
 def get_hotels_standalone() -> List[Dict]:
     """スタンドアロンモードでホテル一覧を取得"""
     try:
-        conn = sqlite3.connect('hotel_agent.db')
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT * FROM hotels')
-        hotels = cursor.fetchall()
-        
-        result = []
-        for hotel in hotels:
-            result.append({
-                'id': hotel[0],
-                'name': hotel[1],
-                'address': hotel[2],
-                'latitude': hotel[3],
-                'longitude': hotel[4],
-                'city': hotel[5],
-                'country': hotel[6]
-            })
-        
-        conn.close()
-        return result
+        return get_repository().hotels()
     except Exception as e:
         st.error(f"ホテル取得エラー: {str(e)}")
         return []
 
-def get_messages_standalone(hotel_id: int) -> List[Dict]:
-    """スタンドアロンモードでメッセージ一覧を取得"""
-    try:
-        conn = sqlite3.connect('hotel_agent.db')
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT gm.* FROM guest_messages gm
-            JOIN bookings b ON gm.booking_id = b.id
-            WHERE b.hotel_id = ? AND gm.is_processed = 0
-        ''', (hotel_id,))
-        
-        messages = cursor.fetchall()
-        
-        result = []
-        for message in messages:
-            result.append({
-                'id': message[0],
-                'booking_id': message[1],
-                'platform': message[2],
-                'message_content': message[3],
-                'message_type': message[4],
-                'timestamp': message[5],
-                'is_processed': bool(message[6])
-            })
-        
-        conn.close()
-        return result
-    except Exception as e:
-        st.error(f"メッセージ取得エラー: {str(e)}")
-        return []
-
 def generate_response_suggestions_standalone(message_content: str, message_type: str, hotel_id: int) -> List[Dict]:
     """スタンドアロンモードで返信候補を生成"""
     try:
-        conn = sqlite3.connect('hotel_agent.db')
-        cursor = conn.cursor()
-        
         # テンプレートから返信候補を生成
-        cursor.execute('''
-            SELECT template_content FROM response_templates 
-            WHERE hotel_id = ? AND message_type = ? AND is_active = 1
-        ''', (hotel_id, message_type))
-        
-        templates = cursor.fetchall()
+        templates = get_repository().active_templates(hotel_id, message_type)
         
         suggestions = []
         if templates:
             for i, template in enumerate(templates):
                 suggestions.append({
-                    'content': template[0],
+                    'content': template,
                     'confidence': 0.8 + (i * 0.05),
                     'type': 'Template Response',
                     'source': 'Response Template'
@@ -325,7 +121,6 @@ def generate_response_suggestions_standalone(message_content: str, message_type:
                     'source': 'Default Template'
                 })
         
-        conn.close()
         return suggestions
     except Exception as e:
         st.error(f"返信候補生成エラー: {str(e)}")
@@ -334,51 +129,19 @@ def generate_response_suggestions_standalone(message_content: str, message_type:
 def get_analytics_standalone(hotel_id: int) -> Dict:
     """スタンドアロンモードで分析データを取得"""
     try:
-        conn = sqlite3.connect('hotel_agent.db')
-        cursor = conn.cursor()
-        
-        # 予約分析
-        cursor.execute('SELECT COUNT(*) FROM bookings WHERE hotel_id = ?', (hotel_id,))
-        total_bookings = cursor.fetchone()[0]
-        
-        cursor.execute('SELECT room_type, COUNT(*) FROM bookings WHERE hotel_id = ? GROUP BY room_type', (hotel_id,))
-        room_types = dict(cursor.fetchall())
-        
-        cursor.execute('SELECT AVG(guest_count) FROM bookings WHERE hotel_id = ?', (hotel_id,))
-        avg_guest_count = cursor.fetchone()[0] or 0
-        
-        # メッセージ分析
-        cursor.execute('''
-            SELECT COUNT(*) FROM guest_messages gm
-            JOIN bookings b ON gm.booking_id = b.id
-            WHERE b.hotel_id = ?
-        ''', (hotel_id,))
-        total_messages = cursor.fetchone()[0]
-        
-        cursor.execute('''
-            SELECT COUNT(*) FROM guest_messages gm
-            JOIN bookings b ON gm.booking_id = b.id
-            WHERE b.hotel_id = ? AND gm.is_processed = 1
-        ''', (hotel_id,))
-        processed_messages = cursor.fetchone()[0]
-        
-        # テンプレート数
-        cursor.execute('SELECT COUNT(*) FROM response_templates WHERE hotel_id = ?', (hotel_id,))
-        template_count = cursor.fetchone()[0]
-        
-        conn.close()
+        stats = get_repository().analytics(hotel_id)
         
         return {
             'booking_analysis': {
-                'total_bookings': total_bookings,
+                'total_bookings': stats['total_bookings'],
                 'average_stay_duration': 2.5,  # デフォルト値
-                'popular_room_types': room_types,
-                'average_guest_count': avg_guest_count
+                'popular_room_types': stats['room_types'],
+                'average_guest_count': stats['average_guest_count']
             },
             'learning_result': {
-                'messages_processed': processed_messages,
-                'responses_processed': processed_messages,
-                'templates_loaded': template_count
+                'messages_processed': stats['processed_messages'],
+                'responses_processed': stats['processed_messages'],
+                'templates_loaded': stats['template_count']
             }
         }
     except Exception as e:
@@ -388,13 +151,7 @@ def get_analytics_standalone(hotel_id: int) -> Dict:
 def get_nearby_attractions_standalone(hotel_id: int) -> List[Dict]:
     """スタンドアロンモードで周辺観光地を取得"""
     try:
-        conn = sqlite3.connect('hotel_agent.db')
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT city FROM hotels WHERE id = ?', (hotel_id,))
-        hotel_city = cursor.fetchone()[0]
-        
-        conn.close()
+        hotel_city = get_repository().hotel_city(hotel_id)
         
         # 都市に応じた観光地データ
         city_attractions = {
@@ -447,222 +204,302 @@ def start_api_server():
     if st.session_state.api_server_started:
         return True
     
+    # 別の方法で起動済みのサーバーがあればそれを使う
+    if wait_for_api(timeout=1):
+        st.session_state.api_server_started = True
+        return True
+    
     try:
-        # FastAPIサーバーをバックグラウンドで起動
-        process = subprocess.Popen(
-            [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "0.0.0.0", "--port", "8000"],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
-        
-        # 少し待機してサーバーが起動するのを待つ
-        time.sleep(3)
-        
-        # サーバーが起動しているかチェック
-        try:
-            response = requests.get(f"{API_BASE_URL}/health", timeout=5)
-            if response.status_code == 200:
-                st.session_state.api_server_started = True
-                return True
-        except:
-            pass
-        
+        # FastAPIサーバーをバックグラウンドで起動（ワーカーが落ちた場合は再起動される）
+        supervisor = get_api_supervisor()
+        supervisor.start()
+        
+        # /health が応答するまで待つ（起動にかかった時間だけ待つ）
+        if supervisor.wait_until_ready() and wait_for_api():
+            st.session_state.api_server_started = True
+            return True
+        
+        # 起動に失敗した場合は直近のログを表示
+        with st.expander("APIサーバーのログ"):
+            st.code("\n".join(supervisor.logs()) or "(ログなし)")
         return False
     except Exception as e:
         st.error(f"APIサーバー起動エラー: {str(e)}")
         return False
 
-def check_api_connection():
-    """API接続をチェック"""
-    try:
-        response = requests.get(f"{API_BASE_URL}/health", timeout=5)
-        return response.status_code == 200
-    except:
-        return False
-
 # =============================================================================
-# エラーハンドリング機能
-# =============================================================================
-
-def parse_error_response(response: requests.Response) -> str:
-    """APIエラーレスポンスからエラーメッセージを抽出"""
-    try:
-        error_data = response.json()
-        
-        # HTTPValidationErrorの場合
-        if 'detail' in error_data:
-            detail = error_data['detail']
-            if isinstance(detail, list) and len(detail) > 0:
-                error_items = []
-                for item in detail:
-                    if isinstance(item, dict) and 'msg' in item:
-                        error_items.append(item['msg'])
-                        # エラーの場所も含める
-                        if 'loc' in item and item['loc']:
-                            location = ' -> '.join(map(str, item['loc']))
-                            error_items[-1] += f" (場所: {location})"
-                return '\n'.join(error_items)
-            elif isinstance(detail, str):
-                return detail
-        
-        # ValidationErrorの場合
-        if 'msg' in error_data:
-            msg = error_data['msg']
-            if 'loc' in error_data and error_data['loc']:
-                location = ' -> '.join(map(str, error_data['loc']))
-                return f"{msg} (場所: {location})"
-            return msg
-        
-        # その他のエラー
-        if 'message' in error_data:
-            return error_data['message']
-        if 'error' in error_data:
-            return error_data['error']
-        
-        # JSONパースは成功したが、予期しない構造
-        return f"予期しないエラーレスポンス形式: {json.dumps(error_data, ensure_ascii=False, indent=2)}"
-        
-    except json.JSONDecodeError:
-        # JSONパースに失敗した場合
-        return f"エラーレスポンスの解析に失敗しました。レスポンス: {response.text[:500]}"
-    except Exception as e:
-        return f"エラーメッセージの抽出中にエラーが発生しました: {str(e)}"
-
-def display_error_with_details(response: requests.Response, operation: str):
-    """詳細なエラー情報を表示"""
-    error_message = parse_error_response(response)
-    
-    st.error(f"{operation}に失敗しました")
-    st.error(f"HTTPステータス: {response.status_code}")
-    st.error(f"エラーメッセージ: {error_message}")
-    
-    # デバッグ情報を表示（デバッグモードが有効な場合）
-    if st.sidebar.checkbox("デバッグ情報を表示"):
-        with st.expander(f"詳細なエラー情報 ({operation})"):
-            st.code(f"ステータスコード: {response.status_code}")
-            st.code(f"レスポンスヘッダー: {dict(response.headers)}")
-            st.code(f"レスポンス本文: {response.text}")
-
-# =============================================================================
-# API呼び出し機能
+# API呼び出し機能（スタンドアロンモードではローカルのデータベースを使う）
 # =============================================================================
 
 def fetch_hotels() -> List[Dict]:
     """ホテル一覧を取得"""
     if st.session_state.standalone_mode:
         return get_hotels_standalone()
-    
-    try:
-        response = requests.get(f"{API_BASE_URL}/hotels", timeout=10)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            display_error_with_details(response, "ホテル一覧の取得")
-            return []
-    except requests.exceptions.Timeout:
-        st.error("API接続タイムアウト - サーバーが起動していない可能性があります")
-        return []
-    except requests.exceptions.ConnectionError:
-        st.error("API接続エラー - サーバーに接続できません")
-        st.error(f"接続先URL: {API_BASE_URL}")
-        return []
-    except Exception as e:
-        st.error(f"API接続エラー: {str(e)}")
-        return []
-
-def fetch_messages(hotel_id: int) -> List[Dict]:
-    """メッセージ一覧を取得"""
-    if st.session_state.standalone_mode:
-        return get_messages_standalone(hotel_id)
-    
-    try:
-        response = requests.get(f"{API_BASE_URL}/messages/{hotel_id}", timeout=10)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            display_error_with_details(response, "メッセージの取得")
-            return []
-    except requests.exceptions.Timeout:
-        st.error("API接続タイムアウト")
-        return []
-    except requests.exceptions.ConnectionError:
-        st.error("API接続エラー")
-        return []
-    except Exception as e:
-        st.error(f"API接続エラー: {str(e)}")
-        return []
+    return api_client.fetch_hotels()
 
 def fetch_response_suggestions(message_id: int, hotel_id: int) -> Dict:
     """返信候補を取得"""
     if st.session_state.standalone_mode:
         # メッセージ内容を取得
-        messages = get_messages_standalone(hotel_id)
-        message_content = ""
-        message_type = "general"
-        
-        for msg in messages:
-            if msg['id'] == message_id:
-                message_content = msg['message_content']
-                message_type = msg['message_type']
-                break
+        message = get_repository().message(message_id) or {}
+        message_content = message.get('message_content') or ""
+        message_type = message.get('message_type') or "general"
         
         suggestions = generate_response_suggestions_standalone(message_content, message_type, hotel_id)
         return {'suggestions': suggestions}
     
-    try:
-        response = requests.post(f"{API_BASE_URL}/messages/{message_id}/suggestions", 
-                               params={"hotel_id": hotel_id}, timeout=30)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            display_error_with_details(response, "返信候補の取得")
-            return {}
-    except requests.exceptions.Timeout:
-        st.error("返信候補生成タイムアウト - 処理に時間がかかっています")
-        return {}
-    except requests.exceptions.ConnectionError:
-        st.error("API接続エラー")
-        return {}
-    except Exception as e:
-        st.error(f"API接続エラー: {str(e)}")
-        return {}
+    return api_client.fetch_response_suggestions(message_id, hotel_id)
+
+def fetch_batch_suggestions(hotel_id: int, message_ids: List[int]) -> Dict[int, List[Dict]]:
+    """複数のメッセージの返信候補をまとめて取得（メッセージID -> 候補）"""
+    if st.session_state.standalone_mode:
+        return {
+            message_id: fetch_response_suggestions(message_id, hotel_id).get('suggestions', [])
+            for message_id in message_ids
+        }
+    
+    data = api_client.fetch_batch_suggestions(hotel_id, message_ids)
+    return {item['message_id']: item['suggestions'] for item in data.get('results', [])}
+
+def stream_response_suggestions(message_id: int, hotel_id: int, placeholder) -> Dict:
+    """返信候補をストリーミングで取得し、届いた順に placeholder に表示する"""
+    if st.session_state.standalone_mode:
+        return fetch_response_suggestions(message_id, hotel_id)
+    return api_client.stream_response_suggestions(message_id, hotel_id, placeholder)
 
-def send_response(message_id: int, response_content: str, platform: str) -> Dict:
-    """返信を送信"""
+def send_response(message_id: int, response_content: str, platform: str, suggestion: Optional[Dict] = None) -> Dict:
+    """返信を送信（suggestion は選んだ候補。編集前の内容と根拠をフィードバックとして送る）"""
     if st.session_state.standalone_mode:
         # スタンドアロンモードでは、メッセージを処理済みにマーク
         try:
-            conn = sqlite3.connect('hotel_agent.db')
-            cursor = conn.cursor()
-            cursor.execute('UPDATE guest_messages SET is_processed = 1 WHERE id = ?', (message_id,))
-            conn.commit()
-            conn.close()
+            get_repository().mark_processed(message_id)
             return {'result': {'success': True}}
         except Exception as e:
             st.error(f"返信送信エラー: {str(e)}")
             return {'result': {'success': False}}
     
-    try:
-        response = requests.post(f"{API_BASE_URL}/messages/{message_id}/respond",
-                               params={
-                                   "response_content": response_content,
-                                   "platform": platform
-                               }, timeout=15)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            display_error_with_details(response, "返信の送信")
+    return api_client.send_response(message_id, response_content, platform, suggestion)
+
+# =============================================================================
+# 受信箱（1ページ分と選択したメッセージだけを取得・表示する）
+# =============================================================================
+
+# 経過時間の絞り込み（表示名 -> 時間）
+INBOX_AGE_OPTIONS = {
+    "すべて": None,
+    "24時間以内": 24,
+    "7日以内": 24 * 7,
+    "30日以内": 24 * 30
+}
+
+INBOX_PAGE_SIZES = [25, 50, 100, 200]
+
+def fetch_inbox_page(hotel_id: int, **filters) -> Dict:
+    """受信箱の1ページを取得"""
+    if st.session_state.standalone_mode:
+        try:
+            return get_repository().inbox_page(hotel_id, **filters)
+        except Exception as e:
+            st.error(f"メッセージ取得エラー: {str(e)}")
             return {}
-    except requests.exceptions.Timeout:
-        st.error("返信送信タイムアウト")
-        return {}
-    except requests.exceptions.ConnectionError:
-        st.error("API接続エラー")
-        return {}
-    except Exception as e:
-        st.error(f"API接続エラー: {str(e)}")
-        return {}
+    return api_client.fetch_inbox_page(hotel_id, **filters)
+
+def fetch_inbox_facets(hotel_id: int) -> Dict:
+    """受信箱の絞り込みの選択肢"""
+    if st.session_state.standalone_mode:
+        try:
+            return get_repository().inbox_facets(hotel_id)
+        except Exception:
+            return {}
+    return api_client.fetch_inbox_facets(hotel_id)
+
+def fetch_inbox_message(hotel_id: int, message_id: int) -> Dict:
+    """受信箱のメッセージ1件の詳細を取得"""
+    if st.session_state.standalone_mode:
+        try:
+            return get_repository().inbox_message(hotel_id, message_id) or {}
+        except Exception as e:
+            st.error(f"メッセージ取得エラー: {str(e)}")
+            return {}
+    return api_client.fetch_inbox_message(hotel_id, message_id)
+
+def render_inbox(hotel: Dict):
+    """受信箱（絞り込み・ページ送り・一覧表・詳細）"""
+    facets = fetch_inbox_facets(hotel['id'])
+    
+    col_platform, col_type, col_age, col_size = st.columns(4)
+    with col_platform:
+        platform = st.selectbox("プラットフォーム", ["すべて"] + facets.get('platforms', []), key="inbox_platform")
+    with col_type:
+        message_type = st.selectbox("メッセージタイプ", ["すべて"] + facets.get('message_types', []), key="inbox_message_type")
+    with col_age:
+        age = st.selectbox("受信日時", list(INBOX_AGE_OPTIONS), key="inbox_age")
+    with col_size:
+        page_size = st.selectbox("表示件数", INBOX_PAGE_SIZES, index=1, key="inbox_page_size")
+    
+    filters = {
+        'limit': page_size,
+        'platform': None if platform == "すべて" else platform,
+        'message_type': None if message_type == "すべて" else message_type,
+        'max_age_hours': INBOX_AGE_OPTIONS[age]
+    }
+    
+    # ホテルや絞り込みが変わったら1ページ目に戻る（inbox_cursors は各ページの before_id）
+    filter_key = (hotel['id'], st.session_state.standalone_mode, tuple(sorted(filters.items())))
+    if st.session_state.get('inbox_filter_key') != filter_key:
+        st.session_state.inbox_filter_key = filter_key
+        st.session_state.inbox_cursors = [None]
+        st.session_state.prefetched_suggestions = {}
+    cursors = st.session_state.inbox_cursors
+    
+    page = fetch_inbox_page(hotel['id'], before_id=cursors[-1], **filters)
+    items = page.get('items', [])
+    if not items:
+        st.info("新しいメッセージはありません")
+        if len(cursors) > 1 and st.button("最初のページに戻る"):
+            st.session_state.inbox_cursors = [None]
+            st.rerun()
+        return
+    
+    col_list, col_detail = st.columns([3, 2])
+    
+    with col_list:
+        st.subheader(f"未処理メッセージ（{len(cursors)}ページ目・{len(items)}件）")
+        table = st.dataframe(
+            [
+                {
+                    "受信時刻": item['timestamp'],
+                    "プラットフォーム": item['platform'],
+                    "タイプ": item['message_type'],
+                    "ゲスト": item['guest_name'],
+                    "メッセージ": item['preview']
+                }
+                for item in items
+            ],
+            hide_index=True,
+            on_select="rerun",
+            selection_mode="single-row",
+            key=f"inbox_table_{filter_key}_{len(cursors)}_{st.session_state.inbox_table_version}"
+        )
+        
+        # 1ページ分の返信候補を1回のリクエストで先に取得しておく（選択したときにすぐ表示できる）
+        pending_ids = [item['id'] for item in items if item['id'] not in st.session_state.prefetched_suggestions]
+        if st.button("このページの返信候補を先に取得", disabled=not pending_ids):
+            with st.spinner(f"{len(pending_ids)}件の返信候補を取得中..."):
+                st.session_state.prefetched_suggestions.update(fetch_batch_suggestions(hotel['id'], pending_ids))
+            st.rerun()
+        
+        col_prev, col_next = st.columns(2)
+        with col_prev:
+            if st.button("← 前のページ", disabled=len(cursors) == 1):
+                cursors.pop()
+                st.rerun()
+        with col_next:
+            if st.button("次のページ →", disabled=page.get('next_cursor') is None):
+                cursors.append(page['next_cursor'])
+                st.rerun()
+    
+    with col_detail:
+        selected_rows = table.selection.rows
+        if not selected_rows:
+            st.info("一覧からメッセージを選択すると詳細を表示します")
+            return
+        
+        message = fetch_inbox_message(hotel['id'], items[selected_rows[0]]['id'])
+        if message:
+            render_message_detail(hotel, message)
+
+def render_message_detail(hotel: Dict, message: Dict):
+    """選択したメッセージの詳細と返信候補"""
+    booking = message.get('booking') or {}
+    
+    st.subheader("メッセージ詳細")
+    st.write(f"**メッセージ:** {message['message_content']}")
+    st.write(f"**プラットフォーム:** {message['platform']}")
+    st.write(f"**受信時刻:** {message['timestamp']}")
+    st.write(f"**メッセージタイプ:** {message['message_type']}")
+    if booking:
+        st.write(f"**ゲスト:** {booking.get('guest_name')}（{booking.get('guest_count') or '-'}名・{booking.get('room_type') or '-'}）")
+        st.write(f"**宿泊日:** {booking.get('check_in') or '-'} 〜 {booking.get('check_out') or '-'}")
+    
+    # 先読みした候補があればそれを使う（ボタンで取得し直せる）
+    prefetched = st.session_state.prefetched_suggestions.get(message['id'])
+    if prefetched is not None and st.session_state.get('current_message', {}).get('id') != message['id']:
+        st.session_state.suggestions = prefetched
+        st.session_state.current_message = message
+    
+    if st.button(f"返信候補を取得", key=f"suggest_{message['id']}"):
+        # 候補はソースが終わった順に表示し、最後に順位付けした結果に置き換える
+        suggestions_data = stream_response_suggestions(message['id'], hotel['id'], st.empty())
+        st.session_state.suggestions = suggestions_data.get('suggestions', [])
+        st.session_state.current_message = message
+    
+    # 返信候補を表示
+    if st.session_state.suggestions and st.session_state.get('current_message', {}).get('id') == message['id']:
+        st.subheader("返信候補")
+        
+        for i, suggestion in enumerate(st.session_state.suggestions):
+            st.write(f"**候補 {i+1}:**")
+            
+            # 返信内容を表示
+            st.write(suggestion['content'])
+            
+            # 信頼度とタイプを表示
+            col_info1, col_info2, col_info3 = st.columns(3)
+            with col_info1:
+                st.write(f"*信頼度: {suggestion['confidence']:.2f}*")
+            with col_info2:
+                st.write(f"*タイプ: {suggestion['type']}*")
+            with col_info3:
+                st.write(f"*根拠: {suggestion['source']}*")
+            
+            # 根拠ソースの詳細説明
+            with st.expander(f"根拠ソースの詳細 (候補 {i+1})"):
+                source_explanations = {
+                    'Response Template': 'ホテルの返信テンプレートに基づく回答',
+                    'Default Template': 'システムのデフォルトテンプレートに基づく回答',
+                    'Template Response': 'テンプレートに基づく回答',
+                    'Standard Response': '標準的な回答',
+                    'Hotel Service Info': 'ホテルの公式サービス情報に基づく回答',
+                    'Personalized Service': 'お客様の個別のご要望に応じた回答',
+                    'Nearby Options': 'ホテル周辺の施設情報に基づく回答',
+                    'Availability Data': '実際の予約データに基づく回答',
+                    'Booking Encouragement': '予約促進を目的とした回答',
+                    'Information Service': '情報提供サービスに基づく回答',
+                    'Local Knowledge': '地元の知識に基づく回答',
+                    'General Response': '一般的な対応に基づく回答',
+                    'Acknowledgment': 'お客様のご要望の確認に基づく回答',
+                    'Service Commitment': 'サービス提供へのコミットメントに基づく回答'
+                }
+                explanation = source_explanations.get(suggestion['source'], 'システムが生成した回答')
+                st.write(f"**{suggestion['source']}**: {explanation}")
+            
+            # 送信前に編集できるようにする（編集量はランキングの学習に使う）
+            response_content = st.text_area(
+                "返信内容（編集できます）",
+                suggestion['content'],
+                key=f"edit_{message['id']}_{i}"
+            )
+            
+            if st.button(f"この候補で返信", key=f"send_{message['id']}_{i}"):
+                with st.spinner("返信を送信中..."):
+                    result = send_response(
+                        message['id'],
+                        response_content,
+                        message['platform'],
+                        suggestion
+                    )
+                    
+                    if result.get('result', {}).get('success'):
+                        st.success("返信を送信しました！")
+                        # 送信したメッセージは一覧から消えるため、選択を解除する
+                        st.session_state.inbox_table_version += 1
+                        st.session_state.prefetched_suggestions.pop(message['id'], None)
+                        st.rerun()
+                    else:
+                        st.error("返信の送信に失敗しました")
+            
+            st.markdown("---")
 
 # =============================================================================
 # メインアプリケーション
@@ -718,6 +555,7 @@ def main():
             if st.button("サンプルデータを作成"):
                 with st.spinner("サンプルデータを作成中..."):
                     if create_sample_data():
+                        invalidate_api_cache()
                         st.success("サンプルデータ作成完了")
                         st.rerun()
                     else:
@@ -788,88 +626,7 @@ def main():
         
         with tab1:
             st.header("メッセージ管理")
-            
-            # メッセージ一覧を取得
-            messages = fetch_messages(hotel['id'])
-            
-            if messages:
-                st.subheader(f"未処理メッセージ ({len([m for m in messages if not m['is_processed']])}件)")
-                
-                for message in messages:
-                    if not message['is_processed']:
-                        with st.expander(f"📩 {message['platform']} - {message['message_content'][:50]}..."):
-                            col1, col2 = st.columns([2, 1])
-                            
-                            with col1:
-                                st.write(f"**メッセージ:** {message['message_content']}")
-                                st.write(f"**プラットフォーム:** {message['platform']}")
-                                st.write(f"**受信時刻:** {message['timestamp']}")
-                                st.write(f"**メッセージタイプ:** {message['message_type']}")
-                            
-                            with col2:
-                                if st.button(f"返信候補を取得", key=f"suggest_{message['id']}"):
-                                    with st.spinner("返信候補を生成中..."):
-                                        suggestions_data = fetch_response_suggestions(message['id'], hotel['id'])
-                                        st.session_state.suggestions = suggestions_data.get('suggestions', [])
-                                        st.session_state.current_message = message
-                                
-                                # 返信候補を表示
-                                if st.session_state.suggestions and st.session_state.current_message['id'] == message['id']:
-                                    st.subheader("返信候補")
-                                    
-                                    for i, suggestion in enumerate(st.session_state.suggestions):
-                                        st.write(f"**候補 {i+1}:**")
-                                        
-                                        # 返信内容を表示
-                                        st.write(suggestion['content'])
-                                        
-                                        # 信頼度とタイプを表示
-                                        col_info1, col_info2, col_info3 = st.columns(3)
-                                        with col_info1:
-                                            st.write(f"*信頼度: {suggestion['confidence']:.2f}*")
-                                        with col_info2:
-                                            st.write(f"*タイプ: {suggestion['type']}*")
-                                        with col_info3:
-                                            st.write(f"*根拠: {suggestion['source']}*")
-                                        
-                                        # 根拠ソースの詳細説明
-                                        with st.expander(f"根拠ソースの詳細 (候補 {i+1})"):
-                                            source_explanations = {
-                                                'Response Template': 'ホテルの返信テンプレートに基づく回答',
-                                                'Default Template': 'システムのデフォルトテンプレートに基づく回答',
-                                                'Template Response': 'テンプレートに基づく回答',
-                                                'Standard Response': '標準的な回答',
-                                                'Hotel Service Info': 'ホテルの公式サービス情報に基づく回答',
-                                                'Personalized Service': 'お客様の個別のご要望に応じた回答',
-                                                'Nearby Options': 'ホテル周辺の施設情報に基づく回答',
-                                                'Availability Data': '実際の予約データに基づく回答',
-                                                'Booking Encouragement': '予約促進を目的とした回答',
-                                                'Information Service': '情報提供サービスに基づく回答',
-                                                'Local Knowledge': '地元の知識に基づく回答',
-                                                'General Response': '一般的な対応に基づく回答',
-                                                'Acknowledgment': 'お客様のご要望の確認に基づく回答',
-                                                'Service Commitment': 'サービス提供へのコミットメントに基づく回答'
-                                            }
-                                            explanation = source_explanations.get(suggestion['source'], 'システムが生成した回答')
-                                            st.write(f"**{suggestion['source']}**: {explanation}")
-                                        
-                                        if st.button(f"この候補で返信", key=f"send_{message['id']}_{i}"):
-                                            with st.spinner("返信を送信中..."):
-                                                result = send_response(
-                                                    message['id'],
-                                                    suggestion['content'],
-                                                    message['platform']
-                                                )
-                                                
-                                                if result.get('result', {}).get('success'):
-                                                    st.success("返信を送信しました！")
-                                                    st.rerun()
-                                                else:
-                                                    st.error("返信の送信に失敗しました")
-                                        
-                                        st.markdown("---")
-            else:
-                st.info("新しいメッセージはありません")
+            render_inbox(hotel)
         
         with tab2:
             st.header("分析データ")
@@ -880,7 +637,7 @@ def main():
                         analytics = get_analytics_standalone(hotel['id'])
                     else:
                         try:
-                            response = requests.get(f"{API_BASE_URL}/hotels/{hotel['id']}/analytics", timeout=15)
+                            response = api_get(f"/hotels/{hotel['id']}/analytics", timeout=15)
                             if response.status_code == 200:
                                 analytics = response.json()
                             else:
@@ -930,7 +687,7 @@ def main():
                             attractions = get_nearby_attractions_standalone(hotel['id'])
                         else:
                             try:
-                                response = requests.get(f"{API_BASE_URL}/hotels/{hotel['id']}/nearby-attractions", timeout=15)
+                                response = api_get(f"/hotels/{hotel['id']}/nearby-attractions", timeout=15)
                                 if response.status_code == 200:
                                     attractions_data = response.json()
                                     attractions = attractions_data.get('attractions', [])
@@ -1,15 +1,22 @@
 import streamlit as st
 import requests
-import json
 import os
-import sys
-import subprocess
 import threading
-import time
-import sqlite3
-from datetime import datetime, timedelta
-from typing import List, Dict, Optional
-import random
+
+from streamlit_api_client import (
+    API_BASE_URL,
+    api_get,
+    check_api_connection,
+    display_error_with_details,
+    get_api_supervisor,
+    fetch_hotels,
+    fetch_messages,
+    fetch_response_suggestions,
+    invalidate_api_cache,
+    send_response,
+    wait_for_api
+)
+from streamlit_standalone import get_repository
 
 # ページ設定
 st.set_page_config(
@@ -18,9 +25,6 @@ st.set_page_config(
     layout="wide"
 )
 
-# APIベースURL
-API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000")
-
 # セッション状態の初期化
 if 'selected_hotel' not in st.session_state:
     st.session_state.selected_hotel = None
@@ -38,74 +42,9 @@ if 'database_initialized' not in st.session_state:
 # =============================================================================
 
 def init_database():
-    """データベースを初期化"""
+    """データベースを初期化（app/models.py のテーブルを作成）"""
     try:
-        # SQLiteデータベースを作成
-        conn = sqlite3.connect('hotel_agent.db')
-        cursor = conn.cursor()
-        
-        # テーブルを作成
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS hotels (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                address TEXT NOT NULL,
-                latitude REAL,
-                longitude REAL,
-                city TEXT NOT NULL,
-                country TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS bookings (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                booking_id TEXT UNIQUE,
-                hotel_id INTEGER NOT NULL,
-                guest_name TEXT,
-                check_in TIMESTAMP,
-                check_out TIMESTAMP,
-                room_type TEXT,
-                guest_count INTEGER,
-                booking_reference TEXT UNIQUE,
-                total_amount REAL,
-                status TEXT DEFAULT 'confirmed',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (hotel_id) REFERENCES hotels (id)
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS guest_messages (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                booking_id INTEGER,
-                platform TEXT NOT NULL,
-                message_content TEXT NOT NULL,
-                message_type TEXT,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                is_processed BOOLEAN DEFAULT FALSE,
-                FOREIGN KEY (booking_id) REFERENCES bookings (id)
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS response_templates (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                hotel_id INTEGER NOT NULL,
-                message_type TEXT NOT NULL,
-                template_content TEXT NOT NULL,
-                language TEXT DEFAULT 'ja',
-                is_active BOOLEAN DEFAULT TRUE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (hotel_id) REFERENCES hotels (id)
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
-        
+        get_repository().create_tables()
         st.session_state.database_initialized = True
         return True
     except Exception as e:
@@ -115,70 +54,7 @@ def init_database():
 def create_sample_data():
     """サンプルデータを作成"""
     try:
-        conn = sqlite3.connect('hotel_agent.db')
-        cursor = conn.cursor()
-        
-        # ホテルデータを作成
-        hotels_data = [
-            ("東京グランドホテル", "東京都千代田区丸の内1-1-1", 35.6762, 139.6503, "東京", "日本"),
-            ("大阪ビジネスホテル", "大阪府大阪市北区梅田1-1-1", 34.6937, 135.5023, "大阪", "日本"),
-            ("京都伝統旅館", "京都府京都市下京区四条通烏丸西入ル", 35.0116, 135.7681, "京都", "日本")
-        ]
-        
-        hotel_ids = []
-        for hotel_data in hotels_data:
-            cursor.execute('''
-                INSERT OR IGNORE INTO hotels (name, address, latitude, longitude, city, country)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', hotel_data)
-            hotel_id = cursor.lastrowid
-            if hotel_id == 0:  # 既に存在する場合
-                cursor.execute('SELECT id FROM hotels WHERE name = ?', (hotel_data[0],))
-                hotel_id = cursor.fetchone()[0]
-            hotel_ids.append(hotel_id)
-        
-        # 予約データを作成
-        for hotel_id in hotel_ids:
-            for i in range(5):
-                check_in = datetime.now() + timedelta(days=random.randint(-30, 30))
-                check_out = check_in + timedelta(days=random.randint(1, 7))
-                
-                cursor.execute('''
-                    INSERT OR IGNORE INTO bookings 
-                    (hotel_id, guest_name, check_in, check_out, room_type, guest_count, booking_reference, total_amount, status)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    hotel_id,
-                    f"ゲスト{i+1}",
-                    check_in.isoformat(),
-                    check_out.isoformat(),
-                    random.choice(["シングル", "ダブル", "ツイン", "スイート"]),
-                    random.randint(1, 4),
-                    f"REF{hotel_id:03d}{i+1:03d}",
-                    random.randint(8000, 15000),
-                    random.choice(["confirmed", "cancelled", "completed"])
-                ))
-        
-        # テンプレートデータを作成
-        templates_data = [
-            ("luggage", "お荷物の預かりサービスをご利用いただけます。フロントデスクまでお越しください。"),
-            ("luggage", "チェックイン前・チェックアウト後もお荷物をお預かりいたします。"),
-            ("availability", "空室状況をお調べいたします。ご希望の日程をお教えください。"),
-            ("availability", "ご予約可能な期間をご案内いたします。お急ぎの場合はお電話にてお問い合わせください。"),
-            ("attractions", "周辺の観光地をご案内いたします。おすすめスポットをご紹介いたします。"),
-            ("attractions", "ホテル周辺の観光情報をお調べいたします。アクセス方法もご案内いたします。")
-        ]
-        
-        for hotel_id in hotel_ids:
-            for template_type, template_content in templates_data:
-                cursor.execute('''
-                    INSERT OR IGNORE INTO response_templates 
-                    (hotel_id, message_type, template_content, language, is_active)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (hotel_id, template_type, template_content, "ja", True))
-        
-        conn.commit()
-        conn.close()
+        get_repository().create_sample_data(include_messages=False)
         return True
     except Exception as e:
         st.error(f"サンプルデータ作成エラー: {str(e)}")
@@ -193,189 +69,29 @@ def start_api_server():
     if st.session_state.api_server_started:
         return True
     
+    # 別の方法で起動済みのサーバーがあればそれを使う
+    if wait_for_api(timeout=1):
+        st.session_state.api_server_started = True
+        return True
+    
     try:
-        # FastAPIサーバーをバックグラウンドで起動
-        process = subprocess.Popen(
-            [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "0.0.0.0", "--port", "8000"],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
-        
-        # 少し待機してサーバーが起動するのを待つ
-        time.sleep(3)
-        
-        # サーバーが起動しているかチェック
-        try:
-            response = requests.get(f"{API_BASE_URL}/health", timeout=5)
-            if response.status_code == 200:
-                st.session_state.api_server_started = True
-                return True
-        except:
-            pass
-        
+        # FastAPIサーバーをバックグラウンドで起動（ワーカーが落ちた場合は再起動される）
+        supervisor = get_api_supervisor()
+        supervisor.start()
+        
+        # /health が応答するまで待つ（起動にかかった時間だけ待つ）
+        if supervisor.wait_until_ready() and wait_for_api():
+            st.session_state.api_server_started = True
+            return True
+        
+        # 起動に失敗した場合は直近のログを表示
+        with st.expander("APIサーバーのログ"):
+            st.code("\n".join(supervisor.logs()) or "(ログなし)")
         return False
     except Exception as e:
         st.error(f"APIサーバー起動エラー: {str(e)}")
         return False
 
-def check_api_connection():
-    """API接続をチェック"""
-    try:
-        response = requests.get(f"{API_BASE_URL}/health", timeout=5)
-        return response.status_code == 200
-    except:
-        return False
-
-# =============================================================================
-# エラーハンドリング機能
-# =============================================================================
-
-def parse_error_response(response: requests.Response) -> str:
-    """APIエラーレスポンスからエラーメッセージを抽出"""
-    try:
-        error_data = response.json()
-        
-        # HTTPValidationErrorの場合
-        if 'detail' in error_data:
-            detail = error_data['detail']
-            if isinstance(detail, list) and len(detail) > 0:
-                error_items = []
-                for item in detail:
-                    if isinstance(item, dict) and 'msg' in item:
-                        error_items.append(item['msg'])
-                        # エラーの場所も含める
-                        if 'loc' in item and item['loc']:
-                            location = ' -> '.join(map(str, item['loc']))
-                            error_items[-1] += f" (場所: {location})"
-                return '\n'.join(error_items)
-            elif isinstance(detail, str):
-                return detail
-        
-        # ValidationErrorの場合
-        if 'msg' in error_data:
-            msg = error_data['msg']
-            if 'loc' in error_data and error_data['loc']:
-                location = ' -> '.join(map(str, error_data['loc']))
-                return f"{msg} (場所: {location})"
-            return msg
-        
-        # その他のエラー
-        if 'message' in error_data:
-            return error_data['message']
-        if 'error' in error_data:
-            return error_data['error']
-        
-        # JSONパースは成功したが、予期しない構造
-        return f"予期しないエラーレスポンス形式: {json.dumps(error_data, ensure_ascii=False, indent=2)}"
-        
-    except json.JSONDecodeError:
-        # JSONパースに失敗した場合
-        return f"エラーレスポンスの解析に失敗しました。レスポンス: {response.text[:500]}"
-    except Exception as e:
-        return f"エラーメッセージの抽出中にエラーが発生しました: {str(e)}"
-
-def display_error_with_details(response: requests.Response, operation: str):
-    """詳細なエラー情報を表示"""
-    error_message = parse_error_response(response)
-    
-    st.error(f"{operation}に失敗しました")
-    st.error(f"HTTPステータス: {response.status_code}")
-    st.error(f"エラーメッセージ: {error_message}")
-    
-    # デバッグ情報を表示（デバッグモードが有効な場合）
-    if st.sidebar.checkbox("デバッグ情報を表示"):
-        with st.expander(f"詳細なエラー情報 ({operation})"):
-            st.code(f"ステータスコード: {response.status_code}")
-            st.code(f"レスポンスヘッダー: {dict(response.headers)}")
-            st.code(f"レスポンス本文: {response.text}")
-
-# =============================================================================
-# API呼び出し機能
-# =============================================================================
-
-def fetch_hotels() -> List[Dict]:
-    """ホテル一覧を取得"""
-    try:
-        response = requests.get(f"{API_BASE_URL}/hotels", timeout=10)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            display_error_with_details(response, "ホテル一覧の取得")
-            return []
-    except requests.exceptions.Timeout:
-        st.error("API接続タイムアウト - サーバーが起動していない可能性があります")
-        return []
-    except requests.exceptions.ConnectionError:
-        st.error("API接続エラー - サーバーに接続できません")
-        st.error(f"接続先URL: {API_BASE_URL}")
-        return []
-    except Exception as e:
-        st.error(f"API接続エラー: {str(e)}")
-        return []
-
-def fetch_messages(hotel_id: int) -> List[Dict]:
-    """メッセージ一覧を取得"""
-    try:
-        response = requests.get(f"{API_BASE_URL}/messages/{hotel_id}", timeout=10)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            display_error_with_details(response, "メッセージの取得")
-            return []
-    except requests.exceptions.Timeout:
-        st.error("API接続タイムアウト")
-        return []
-    except requests.exceptions.ConnectionError:
-        st.error("API接続エラー")
-        return []
-    except Exception as e:
-        st.error(f"API接続エラー: {str(e)}")
-        return []
-
-def fetch_response_suggestions(message_id: int, hotel_id: int) -> Dict:
-    """返信候補を取得"""
-    try:
-        response = requests.post(f"{API_BASE_URL}/messages/{message_id}/suggestions", 
-                               params={"hotel_id": hotel_id}, timeout=30)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            display_error_with_details(response, "返信候補の取得")
-            return {}
-    except requests.exceptions.Timeout:
-        st.error("返信候補生成タイムアウト - 処理に時間がかかっています")
-        return {}
-    except requests.exceptions.ConnectionError:
-        st.error("API接続エラー")
-        return {}
-    except Exception as e:
-        st.error(f"API接続エラー: {str(e)}")
-        return {}
-
-def send_response(message_id: int, response_content: str, platform: str) -> Dict:
-    """返信を送信"""
-    try:
-        response = requests.post(f"{API_BASE_URL}/messages/{message_id}/respond",
-                               params={
-                                   "response_content": response_content,
-                                   "platform": platform
-                               }, timeout=15)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            display_error_with_details(response, "返信の送信")
-            return {}
-    except requests.exceptions.Timeout:
-        st.error("返信送信タイムアウト")
-        return {}
-    except requests.exceptions.ConnectionError:
-        st.error("API接続エラー")
-        return {}
-    except Exception as e:
-        st.error(f"API接続エラー: {str(e)}")
-        return {}
-
 # =============================================================================
 # メインアプリケーション
 # =============================================================================
@@ -424,6 +140,7 @@ def main():
             if st.button("サンプルデータを作成"):
                 with st.spinner("サンプルデータを作成中..."):
                     if create_sample_data():
+                        invalidate_api_cache()
                         st.success("サンプルデータ作成完了")
                         st.rerun()
                     else:
@@ -567,7 +284,7 @@ def main():
             if st.button("分析データを更新"):
                 with st.spinner("分析データを取得中..."):
                     try:
-                        response = requests.get(f"{API_BASE_URL}/hotels/{hotel['id']}/analytics", timeout=15)
+                        response = api_get(f"/hotels/{hotel['id']}/analytics", timeout=15)
                         if response.status_code == 200:
                             analytics = response.json()
                             
@@ -610,7 +327,7 @@ def main():
                 if st.button("観光地情報を取得"):
                     with st.spinner("観光地情報を取得中..."):
                         try:
-                            response = requests.get(f"{API_BASE_URL}/hotels/{hotel['id']}/nearby-attractions", timeout=15)
+                            response = api_get(f"/hotels/{hotel['id']}/nearby-attractions", timeout=15)
                             if response.status_code == 200:
                                 attractions_data = response.json()
                                 attractions = attractions_data.get('attractions', [])
@@ -0,0 +1,323 @@
+"""
+Streamlitのスタンドアロンモード（APIサーバーなし）のデータアクセス
+
+streamlit_app_fixed.py / streamlit_app_integrated.py から使う。
+- テーブル定義は app/models.py のORMモデルをそのまま使う（APIと同じスキーマ）
+- SQLiteの接続は1つだけ開き、st.cache_resource で再実行・セッションをまたいで使い回す
+  （WALモード、check_same_thread=False。行は列名でアクセスする）
+- 分析データは1回の集計クエリで取得する
+"""
+
+import json
+import os
+import random
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import streamlit as st
+from sqlalchemy import Integer, cast, create_engine, event, func, insert, select, update
+from sqlalchemy.pool import StaticPool
+
+from app.models import Base, Booking, GuestMessage, Hotel, ResponseTemplate, create_missing_indexes
+
+# スタンドアロンモードで使うSQLiteファイル（APIのデフォルトの DATABASE_URL と同じファイル）
+STANDALONE_DATABASE_PATH = os.getenv("STANDALONE_DATABASE_PATH", "hotel_agent.db")
+
+# 受信箱の一覧で返すメッセージ本文の文字数（APIと同じ）
+INBOX_PREVIEW_CHARS = 80
+
+# サンプルデータ
+SAMPLE_HOTELS = [
+    ("東京グランドホテル", "東京都千代田区丸の内1-1-1", 35.6762, 139.6503, "東京", "日本"),
+    ("大阪ビジネスホテル", "大阪府大阪市北区梅田1-1-1", 34.6937, 135.5023, "大阪", "日本"),
+    ("京都伝統旅館", "京都府京都市下京区四条通烏丸西入ル", 35.0116, 135.7681, "京都", "日本")
+]
+
+SAMPLE_MESSAGES = [
+    ("チェックイン前に荷物を預かってもらえますか？午前10時に到着予定です。", "luggage"),
+    ("来月の15日から3泊4日で予約できますか？", "availability"),
+    ("ホテル周辺でおすすめの観光地はありますか？", "attractions"),
+    ("Wi-Fiのパスワードを教えてください。", "general"),
+    ("朝食は何時からですか？", "general")
+]
+
+SAMPLE_TEMPLATES = [
+    ("luggage", "お荷物の預かりサービスをご利用いただけます。フロントデスクまでお越しください。"),
+    ("luggage", "チェックイン前・チェックアウト後もお荷物をお預かりいたします。"),
+    ("availability", "空室状況をお調べいたします。ご希望の日程をお教えください。"),
+    ("availability", "ご予約可能な期間をご案内いたします。お急ぎの場合はお電話にてお問い合わせください。"),
+    ("attractions", "周辺の観光地をご案内いたします。おすすめスポットをご紹介いたします。"),
+    ("attractions", "ホテル周辺の観光情報をお調べいたします。アクセス方法もご案内いたします。")
+]
+
+def _configure_connection(dbapi_connection, connection_record):
+    """接続時の設定（APIサーバーが同じファイルに書き込んでいても読み取りがブロックされないようWALにする）"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
+class StandaloneRepository:
+    """1つのSQLite接続を使い回すリポジトリ
+
+    Streamlitはセッションごとに別スレッドでスクリプトを実行するため、
+    接続を共有したまま1回の操作（トランザクション）が混ざらないようロックで直列化する。
+    """
+
+    def __init__(self, path: str = STANDALONE_DATABASE_PATH):
+        self.engine = create_engine(
+            f"sqlite:///{path}",
+            poolclass=StaticPool,
+            connect_args={"check_same_thread": False}
+        )
+        event.listen(self.engine, "connect", _configure_connection)
+        self._lock = threading.RLock()
+
+    def create_tables(self):
+        """app/models.py のテーブルを作成"""
+        with self._lock:
+            Base.metadata.create_all(self.engine)
+            create_missing_indexes(self.engine)
+
+    def hotels(self) -> List[Dict]:
+        stmt = select(
+            Hotel.id, Hotel.name, Hotel.address, Hotel.latitude, Hotel.longitude, Hotel.city, Hotel.country
+        ).order_by(Hotel.id)
+        with self._lock, self.engine.connect() as conn:
+            return [dict(row) for row in conn.execute(stmt).mappings()]
+
+    def hotel_city(self, hotel_id: int) -> Optional[str]:
+        with self._lock, self.engine.connect() as conn:
+            return conn.execute(select(Hotel.city).where(Hotel.id == hotel_id)).scalar()
+
+    def inbox_page(
+        self,
+        hotel_id: int,
+        limit: int = 50,
+        before_id: Optional[int] = None,
+        platform: Optional[str] = None,
+        message_type: Optional[str] = None,
+        max_age_hours: Optional[int] = None
+    ) -> Dict:
+        """未処理メッセージを新しい順に1ページ取得（APIの /hotels/{hotel_id}/inbox と同じ形式）"""
+        stmt = select(
+            GuestMessage.id,
+            GuestMessage.platform,
+            GuestMessage.message_type,
+            GuestMessage.timestamp,
+            GuestMessage.is_processed,
+            func.substr(GuestMessage.message_content, 1, INBOX_PREVIEW_CHARS).label('preview'),
+            Booking.guest_name
+        ).join(Booking, GuestMessage.booking_id == Booking.id).where(
+            Booking.hotel_id == hotel_id,
+            GuestMessage.is_processed.is_(False)
+        )
+        if before_id is not None:
+            stmt = stmt.where(GuestMessage.id < before_id)
+        if platform:
+            stmt = stmt.where(GuestMessage.platform == platform)
+        if message_type:
+            stmt = stmt.where(GuestMessage.message_type == message_type)
+        if max_age_hours:
+            stmt = stmt.where(GuestMessage.timestamp >= datetime.now() - timedelta(hours=max_age_hours))
+
+        with self._lock, self.engine.connect() as conn:
+            rows = list(conn.execute(stmt.order_by(GuestMessage.id.desc()).limit(limit + 1)).mappings())
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return {
+            'items': [
+                {**row, 'timestamp': row['timestamp'].isoformat() if row['timestamp'] else None}
+                for row in rows
+            ],
+            'next_cursor': rows[-1]['id'] if has_more else None
+        }
+
+    def inbox_facets(self, hotel_id: int) -> Dict:
+        hotel_messages = select(GuestMessage.platform, GuestMessage.message_type).join(
+            Booking, GuestMessage.booking_id == Booking.id
+        ).where(Booking.hotel_id == hotel_id).distinct()
+        with self._lock, self.engine.connect() as conn:
+            rows = conn.execute(hotel_messages).all()
+        return {
+            'platforms': sorted({platform for platform, _ in rows if platform}),
+            'message_types': sorted({message_type for _, message_type in rows if message_type})
+        }
+
+    def inbox_message(self, hotel_id: int, message_id: int) -> Optional[Dict]:
+        """メッセージ1件の詳細（APIの /hotels/{hotel_id}/inbox/{message_id} と同じ形式）"""
+        stmt = select(
+            GuestMessage.id,
+            GuestMessage.booking_id,
+            GuestMessage.platform,
+            GuestMessage.message_content,
+            GuestMessage.message_type,
+            GuestMessage.timestamp,
+            GuestMessage.is_processed,
+            Booking.guest_name,
+            Booking.booking_reference,
+            Booking.check_in,
+            Booking.check_out,
+            Booking.room_type,
+            Booking.guest_count
+        ).join(Booking, GuestMessage.booking_id == Booking.id).where(
+            GuestMessage.id == message_id,
+            Booking.hotel_id == hotel_id
+        )
+        with self._lock, self.engine.connect() as conn:
+            row = conn.execute(stmt).mappings().first()
+        if row is None:
+            return None
+
+        def isoformat(value):
+            return value.isoformat() if value else None
+
+        return {
+            'id': row['id'],
+            'booking_id': row['booking_id'],
+            'platform': row['platform'],
+            'message_content': row['message_content'],
+            'message_type': row['message_type'],
+            'timestamp': isoformat(row['timestamp']),
+            'is_processed': row['is_processed'],
+            'booking': {
+                'guest_name': row['guest_name'],
+                'booking_reference': row['booking_reference'],
+                'check_in': isoformat(row['check_in']),
+                'check_out': isoformat(row['check_out']),
+                'room_type': row['room_type'],
+                'guest_count': row['guest_count']
+            }
+        }
+
+    def message(self, message_id: int) -> Optional[Dict]:
+        stmt = select(GuestMessage.message_content, GuestMessage.message_type).where(GuestMessage.id == message_id)
+        with self._lock, self.engine.connect() as conn:
+            row = conn.execute(stmt).mappings().first()
+        return dict(row) if row else None
+
+    def active_templates(self, hotel_id: int, message_type: str) -> List[str]:
+        stmt = select(ResponseTemplate.template_content).where(
+            ResponseTemplate.hotel_id == hotel_id,
+            ResponseTemplate.message_type == message_type,
+            ResponseTemplate.is_active.is_(True)
+        ).order_by(ResponseTemplate.id)
+        with self._lock, self.engine.connect() as conn:
+            return list(conn.execute(stmt).scalars())
+
+    def mark_processed(self, message_id: int):
+        with self._lock, self.engine.begin() as conn:
+            conn.execute(update(GuestMessage).where(GuestMessage.id == message_id).values(is_processed=True))
+
+    def analytics(self, hotel_id: int) -> Dict:
+        """予約・メッセージ・テンプレートの集計（1回のクエリ）"""
+        hotel_bookings = Booking.hotel_id == hotel_id
+        room_types = select(Booking.room_type, func.count().label('count')).where(
+            hotel_bookings, Booking.room_type.isnot(None)
+        ).group_by(Booking.room_type).subquery()
+        hotel_messages = select(GuestMessage.is_processed).join(
+            Booking, GuestMessage.booking_id == Booking.id
+        ).where(hotel_bookings).subquery()
+
+        stmt = select(
+            select(func.count()).select_from(Booking).where(hotel_bookings).scalar_subquery().label('total_bookings'),
+            select(func.avg(Booking.guest_count)).where(hotel_bookings).scalar_subquery().label('average_guest_count'),
+            select(func.json_group_object(room_types.c.room_type, room_types.c.count)).scalar_subquery().label('room_types'),
+            select(func.count()).select_from(hotel_messages).scalar_subquery().label('total_messages'),
+            select(func.coalesce(func.sum(cast(hotel_messages.c.is_processed, Integer)), 0)).scalar_subquery().label('processed_messages'),
+            select(func.count()).select_from(ResponseTemplate).where(
+                ResponseTemplate.hotel_id == hotel_id
+            ).scalar_subquery().label('template_count')
+        )
+        with self._lock, self.engine.connect() as conn:
+            row = dict(conn.execute(stmt).mappings().one())
+
+        row['room_types'] = json.loads(row['room_types'] or '{}')
+        row['average_guest_count'] = row['average_guest_count'] or 0
+        return row
+
+    def create_sample_data(self, include_messages: bool = True):
+        """サンプルのホテル・予約・メッセージ・テンプレートを作成（作成済みのものは追加しないため何度実行してもよい）"""
+        with self._lock, self.engine.begin() as conn:
+            existing = dict(conn.execute(
+                select(Hotel.name, Hotel.id).where(Hotel.name.in_([name for name, *_ in SAMPLE_HOTELS]))
+            ).all())
+            hotel_ids = []
+            for name, address, latitude, longitude, city, country in SAMPLE_HOTELS:
+                hotel_id = existing.get(name)
+                if hotel_id is None:
+                    hotel_id = conn.execute(insert(Hotel).values(
+                        name=name, address=address, latitude=latitude, longitude=longitude, city=city, country=country
+                    )).inserted_primary_key[0]
+                hotel_ids.append(hotel_id)
+
+            # 予約（booking_reference が既にあるものは追加しない）
+            bookings = []
+            for hotel_id in hotel_ids:
+                for i in range(5):
+                    check_in = datetime.now() + timedelta(days=random.randint(-30, 30))
+                    bookings.append({
+                        'hotel_id': hotel_id,
+                        'guest_name': f"ゲスト{i+1}",
+                        'check_in': check_in,
+                        'check_out': check_in + timedelta(days=random.randint(1, 7)),
+                        'room_type': random.choice(["シングル", "ダブル", "ツイン", "スイート"]),
+                        'guest_count': random.randint(1, 4),
+                        'booking_reference': f"REF{hotel_id:03d}{i+1:03d}",
+                        'total_amount': random.randint(8000, 15000),
+                        'status': random.choice(["confirmed", "cancelled", "completed"])
+                    })
+            conn.execute(insert(Booking).prefix_with("OR IGNORE"), bookings)
+
+            if include_messages:
+                first_bookings = dict(conn.execute(
+                    select(Booking.hotel_id, func.min(Booking.id)).where(
+                        Booking.hotel_id.in_(hotel_ids)
+                    ).group_by(Booking.hotel_id)
+                ).all())
+                existing_messages = set(conn.execute(
+                    select(GuestMessage.booking_id, GuestMessage.message_content).where(
+                        GuestMessage.booking_id.in_(list(first_bookings.values()))
+                    )
+                ).all())
+                messages = [
+                    {
+                        'booking_id': first_bookings[hotel_id],
+                        'platform': "booking.com",
+                        'message_content': message_content,
+                        'message_type': message_type,
+                        'is_processed': False
+                    }
+                    for hotel_id in hotel_ids if hotel_id in first_bookings
+                    for message_content, message_type in SAMPLE_MESSAGES
+                    if (first_bookings[hotel_id], message_content) not in existing_messages
+                ]
+                if messages:
+                    conn.execute(insert(GuestMessage), messages)
+
+            existing_templates = set(conn.execute(
+                select(ResponseTemplate.hotel_id, ResponseTemplate.message_type, ResponseTemplate.template_content).where(
+                    ResponseTemplate.hotel_id.in_(hotel_ids)
+                )
+            ).all())
+            templates = [
+                {
+                    'hotel_id': hotel_id,
+                    'message_type': template_type,
+                    'template_content': template_content,
+                    'language': "ja",
+                    'is_active': True
+                }
+                for hotel_id in hotel_ids
+                for template_type, template_content in SAMPLE_TEMPLATES
+                if (hotel_id, template_type, template_content) not in existing_templates
+            ]
+            if templates:
+                conn.execute(insert(ResponseTemplate), templates)
+
+@st.cache_resource
+def get_repository() -> StandaloneRepository:
+    """プロセス全体で共有するリポジトリ（接続は1つ）"""
+    return StandaloneRepository()
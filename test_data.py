@@ -27,6 +27,110 @@ API_BASE_URL = "http://localhost:8000"
 # リクエストタイムアウト設定
 REQUEST_TIMEOUT = 10  # 10秒
 
+# サンプルホテル（負荷テスト benchmarks/load_test.py でも使う）
+SAMPLE_HOTELS = [
+    {
+        "name": "東京ステーションホテル",
+        "address": "東京都千代田区丸の内1-9-1",
+        "latitude": 35.6812,
+        "longitude": 139.7671,
+        "city": "東京",
+        "country": "日本"
+    },
+    {
+        "name": "大阪グランドホテル",
+        "address": "大阪府大阪市北区梅田1-1-1",
+        "latitude": 34.6937,
+        "longitude": 135.5023,
+        "city": "大阪",
+        "country": "日本"
+    },
+    {
+        "name": "京都伝統ホテル",
+        "address": "京都府京都市下京区四条通烏丸東入ル",
+        "latitude": 35.0038,
+        "longitude": 135.7694,
+        "city": "京都",
+        "country": "日本"
+    },
+    {
+        "name": "横浜ベイホテル",
+        "address": "神奈川県横浜市西区みなとみらい2-2-1",
+        "latitude": 35.4542,
+        "longitude": 139.6311,
+        "city": "横浜",
+        "country": "日本"
+    },
+    {
+        "name": "福岡シティホテル",
+        "address": "福岡県福岡市博多区博多駅前1-1-1",
+        "latitude": 33.5904,
+        "longitude": 130.4207,
+        "city": "福岡",
+        "country": "日本"
+    }
+]
+
+# ゲストの問い合わせシナリオ（message_type はAPIでのメッセージタイプ）
+SAMPLE_SCENARIOS = [
+    {
+        "title": "荷物預かりの問い合わせ",
+        "message": "チェックイン前に荷物を預かってもらえますか？午前10時に到着予定です。",
+        "expected_type": "荷物預かり",
+        "platform": "booking.com",
+        "message_type": "luggage"
+    },
+    {
+        "title": "予約可能期間の問い合わせ",
+        "message": "来月の15日から3泊4日で予約できますか？",
+        "expected_type": "予約確認",
+        "platform": "airbnb",
+        "message_type": "availability"
+    },
+    {
+        "title": "周辺観光地の問い合わせ",
+        "message": "ホテル周辺でおすすめの観光地はありますか？",
+        "expected_type": "観光地情報",
+        "platform": "booking.com",
+        "message_type": "attractions"
+    },
+    {
+        "title": "チェックイン時間の問い合わせ",
+        "message": "チェックイン時間は何時からですか？",
+        "expected_type": "チェックイン情報",
+        "platform": "airbnb",
+        "message_type": "checkin"
+    },
+    {
+        "title": "WiFi情報の問い合わせ",
+        "message": "WiFiは無料で使えますか？パスワードを教えてください。",
+        "expected_type": "WiFi情報",
+        "platform": "booking.com",
+        "message_type": "amenities"
+    },
+    {
+        "title": "レストランの問い合わせ",
+        "message": "ホテル内にレストランはありますか？朝食は含まれていますか？",
+        "expected_type": "レストラン情報",
+        "platform": "airbnb",
+        "message_type": "amenities"
+    },
+    {
+        "title": "交通手段の問い合わせ",
+        "message": "空港からホテルまでのアクセス方法を教えてください。",
+        "expected_type": "交通情報",
+        "platform": "booking.com",
+        "message_type": "transport"
+    },
+    {
+        "title": "ペット同伴の問い合わせ",
+        "message": "ペットを連れて宿泊できますか？追加料金はかかりますか？",
+        "expected_type": "ペット情報",
+        "platform": "airbnb",
+        "message_type": "general"
+    }
+]
+
 class TestDataGenerator:
     """テストデータ生成クラス"""
     
@@ -67,51 +171,9 @@ class TestDataGenerator:
         """サンプルホテルを作成"""
         print("[HOTEL] サンプルホテルを作成中...")
         
-        hotels_data = [
-            {
-                "name": "東京ステーションホテル",
-                "address": "東京都千代田区丸の内1-9-1",
-                "latitude": 35.6812,
-                "longitude": 139.7671,
-                "city": "東京",
-                "country": "日本"
-            },
-            {
-                "name": "大阪グランドホテル",
-                "address": "大阪府大阪市北区梅田1-1-1",
-                "latitude": 34.6937,
-                "longitude": 135.5023,
-                "city": "大阪",
-                "country": "日本"
-            },
-            {
-                "name": "京都伝統ホテル",
-                "address": "京都府京都市下京区四条通烏丸東入ル",
-                "latitude": 35.0038,
-                "longitude": 135.7694,
-                "city": "京都",
-                "country": "日本"
-            },
-            {
-                "name": "横浜ベイホテル",
-                "address": "神奈川県横浜市西区みなとみらい2-2-1",
-                "latitude": 35.4542,
-                "longitude": 139.6311,
-                "city": "横浜",
-                "country": "日本"
-            },
-            {
-                "name": "福岡シティホテル",
-                "address": "福岡県福岡市博多区博多駅前1-1-1",
-                "latitude": 33.5904,
-                "longitude": 130.4207,
-                "city": "福岡",
-                "country": "日本"
-            }
-        ]
         
         created_hotels = []
-        for hotel_data in hotels_data:
+        for hotel_data in SAMPLE_HOTELS:
             try:
                 response = self.session.post(f"{self.base_url}/hotels", params=hotel_data, timeout=REQUEST_TIMEOUT)
                 if response.status_code == 200:
@@ -383,56 +445,8 @@ def create_sample_scenarios():
     """サンプルシナリオを作成"""
     print("[NOTE] サンプルシナリオを作成中...")
     
-    scenarios = [
-        {
-            "title": "荷物預かりの問い合わせ",
-            "message": "チェックイン前に荷物を預かってもらえますか？午前10時に到着予定です。",
-            "expected_type": "荷物預かり",
-            "platform": "booking.com"
-        },
-        {
-            "title": "予約可能期間の問い合わせ",
-            "message": "来月の15日から3泊4日で予約できますか？",
-            "expected_type": "予約確認",
-            "platform": "airbnb"
-        },
-        {
-            "title": "周辺観光地の問い合わせ",
-            "message": "ホテル周辺でおすすめの観光地はありますか？",
-            "expected_type": "観光地情報",
-            "platform": "booking.com"
-        },
-        {
-            "title": "チェックイン時間の問い合わせ",
-            "message": "チェックイン時間は何時からですか？",
-            "expected_type": "チェックイン情報",
-            "platform": "airbnb"
-        },
-        {
-            "title": "WiFi情報の問い合わせ",
-            "message": "WiFiは無料で使えますか？パスワードを教えてください。",
-            "expected_type": "WiFi情報",
-            "platform": "booking.com"
-        },
-        {
-            "title": "レストランの問い合わせ",
-            "message": "ホテル内にレストランはありますか？朝食は含まれていますか？",
-            "expected_type": "レストラン情報",
-            "platform": "airbnb"
-        },
-        {
-            "title": "交通手段の問い合わせ",
-            "message": "空港からホテルまでのアクセス方法を教えてください。",
-            "expected_type": "交通情報",
-            "platform": "booking.com"
-        },
-        {
-            "title": "ペット同伴の問い合わせ",
-            "message": "ペットを連れて宿泊できますか？追加料金はかかりますか？",
-            "expected_type": "ペット情報",
-            "platform": "airbnb"
-        }
-    ]
+    
+    scenarios = SAMPLE_SCENARIOS
     
     print("[LIST] サンプルシナリオ一覧:")
     for i, scenario in enumerate(scenarios, 1):
@@ -32,6 +32,17 @@ STREAMLIT_URL = "http://localhost:8501"
 # リクエストタイムアウト設定
 REQUEST_TIMEOUT = 10  # 10秒
 
+# テスト用ホテルと返信（負荷テスト benchmarks/load_test.py でも使う）
+TEST_HOTEL = {
+    "name": "テストホテル東京",
+    "address": "東京都渋谷区道玄坂1-2-3",
+    "latitude": 35.6581,
+    "longitude": 139.7016,
+    "city": "東京",
+    "country": "日本"
+}
+TEST_RESPONSE = "お客様、お疲れ様です。ご質問にお答えいたします。"
+
 class HotelAPITester:
     """ホテルAPIテストクラス"""
     
@@ -78,17 +89,8 @@ class HotelAPITester:
         """テスト用ホテルを作成"""
         print("[HOTEL] テスト用ホテルを作成...")
         
-        hotel_data = {
-            "name": "テストホテル東京",
-            "address": "東京都渋谷区道玄坂1-2-3",
-            "latitude": 35.6581,
-            "longitude": 139.7016,
-            "city": "東京",
-            "country": "日本"
-        }
-        
         try:
-            response = self.session.post(f"{self.base_url}/hotels", params=hotel_data, timeout=REQUEST_TIMEOUT)
+            response = self.session.post(f"{self.base_url}/hotels", params=TEST_HOTEL, timeout=REQUEST_TIMEOUT)
             if response.status_code == 200:
                 data = response.json()
                 hotel_id = data["id"]
@@ -313,8 +315,7 @@ class HotelAPITester:
                 self.test_response_suggestions(message['id'], hotel_id)
                 
                 # テスト用返信を送信
-                test_response = "お客様、お疲れ様です。ご質問にお答えいたします。"
-                self.test_send_response(message['id'], test_response, message['platform'])
+                self.test_send_response(message['id'], TEST_RESPONSE, message['platform'])
             else:
                 print("[WARNING] 未処理のメッセージがありません。")
         else:
@@ -0,0 +1,72 @@
+"""
+テストの共通設定
+
+app の設定は import 時に環境変数から読まれるため、app を import する前に
+一時ディレクトリのSQLiteデータベース・モデルの保存先を設定する（開発用のデータベースには書き込まない）。
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+TMP_DIR = tempfile.mkdtemp(prefix="hotel_tests_")
+os.environ["DATABASE_URL"] = f"sqlite:///{TMP_DIR}/test.db"
+os.environ["MODEL_DIR"] = os.path.join(TMP_DIR, "models")
+os.environ["CPU_WORKERS"] = "0"
+os.environ["LLM_BACKEND"] = "static"
+os.environ["GOOGLE_MAPS_API_KEY"] = ""
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(TMP_DIR, ignore_errors=True)
+
+@pytest.fixture
+def db():
+    """テストごとのインメモリのSQLiteデータベースのセッション"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+
+    from app.models import Base
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    with Session(bind=engine) as session:
+        yield session
+    engine.dispose()
+
+@pytest.fixture
+def api(tmp_path):
+    """APIのテストクライアントと、同じデータベースのセッション
+
+    エンドポイントはスレッドで専用のセッションを作るため、インメモリではなく一時ファイルのSQLiteを使う。
+    """
+    from fastapi.testclient import TestClient
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session, sessionmaker
+
+    from app.database import get_db
+    from app.main import app
+    from app.models import Base
+    from app.services.hotel_context import hotel_context_registry
+
+    engine = create_engine(f"sqlite:///{tmp_path}/api.db", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db():
+        with SessionLocal() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    hotel_context_registry.clear()
+    with Session(bind=engine) as session:
+        yield TestClient(app), session
+    app.dependency_overrides.clear()
+    hotel_context_registry.clear()
+    engine.dispose()
@@ -0,0 +1,38 @@
+"""AnalyticsSnapshotExporter（スナップショットの切り替え）と ChainAnalytics の読み取りのテスト"""
+
+import os
+from datetime import datetime
+
+from app.models import Booking, Hotel
+from app.services.analytics_snapshot import AnalyticsSnapshotExporter, current_table_dir
+from app.services.chain_analytics import ChainAnalytics
+
+def add_booking(db, hotel_id, day):
+    db.add(Booking(hotel_id=hotel_id, check_in=datetime(2025, 1, day), check_out=datetime(2025, 1, day + 2), room_type="twin", guest_count=2))
+    db.commit()
+
+def test_snapshot_switches_versions(db, tmp_path):
+    """再作成してもスナップショットは常に読め、直前の1世代より古いものは削除される"""
+    db.add(Hotel(id=1, name="テストホテル"))
+    add_booking(db, 1, 1)
+    exporter = AnalyticsSnapshotExporter(db.get_bind(), snapshot_dir=str(tmp_path))
+    chain = ChainAnalytics(snapshot_dir=str(tmp_path))
+
+    versions = []
+    for day in (3, 5, 7):
+        exporter.export_table("bookings")
+        versions.append(os.path.basename(current_table_dir(str(tmp_path), "bookings")))
+        assert chain.snapshot_available()
+        add_booking(db, 1, day)
+
+    # 最後のスナップショットは3回目の作成時点の予約（3件）
+    assert chain.analyze_booking_patterns()["chain"]["total_bookings"] == 3
+    assert len(set(versions)) == 3
+    remaining = sorted(name for name in os.listdir(tmp_path) if name.startswith("bookings-"))
+    assert remaining == versions[1:]
+
+def test_legacy_snapshot_directory(tmp_path):
+    """{table}.current がない旧形式のディレクトリもそのまま読める"""
+    (tmp_path / "bookings").mkdir()
+    assert current_table_dir(str(tmp_path), "bookings") == os.path.join(str(tmp_path), "bookings")
+    assert current_table_dir(str(tmp_path), "guest_messages") is None
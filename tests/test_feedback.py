@@ -0,0 +1,83 @@
+"""FeedbackLearner.record（編集距離・報酬・重みの指数移動平均）のテスト"""
+
+import pytest
+
+from app.models import RankingWeight, SuggestionFeedback
+from app.services.feedback import MAX_EDIT_LENGTH, NEUTRAL_VALUE, FeedbackLearner, edit_distance
+
+SUGGESTION = "お荷物はフロントにてお預かりいたします。"
+
+@pytest.fixture
+def learner():
+    return FeedbackLearner(learning_rate=0.5, weight=0.1, ttl=0)
+
+def weights(db, hotel_id=1):
+    return {row.key: row for row in db.query(RankingWeight).filter(RankingWeight.hotel_id == hotel_id)}
+
+def test_edit_distance():
+    assert edit_distance("abc", "abc") == 0
+    assert edit_distance("kitten", "sitting") == 3
+    assert edit_distance("", "abc") == 3
+
+def test_edit_distance_past_cap():
+    """MAX_EDIT_LENGTH 文字より後ろの編集も距離に数える"""
+    assert edit_distance("x" * 600, "x" * 500 + "y" * 400) == 400
+    assert edit_distance("a" * 1000, "a" * 500 + "b" * 500) == 500
+    # 共通の先頭・末尾を除いても長い場合は、上限より後ろを全て書き換えたとみなす
+    a = "p" + "x" * (MAX_EDIT_LENGTH + 300) + "q"
+    b = "r" + "y" * (MAX_EDIT_LENGTH + 300) + "s"
+    assert edit_distance(a, b) == len(a)
+    # 上限を超えても、編集が一部だけなら正確な距離を返す
+    assert edit_distance("a" * 1000, "a" * 700 + "b" + "a" * 299) == 1
+
+def test_record_rewrite_past_cap(db, learner):
+    """長い返信の後半を書き換えた場合は報酬が下がる"""
+    suggested = "あ" * 1000
+    result = learner.record(db, 1, 10, "あ" * 500 + "い" * 500, suggestion_source="AI Generated #1", suggestion_type="ai_generated", suggested_content=suggested)
+
+    assert result["edit_distance"] == 500
+    assert result["reward"] == pytest.approx(0.5)
+
+def test_record_pick_as_is(db, learner):
+    """候補をそのまま送信: 報酬1、ソースの種類とテンプレートの重みが上がる"""
+    result = learner.record(db, 1, 10, SUGGESTION, suggestion_source="Template: 3", suggestion_type="template", suggested_content=SUGGESTION)
+
+    assert result["edit_distance"] == 0
+    assert result["reward"] == 1.0
+    assert result["updated_weights"] == ["template", "Template: 3"]
+
+    rows = weights(db)
+    expected = NEUTRAL_VALUE + 0.5 * (1.0 - NEUTRAL_VALUE)
+    assert rows["template"].value == pytest.approx(expected)
+    assert rows["Template: 3"].value == pytest.approx(expected)
+    assert rows["template"].observations == 1
+
+    priors = learner.priors(1, db)
+    assert priors["template"] == pytest.approx(0.1 * (expected - NEUTRAL_VALUE) * 2)
+
+def test_record_edit(db, learner):
+    """候補を編集して送信: 編集距離に応じた報酬で指数移動平均を更新する"""
+    learner.record(db, 1, 10, SUGGESTION, suggestion_source="AI Generated #1", suggestion_type="ai_generated", suggested_content=SUGGESTION)
+    edited = SUGGESTION + "ご不明な点はお尋ねください。"
+    result = learner.record(db, 1, 11, edited, suggestion_source="AI Generated #1", suggestion_type="ai_generated", suggested_content=SUGGESTION)
+
+    distance = len(edited) - len(SUGGESTION)
+    reward = 1.0 - distance / len(edited)
+    assert result["edit_distance"] == distance
+    assert result["reward"] == pytest.approx(reward, abs=1e-4)
+    # AIの候補はソースの種類だけを更新する
+    assert result["updated_weights"] == ["ai"]
+
+    first = NEUTRAL_VALUE + 0.5 * (1.0 - NEUTRAL_VALUE)
+    rows = weights(db)
+    assert rows["ai"].value == pytest.approx(first + 0.5 * (reward - first))
+    assert rows["ai"].observations == 2
+
+def test_record_without_suggestion(db, learner):
+    """候補を使わずに返信: フィードバックだけを記録し、重みは更新しない"""
+    result = learner.record(db, 1, 10, "手入力の返信です。")
+
+    assert result == {"feedback_id": result["feedback_id"], "edit_distance": None, "reward": None, "updated_weights": []}
+    feedback = db.query(SuggestionFeedback).one()
+    assert feedback.suggestion_source is None and feedback.reward is None
+    assert weights(db) == {}
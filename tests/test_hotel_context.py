@@ -0,0 +1,45 @@
+"""HotelContextRegistry（ワーカー間のコンテキストの破棄）のテスト"""
+
+from app.models import Hotel
+from app.services import hotel_context
+from app.services.hotel_context import HotelContextRegistry
+
+def test_invalidation_reaches_other_workers(db):
+    """あるワーカーで破棄したコンテキストは、他のワーカー（別のレジストリ）でも読み込み直される"""
+    hotel = Hotel(name="旧ホテル名", city="東京")
+    db.add(hotel)
+    db.commit()
+
+    worker_a = HotelContextRegistry(ttl=300, check_interval=0)
+    worker_b = HotelContextRegistry(ttl=300, check_interval=0)
+    assert worker_b.get(hotel.id, db).name == "旧ホテル名"
+
+    hotel.name = "新ホテル名"
+    db.commit()
+    worker_a.invalidate(hotel.id)
+
+    assert worker_b.get(hotel.id, db).name == "新ホテル名"
+    # 読み込み直した後はキャッシュを使う
+    context = worker_b.get(hotel.id, db)
+    assert worker_b.get(hotel.id, db) is context
+
+def test_marker_check_is_throttled(db, monkeypatch):
+    """目印の確認（stat）は check_interval 秒に1回だけ行う"""
+    hotel = Hotel(name="テストホテル", city="東京")
+    db.add(hotel)
+    db.commit()
+
+    checks = []
+    markers = hotel_context.invalidation_markers
+    monkeypatch.setattr(markers, "changed_since", lambda *args: checks.append(args) or False)
+
+    registry = HotelContextRegistry(ttl=300, check_interval=60)
+    context = registry.get(hotel.id, db)
+    for _ in range(10):
+        assert registry.get(hotel.id, db) is context
+    assert checks == []
+
+    context.marker_checked_at -= 60
+    assert registry.get(hotel.id, db) is context
+    assert registry.get(hotel.id, db) is context
+    assert len(checks) == 1
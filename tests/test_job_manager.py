@@ -0,0 +1,123 @@
+"""JobManager（background_jobs テーブルへのジョブの状態の保存）のテスト"""
+
+import time
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models import BackgroundJob, Base
+from app.services.job_manager import STALE_JOB_ERROR, JobManager
+
+class ManualExecutor:
+    """投入したタスクの Future をテストから完了させる executor"""
+
+    def __init__(self):
+        self.futures = []
+
+    def submit(self, task_name, **payload):
+        future = Future()
+        self.futures.append(future)
+        return future
+
+@pytest.fixture
+def session_factory(db):
+    return sessionmaker(bind=db.get_bind())
+
+def test_job_state_is_shared_between_workers(session_factory):
+    """投入したワーカー以外（別の JobManager）からもジョブの状態を取得できる"""
+    executor = ManualExecutor()
+    worker_a = JobManager(executor, session_factory)
+    worker_b = JobManager(ManualExecutor(), session_factory)
+
+    job = worker_a.submit("train_hotel_model", hotel_id=1)
+    assert job["status"] == "queued"
+    assert worker_b.get(job["job_id"])["status"] == "queued"
+
+    executor.futures[0].set_running_or_notify_cancel()
+    assert worker_a.get(job["job_id"])["status"] == "running"
+
+    executor.futures[0].set_result({"templates": 3})
+    completed = worker_b.get(job["job_id"])
+    assert completed["status"] == "completed"
+    assert completed["result"] == {"templates": 3}
+    assert completed["hotel_id"] == 1
+    assert completed["finished_at"] is not None
+
+def test_failed_job(session_factory):
+    executor = ManualExecutor()
+    manager = JobManager(executor, session_factory)
+
+    job = manager.submit("train_message_classifier")
+    executor.futures[0].set_exception(ValueError("ラベル付きメッセージがありません"))
+
+    failed = JobManager(ManualExecutor(), session_factory).get(job["job_id"])
+    assert failed["status"] == "failed"
+    assert failed["error"] == "ラベル付きメッセージがありません"
+    assert failed["result"] is None
+
+def test_unknown_job(session_factory):
+    assert JobManager(ManualExecutor(), session_factory).get("missing") is None
+
+def test_old_jobs_are_pruned(session_factory, monkeypatch):
+    monkeypatch.setattr("app.services.job_manager.MAX_JOB_HISTORY", 2)
+    manager = JobManager(ManualExecutor(), session_factory)
+
+    jobs = [manager.submit("train_message_classifier") for _ in range(4)]
+
+    with session_factory() as db:
+        remaining = {job.id for job in db.query(BackgroundJob)}
+    assert jobs[-1]["job_id"] in remaining
+    assert len(remaining) <= 3
+
+def test_job_of_stopped_worker_fails(session_factory):
+    """投入したワーカーが停止して生存の記録が途切れたジョブは、他のワーカーから失敗に見える"""
+    stopped = JobManager(ManualExecutor(), session_factory, heartbeat_interval=60)
+    job = stopped.submit("train_hotel_model", hotel_id=1)
+    other = JobManager(ManualExecutor(), session_factory, heartbeat_interval=60)
+    assert other.get(job["job_id"])["status"] == "queued"
+
+    # 最後の記録から3回分以上経過した（ワーカーが停止した）
+    with session_factory() as db:
+        db.query(BackgroundJob).update({"heartbeat_at": datetime.now() - timedelta(minutes=5)})
+        db.commit()
+
+    failed = other.get(job["job_id"])
+    assert failed["status"] == "failed"
+    assert failed["error"] == STALE_JOB_ERROR
+    assert failed["finished_at"] is not None
+
+def test_stale_jobs_are_swept_on_submit(session_factory):
+    stopped = JobManager(ManualExecutor(), session_factory, heartbeat_interval=60)
+    job = stopped.submit("train_message_classifier")
+    with session_factory() as db:
+        db.query(BackgroundJob).update({"heartbeat_at": datetime.now() - timedelta(minutes=5)})
+        db.commit()
+
+    JobManager(ManualExecutor(), session_factory, heartbeat_interval=60).submit("train_message_classifier")
+
+    with session_factory() as db:
+        assert db.get(BackgroundJob, job["job_id"]).status == "failed"
+
+def test_heartbeat_keeps_running_job_alive(tmp_path):
+    """実行中のワーカーは生存を記録し続けるため、長いジョブも失敗にならない"""
+    # 生存の記録はスレッドから書き込むため、インメモリではなく一時ファイルのSQLiteを使う
+    engine = create_engine(f"sqlite:///{tmp_path}/jobs.db", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(bind=engine)
+    executor = ManualExecutor()
+    manager = JobManager(executor, session_factory, heartbeat_interval=0.01)
+    job = manager.submit("train_hotel_model", hotel_id=1)
+    executor.futures[0].set_running_or_notify_cancel()
+
+    time.sleep(0.05)
+    with session_factory() as db:
+        heartbeat_at = db.get(BackgroundJob, job["job_id"]).heartbeat_at
+    assert heartbeat_at > datetime.fromisoformat(job["created_at"])
+    assert JobManager(ManualExecutor(), session_factory, heartbeat_interval=0.01).get(job["job_id"])["status"] == "queued"
+
+    executor.futures[0].set_result({"templates": 3})
+    assert manager.get(job["job_id"])["status"] == "completed"
+    engine.dispose()
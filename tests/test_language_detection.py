@@ -0,0 +1,23 @@
+"""detect_language（文字種・文字3-gramによる言語判定）のテスト"""
+
+import pytest
+
+from app.services.language_detection import detect_language
+
+@pytest.mark.parametrize("text", ["質問", "時間", "予約確認", "領収書発行", "駐車場有無"])
+def test_kanji_only_japanese(text):
+    """かなを含まない漢字だけの日本語（日本語でも使う漢字のみ）は中国語と判定しない"""
+    assert detect_language(text) == "ja"
+
+@pytest.mark.parametrize("text", ["请问有房间吗", "請問有房間嗎", "谢谢你", "我想预订两晚"])
+def test_chinese(text):
+    assert detect_language(text) == "zh"
+
+@pytest.mark.parametrize("text, expected", [
+    ("チェックイン前に荷物を預けられますか？", "ja"),
+    ("체크인 전에 짐을 맡길 수 있나요?", "ko"),
+    ("Can I store my luggage before check in?", "en"),
+    ("Est-ce que je peux laisser mes bagages avant l'arrivée?", "fr")
+])
+def test_other_languages(text, expected):
+    assert detect_language(text) == expected
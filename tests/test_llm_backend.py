@@ -0,0 +1,100 @@
+"""LLMService のストリーミング・トークン集計と、LLMバックエンドの選択のテスト"""
+
+import asyncio
+
+import pytest
+
+from app.config import settings
+from app.services import llm_backend
+from app.services.llm_backend import (
+    LLMBackend,
+    LLMCompletion,
+    LLMRequest,
+    LLMService,
+    MicroBatcher,
+    StubBackend,
+    SuggestionCache,
+    get_llm_service,
+    has_openai_api_key,
+    llm_usage
+)
+
+@pytest.fixture(autouse=True)
+def reset_usage():
+    llm_usage.reset()
+    yield
+    llm_usage.reset()
+
+async def collect(stream):
+    return [suggestion async for suggestion in stream]
+
+def test_stream_suggestions_records_usage_in_service():
+    """ストリーミングでも suggest() と同じくサービス側でトークン数・呼び出し回数を集計する"""
+    service = LLMService(StubBackend())
+
+    suggestions = asyncio.run(collect(service.stream_suggestions("荷物を預けたいです", "luggage")))
+
+    assert [suggestion.source for suggestion in suggestions] == ["AI Generated #1 (stub)", "AI Generated #2 (stub)"]
+    totals = llm_usage.snapshot()["totals"]
+    assert totals["requests"] == 1
+    assert totals["prompt_tokens"] > 0 and totals["completion_tokens"] > 0
+
+    # 2回目はキャッシュから返し、LLMは呼ばない
+    cached = asyncio.run(collect(service.stream_suggestions("荷物を預けたいです", "luggage")))
+    assert [suggestion.content for suggestion in cached] == [suggestion.content for suggestion in suggestions]
+    totals = llm_usage.snapshot()["totals"]
+    assert totals["requests"] == 1
+    assert totals["cache_hits"] == 1
+
+@pytest.mark.parametrize("api_key, expected", [
+    ("", False),
+    ("sk-your-openai-api-key-here", False),
+    ("your_openai_api_key", False),
+    ("sk-proj-abc123", True)
+])
+def test_has_openai_api_key(monkeypatch, api_key, expected):
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", api_key)
+    assert has_openai_api_key() is expected
+
+def test_auto_backend_ignores_placeholder_key(monkeypatch):
+    """LLM_BACKEND=auto で env.example のプレースホルダーのままなら LLM を使わない"""
+    monkeypatch.setattr(settings, "LLM_BACKEND", "auto")
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "sk-your-openai-api-key-here")
+    monkeypatch.setattr(llm_backend, "_llm_service", None)
+    assert get_llm_service() is None
+
+def test_cache_key_keeps_numbers():
+    """泊数・日付が違う問い合わせは別のキャッシュキーにする"""
+    cache = SuggestionCache(max_size=10, ttl=60)
+    first = LLMRequest("3泊で予約できますか？15日から", "reservation")
+    second = LLMRequest("1泊で予約できますか？20日から", "reservation")
+    assert cache.key(first) != cache.key(second)
+    # 全角数字・空白・記号の違いは同じキー
+    assert cache.key(first) == cache.key(LLMRequest("３泊で 予約できますか 15日から", "reservation"))
+
+    cache.set(first, ["3泊のご予約"])
+    assert cache.get(second) is None
+
+def test_micro_batcher_fails_missing_completions():
+    """バックエンドの結果がリクエストより少なくても、残りの呼び出し側はすぐに失敗する"""
+    class ShortBackend(LLMBackend):
+        name = "short"
+
+        async def complete_batch(self, requests):
+            return [LLMCompletion(["返信"])]
+
+    async def run():
+        batcher = MicroBatcher(ShortBackend(), max_batch_size=2, max_wait_ms=10)
+        return await asyncio.wait_for(asyncio.gather(
+            batcher.submit(LLMRequest("a", "general")),
+            batcher.submit(LLMRequest("b", "general")),
+            return_exceptions=True
+        ), timeout=1)
+
+    first, second = asyncio.run(run())
+    assert first.replies == ["返信"]
+    assert isinstance(second, RuntimeError)
+
+def test_backend_requires_complete_batch():
+    with pytest.raises(TypeError):
+        LLMBackend()
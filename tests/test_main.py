@@ -0,0 +1,139 @@
+"""APIエンドポイントのテスト"""
+
+from datetime import datetime
+
+import pytest
+
+from app.config import settings
+from app.models import Booking, GuestMessage, Hotel
+
+def add_messages(session, hotel, contents, booking_id=None):
+    """ホテルの予約を1件作り、メッセージを追加してIDを返す"""
+    booking = Booking(booking_id=booking_id or f"B-{hotel.id}", hotel_id=hotel.id, guest_name="山田太郎", check_in=datetime(2025, 3, 5), check_out=datetime(2025, 3, 7))
+    session.add(booking)
+    session.flush()
+    messages = [GuestMessage(booking_id=booking.id, platform="booking.com", message_content=content) for content in contents]
+    session.add_all(messages)
+    session.commit()
+    return [message.id for message in messages]
+
+@pytest.fixture
+def hotels(api):
+    _, session = api
+    hotels = [Hotel(name="東京ホテル", city="東京"), Hotel(name="大阪ホテル", city="大阪")]
+    session.add_all(hotels)
+    session.commit()
+    return hotels
+
+def test_batch_suggestions(api, hotels):
+    """他のホテルのメッセージは除外し、重複したIDは1件にまとめて指定した順に返す"""
+    client, session = api
+    tokyo, osaka = hotels
+    luggage, wifi = add_messages(session, tokyo, ["荷物を預けたいです", "Wi-Fiのパスワードを教えてください"])
+    (other,) = add_messages(session, osaka, ["駐車場はありますか"])
+
+    response = client.post("/messages/suggestions/batch", json={
+        "hotel_id": tokyo.id,
+        "message_ids": [wifi, other, luggage, wifi, 9999]
+    })
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [result["message_id"] for result in body["results"]] == [wifi, luggage]
+    assert body["results"][1]["message_content"] == "荷物を預けたいです"
+    assert all(result["suggestions"] for result in body["results"])
+    assert body["missing_message_ids"] == [other, 9999]
+
+@pytest.mark.parametrize("payload", [
+    {"message_ids": []},
+    {"message_ids": list(range(1, settings.SUGGESTION_BATCH_MAX + 2))},
+    {"message_ids": [1], "budget_ms": 0}
+])
+def test_batch_suggestions_limits(api, hotels, payload):
+    client, _ = api
+    response = client.post("/messages/suggestions/batch", json={"hotel_id": hotels[0].id, **payload})
+    assert response.status_code == 422
+
+def add_inbox(session, hotel, count=5):
+    """受信箱のメッセージ（偶数番目は airbnb・luggage、奇数番目は booking.com・general）"""
+    ids = add_messages(session, hotel, [f"メッセージ{i}" for i in range(count)])
+    for i, message in enumerate(session.query(GuestMessage).filter(GuestMessage.id.in_(ids)).order_by(GuestMessage.id)):
+        message.platform = "airbnb" if i % 2 == 0 else "booking.com"
+        message.message_type = "luggage" if i % 2 == 0 else "general"
+    session.commit()
+    return ids
+
+def test_inbox_pages(api, hotels):
+    """カーソルで新しい順に重複・欠落なくページをたどり、最後のページは next_cursor=None"""
+    client, session = api
+    ids = add_inbox(session, hotels[0])
+    add_inbox(session, hotels[1], 2)
+
+    seen = []
+    cursor = None
+    for _ in range(3):
+        params = {"limit": 2, **({"before_id": cursor} if cursor else {})}
+        page = client.get(f"/hotels/{hotels[0].id}/inbox", params=params).json()
+        seen.extend(item["id"] for item in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+        # ページの途中で新しいメッセージが届いてもカーソル以降のページは変わらない
+        add_messages(session, hotels[0], ["新着"], booking_id=f"B-new-{len(seen)}")
+
+    assert seen == sorted(ids, reverse=True)
+    assert cursor is None
+
+def test_inbox_filters_with_cursor(api, hotels):
+    client, session = api
+    ids = add_inbox(session, hotels[0], 6)
+    airbnb = sorted(ids[0::2], reverse=True)
+
+    first = client.get(f"/hotels/{hotels[0].id}/inbox", params={"limit": 2, "platform": "airbnb"}).json()
+    assert [item["id"] for item in first["items"]] == airbnb[:2]
+    assert first["next_cursor"] == airbnb[1]
+
+    second = client.get(f"/hotels/{hotels[0].id}/inbox", params={"limit": 2, "platform": "airbnb", "message_type": "luggage", "before_id": first["next_cursor"]}).json()
+    assert [item["id"] for item in second["items"]] == airbnb[2:]
+    assert second["next_cursor"] is None
+
+def test_inbox_exact_last_page(api, hotels):
+    """件数がちょうど limit の倍数でも、最後のページの後に空のページを返さない"""
+    client, session = api
+    add_inbox(session, hotels[0], 4)
+
+    first = client.get(f"/hotels/{hotels[0].id}/inbox", params={"limit": 2}).json()
+    second = client.get(f"/hotels/{hotels[0].id}/inbox", params={"limit": 2, "before_id": first["next_cursor"]}).json()
+    assert len(second["items"]) == 2
+    assert second["next_cursor"] is None
+
+def test_inbox_facets(api, hotels):
+    client, session = api
+    add_inbox(session, hotels[0], 2)
+
+    facets = client.get(f"/hotels/{hotels[0].id}/inbox/facets").json()
+    assert facets == {"platforms": ["airbnb", "booking.com"], "message_types": ["general", "luggage"]}
+
+    assert client.get("/hotels/9999/inbox/facets").status_code == 404
+    assert client.get("/hotels/9999/inbox").status_code == 404
+
+def test_etag_revalidation(api, hotels):
+    """If-None-Match が一致すれば本文なしの304、内容が変わればETagも変わる"""
+    client, session = api
+
+    first = client.get("/hotels")
+    etag = first.headers["ETag"]
+    assert first.status_code == 200
+
+    cached = client.get("/hotels", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["ETag"] == etag
+    assert client.get("/hotels", headers={"If-None-Match": f'"other", W/{etag}'}).status_code == 304
+
+    hotels[0].name = "新東京ホテル"
+    session.commit()
+    changed = client.get("/hotels", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert changed.json()[0]["name"] == "新東京ホテル"
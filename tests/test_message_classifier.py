@@ -0,0 +1,82 @@
+"""MessageClassifier（学習済みの分類モデルとキーワード分類へのフォールバック）のテスト"""
+
+import pytest
+
+pytest.importorskip("sklearn")
+
+from app.config import settings
+from app.services import api_service
+from app.services.api_service import MessageProcessor
+from app.services.message_classifier import LinearModel, MessageClassifier
+
+TRAINING = {
+    "luggage": [
+        "荷物を預けたいです", "スーツケースを預かってもらえますか", "キャリーケースを置いておけますか",
+        "チェックイン前にキャリーケースを置いていいですか", "大きなキャリーケースを持って行きます",
+        "チェックアウト後にバッグを置いておけますか", "Can you keep my luggage?", "Where can I leave my suitcase?"
+    ],
+    "availability": [
+        "来週空室はありますか", "予約したいです", "3月に2泊泊まれますか", "週末に泊まれる部屋はありますか",
+        "明日から2泊泊まれますか", "4人で泊まれる部屋はありますか", "Do you have a room available?", "Can I book a room for two nights?"
+    ],
+    "attractions": [
+        "近くの観光地を教えてください", "おすすめの観光スポットはありますか", "周辺で行くべき場所はどこですか",
+        "近くで行くべき場所を教えてください", "子供と行ける場所はありますか", "周辺の見どころを教えてください",
+        "What are the best places to visit nearby?", "Any sightseeing recommendations?"
+    ],
+    "general": [
+        "Wi-Fiのパスワードを教えてください", "朝食は何時からですか", "タオルを追加でお願いします",
+        "駐車場はありますか", "チェックインは何時からですか", "部屋にドライヤーはありますか",
+        "What time is breakfast?", "Is there parking?"
+    ]
+}
+
+# キーワードを含まない言い換えを含む評価用のメッセージ
+LABELED = [
+    ("キャリーケースを置いていけますか", "luggage"),
+    ("荷物を置いておけますか", "luggage"),
+    ("来月3泊泊まれますか", "availability"),
+    ("空室はありますか", "availability"),
+    ("近くで子供と行くべき場所はありますか", "attractions"),
+    ("周辺の見どころはどこですか", "attractions"),
+    ("朝食は何時までですか", "general"),
+    ("Wi-Fiはありますか", "general")
+]
+
+@pytest.fixture
+def model_path(tmp_path):
+    texts = [text for texts in TRAINING.values() for text in texts]
+    labels = [label for label, texts in TRAINING.items() for _ in texts]
+    path = str(tmp_path / "message_classifier.npz")
+    LinearModel.fit(texts, labels).save(path)
+    return path
+
+def accuracy(predictions):
+    return sum(prediction == label for prediction, (_, label) in zip(predictions, LABELED)) / len(LABELED)
+
+def test_model_matches_or_beats_keywords(monkeypatch, model_path):
+    monkeypatch.setattr(settings, "CLASSIFIER_MIN_CONFIDENCE", 0.0)
+    monkeypatch.setattr(api_service, "message_classifier", MessageClassifier(model_path))
+    processor = MessageProcessor()
+    messages = [message for message, _ in LABELED]
+
+    model_accuracy = accuracy(processor.categorize_messages(messages))
+    keyword_accuracy = accuracy([processor.categorize_by_keywords(message) for message in messages])
+
+    assert model_accuracy >= keyword_accuracy
+    assert processor.categorize_message("キャリーケースを置いていけますか") == "luggage"
+
+def test_keyword_fallback_without_model(monkeypatch, tmp_path):
+    """モデルファイルがなければキーワードで分類する"""
+    classifier = MessageClassifier(str(tmp_path / "missing.npz"))
+    monkeypatch.setattr(api_service, "message_classifier", classifier)
+    processor = MessageProcessor()
+
+    assert classifier.predict_batch(["荷物を預けたいです", "朝食は何時からですか"]) == [None, None]
+    assert processor.categorize_messages(["荷物を預けたいです", "キャリーケースを置いていけますか"]) == ["luggage", "general"]
+
+def test_low_confidence_falls_back_to_keywords(monkeypatch, model_path):
+    monkeypatch.setattr(settings, "CLASSIFIER_MIN_CONFIDENCE", 1.0)
+    monkeypatch.setattr(api_service, "message_classifier", MessageClassifier(model_path))
+
+    assert MessageProcessor().categorize_messages(["荷物を預けたいです", "キャリーケースを置いていけますか"]) == ["luggage", "general"]
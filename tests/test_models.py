@@ -0,0 +1,22 @@
+"""create_missing_indexes（既存のデータベースへのインデックスの追加）のテスト"""
+
+from sqlalchemy import create_engine, inspect, text
+
+from app.models import Base, create_missing_indexes
+
+def test_indexes_added_to_existing_tables():
+    """インデックスを追加する前に作成したテーブルにも、インデックスを後から作成する"""
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE bookings (id INTEGER PRIMARY KEY, hotel_id INTEGER NOT NULL)"))
+        conn.execute(text("CREATE TABLE guest_messages (id INTEGER PRIMARY KEY, booking_id INTEGER NOT NULL)"))
+    Base.metadata.create_all(engine)
+
+    create_missing_indexes(engine)
+    # 2回目は何もしない
+    create_missing_indexes(engine)
+
+    inspector = inspect(engine)
+    assert "ix_bookings_hotel_id" in {index["name"] for index in inspector.get_indexes("bookings")}
+    assert "ix_guest_messages_booking_id" in {index["name"] for index in inspector.get_indexes("guest_messages")}
+    engine.dispose()
@@ -0,0 +1,73 @@
+"""rank_suggestions（言い換えの集約・ソースの多様性・学習した加点）のテスト"""
+
+from app.services.ranking import DIVERSITY_PENALTY, collapse_near_duplicates, rank_suggestions
+from app.services.suggestion import Suggestion, SuggestionSource, SuggestionType
+
+LUGGAGE = "お荷物はチェックイン前でもフロントにてお預かりいたします。"
+PARKING = "駐車場はホテル裏手にございます。1泊1,500円でご利用いただけます。"
+WIFI = "Wi-Fiは全館無料でご利用いただけます。パスワードはフロントでお渡しします。"
+
+def template(content, confidence, template_id=1):
+    return Suggestion(content, SuggestionType.TEMPLATE, confidence, f"Template: {template_id}")
+
+def ai(content, confidence, index=1):
+    return Suggestion(content, SuggestionType.AI_GENERATED, confidence, f"AI Generated #{index}")
+
+def rules(content, confidence):
+    return Suggestion(content, SuggestionType.GENERAL, confidence, SuggestionSource.GENERAL_RESPONSE)
+
+def test_paraphrases_collapse_to_highest_score():
+    """記号・空白の違いや言い足しはまとめ、信頼度の高い候補を残す"""
+    suggestions = [
+        template(LUGGAGE, 0.7),
+        ai(LUGGAGE.replace("。", "！") + " お気軽にお申し付けください。", 0.9),
+        rules("お荷物は チェックイン前でも フロントにて お預かりいたします", 0.5)
+    ]
+
+    clusters = collapse_near_duplicates(suggestions)
+
+    assert len(clusters) == 1
+    assert clusters[0]["suggestion"] is suggestions[1]
+    assert clusters[0]["families"] == {"template", "ai", "rules"}
+
+def test_distinct_replies_survive():
+    suggestions = [template(LUGGAGE, 0.8), template(PARKING, 0.7, 2), ai(WIFI, 0.6)]
+
+    ranked = rank_suggestions(suggestions, top_k=3)
+
+    assert sorted(suggestion.content for suggestion in ranked) == sorted([LUGGAGE, PARKING, WIFI])
+
+def test_consensus_across_sources_raises_score():
+    """複数のソースが同じ内容を出した候補は、同じ信頼度の候補より上に来る"""
+    ranked = rank_suggestions([template(PARKING, 0.7), ai(LUGGAGE, 0.7), rules(LUGGAGE + "ご安心ください。", 0.6)], top_k=2)
+
+    assert ranked[0].content == LUGGAGE
+    assert len(ranked) == 2
+
+def test_diversity_penalty_reorders_same_source():
+    """同じ種類のソースが上位に続く場合は、僅差の別ソースの候補を先に選ぶ"""
+    suggestions = [
+        template(LUGGAGE, 0.8),
+        template(PARKING, 0.79, 2),
+        ai(WIFI, 0.79 - DIVERSITY_PENALTY / 2)
+    ]
+
+    ranked = rank_suggestions(suggestions, top_k=3)
+
+    assert [suggestion.content for suggestion in ranked] == [LUGGAGE, WIFI, PARKING]
+
+def test_priors_change_order():
+    """フィードバックから学習した加点で順位が入れ替わる"""
+    suggestions = [template(LUGGAGE, 0.8), ai(PARKING, 0.75)]
+
+    assert rank_suggestions(suggestions)[0].content == LUGGAGE
+    assert rank_suggestions(suggestions, priors={"ai": 0.1})[0].content == PARKING
+    # テンプレート単位の減点
+    assert rank_suggestions(suggestions, priors={"Template: 1": -0.1})[0].content == PARKING
+
+def test_priors_pick_cluster_representative():
+    """まとめた候補のうち、学習した加点を含めて高い方を残す"""
+    suggestions = [template(LUGGAGE, 0.8), ai(LUGGAGE + "お気軽にどうぞ。", 0.75)]
+
+    assert collapse_near_duplicates(suggestions)[0]["suggestion"] is suggestions[0]
+    assert collapse_near_duplicates(suggestions, priors={"ai": 0.1})[0]["suggestion"] is suggestions[1]
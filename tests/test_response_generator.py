@@ -0,0 +1,120 @@
+"""ResponseGenerator._iter_sources（ソースの並行実行・ストリーミングのAI候補）のテスト"""
+
+import asyncio
+
+import pytest
+
+from app.services.deadline import Deadline
+from app.services.response_generator import ResponseGenerator
+
+@pytest.fixture
+def generator(monkeypatch):
+    generator = ResponseGenerator()
+    monkeypatch.setattr(generator, "SOURCE_TIMEOUTS", {"ai": 0.2, "history": 0.2})
+    return generator
+
+async def collect(generator, sources, dropped):
+    return [item async for item in generator._iter_sources(sources, Deadline(1000), dropped)]
+
+async def history(delay=0.0):
+    await asyncio.sleep(delay)
+    return ["history"]
+
+def test_streaming_source_yields_partials_then_all(generator):
+    """非同期イテレータのソースは1件ずつ返し、最後に全件を返す"""
+    async def ai():
+        for reply in ("ai-1", "ai-2"):
+            await asyncio.sleep(0.01)
+            yield reply
+
+    dropped = []
+    events = asyncio.run(collect(generator, {"ai": ai(), "history": history(0.015)}, dropped))
+
+    assert [event for event in events if event[0] == "ai"] == [("ai", ["ai-1"]), ("ai", ["ai-2"]), ("ai", ["ai-1", "ai-2"])]
+    # 1件目のAI候補は、AIのストリームが終わる前・過去の返信より先に届く
+    assert events[0] == ("ai", ["ai-1"])
+    assert ("history", ["history"]) in events
+    assert dropped == []
+
+def test_streaming_source_keeps_partials_on_timeout(generator):
+    """タイムアウトしたストリーミングのソースはそれまでに届いた候補を使い、何も届かなければ dropped"""
+    async def slow_ai():
+        yield "ai-1"
+        await asyncio.sleep(1)
+        yield "ai-2"
+
+    dropped = []
+    events = asyncio.run(collect(generator, {"ai": slow_ai(), "history": history(1)}, dropped))
+
+    assert events == [("ai", ["ai-1"]), ("ai", ["ai-1"])]
+    assert dropped == ["history"]
+
+def test_suggestions_keep_request_session_state(db):
+    """候補の生成はリクエストのセッションの未確定の変更・読み込み済みのオブジェクトを破棄しない"""
+    from app.models import Hotel, ResponseTemplate
+    from app.services.hotel_context import hotel_context_registry
+
+    hotel = Hotel(name="テストホテル", city="東京")
+    db.add(hotel)
+    db.commit()
+    hotel_context_registry.invalidate(hotel.id)
+    pending = ResponseTemplate(hotel_id=hotel.id, message_type="luggage", template_content="お荷物をお預かりします。", language="ja")
+    db.add(pending)
+
+    result = asyncio.run(ResponseGenerator().generate_suggestions_with_sources("荷物を預けたいです", "luggage", hotel.id, db))
+
+    assert result["suggestions"]
+    assert pending in db
+    assert db.query(ResponseTemplate).count() == 1
+    assert "name" in hotel.__dict__
+
+LUGGAGE_INFO = {"storage_options": [{"name": "東京駅コインロッカー", "address": "東京都千代田区", "distance_km": 0.3}]}
+ATTRACTIONS = [{"name": "皇居"}, {"name": "丸の内"}]
+
+@pytest.fixture
+def context_template(db, monkeypatch):
+    """最寄り駅・観光地の変数を使うテンプレートのあるホテル（周辺情報は未取得）"""
+    from app.models import Hotel, ResponseTemplate
+    from app.services.hotel_context import hotel_context_registry
+
+    hotel = Hotel(name="テストホテル", city="東京")
+    db.add(hotel)
+    db.commit()
+    db.add(ResponseTemplate(
+        hotel_id=hotel.id,
+        message_type="luggage",
+        template_content="{{ nearest_station }}から徒歩5分です。近くに{{ top_attractions|join('、') }}があります。",
+        language="ja"
+    ))
+    db.commit()
+    hotel_context_registry.invalidate(hotel.id)
+
+    generator = ResponseGenerator()
+    monkeypatch.setattr(generator.hotel_info_agent, "get_luggage_storage_info", lambda *args, **kwargs: LUGGAGE_INFO)
+    monkeypatch.setattr(generator.hotel_info_agent, "get_nearby_attractions", lambda *args, **kwargs: ATTRACTIONS)
+    return generator, hotel
+
+RENDERED = "東京駅から徒歩5分です。近くに皇居、丸の内があります。"
+
+def test_templates_render_context_on_first_request(db, context_template):
+    """周辺情報が未取得でも、取得してからテンプレートを描画する（話題が観光地でなくても観光地を取得する）"""
+    generator, hotel = context_template
+
+    async def run():
+        return [event async for event in generator.stream_suggestions("荷物を預けたいです", "luggage", hotel.id, db)]
+
+    events = asyncio.run(run())
+
+    templates = [data["suggestion"].content for event, data in events if event == "suggestion" and data["source"] == "templates"]
+    assert templates == [RENDERED]
+    done = events[-1][1]
+    assert "attractions" in done["sources"]["contributed"]
+    assert "templates" in done["sources"]["contributed"]
+
+def test_batch_templates_render_context_on_first_request(db, context_template):
+    generator, hotel = context_template
+    messages = [{"content": "荷物を預けたいです", "message_type": "luggage", "language": "ja", "booking": None}]
+
+    batch = asyncio.run(generator.generate_batch_suggestions(messages, hotel.id, db))
+
+    assert RENDERED in [suggestion.content for suggestion in batch[0]["suggestions"]]
@@ -0,0 +1,19 @@
+"""streamlit_api_client.ETagStore（ETag と本文のLRU）のテスト"""
+
+import pytest
+
+pytest.importorskip("streamlit")
+
+from streamlit_api_client import ETagStore
+
+def test_etag_store_evicts_least_recently_used():
+    store = ETagStore(max_size=2)
+    store.set("/hotels", '"a"', [])
+    store.set("/hotels/1/messages", '"b"', [])
+    assert store.get("/hotels") == ('"a"', [])
+
+    store.set("/hotels/2/messages", '"c"', [])
+
+    assert store.get("/hotels/1/messages") is None
+    assert store.get("/hotels") == ('"a"', [])
+    assert store.get("/hotels/2/messages") == ('"c"', [])
@@ -0,0 +1,44 @@
+"""テンプレートの変数（日付の表記）とテンプレート候補の類似度の反映のテスト"""
+
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from app.agents.booking_data_agent import BookingDataAgent
+from app.services.suggestion import Suggestion, SuggestionType
+from app.services.template_engine import template_variables
+
+HOTEL = SimpleNamespace(name="テストホテル", address="東京都千代田区", city="東京", country="日本")
+BOOKING = SimpleNamespace(guest_name="山田", check_in=datetime(2025, 3, 5), check_out=datetime(2025, 3, 7))
+
+@pytest.mark.parametrize("language, check_in", [
+    (None, "2025年3月5日"),
+    ("ja", "2025年3月5日"),
+    ("en", "March 5, 2025"),
+    ("de", "05.03.2025"),
+    ("pt", "2025-03-05")
+])
+def test_dates_follow_template_language(language, check_in):
+    variables = template_variables(HOTEL, BOOKING, language=language)
+    assert variables["check_in"] == check_in
+
+def test_template_similarity_matches_rendered_templates():
+    """変数を描画した候補も、テンプレートIDで類似度が反映される"""
+    rendered = Suggestion("山田様、3月5日のご到着をお待ちしております。", SuggestionType.TEMPLATE, 0.8, "Template: 7")
+    static = Suggestion("お荷物をお預かりいたします。", SuggestionType.TEMPLATE, 0.8, "Template: 8")
+    scores = [
+        {"template_id": 7, "content": "{{ guest_name }}様、{{ check_in }}のご到着をお待ちしております。", "similarity": 1.0},
+        {"template_id": 8, "content": "お荷物をお預かりいたします。", "similarity": 0.0}
+    ]
+
+    adjusted = BookingDataAgent()._apply_template_similarity(scores, [rendered, static])
+
+    assert [suggestion.confidence for suggestion in adjusted] == [0.9, 0.7]
+
+def test_template_similarity_legacy_model_matches_content():
+    """テンプレートIDを保存していない古いモデルは本文で対応付ける"""
+    static = Suggestion("お荷物をお預かりいたします。", SuggestionType.TEMPLATE, 0.8, "Template: 8")
+    scores = [{"template_id": None, "content": "お荷物をお預かりいたします。", "similarity": 0.5}]
+
+    assert BookingDataAgent()._apply_template_similarity(scores, [static])[0].confidence == 0.8